@@ -1,137 +1,232 @@
+"""Raydium AMM v4 池子发现
+
+订阅 Raydium AMM v4 程序的所有池子账户，将新出现的池子写入 Redis 与数据库。
+
+池子状态每次变化（每笔交易）都会推送，为了在一个 CPU 核心上跟上主网的推送速度：
+
+1. 订阅使用 base64 编码，直接从推送的数据中读取 AMM 状态，不再重新获取池子账户
+2. 已写入的池子记录在进程内，重复的推送只需一次字典访问
+3. 新池子在内存中累积后批量处理：一个 pipeline 检查是否已存在，一次 getMultipleAccounts
+   获取 market 账户，一个 pipeline 写入 Redis，一条多行 upsert 写入数据库
+
+启动时同时构建 mint -> 池子索引（见 solbot_cache.pool_index）的快照，之后发现的新池子追加到索引中。
+"""
+
 import asyncio
 
 import aioredis
 from solana.rpc import commitment
 from solana.rpc.websocket_api import connect
-from solbot_cache.rayidum import RaydiumPoolStoreage
+from solbot_cache.local import LRUCache
+from solbot_cache.pool_index import PoolIndexWriter, build_snapshot, encode_amm_v4
+from solbot_cache.rayidum import AMMData, RaydiumPoolStoreage
 from solbot_common.config import settings
 from solbot_common.constants import RAY_V4
-from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_LAYOUT_V4
+from solbot_common.layouts.amm_v4 import AMM_V4_SERUM_MARKET_OFFSET, LIQUIDITY_STATE_LAYOUT_V4
 from solbot_common.log import logger
-from solbot_common.utils.pool import fetch_pool_data_from_rpc
 from solbot_common.utils.utils import get_async_client
-from solbot_db.redis import RedisClient
+from solders.pubkey import Pubkey  # type: ignore
 from solders.rpc.responses import ProgramNotification  # type: ignore
 from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
 
 from cache_preloader.core.base import AutoUpdateCacheProtocol
 
+# getMultipleAccounts 单次最多查询的账户数量
+MAX_MULTIPLE_ACCOUNTS = 100
+
 
 class RaydiumPoolCache(AutoUpdateCacheProtocol):
     def __init__(
         self,
         rpc_endpoint: str,
         redis: aioredis.Redis,
-        max_concurrent_tasks: int = 10,
+        batch_size: int = MAX_MULTIPLE_ACCOUNTS,
+        flush_interval: float = 0.5,
+        known_pools_size: int = 100_000,
+        pool_index_path: str | None = None,
     ):
+        """
+        Args:
+            rpc_endpoint: RPC 地址
+            redis: Redis客户端实例
+            batch_size: 每批处理的池子数量，不超过 getMultipleAccounts 的上限
+            flush_interval: 新池子最多在内存中等待的时间（秒）
+            known_pools_size: 进程内记录的已写入池子的数量
+            pool_index_path: 池子索引文件路径，默认为 settings.db.pool_index_path
+        """
         self.rpc_client = get_async_client()
         self.websocket_url = rpc_endpoint.replace("https://", "wss://")
         self.storeage = RaydiumPoolStoreage(redis)
-        # 添加信号量来限制并发任务数
-        self._semaphore = asyncio.Semaphore(max_concurrent_tasks)
-        # 用于追踪正在运行的任务
-        self._running_tasks: set[asyncio.Task] = set()
-        # 是否处于等待其他任务完成的标志
-        self._waiting_for_tasks = False
-
-    async def _process_message(self, message: ProgramNotification):
-        """使用信号量包装消息处理函数"""
-        try:
-            async with self._semaphore:
-                await self._handle_message(message)
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            logger.exception(e)
-        finally:
-            # 从正在运行的任务集合中移除当前任务
-            current_task = asyncio.current_task()
-            if current_task:
-                self._running_tasks.discard(current_task)
-
-    async def _handle_message(self, message: ProgramNotification):
+        self.batch_size = min(batch_size, MAX_MULTIPLE_ACCOUNTS)
+        self.flush_interval = flush_interval
+        # 已写入的池子
+        self._known_pools: LRUCache[Pubkey, bool] = LRUCache(maxsize=known_pools_size)
+        # 等待写入的池子：pool_id -> amm_data
+        self._pending: dict[Pubkey, bytes] = {}
+        self._batch_ready = asyncio.Event()
+        self.pool_index_writer = PoolIndexWriter(pool_index_path)
+        # 构建快照期间发现的新池子，快照写入后再追加到索引中
+        self._index_backlog: list[bytes] | None = None
+        self._stream_task: asyncio.Task | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._snapshot_task: asyncio.Task | None = None
+        self._is_running = False
+
+    def _on_notification(self, message: ProgramNotification) -> None:
         pool_id = message.result.value.pubkey
-        is_exists = await self.storeage.is_exist(pool_id)
-        if is_exists:
-            logger.debug(f"Pool data already exists: {pool_id}")
+        if pool_id in self._pending or self._known_pools.get(pool_id) is not None:
             return
-
-        try:
-            pool_data = await fetch_pool_data_from_rpc(pool_id, self.rpc_client)
-        except Exception as e:
-            logger.exception(f"Error fetching market data: {e}")
-            return
-
-        if pool_data is None:
-            logger.error(f"Failed to fetch pool data for pool_id: {pool_id}")
+        self._pending[pool_id] = bytes(message.result.value.account.data)
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    async def _fetch_markets(self, market_ids: list[Pubkey]) -> list[bytes | None]:
+        markets: list[bytes | None] = []
+        for i in range(0, len(market_ids), MAX_MULTIPLE_ACCOUNTS):
+            resp = await self.rpc_client.get_multiple_accounts(
+                market_ids[i : i + MAX_MULTIPLE_ACCOUNTS], commitment=commitment.Processed
+            )
+            markets.extend(bytes(account.data) if account else None for account in resp.value)
+        return markets
+
+    async def _process_batch(self, batch: dict[Pubkey, bytes]) -> None:
+        pool_ids = list(batch)
+        exists = await self.storeage.pool_data.exists_many([str(p) for p in pool_ids])
+        new_pool_ids = []
+        for pool_id, is_exists in zip(pool_ids, exists, strict=True):
+            if is_exists:
+                self._known_pools.set(pool_id, True)
+            else:
+                new_pool_ids.append(pool_id)
+        if not new_pool_ids:
             return
 
-        await self.storeage.update(pool_id, pool_data)
-
-    async def start(self):
-        try:
-            async with connect(
-                self.websocket_url,
-                ping_timeout=30,
-                ping_interval=20,
-                close_timeout=20,
-            ) as websocket:
-                self.websocket = websocket
-                await self.websocket.program_subscribe(
-                    program_id=RAY_V4,
-                    commitment=commitment.Confirmed,
-                    encoding="jsonParsed",
-                    filters=[LIQUIDITY_STATE_LAYOUT_V4.sizeof()],
+        market_ids = [
+            Pubkey.from_bytes(
+                batch[pool_id][AMM_V4_SERUM_MARKET_OFFSET : AMM_V4_SERUM_MARKET_OFFSET + 32]
+            )
+            for pool_id in new_pool_ids
+        ]
+        markets = await self._fetch_markets(market_ids)
+
+        pools: list[AMMData] = []
+        for pool_id, market_id, market_data in zip(new_pool_ids, market_ids, markets, strict=True):
+            if market_data is None:
+                logger.error(f"Failed to fetch market data: {market_id}, pool_id: {pool_id}")
+                continue
+            pools.append(
+                {"pool_id": pool_id, "amm_data": batch[pool_id], "market_data": market_data}
+            )
+
+        await self.storeage.update_many(pools)
+        for pool in pools:
+            self._known_pools.set(pool["pool_id"], True)
+        self._append_to_index(pools)
+        logger.info(f"Pool data updated: {len(pools)} new pools")
+
+    def _append_to_index(self, pools: list[AMMData]) -> None:
+        records = []
+        for pool in pools:
+            try:
+                records.append(
+                    encode_amm_v4(pool["pool_id"], pool["amm_data"], pool["market_data"])
                 )
-
-                while True:
-                    try:
-                        messages = await websocket.recv()
-                        for message in messages:
-                            if not isinstance(message, ProgramNotification):
-                                continue
-                            # 创建新任务并追踪它
-                            task = asyncio.create_task(self._process_message(message))
-                            self._running_tasks.add(task)
-                            logger.debug(f"Current tasks: {len(self._running_tasks)}")
-                    except (ConnectionClosedError, ConnectionClosedOK) as ws_error:
-                        logger.warning(f"WebSocket connection closed: {ws_error}")
-                        break
-                    except Exception as e:
-                        logger.error(f"Error processing message: {e}")
-                        logger.exception(e)
-                        break
+            except ValueError as e:
+                logger.warning(f"Failed to encode pool {pool['pool_id']}: {e}")
+        if self._index_backlog is not None:
+            self._index_backlog.extend(records)
+        else:
+            self.pool_index_writer.append(records)
+
+    async def _build_index_snapshot(self) -> None:
+        self._index_backlog = []
+        try:
+            await build_snapshot(self.rpc_client, self.pool_index_writer)
         except Exception as e:
-            logger.error(f"Error in start: {e}")
+            logger.exception(f"Failed to build pool index snapshot: {e}")
         finally:
-            await self.stop()
+            backlog, self._index_backlog = self._index_backlog, None
+            self.pool_index_writer.append(backlog)
+
+    async def _flush(self) -> None:
+        """处理所有等待写入的池子"""
+        batch, self._pending = self._pending, {}
+        self._batch_ready.clear()
+        items = list(batch.items())
+        for i in range(0, len(items), self.batch_size):
+            try:
+                await self._process_batch(dict(items[i : i + self.batch_size]))
+            except Exception as e:
+                logger.exception(f"Error processing pool batch: {e}")
+
+    async def _flush_loop(self) -> None:
+        while self._is_running:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._pending:
+                await self._flush()
+
+    async def _stream(self) -> None:
+        async with connect(
+            self.websocket_url,
+            ping_timeout=30,
+            ping_interval=20,
+            close_timeout=20,
+        ) as websocket:
+            await websocket.program_subscribe(
+                program_id=RAY_V4,
+                commitment=commitment.Confirmed,
+                encoding="base64",
+                filters=[LIQUIDITY_STATE_LAYOUT_V4.sizeof()],
+            )
+            while self._is_running:
+                for message in await websocket.recv():
+                    if isinstance(message, ProgramNotification):
+                        self._on_notification(message)
+
+    async def _stream_loop(self) -> None:
+        while self._is_running:
+            try:
+                await self._stream()
+            except (ConnectionClosedError, ConnectionClosedOK) as ws_error:
+                logger.warning(f"WebSocket connection closed: {ws_error}, reconnecting...")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.exception(f"Error in RaydiumPoolCache stream: {e}")
+                await asyncio.sleep(1)
+
+    async def start(self):
+        if self._is_running:
+            return
+        self._is_running = True
+        self._stream_task = asyncio.create_task(self._stream_loop())
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        self._snapshot_task = asyncio.create_task(self._build_index_snapshot())
+        logger.info("RaydiumPoolCache started")
 
     async def stop(self):
-        """停止所有正在运行的任务"""
+        """停止订阅，并写入剩余的池子"""
         logger.info("Stopping RaydiumPoolCache...")
-
-        if hasattr(self, "websocket"):
-            await self.websocket.close()
-
-        logger.info("RaydiumPoolCache Websocket closed")
-
-        if hasattr(self, "_running_tasks"):
-            if self._waiting_for_tasks is True and len(self._running_tasks) != 0:
-                # Force all tasks to complete
-                for task in self._running_tasks:
-                    task.cancel()
-            else:
-                self._waiting_for_tasks = True
-                logger.info(
-                    f"Waiting for {len(self._running_tasks)} tasks to complete...",
-                )
-                # 等待所有正在运行的任务完成
-                if self._running_tasks:
-                    await asyncio.gather(*self._running_tasks, return_exceptions=True)
-
-            self._running_tasks.clear()
+        self._is_running = False
+        for task in (self._stream_task, self._flush_task, self._snapshot_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._stream_task = None
+        self._flush_task = None
+        self._snapshot_task = None
+        if self._pending:
+            await self._flush()
+        logger.info("RaydiumPoolCache stopped")
 
     def is_running(self):
-        return len(self._running_tasks) > 0
+        return self._is_running
 
 
 if __name__ == "__main__":
@@ -143,6 +238,7 @@ if __name__ == "__main__":
 
         try:
             await pool.start()
+            await asyncio.Event().wait()
         except KeyboardInterrupt:
             logger.info("Received keyboard interrupt, shutting down...")
         finally:
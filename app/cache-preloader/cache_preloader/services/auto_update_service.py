@@ -1,10 +1,12 @@
 import asyncio
 
+from solbot_common.config import settings
 from solbot_common.log import logger
 from solbot_db.redis import RedisClient
 
 from cache_preloader.caches.blockhash import BlockhashCache
 from cache_preloader.caches.min_balance_rent import MinBalanceRentCache
+from cache_preloader.caches.raydium_pool import RaydiumPoolCache
 from cache_preloader.core.protocols import AutoUpdateCacheProtocol
 
 
@@ -16,7 +18,7 @@ class AutoUpdateCacheService:
         self.auto_update_caches: list[AutoUpdateCacheProtocol] = [
             BlockhashCache(self.redis_client),
             MinBalanceRentCache(self.redis_client),
-            # RaydiumPoolCache(settings.rpc.rpc_url, self.redis_client, 20),
+            RaydiumPoolCache(settings.rpc.rpc_url, self.redis_client),
         ]
         self._shutdown_event = asyncio.Event()
         self._main_task = None
@@ -1,4 +1,5 @@
 from aiogram.enums import ParseMode
+from solbot_cache import AccountAmountCache
 from solbot_cache.wallet import WalletCache
 from solbot_services.holding import HoldingService
 
@@ -7,11 +8,12 @@ from tg_bot.templates import render_asset_message
 
 holding_service = HoldingService()
 wallet_cache = WalletCache()
+account_amount_cache = AccountAmountCache()
 
 
 async def render(wallet: str):
-    # PERF: 这里后续需要优化，应该从数据库中获取，而不是调用 Shyft API
-    # 在程序运行过程中，需要跟踪钱包的 Token 余额变化并及时更新到数据库中
+    # 首次查看时开始跟踪钱包的代币余额，之后从内存中读取
+    await account_amount_cache.watch([wallet])
     tokens = await holding_service.get_tokens(wallet, hidden_small_amount=True)
     sol_balance = await wallet_cache.get_sol_balance(wallet)
 
@@ -7,6 +7,7 @@ from aiogram.enums import ParseMode
 from aiogram.filters import Command, StateFilter
 from aiogram.fsm.storage.memory import MemoryStorage
 from loguru import logger
+from solbot_cache import AccountAmountCache
 from solbot_common.config import settings
 from solbot_common.prestart import pre_start
 from solbot_db.redis import RedisClient
@@ -80,9 +81,15 @@ async def start_bot():
     notify = Notify(redis=redis, bot=bot)
     await notify.start()
 
+    # 跟踪用户钱包的代币余额，用户查看资产时开始跟踪
+    account_amount_cache = AccountAmountCache()
+    account_amount_task = asyncio.create_task(account_amount_cache.start())
+
     # Start polling
     logger.info("Starting bot...")
     await dp.start_polling(bot)
+    account_amount_cache.stop()
+    account_amount_task.cancel()
 
     # 清理数据库连接
     # await cleanup_session_factory()
@@ -1,5 +1,6 @@
 import builtins
 
+from solbot_common.cp.config_events import ConfigEventProducer
 from solbot_common.cp.monitor_events import MonitorEventProducer
 from solbot_common.models.tg_bot.copytrade import CopyTrade as CopyTradeModel
 from solbot_common.types.copytrade import CopyTrade, CopyTradeSummary
@@ -38,6 +39,7 @@ class CopyTradeService:
     def __init__(self):
         redis = RedisClient.get_instance()
         self.monitor_event_producer = MonitorEventProducer(redis)
+        self.config_event_producer = ConfigEventProducer(redis)
 
     @provide_session
     async def add(self, copytrade: CopyTrade, *, session: AsyncSession = NEW_ASYNC_SESSION) -> None:
@@ -72,6 +74,9 @@ class CopyTradeService:
             target_wallet=model.target_wallet,
             owner_id=int(model.chat_id),
         )
+        # 提交后再通知跟单配置变更，确保订阅方能读取到最新数据
+        await session.commit()
+        await self.config_event_producer.copytrade_changed(model.target_wallet)
 
     @provide_session
     async def update(
@@ -86,6 +91,7 @@ class CopyTradeService:
         obj = result.scalar_one_or_none()
         if obj is None:
             raise ValueError(f"Copytrade with pk {copytrade.pk} not found")
+        old_target_wallet = obj.target_wallet
         obj.target_wallet = copytrade.target_wallet
         obj.wallet_alias = copytrade.wallet_alias
         obj.is_fixed_buy = copytrade.is_fixed_buy
@@ -114,6 +120,9 @@ class CopyTradeService:
                 owner_id=obj.chat_id,
             )
         await session.commit()
+        await self.config_event_producer.copytrade_changed(obj.target_wallet)
+        if old_target_wallet != obj.target_wallet:
+            await self.config_event_producer.copytrade_changed(old_target_wallet)
 
     @provide_session
     async def delete(
@@ -136,6 +145,8 @@ class CopyTradeService:
             target_wallet=obj.target_wallet,
             owner_id=obj.chat_id,
         )
+        await session.commit()
+        await self.config_event_producer.copytrade_changed(obj.target_wallet)
 
     @provide_session
     async def list(self, *, session: AsyncSession = NEW_ASYNC_SESSION) -> list[CopyTradeSummary]:
@@ -223,9 +234,11 @@ class CopyTradeService:
     ) -> None:
         stmt = select(CopyTradeModel).where(CopyTradeModel.chat_id == chat_id)
         results = await session.execute(stmt)
+        target_wallets = set()
         for obj in results.scalars():
             obj.active = False
             session.add(obj)
+            target_wallets.add(obj.target_wallet)
 
             assert obj.id is not None, "obj.id is None"
             await self.monitor_event_producer.pause_monitor(
@@ -233,3 +246,6 @@ class CopyTradeService:
                 target_wallet=obj.target_wallet,
                 owner_id=obj.chat_id,
             )
+        await session.commit()
+        for target_wallet in target_wallets:
+            await self.config_event_producer.copytrade_changed(target_wallet)
@@ -14,12 +14,15 @@ from solbot_common.log import logger
 from solbot_common.models.tg_bot.copytrade import CopyTrade
 from solbot_common.types.swap import SwapEvent
 from solbot_common.types.tx import TxEvent, TxType
-from solbot_common.utils import calculate_auto_slippage
+from solbot_common.utils import get_async_client
 from solbot_db.redis import RedisClient
 from solbot_services.bot_setting import BotSettingService as SettingService
-from solbot_services.copytrade import CopyTradeService
+from solbot_services.copytrade_index import CopyTradeIndex
 from solbot_services.holding import HoldingService
 
+from trading.quote import QuoteEngine
+from trading.route import RouteResolver
+
 IGNORED_MINTS = {
     "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v",  # USDC
     "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB",  # USDT
@@ -30,24 +33,32 @@ IGNORED_MINTS = {
 class CopyTradeProcessor:
     """跟单交易"""
 
-    def __init__(self):
+    def __init__(
+        self,
+        consumer_name: str = "trading:new_swap_event",
+        claim_min_idle_ms: int | None = None,
+        route_resolver: RouteResolver | None = None,
+    ):
         redis_client = RedisClient.get_instance()
         self.tx_event_consumer = TxEventConsumer(
             redis_client,
             "trading:tx_event",
-            "trading:new_swap_event",
+            consumer_name,
+            claim_min_idle_ms=claim_min_idle_ms,
         )
         self.tx_event_consumer.register_callback(self._process_tx_event)
-        self.copytrade_service = CopyTradeService()
+        self.copytrade_index = CopyTradeIndex(redis_client)
         self.setting_service = SettingService()
         self.holding_service = HoldingService()
         self.swap_event_producer = SwapEventProducer(redis_client)
         self.notify_copytrade_producer = NotifyCopyTradeProducer(redis_client)
+        # 自动滑点在本地根据池子状态计算，避免每笔跟单都调用 Jupiter 的报价 API
+        self.quote_engine = QuoteEngine(get_async_client(), route_resolver)
 
     async def _process_tx_event(self, tx_event: TxEvent):
         """处理交易事件"""
         logger.info(f"Processing tx event: {tx_event}")
-        copytrade_items = await self.copytrade_service.get_by_target_wallet(tx_event.who)
+        copytrade_items = self.copytrade_index.get_by_target_wallet(tx_event.who)
         swap_mode = "ExactIn" if tx_event.tx_direction == "buy" else "ExactOut"
         # buy_pct = 0
         sell_pct = 0
@@ -107,7 +118,10 @@ class CopyTradeProcessor:
 
         try:
             # 根据不同的根据设置，创建不同的 swap_event
-            setting = await self.setting_service.get(copytrade.chat_id, copytrade.owner)
+            setting = self.copytrade_index.get_setting(copytrade.chat_id, copytrade.owner)
+            if setting is None:
+                # 索引中没有时（如设置刚刚创建），回退到 redis 查询
+                setting = await self.setting_service.get(copytrade.chat_id, copytrade.owner)
             if setting is None:
                 raise ValueError(
                     f"Setting not found, chat_id: {copytrade.chat_id}, wallet: {copytrade.owner}"
@@ -136,8 +150,8 @@ class CopyTradeProcessor:
 
                 # 自动跟买跟卖
                 if copytrade.auto_follow:
-                    amount = int(int(balance.balance * balance.decimals) * sell_pct)
-                    ui_amount = amount / balance.decimals
+                    amount = int(int(balance.balance * 10**balance.decimals) * sell_pct)
+                    ui_amount = amount / 10**balance.decimals
                 else:
                     logger.info("Not auto follow, skip...")
                     return
@@ -147,7 +161,7 @@ class CopyTradeProcessor:
             elif copytrade.auto_slippage is False:
                 slippage_bps = copytrade.custom_slippage_bps
             else:
-                slippage_bps = await calculate_auto_slippage(
+                slippage_bps = await self.quote_engine.auto_slippage(
                     input_mint=input_mint,
                     output_mint=output_mint,
                     amount=amount,
@@ -187,10 +201,16 @@ class CopyTradeProcessor:
             logger.exception(f"Failed to process copytrade: {e}")
             # TODO: 通知到用户，跟单交易失败
 
+    async def _start_consumer(self):
+        # 跟单规则加载完成后再开始消费交易事件
+        await self.copytrade_index.ready.wait()
+        await self.tx_event_consumer.start()
+
     async def start(self):
         """启动跟单交易"""
-        await self.tx_event_consumer.start()
+        await asyncio.gather(self.copytrade_index.start(), self._start_consumer())
 
     def stop(self):
         """停止跟单交易"""
         self.tx_event_consumer.stop()
+        self.copytrade_index.stop()
@@ -1,16 +1,14 @@
 from solana.rpc.async_api import AsyncClient
-from solbot_cache.launch import LaunchCache
-from solbot_cache.rayidum import get_preferred_pool
 from solbot_common.config import settings
 from solbot_common.constants import PUMP_FUN_PROGRAM, RAY_V4
 from solbot_common.log import logger
 from solbot_common.models.tg_bot.user import User
 from solbot_common.types.swap import SwapEvent
-from solbot_common.utils.pump import is_pumpfun_token
 from solbot_db.session import NEW_ASYNC_SESSION, provide_session
 from solders.keypair import Keypair  # type: ignore
 from solders.signature import Signature  # type: ignore
 from sqlmodel import select
+from trading.route import MintStage, RouteResolver
 from trading.swap import SwapDirection, SwapInType
 from trading.transaction import TradingRoute, TradingService
 
@@ -21,7 +19,7 @@ RAY_V4_PROGRAM_ID = str(RAY_V4)
 class TradingExecutor:
     def __init__(self, client: AsyncClient):
         self._rpc_client = client
-        self._launch_cache = LaunchCache()
+        self.route_resolver = RouteResolver(self._rpc_client)
         self._trading_service = TradingService(self._rpc_client)
 
     @provide_session
@@ -42,50 +40,31 @@ class TradingExecutor:
             raise ValueError("swap_mode must be ExactIn or ExactOut")
 
     async def find_route(self, swap_event: SwapEvent) -> TradingRoute:
-        """ Find the best route for executing the swap event """
-        # Check if you need to use it Pump Transactions with contract
-        should_use_pump = False
+        """ Find the best route for executing the swap event
+
+        代币阶段由 RouteResolver 根据链上的 bonding curve 账户判断并缓存，
+        不需要调用第三方 API。
+        不在 bonding curve 上的代币，只有跟单的交易来自 Raydium AMM v4 时才使用 Raydium，
+        其余交给 DEX 聚合器选择池子
+        """
         program_id = swap_event.program_id
-        
-        _, token_address = self._get_direction_address(swap_event)
 
-        try:
-             is_pump = await is_pumpfun_token(token_address)
-        except ValueError as e:
-            logger.warning(f"Failed to check if token is pumpfun token, cause: {e}. Falling back to guess.")
-            is_pump = token_address.endswith("pump")
+        _, token_address = self._get_direction_address(swap_event)
 
-        
         try:
-            if is_pump:
-                is_pump_token_graduated = await self._launch_cache.is_pump_token_graduated(token_address)
-                logger.info(f"Pump token {token_address} is graduated: {is_pump_token_graduated}")
-                if not is_pump_token_graduated:
-                    should_use_pump = True
-                    logger.info(
-                        f"Token {token_address} has not graduated, using Pump protocol to trade"
-                    )
-                else:
-                    # Check if the token is launched on Raydium
-                    pool_data = await get_preferred_pool(token_address)
-                    if pool_data is not None:
-                        logger.info(
-                            f"Token {token_address} is trading on Raydium, using Raydium protocol to trade"
-                        )
-                        # Program ID should be Raydium V4 when the token is launched on Raydium
-                        if program_id != RAY_V4_PROGRAM_ID:
-                            logger.warning("Original transaction was on a different protocol than Raydium")
-                        # assert program_id == RAY_V4_PROGRAM_ID, "Program ID must be Raydium V4"
-                        # 如果 token 在 Raydium 上启动，则使用 Raydium 协议进行交易
-                        #swap_event.program_id = RAY_V4_PROGRAM_ID
+            stage = await self.route_resolver.resolve(
+                token_address, expect_pump=program_id == PUMP_FUN_PROGRAM_ID
+            )
         except Exception as e:
-            logger.error(f"Failed graduation status check on PUMP, cause: {e}")
+            logger.error(f"Failed to resolve stage of {token_address}, cause: {e}")
+            stage = MintStage.OTHER
+        logger.info(f"Token {token_address} stage: {stage.value}")
 
-        if should_use_pump:
-            logger.info("Program ID is PUMP")
+        if stage == MintStage.PUMP:
+            logger.info(f"Token {token_address} has not graduated, using Pump protocol to trade")
             trade_route = TradingRoute.PUMP
         # NOTE: Testing is not very ideal, use alternatives for the time being
-        elif swap_event.program_id == RAY_V4_PROGRAM_ID:
+        elif program_id == RAY_V4_PROGRAM_ID:
             logger.info("Program ID is RayV4")
             trade_route = TradingRoute.RAYDIUM_V4
         elif program_id is None:
@@ -121,15 +100,21 @@ class TradingExecutor:
            
         trade_route = await self.find_route(swap_event)
 
-        sig = await self._trading_service.use_route(trade_route).swap(
-            keypair,
-            token_address,
-            swap_event.ui_amount,
-            swap_direction,
-            slippage_bps,
-            swap_in_type,
-            use_jito=settings.trading.use_jito,
-            priority_fee=swap_event.priority_fee,
-        )
+        try:
+            sig = await self._trading_service.use_route(trade_route).swap(
+                keypair,
+                token_address,
+                swap_event.ui_amount,
+                swap_direction,
+                slippage_bps,
+                swap_in_type,
+                use_jito=settings.trading.use_jito,
+                priority_fee=swap_event.priority_fee,
+            )
+        except Exception:
+            if trade_route == TradingRoute.PUMP:
+                # 代币可能已经毕业，下次交易时重新获取链上状态
+                self.route_resolver.invalidate(token_address)
+            raise
 
         return sig
@@ -1,58 +1,133 @@
+import argparse
 import asyncio
+import multiprocessing
+import signal
+import socket
 import time
 
 import backoff
 import httpx
+from solbot_cache import AccountAmountCache, ReserveStore
+from solbot_cache.blockhash import BlockhashTicker
 from solbot_common.cp.swap_event import SwapEventConsumer
 from solbot_common.cp.swap_result import SwapResultProducer
+from solbot_common.cp.swap_settlement import SwapSettlementConsumer, SwapSettlementProducer
 from solbot_common.log import logger
 from solbot_common.prestart import pre_start
-from solbot_common.types.swap import SwapEvent, SwapResult
+from solbot_common.types.swap import PendingSettlement, SwapEvent, SwapResult
 from solbot_common.utils.utils import get_async_client
 from solbot_db.redis import RedisClient
+from solbot_services.benchmark import benchmark_service
 from solders.signature import Signature  # type: ignore
 
 from trading.copytrade import CopyTradeProcessor
 from trading.executor import TradingExecutor
-from trading.settlement import SwapSettlementProcessor
+from trading.settlement import ConfirmationTracker, SwapSettlementProcessor
+from trading.transaction.template import SwapTemplateRefresher
+
+# 其他消费者的待处理消息空闲超过该时间后，将被认领。
+# 必须大于处理一条消息的最长耗时（构建并发送交易，包括 RPC 超时与重试），
+# 否则正在处理的消息会被认领，只能依靠消息锁避免重复执行。
+# 交易事件与聪明钱交易事件的有效期（15s）远小于该时间，认领到的消息一定已过期，
+# 不会再执行或跟单，而是移入死信队列（swap_event:dlq、tx_event:dlq）：
+# 崩溃的进程遗留的消息不会一直留在 PEL 中，丢失的交易在死信队列中可见
+CLAIM_MIN_IDLE_MS = 60_000
+# 其他进程遗留的结算空闲超过该时间后，将被认领并继续结算。
+# 必须大于一次结算的最长耗时（等待交易确认的超时时间加上解析交易的时间）
+SETTLEMENT_CLAIM_MIN_IDLE_MS = 180_000
+# 关闭时等待正在进行的结算完成的最长时间（秒），未完成的结算在重启后继续
+SHUTDOWN_TIMEOUT = 30
 
 
 class Trading:
-    def __init__(self):
+    def __init__(
+        self,
+        worker_id: str | None = None,
+        num_consumers: int = 3,
+        num_settlement_workers: int = 50,
+        warm_caches: bool = True,
+    ):
+        """
+        Args:
+            worker_id: 工作进程的唯一标识，必须在重启后保持不变，
+                以便重启后能够继续处理该进程遗留的待处理消息。
+                多个进程/主机部署时，每个进程的 worker_id 必须不同
+            num_consumers: 每个进程中的消费者数量
+            num_settlement_workers: 结算的并发数量。结算主要是等待交易确认，
+                与执行阶段的并发数量相互独立
+            warm_caches: 是否在该进程中维护热路径的缓存：blockhash 轮询（每 0.4 秒一次请求）、
+                每个跟单钱包的代币账户订阅与定期全量同步、热点池子的账户订阅、
+                持仓代币的交易模板扫描与刷新。这些都是进程级的，RPC 请求与 websocket
+                订阅的数量随进程数线性增长。关闭后该进程构建交易时回退到 Redis 缓存与 RPC 查询
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:0"
+        self.warm_caches = warm_caches
         self.redis = RedisClient.get_instance()
         self.rpc_client = get_async_client()
         self.trading_executor = TradingExecutor(self.rpc_client)
-        self.swap_settlement_processor = SwapSettlementProcessor()
+        self.swap_settlement_processor = SwapSettlementProcessor(
+            ConfirmationTracker(self.rpc_client)
+        )
         # 创建多个消费者实例
-        self.num_consumers = 3  # 可以根据需要调整消费者数量
+        self.num_consumers = num_consumers
         self.swap_event_consumers = []
         for i in range(self.num_consumers):
             consumer = SwapEventConsumer(
                 self.redis,
                 "trading:swap_event",
-                f"trading:new_swap_event:{i}",  # 为每个消费者创建唯一的名称
+                f"trading:new_swap_event:{self.worker_id}:{i}",  # 为每个消费者创建唯一且稳定的名称
+                claim_min_idle_ms=CLAIM_MIN_IDLE_MS,
             )
             consumer.register_callback(self._process_swap_event)
             self.swap_event_consumers.append(consumer)
 
-        self.copytrade_processor = CopyTradeProcessor()
+        self.copytrade_processor = CopyTradeProcessor(
+            consumer_name=f"trading:new_swap_event:{self.worker_id}",
+            claim_min_idle_ms=CLAIM_MIN_IDLE_MS,
+            route_resolver=self.trading_executor.route_resolver,
+        )
+        # 为跟单钱包持有的代币预先准备交易模板
+        self.swap_template_refresher = SwapTemplateRefresher(
+            self.rpc_client,
+            wallets=self.copytrade_processor.copytrade_index.get_owners,
+            route_resolver=self.trading_executor.route_resolver,
+        )
+
+        # 在进程内维护最新的 blockhash，构建交易时无需访问 Redis
+        self.blockhash_ticker = BlockhashTicker(self.rpc_client)
+        # 在内存中跟踪跟单钱包的代币余额，跟单卖出时无需查询余额
+        self.account_amount_cache = AccountAmountCache()
+        # 订阅热点池子的 vault 与 bonding curve，构建交易与报价时从内存中读取储备量
+        self.reserve_store = ReserveStore()
 
         self.swap_result_producer = SwapResultProducer(self.redis)
-        # 添加任务池和信号量
+        # 添加任务池和信号量，信号量只限制执行阶段（构建并发送交易）的并发数量
         self.task_pool = set()
         self.max_concurrent_tasks = 10
         self.semaphore = asyncio.Semaphore(self.max_concurrent_tasks)
+        # 已发送的交易先写入结算流再确认交易事件消息，由结算消费者等待确认并记录结果，
+        # 结算完成后才确认结算消息，进程崩溃或重启不会丢失结算
+        self.settlement_producer = SwapSettlementProducer(self.redis)
+        self.settlement_consumer = SwapSettlementConsumer(
+            self.redis,
+            "trading:swap_settlement",
+            f"trading:swap_settlement:{self.worker_id}",
+            max_concurrent_tasks=num_settlement_workers,
+            claim_min_idle_ms=SETTLEMENT_CLAIM_MIN_IDLE_MS,
+        )
+        self.settlement_consumer.register_callback(self._settle_pending)
+        self.is_running = False
 
     async def _process_single_swap_event(self, swap_event: SwapEvent):
-        """处理单个交易事件的核心逻辑"""
+        """处理单个交易事件的核心逻辑
+
+        交易发送后即释放执行槽位，交易确认与结果记录交给结算流
+        """
         async with self.semaphore:
             logger.info(f"Processing swap event: {swap_event}")
 
             try:
                 sig = await self._execute_swap(swap_event)
-                swap_result = await self._record_swap_result(sig, swap_event)
-                logger.info(f"Successfully processed swap event: {swap_event}")
-                return swap_result
             except (httpx.ConnectTimeout, httpx.ConnectError):
                 logger.error("Connection error")
                 await self._record_failed_swap(swap_event)
@@ -63,6 +138,35 @@ class Trading:
                 await self._record_failed_swap(swap_event)
                 raise e
 
+        pending = PendingSettlement(
+            swap_event=swap_event,
+            transaction_hash=str(sig) if sig else None,
+            submmit_time=int(time.time()),
+        )
+        try:
+            # 写入结算流后才返回，交易事件消息随后才会被确认
+            await self.settlement_producer.produce(pending)
+        except Exception as e:
+            logger.error(f"Failed to persist settlement of {sig}, settling in process: {e}")
+            task = asyncio.create_task(self._settle_pending(pending))
+            self.task_pool.add(task)
+            task.add_done_callback(self.task_pool.discard)
+
+    async def _settle(self, sig: Signature | None, swap_event: SwapEvent):
+        """等待交易确认并记录结果"""
+        try:
+            await self._record_swap_result(sig, swap_event)
+            logger.info(f"Successfully processed swap event: {swap_event}")
+        except Exception:
+            logger.exception(f"Failed to settle swap event: {swap_event}")
+            # 即使发生错误也要记录结果
+            await self._record_failed_swap(swap_event)
+
+    async def _settle_pending(self, pending: PendingSettlement):
+        """结算流的回调"""
+        sig = Signature.from_string(pending.transaction_hash) if pending.transaction_hash else None
+        await self._settle(sig, pending.swap_event)
+
     @backoff.on_exception(
         backoff.expo,
         (httpx.ConnectTimeout, httpx.ConnectError),
@@ -116,40 +220,163 @@ class Trading:
         return swap_result
 
     async def _process_swap_event(self, swap_event: SwapEvent):
-        """创建新的任务来处理交易事件"""
+        """处理交易事件
+
+        等待交易发送后才返回，消息在交易发送后才会被确认，
+        进程崩溃时未确认的消息会被其他消费者认领
+        """
         task = asyncio.create_task(self._process_single_swap_event(swap_event))
         self.task_pool.add(task)
         task.add_done_callback(self.task_pool.discard)
+        await task
+
+    async def _start_template_refresher(self):
+        # 跟单规则加载完成后才能知道需要维护哪些钱包
+        await self.copytrade_processor.copytrade_index.ready.wait()
+        await self.swap_template_refresher.start()
+
+    async def _start_account_amount_cache(self):
+        await self.copytrade_processor.copytrade_index.ready.wait()
+        await self.account_amount_cache.start(
+            wallets=self.copytrade_processor.copytrade_index.get_owners
+        )
 
     async def start(self):
-        processor_task = asyncio.create_task(self.copytrade_processor.start())
-        # 添加任务完成回调以处理可能的异常
-        processor_task.add_done_callback(lambda t: t.exception() if t.exception() else None)
-        # 启动所有消费者
-        for consumer in self.swap_event_consumers:
-            await consumer.start()
+        # 启动 benchmark 服务、结算 worker、跟单交易与所有消费者
+        self.is_running = True
+        services = [
+            benchmark_service.start(),
+            self.settlement_consumer.start(),
+            self.copytrade_processor.start(),
+            *[consumer.start() for consumer in self.swap_event_consumers],
+        ]
+        if self.warm_caches:
+            services += [
+                self.blockhash_ticker.start(),
+                self._start_template_refresher(),
+                self._start_account_amount_cache(),
+                self.reserve_store.start(),
+            ]
+        else:
+            logger.info(f"Worker {self.worker_id} runs without warm caches")
+        await asyncio.gather(*services)
 
     async def stop(self):
         """优雅关闭所有消费者"""
         # 停止跟单交易
         self.copytrade_processor.stop()
+        self.swap_template_refresher.stop()
+        self.account_amount_cache.stop()
+        self.reserve_store.stop()
+        self.blockhash_ticker.stop()
 
-        # 停止所有消费者
+        # 停止所有消费者，等待正在执行的交易发送完成（其结算已写入结算流）
         for consumer in self.swap_event_consumers:
             consumer.stop()
+        await asyncio.gather(*(consumer.drain() for consumer in self.swap_event_consumers))
 
         if self.task_pool:
             logger.info("Waiting for remaining tasks to complete...")
             await asyncio.gather(*self.task_pool, return_exceptions=True)
+
+        # 等待正在进行的结算完成，超时未完成的结算没有被确认，重启后继续
+        self.settlement_consumer.stop()
+        try:
+            logger.info("Waiting for remaining settlements to complete...")
+            await asyncio.wait_for(self.settlement_consumer.drain(), timeout=SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Remaining settlements will be resumed after restart")
+        self.is_running = False
+        self.swap_settlement_processor.tracker.stop()
         logger.info("All consumers stopped")
 
+    async def run(self):
+        """运行直到收到 SIGINT/SIGTERM，然后在同一个事件循环中优雅关闭"""
+        loop = asyncio.get_running_loop()
+        stop_event = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
 
-if __name__ == "__main__":
+        main_task = asyncio.create_task(self.start())
+        stop_task = asyncio.create_task(stop_event.wait())
+        try:
+            await asyncio.wait({main_task, stop_task}, return_when=asyncio.FIRST_COMPLETED)
+            stop_task.cancel()
+            logger.info(f"Shutting down worker {self.worker_id}...")
+
+            await self.stop()
+            main_task.cancel()
+            await asyncio.gather(main_task, return_exceptions=True)
+            if not main_task.cancelled() and main_task.exception() is not None:
+                raise main_task.exception()  # type: ignore
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+
+
+def run_worker(worker_id: str, num_consumers: int, warm_caches: bool = True):
+    """运行一个交易进程"""
     pre_start()
-    trading = Trading()
-    try:
-        asyncio.run(trading.start())
-    except KeyboardInterrupt:
-        logger.info("Shutting down...")
-        asyncio.run(trading.stop())
-        logger.info("Shutdown complete")
+    trading = Trading(worker_id=worker_id, num_consumers=num_consumers, warm_caches=warm_caches)
+    asyncio.run(trading.run())
+    logger.info(f"Worker {worker_id} shutdown complete")
+
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Trading service")
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="交易进程数量，每个进程运行独立的事件循环",
+    )
+    parser.add_argument(
+        "-c",
+        "--consumers",
+        type=int,
+        default=3,
+        help="每个进程中的消费者数量",
+    )
+    parser.add_argument(
+        "--node-id",
+        default=socket.gethostname(),
+        help="节点标识，默认为主机名。多主机部署时每台主机必须不同，且重启后保持不变",
+    )
+    parser.add_argument(
+        "--warm-workers",
+        type=int,
+        default=None,
+        help=(
+            "维护热路径缓存（blockhash 轮询、跟单钱包余额订阅、池子订阅、交易模板）的进程数量，"
+            "默认为全部进程。这些缓存是进程级的，RPC 与 websocket 负载随进程数线性增长，"
+            "其余进程构建交易时回退到 Redis 缓存与 RPC 查询"
+        ),
+    )
+    return parser.parse_args(args)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    worker_ids = [f"{args.node_id}:{i}" for i in range(args.workers)]
+    warm_workers = args.workers if args.warm_workers is None else args.warm_workers
+    if len(worker_ids) == 1:
+        run_worker(worker_ids[0], args.consumers, warm_workers > 0)
+    else:
+        processes = [
+            multiprocessing.Process(
+                target=run_worker,
+                args=(worker_id, args.consumers, i < warm_workers),
+                name=f"trading:{worker_id}",
+            )
+            for i, worker_id in enumerate(worker_ids)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            # 子进程同样会收到 SIGINT，等待其优雅退出
+            for process in processes:
+                process.join()
@@ -0,0 +1,166 @@
+"""本地报价引擎
+
+根据代币所处的阶段获取池子状态，在本地计算价格冲击与自动滑点：
+
+- 仍在 pump.fun 上交易：bonding curve 账户
+- 其他：Raydium AMM v4 池子两个 vault 的余额
+
+账户已被 ReserveStore 订阅时直接从内存中读取，否则通过 RPC 获取并开始订阅。
+池子状态在进程内缓存 pool_state_ttl 秒，同一笔交易的所有跟单钱包共用一次查询；
+找不到池子或本地报价失败时回退到 Jupiter 的报价 API。
+"""
+
+import asyncio
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Processed
+from solbot_cache.local import LRUCache
+from solbot_cache.rayidum import get_preferred_pool_keys
+from solbot_cache.reserve import ReserveStore
+from solbot_common.constants import PUMP_FUN_PROGRAM, WSOL
+from solbot_common.layouts.bonding_curve_account import BondingCurveAccount
+from solbot_common.log import logger
+from solbot_common.utils import calculate_auto_slippage
+from solbot_common.utils.quote import (
+    ConstantProductQuoter,
+    PumpCurveQuoter,
+    Quoter,
+    slippage_from_price_impact,
+)
+from solbot_common.utils.utils import get_bonding_curve_pda
+from solders.pubkey import Pubkey  # type: ignore
+
+from trading.route import MintStage, RouteResolver
+from trading.transaction.resolver import get_multiple_accounts, parse_token_amount
+
+# 池子状态的缓存时间（秒）
+POOL_STATE_TTL = 1
+POOL_STATE_CACHE_SIZE = 1000
+
+
+class QuoteEngine:
+    def __init__(
+        self,
+        client: AsyncClient,
+        route_resolver: RouteResolver | None = None,
+        pool_state_ttl: float = POOL_STATE_TTL,
+    ) -> None:
+        self.client = client
+        self.route_resolver = route_resolver or RouteResolver(client)
+        self.reserve_store = ReserveStore()
+        self._quoters: LRUCache[str, Quoter] = LRUCache(
+            maxsize=POOL_STATE_CACHE_SIZE, ttl=pool_state_ttl
+        )
+        self._inflight: dict[str, asyncio.Future[Quoter | None]] = {}
+
+    async def _get_accounts(self, pubkeys: list[Pubkey]) -> list[bytes | None]:
+        """优先从 ReserveStore 中读取，否则通过 RPC 获取并开始订阅"""
+        snapshots = self.reserve_store.get_many(pubkeys)
+        if snapshots is not None:
+            return [snapshot.data for snapshot in snapshots]
+        accounts = await get_multiple_accounts(self.client, pubkeys, Processed)
+        self.reserve_store.watch(pubkeys)
+        return accounts
+
+    async def _load_pump_quoter(self, mint: str) -> Quoter | None:
+        bonding_curve = get_bonding_curve_pda(Pubkey.from_string(mint), PUMP_FUN_PROGRAM)[0]
+        (data,) = await self._get_accounts([bonding_curve])
+        if data is None:
+            return None
+        return PumpCurveQuoter.from_account(BondingCurveAccount(data))
+
+    async def _load_amm_v4_quoter(self, mint: str) -> Quoter | None:
+        pool_keys = await get_preferred_pool_keys(mint)
+        if pool_keys is None:
+            return None
+        base_vault_data, quote_vault_data = await self._get_accounts(
+            [pool_keys.base_vault, pool_keys.quote_vault]
+        )
+        if base_vault_data is None or quote_vault_data is None:
+            return None
+        return ConstantProductQuoter.from_amm_v4(
+            pool_keys, parse_token_amount(base_vault_data), parse_token_amount(quote_vault_data)
+        )
+
+    async def _load_quoter(self, mint: str) -> Quoter | None:
+        stage = await self.route_resolver.resolve(mint)
+        if stage == MintStage.PUMP:
+            return await self._load_pump_quoter(mint)
+        return await self._load_amm_v4_quoter(mint)
+
+    async def get_quoter(self, mint: str) -> Quoter | None:
+        """获取代币当前池子的报价，找不到池子时返回 None"""
+        quoter = self._quoters.get(mint)
+        if quoter is not None:
+            return quoter
+
+        future = self._inflight.get(mint)
+        if future is None:
+            future = asyncio.ensure_future(self._load_quoter(mint))
+            self._inflight[mint] = future
+            future.add_done_callback(lambda _: self._inflight.pop(mint, None))
+        quoter = await asyncio.shield(future)
+        if quoter is not None:
+            self._quoters.set(mint, quoter)
+        return quoter
+
+    async def price_impact_many(
+        self, input_mint: str, output_mint: str, amounts: list[int]
+    ) -> list[float] | None:
+        """本地计算多个数量的价格冲击（0~1 的小数），无法本地报价时返回 None"""
+        buy = input_mint == str(WSOL)
+        mint = output_mint if buy else input_mint
+        quoter = await self.get_quoter(mint)
+        if quoter is None:
+            return None
+        return quoter.price_impact_many(amounts, buy)
+
+    async def auto_slippage_many(
+        self,
+        input_mint: str,
+        output_mint: str,
+        amounts: list[int],
+        swap_mode: str = "ExactIn",
+        min_slippage_bps: int = 250,
+        max_slippage_bps: int = 3000,
+        price_impact_multiplier: float = 1.5,
+    ) -> list[int]:
+        """根据价格冲击计算自动滑点（bps），参数与 calculate_auto_slippage 相同
+
+        本地报价失败时回退到 Jupiter 的报价 API
+        """
+        try:
+            price_impacts = await self.price_impact_many(input_mint, output_mint, amounts)
+        except Exception as e:
+            logger.warning(f"Failed to quote {input_mint} -> {output_mint} locally: {e}")
+            price_impacts = None
+
+        if price_impacts is not None:
+            return [
+                slippage_from_price_impact(
+                    price_impact, min_slippage_bps, max_slippage_bps, price_impact_multiplier
+                )
+                for price_impact in price_impacts
+            ]
+
+        logger.info(f"No local quote for {input_mint} -> {output_mint}, falling back to Jupiter")
+        return [
+            await calculate_auto_slippage(
+                input_mint=input_mint,
+                output_mint=output_mint,
+                amount=amount,
+                swap_mode=swap_mode,
+                min_slippage_bps=min_slippage_bps,
+                max_slippage_bps=max_slippage_bps,
+                price_impact_multiplier=price_impact_multiplier,
+            )
+            for amount in amounts
+        ]
+
+    async def auto_slippage(
+        self, input_mint: str, output_mint: str, amount: int, swap_mode: str = "ExactIn"
+    ) -> int:
+        (slippage_bps,) = await self.auto_slippage_many(
+            input_mint, output_mint, [amount], swap_mode
+        )
+        return slippage_bps
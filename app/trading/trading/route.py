@@ -0,0 +1,133 @@
+"""交易路由解析
+
+只根据链上状态判断代币所处的阶段，不调用第三方 API：
+
+- bonding curve PDA 存在且未完成：仍在 pump.fun 上交易
+- bonding curve PDA 存在且已完成：已从 pump.fun 毕业
+- bonding curve PDA 不存在：不是 pump.fun 代币
+
+多个代币的 bonding curve 通过一次 getMultipleAccounts 批量查询，结果按 mint 缓存。
+毕业是单向的，已毕业的代币永久缓存；非 pump.fun 代币缓存较长时间；
+仍在 bonding curve 上的代币缓存时间较短，并在发现毕业（交易模板刷新、pump 交易失败）时主动失效。
+交易来自 pump.fun 程序却查询不到 bonding curve 时，多半是 RPC 节点落后，结果只缓存几秒。
+"""
+
+import asyncio
+from enum import Enum
+
+from solana.rpc.async_api import AsyncClient
+from solbot_cache.local import LRUCache
+from solbot_common.constants import PUMP_FUN_PROGRAM
+from solbot_common.layouts.bonding_curve_account import BondingCurveAccount
+from solbot_common.log import logger
+from solbot_common.utils.utils import get_bonding_curve_pda
+from solders.pubkey import Pubkey  # type: ignore
+
+from trading.transaction.resolver import get_multiple_accounts
+
+# 仍在 bonding curve 上的代币的缓存时间（秒）
+BONDING_CURVE_TTL = 30
+# 非 pump.fun 代币的缓存时间（秒），刚创建的 bonding curve 可能因 RPC 延迟尚未查询到
+NOT_PUMP_TTL = 10 * 60
+# 交易来自 pump.fun 程序却查询不到 bonding curve 时的缓存时间（秒）
+PUMP_MISS_TTL = 3
+ROUTE_CACHE_SIZE = 10000
+
+
+class MintStage(Enum):
+    """代币所处的阶段"""
+
+    PUMP = "pump"  # 在 pump.fun bonding curve 上交易
+    PUMP_GRADUATED = "pump_graduated"  # 已从 pump.fun 毕业
+    OTHER = "other"  # 不是 pump.fun 代币
+
+
+class RouteResolver:
+    """按 mint 缓存代币阶段，并发查询同一个 mint 时只发起一次请求"""
+
+    def __init__(self, client: AsyncClient) -> None:
+        self.client = client
+        self._cache: LRUCache[Pubkey, MintStage] = LRUCache(maxsize=ROUTE_CACHE_SIZE)
+        # 查询中的 mint -> (批量请求, 在请求中的位置)
+        self._inflight: dict[Pubkey, tuple[asyncio.Future[list[MintStage]], int]] = {}
+
+    def _set(self, mint: Pubkey, stage: MintStage) -> None:
+        if stage == MintStage.PUMP:
+            ttl = BONDING_CURVE_TTL
+        elif stage == MintStage.OTHER:
+            ttl = NOT_PUMP_TTL
+        else:
+            # 毕业是单向的，不会过期
+            ttl = None
+        self._cache.set(mint, stage, ttl=ttl)
+
+    def invalidate(self, mint: Pubkey | str) -> None:
+        """使缓存失效，下次查询时重新获取链上状态"""
+        if isinstance(mint, str):
+            mint = Pubkey.from_string(mint)
+        self._cache.pop(mint)
+
+    def mark_graduated(self, mint: Pubkey | str) -> None:
+        if isinstance(mint, str):
+            mint = Pubkey.from_string(mint)
+        self._set(mint, MintStage.PUMP_GRADUATED)
+
+    async def _fetch(self, mints: list[Pubkey]) -> list[MintStage]:
+        bonding_curves = [get_bonding_curve_pda(mint, PUMP_FUN_PROGRAM)[0] for mint in mints]
+        accounts = await get_multiple_accounts(self.client, bonding_curves)
+        stages = []
+        for mint, data in zip(mints, accounts, strict=True):
+            if data is None:
+                stage = MintStage.OTHER
+            else:
+                try:
+                    complete = BondingCurveAccount(data).complete
+                except ValueError:
+                    logger.warning(f"Invalid bonding curve account of {mint}")
+                    complete = True
+                stage = MintStage.PUMP_GRADUATED if complete else MintStage.PUMP
+            self._set(mint, stage)
+            stages.append(stage)
+        return stages
+
+    async def resolve_many(self, mints: list[Pubkey | str]) -> list[MintStage]:
+        """批量获取代币阶段，未缓存的 mint 通过一次 getMultipleAccounts 查询"""
+        keys = [Pubkey.from_string(mint) if isinstance(mint, str) else mint for mint in mints]
+        result: dict[Pubkey, MintStage] = {}
+        waiting: dict[Pubkey, tuple[asyncio.Future[list[MintStage]], int]] = {}
+        missing: list[Pubkey] = []
+        for mint in dict.fromkeys(keys):
+            stage = self._cache.get(mint)
+            if stage is not None:
+                result[mint] = stage
+            elif mint in self._inflight:
+                waiting[mint] = self._inflight[mint]
+            else:
+                missing.append(mint)
+
+        if missing:
+            future = asyncio.ensure_future(self._fetch(missing))
+            # 并发查询同一个 mint 的调用等待这次请求的结果
+            for i, mint in enumerate(missing):
+                self._inflight[mint] = (future, i)
+            try:
+                result.update(zip(missing, await asyncio.shield(future), strict=True))
+            finally:
+                for mint in missing:
+                    self._inflight.pop(mint, None)
+
+        for mint, (pending, i) in waiting.items():
+            result[mint] = (await asyncio.shield(pending))[i]
+        return [result[mint] for mint in keys]
+
+    async def resolve(self, mint: Pubkey | str, expect_pump: bool = False) -> MintStage:
+        """
+        Args:
+            expect_pump: 交易来自 pump.fun 程序，此时查询不到 bonding curve 的结果只缓存 PUMP_MISS_TTL 秒
+        """
+        stage = (await self.resolve_many([mint]))[0]
+        if expect_pump and stage == MintStage.OTHER:
+            if isinstance(mint, str):
+                mint = Pubkey.from_string(mint)
+            self._cache.set(mint, stage, ttl=PUMP_MISS_TTL)
+        return stage
@@ -2,8 +2,10 @@
 
 包含以下主要组件：
 1. SwapSettlementProcessor: 交易结算处理器，负责获取和验证交易状态
+2. ConfirmationTracker: 交易确认跟踪器，批量查询待确认交易的状态
 """
 
 from .processor import SwapSettlementProcessor
+from .tracker import ConfirmationTracker
 
-__all__ = ["SwapSettlementProcessor"]
+__all__ = ["ConfirmationTracker", "SwapSettlementProcessor"]
@@ -3,17 +3,19 @@
 交易验证器用于验证交易的上链情况.
 """
 
-import asyncio
-
-from solbot_common.constants import SOL_DECIMAL
+from solbot_cache import MintAccountCache
+from solbot_common.constants import SOL_DECIMAL, WSOL
 from solbot_common.log import logger
 from solbot_common.models.swap_record import SwapRecord, TransactionStatus
 from solbot_common.types.swap import SwapEvent
-from solbot_common.utils.utils import validate_transaction
+from solbot_common.utils.utils import get_async_client
 from solbot_db.session import NEW_ASYNC_SESSION, provide_session
 from solders.signature import Signature  # type: ignore
 
 from .analyzer import TransactionAnalyzer
+from .tracker import ConfirmationTracker
+
+WSOL_DECIMALS = 9
 
 
 class SwapSettlementProcessor:
@@ -22,8 +24,37 @@ class SwapSettlementProcessor:
     验证交易结果并写入数据库
     """
 
-    def __init__(self):
-        self.analyzer = TransactionAnalyzer()
+    def __init__(self, tracker: ConfirmationTracker | None = None):
+        self.tracker = tracker or ConfirmationTracker(get_async_client())
+        self.analyzer = TransactionAnalyzer(self.tracker.client)
+        self.mint_account_cache = MintAccountCache()
+
+    async def get_decimals(
+        self, input_mint: str, output_mint: str
+    ) -> tuple[int | None, int | None]:
+        """获取交易双方代币的精度
+
+        WSOL 的精度固定为 9，不查询 Mint 账户；获取不到 Mint 账户时对应的精度为 None，
+        由调用方从交易的 token 余额中回退获取
+        """
+        mints = [mint for mint in (input_mint, output_mint) if mint != str(WSOL)]
+        accounts = await self.mint_account_cache.get_mint_accounts(mints) if mints else []
+        decimals = {
+            mint: account.decimals
+            for mint, account in zip(mints, accounts, strict=True)
+            if account is not None
+        }
+        decimals[str(WSOL)] = WSOL_DECIMALS
+        for mint in mints:
+            if mint not in decimals:
+                logger.warning(f"Mint account not found: {mint}")
+        return decimals.get(input_mint), decimals.get(output_mint)
+
+    @staticmethod
+    def _require_decimals(mint: str, decimals: int | None) -> int:
+        if decimals is None:
+            raise ValueError(f"Mint decimals not found: {mint}")
+        return decimals
 
     @provide_session
     async def record(
@@ -40,7 +71,8 @@ class SwapSettlementProcessor:
         """验证交易是否已经上链.
 
         调用 validate 会返回一个协程，协程会在 60 秒内等待交易的上链状态。
-        如果协程超时，则返回 None。
+        如果协程超时，则返回 TransactionStatus.EXPIRED。
+        交易状态由共享的 ConfirmationTracker 批量查询。
 
         Examples:
             >>> from solders.signature import Signature  # type: ignore
@@ -62,21 +94,7 @@ class SwapSettlementProcessor:
         Returns:
             Coroutine[None, None, TransactionStatus | None]: 协程
         """
-        tx_status = None
-        for _ in range(60):
-            try:
-                tx_status = await validate_transaction(tx_hash)
-            except Exception as e:
-                logger.error(f"Failed to get transaction status: {e}")
-                await asyncio.sleep(1)
-                continue
-
-            if tx_status is True:
-                return TransactionStatus.SUCCESS
-            elif tx_status is False:
-                return TransactionStatus.FAILED
-            await asyncio.sleep(1)
-        return TransactionStatus.EXPIRED
+        return await self.tracker.wait(tx_hash)
 
     async def process(self, signature: Signature | None, swap_event: SwapEvent) -> SwapRecord:
         """处理交易
@@ -87,15 +105,13 @@ class SwapSettlementProcessor:
         input_amount = swap_event.amount
         input_mint = swap_event.input_mint
         output_mint = swap_event.output_mint
-        # PERF: 需要优化，不应该将 deciamls 写死
-        if swap_event.swap_mode == "ExactIn":
-            input_token_decimals = 9
-            output_token_decimals = 6
-        else:
-            input_token_decimals = 6
-            output_token_decimals = 9
+        input_token_decimals, output_token_decimals = await self.get_decimals(
+            input_mint, output_mint
+        )
 
         if signature is None:
+            input_token_decimals = self._require_decimals(input_mint, input_token_decimals)
+            output_token_decimals = self._require_decimals(output_mint, output_token_decimals)
             swap_record = SwapRecord(
                 user_pubkey=swap_event.user_pubkey,
                 swap_mode=swap_event.swap_mode,
@@ -109,6 +125,8 @@ class SwapSettlementProcessor:
         else:
             tx_status = await self.validate(signature)
             if tx_status is None:
+                input_token_decimals = self._require_decimals(input_mint, input_token_decimals)
+                output_token_decimals = self._require_decimals(output_mint, output_token_decimals)
                 swap_record = SwapRecord(
                     signature=str(signature),
                     status=TransactionStatus.EXPIRED,
@@ -122,17 +140,26 @@ class SwapSettlementProcessor:
                     output_token_decimals=output_token_decimals,
                 )
             else:
+                # 交易的代币是 SOL 以外的一侧
+                mint = output_mint if input_mint == str(WSOL) else input_mint
                 data = await self.analyzer.analyze_transaction(
                     str(signature),
                     user_account=swap_event.user_pubkey,
-                    mint=swap_event.output_mint,
+                    mint=mint,
                 )
                 logger.debug(f"Transaction analysis data: {data}")
-
-                if swap_event.swap_mode == "ExactIn":
-                    output_amount = int(abs(data["token_change"]) * 10**6)
+                # 获取不到 Mint 账户时使用交易中 token 余额的精度，避免已上链的交易被记录为失败
+                if input_token_decimals is None:
+                    input_token_decimals = data["mint_decimals"].get(input_mint)
+                if output_token_decimals is None:
+                    output_token_decimals = data["mint_decimals"].get(output_mint)
+                input_token_decimals = self._require_decimals(input_mint, input_token_decimals)
+                output_token_decimals = self._require_decimals(output_mint, output_token_decimals)
+
+                if output_mint == str(WSOL):
+                    output_amount = round(abs(data["swap_sol_change"]) * SOL_DECIMAL)
                 else:
-                    output_amount = int(abs(data["swap_sol_change"]) * 10**9)
+                    output_amount = round(abs(data["token_change"]) * 10**output_token_decimals)
 
                 swap_record = SwapRecord(
                     signature=str(signature),
@@ -0,0 +1,143 @@
+"""交易确认跟踪器
+
+所有等待上链的交易共享一个跟踪器：待确认的交易签名注册到跟踪器后，
+由一个后台任务每隔 poll_interval 秒通过一次 getSignatureStatuses（每批最多 256 个签名）
+批量查询它们的状态，调用方只需等待各自的 future。
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+
+from solana.rpc.async_api import AsyncClient
+from solbot_common.log import logger
+from solbot_common.models.swap_record import TransactionStatus
+from solders.signature import Signature  # type: ignore
+from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
+
+# getSignatureStatuses 单次最多查询的签名数量
+MAX_SIGNATURE_STATUSES = 256
+
+
+@dataclass
+class _PendingSignature:
+    future: asyncio.Future[TransactionStatus]
+    deadline: float
+
+
+class ConfirmationTracker:
+    """交易确认跟踪器
+
+    除了批量轮询外，也可以通过 resolve 由其他数据源（如 websocket、geyser 订阅）
+    直接推送交易的确认结果。
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        poll_interval: float = 1,
+        timeout: float = 60,
+    ) -> None:
+        """
+        Args:
+            client: RPC 客户端
+            poll_interval: 批量查询的间隔（秒）
+            timeout: 交易等待确认的默认超时时间（秒），超时后视为过期
+        """
+        self.client = client
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self._pending: dict[Signature, _PendingSignature] = {}
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _ensure_running(self) -> None:
+        # 首次有交易等待确认时启动后台任务
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def wait(self, signature: Signature, timeout: float | None = None) -> TransactionStatus:
+        """等待交易确认
+
+        Returns:
+            TransactionStatus: 交易成功、失败，或超时未确认（EXPIRED）
+        """
+        pending = self._pending.get(signature)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = _PendingSignature(
+                future=loop.create_future(),
+                deadline=time.monotonic() + (timeout if timeout is not None else self.timeout),
+            )
+            self._pending[signature] = pending
+            self._wakeup.set()
+            self._ensure_running()
+        # 多个调用方等待同一笔交易时，其中一个被取消不应影响其他调用方
+        return await asyncio.shield(pending.future)
+
+    def resolve(self, signature: Signature, status: TransactionStatus) -> None:
+        """设置交易的确认结果，并唤醒所有等待该交易的调用方"""
+        pending = self._pending.pop(signature, None)
+        if pending is not None and not pending.future.done():
+            pending.future.set_result(status)
+
+    async def _get_statuses(self, signatures: list[Signature]) -> None:
+        resp = await self.client.get_signature_statuses(signatures, search_transaction_history=True)
+        for signature, value in zip(signatures, resp.value, strict=True):
+            if value is None:
+                continue
+            if value.confirmation_status in (
+                TransactionConfirmationStatus.Confirmed,
+                TransactionConfirmationStatus.Finalized,
+            ):
+                status = (
+                    TransactionStatus.SUCCESS if value.err is None else TransactionStatus.FAILED
+                )
+                self.resolve(signature, status)
+
+    async def poll(self) -> None:
+        """批量查询所有待确认交易的状态，并将超时的交易标记为过期"""
+        signatures = list(self._pending)
+        if not signatures:
+            return
+
+        results = await asyncio.gather(
+            *[
+                self._get_statuses(signatures[i : i + MAX_SIGNATURE_STATUSES])
+                for i in range(0, len(signatures), MAX_SIGNATURE_STATUSES)
+            ],
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Failed to get transaction status: {result}")
+
+        now = time.monotonic()
+        for signature in [s for s, p in self._pending.items() if p.deadline <= now]:
+            logger.warning(f"Transaction {signature} is not confirmed before deadline")
+            self.resolve(signature, TransactionStatus.EXPIRED)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if not self._pending:
+                    # 没有待确认的交易时不发起请求
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                await asyncio.sleep(self.poll_interval)
+                await self.poll()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error tracking transaction confirmations: {e}")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for pending in self._pending.values():
+            pending.future.cancel()
+        self._pending.clear()
@@ -1,5 +1,5 @@
 from solana.rpc.async_api import AsyncClient
-from solbot_cache.token_info import TokenInfoCache
+from solbot_cache import MintAccountCache
 from solbot_common.constants import SOL_DECIMAL, WSOL
 from solbot_common.utils.jupiter import JupiterAPI
 from solders.keypair import Keypair  # type: ignore
@@ -16,7 +16,7 @@ class JupiterTransactionBuilder(TransactionBuilder):
 
     def __init__(self, rpc_client: AsyncClient) -> None:
         super().__init__(rpc_client=rpc_client)
-        self.token_info_cache = TokenInfoCache()
+        self.mint_account_cache = MintAccountCache()
         self.jupiter_client = JupiterAPI()
 
     async def build_swap_transaction(
@@ -52,10 +52,9 @@ class JupiterTransactionBuilder(TransactionBuilder):
             token_out = token_address
             amount = int(ui_amount * SOL_DECIMAL)
         elif swap_direction == SwapDirection.Sell:
-            token_info = await self.token_info_cache.get(token_address)
-            if token_info is None:
-                raise ValueError("Token info not found")
-            decimals = token_info.decimals
+            decimals = await self.mint_account_cache.get_decimals(token_address)
+            if decimals is None:
+                raise ValueError("Mint account not found")
             token_in = token_address
             token_out = str(WSOL)
             amount = int(ui_amount * 10**decimals)
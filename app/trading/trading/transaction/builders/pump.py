@@ -1,27 +1,26 @@
-from solbot_cache import AccountAmountCache, MintAccountCache
-from solbot_common.constants import (ASSOCIATED_TOKEN_PROGRAM, PUMP_BUY_METHOD,
-                                     PUMP_FUN_ACCOUNT, PUMP_FUN_PROGRAM,
-                                     PUMP_GLOBAL_ACCOUNT, PUMP_SELL_METHOD,
-                                     RENT_PROGRAM_ID, SOL_DECIMAL,
-                                     SYSTEM_PROGRAM_ID, TOKEN_PROGRAM_ID, WSOL)
-from solbot_common.IDL.pumpfun import PumpFunInterface
+import asyncio
+
+from solbot_cache import MintAccountCache
+from solbot_common.constants import SOL_DECIMAL, TOKEN_PROGRAM_ID, WSOL
+from solbot_common.IDL.pumpfun import get_encoder
 from solbot_common.log import logger
-from solbot_common.utils.utils import (get_bonding_curve_account, get_bonding_curve_pda_creator_vault,
-                                       get_global_account)
+from solbot_common.utils.quote import PumpCurveQuoter
 from solders.keypair import Keypair  # type: ignore
 from solders.pubkey import Pubkey  # type: ignore
 from solders.transaction import VersionedTransaction  # type: ignore
 from spl.token.instructions import (CloseAccountParams, close_account,
-                                    create_associated_token_account,
-                                    get_associated_token_address)
-from trading.exceptions import BondingCurveNotFound
+                                    create_associated_token_account)
 from trading.swap import SwapDirection, SwapInType
+from trading.transaction.resolver import StepTimer
+from trading.transaction.template import get_pump_template
 from trading.tx import build_transaction
-from trading.utils import (has_ata, max_amount_with_slippage,
-                           min_amount_with_slippage)
+from trading.utils import max_amount_with_slippage, min_amount_with_slippage
 
 from .base import TransactionBuilder
 
+# 交易模板的最大有效期（秒），超过后重新通过 RPC 获取账户状态
+TEMPLATE_MAX_AGE = 5
+
 
 # Reference: https://github.com/wisarmy/raytx/blob/main/src/pump.rs
 class PumpTransactionBuilder(TransactionBuilder):
@@ -47,47 +46,43 @@ class PumpTransactionBuilder(TransactionBuilder):
         if swap_direction == SwapDirection.Buy:
             token_in = native_mint
             token_out = mint
-            pump_method = PUMP_BUY_METHOD
         elif swap_direction == SwapDirection.Sell:
             token_in = mint
             token_out = native_mint
-            pump_method = PUMP_SELL_METHOD
         else:
             raise ValueError("swap_direction must be buy or sell")
 
-        pump_program = PUMP_FUN_PROGRAM
-        result = await get_bonding_curve_account(self.rpc_client, mint, pump_program)
-        if result is None:
-            raise BondingCurveNotFound("bonding curve account not found")
-        bonding_curve, associated_bonding_curve, bonding_curve_account = result
-        bonding_curve_pda,bump = get_bonding_curve_pda_creator_vault(bonding_curve_account.creator, pump_program)
-        global_account = await get_global_account(self.rpc_client, pump_program)
-        if global_account is None:
-            raise ValueError("global account not found")
-
-        fee_recipient = global_account.fee_recipient
-
-        in_ata = get_associated_token_address(owner=owner, mint=token_in)
-        out_ata = get_associated_token_address(owner=owner, mint=token_out)
+        timer = StepTimer()
+        get_template = timer.measure(
+            "template",
+            get_pump_template(
+                self.rpc_client, owner, mint, swap_direction, TEMPLATE_MAX_AGE, timer
+            ),
+        )
+        in_mint = None
+        if swap_direction == SwapDirection.Sell and in_type == SwapInType.Qty:
+            # 按数量卖出时需要代币精度，与模板并发获取
+            template, in_mint = await asyncio.gather(
+                get_template,
+                timer.measure("mint_account", MintAccountCache().get_mint_account(token_in)),
+            )
+        else:
+            template = await get_template
+        bonding_curve_account = template.bonding_curve_account
 
         create_instruction = None
         close_instruction = None
         if swap_direction == SwapDirection.Buy:
             # 如果 ata 账户不存在，需要创建
-            if not await has_ata(
-                self.rpc_client,
-                owner,
-                token_out,
-            ):
+            if not template.ata_exists:
                 create_instruction = create_associated_token_account(owner, owner, token_out)
 
             amount_specified = int(ui_amount * SOL_DECIMAL)
         elif swap_direction == SwapDirection.Sell:
-            in_amount = await AccountAmountCache().get_amount(in_ata)
-            in_mint = await MintAccountCache().get_mint_account(token_in)
-            if in_mint is None:
-                raise Exception("in_mint not found")
-
+            if not template.ata_exists:
+                raise Exception("in_account not found")
+            in_ata = template.ata
+            in_amount = template.token_amount
             if in_type == SwapInType.Pct:
                 amount_in_pct = min(ui_amount, 1)
                 if amount_in_pct < 0:
@@ -108,6 +103,8 @@ class PumpTransactionBuilder(TransactionBuilder):
                 else:
                     amount_specified = int(in_amount * amount_in_pct)
             elif in_type == SwapInType.Qty:
+                if in_mint is None:
+                    raise Exception("in_mint not found")
                 amount_specified = int(ui_amount * 10**in_mint.decimals)
             else:
                 raise Exception("in_type must be qty or pct")
@@ -121,63 +118,26 @@ class PumpTransactionBuilder(TransactionBuilder):
             / 1000
         )
 
+        # 按 bonding curve 与手续费计算兑换数量
+        quoter = PumpCurveQuoter.from_account(bonding_curve_account)
         if swap_direction == SwapDirection.Buy:
             max_sol_cost = max_amount_with_slippage(amount_specified, slippage_bps)
             sol_amount_threshold = max_sol_cost
-            token_amount = (
-                amount_specified
-                * bonding_curve_account.virtual_token_reserves
-                // bonding_curve_account.virtual_sol_reserves
-            )
-            input_accounts = {
-                "fee_recipient": fee_recipient,
-                "mint": mint,
-                "bonding_curve": bonding_curve,
-                "associated_bonding_curve": associated_bonding_curve,
-                "associated_user": out_ata,
-                "user": owner,
-                "global": PUMP_GLOBAL_ACCOUNT,
-                "system_program": SYSTEM_PROGRAM_ID,
-                "token_program": TOKEN_PROGRAM_ID,
-                "creator_vault": bonding_curve_pda,
-                "event_authority": PUMP_FUN_ACCOUNT,
-                "program": PUMP_FUN_PROGRAM,
-            }
+            token_amount = quoter.quote(amount_specified, buy=True)
         elif swap_direction == SwapDirection.Sell:
-            sol_output = (
-                amount_specified
-                * bonding_curve_account.virtual_sol_reserves
-                // bonding_curve_account.virtual_token_reserves
-            )
+            sol_output = quoter.quote(amount_specified, buy=False)
             min_sol_cost = min_amount_with_slippage(sol_output, slippage_bps)
             sol_amount_threshold = min_sol_cost
             token_amount = amount_specified
-            input_accounts = {
-                "fee_recipient": fee_recipient,
-                "mint": mint,
-                "bonding_curve": bonding_curve,
-                "associated_bonding_curve": associated_bonding_curve,
-                "associated_user": in_ata,
-                "user": owner,
-                "global": PUMP_GLOBAL_ACCOUNT,
-                "system_program": SYSTEM_PROGRAM_ID,
-                "creator_vault": bonding_curve_pda,
-                "token_program": TOKEN_PROGRAM_ID,
-                "event_authority": PUMP_FUN_ACCOUNT,
-                "program": PUMP_FUN_PROGRAM,
-            }
 
         logger.info(
             f"token_amount: {token_amount}, sol_amount_threshold: {sol_amount_threshold}, unit_price: {unit_price}"
         )
 
         instructions = []
-        pumpfun = PumpFunInterface(keypair, self.rpc_client)
-        pump_method = pumpfun.program.methods[swap_direction]
-        build_swap_instruction = (
-            pump_method.args([token_amount, sol_amount_threshold])
-            .accounts(input_accounts)
-            .instruction()
+        input_accounts = template.accounts()
+        build_swap_instruction = get_encoder().encode(
+            swap_direction.value, (token_amount, sol_amount_threshold), input_accounts
         )
         logger.debug(f"Build swap input accounts: {input_accounts}")
 
@@ -196,9 +156,12 @@ class PumpTransactionBuilder(TransactionBuilder):
 
         logger.debug(f"Swap instructions: {instructions}")
 
-        return await build_transaction(
-            keypair=keypair,
-            instructions=instructions,
-            priority_fee=priority_fee,
-            use_jito=use_jito,
-        )
+        async with timer.step("transaction"):
+            transaction = await build_transaction(
+                keypair=keypair,
+                instructions=instructions,
+                priority_fee=priority_fee,
+                use_jito=use_jito,
+            )
+        await timer.report(str(transaction.signatures[0]))
+        return transaction
@@ -1,18 +1,21 @@
+import asyncio
 import base64
 import os
+from dataclasses import dataclass
 
 from loguru import logger
 from solana.rpc.commitment import Processed
-from solana.rpc.types import TokenAccountOpts
 from solbot_cache import get_min_balance_rent
-from solbot_cache.rayidum import get_preferred_pool
+from solbot_cache.rayidum import get_preferred_pool_keys
+from solbot_cache.reserve import ReserveStore
 from solbot_common.constants import ACCOUNT_LAYOUT_LEN, SOL_DECIMAL, TOKEN_PROGRAM_ID, WSOL
 from solbot_common.utils.pool import (
     AmmV4PoolKeys,
-    get_amm_v4_reserves,
+    calc_amm_v4_reserves,
     make_amm_v4_swap_instruction,
 )
-from solbot_common.utils.utils import get_associated_token_address, get_token_balance
+from solbot_common.utils.quote import ConstantProductQuoter
+from solbot_common.utils.utils import get_associated_token_address
 from solders.instruction import Instruction  # type: ignore[reportMissingModuleSource]
 from solders.keypair import Keypair  # type: ignore[reportMissingModuleSource]
 from solders.pubkey import Pubkey  # type: ignore[reportMissingModuleSource]
@@ -30,18 +33,108 @@ from spl.token.instructions import (
 )
 
 from trading.swap import SwapDirection, SwapInType
+from trading.transaction.resolver import StepTimer, get_multiple_accounts, parse_token_amount
 from trading.tx import build_transaction
+from trading.utils import min_amount_with_slippage
 
 from .base import TransactionBuilder
 
 
+@dataclass
+class AmmV4SwapAccounts:
+    """构建 AMM v4 交易所需的账户与链上状态"""
+
+    pool_keys: AmmV4PoolKeys
+    token_mint: Pubkey
+    token_account: Pubkey
+    token_account_exists: bool
+    # 代币账户中的代币数量（最小单位），账户不存在时为 0
+    token_amount: int
+    base_reserve: float
+    quote_reserve: float
+    token_decimal: int
+    # 按池子储备量（最小单位）计算兑换数量
+    quoter: ConstantProductQuoter
+    # 租金豁免所需的最小余额
+    balance_needed: int
+
+
 class RaydiumV4TransactionBuilder(TransactionBuilder):
+    async def _get_pool_keys(self, token_address: str) -> AmmV4PoolKeys:
+        pool_keys = await get_preferred_pool_keys(token_address)
+        if pool_keys is None:
+            raise ValueError(f"未找到代币 {token_address} 的交易池")
+        return pool_keys
+
+    async def resolve_accounts(
+        self,
+        owner: Pubkey,
+        token_address: str,
+        timer: StepTimer | None = None,
+    ) -> AmmV4SwapAccounts:
+        """解析构建交易所需的账户
+
+        池子信息与租金互不依赖，并发获取；得到池子后，两个 vault 与用户的代币账户
+        通过一次 getMultipleAccounts 获取。vault 已被 ReserveStore 订阅时直接从内存中读取。
+        """
+        timer = timer or StepTimer()
+        pool_keys, balance_needed = await asyncio.gather(
+            timer.measure("pool", self._get_pool_keys(token_address)),
+            timer.measure("rent", get_min_balance_rent()),
+        )
+
+        # 确定代币铸币厂
+        token_mint = pool_keys.base_mint if pool_keys.base_mint != WSOL else pool_keys.quote_mint
+        token_account = get_associated_token_address(owner, token_mint)
+
+        vaults = [pool_keys.quote_vault, pool_keys.base_vault]
+        reserve_store = ReserveStore()
+        snapshots = reserve_store.get_many(vaults)
+        if snapshots is not None:
+            # vault 余额由订阅维护在内存中，只需获取用户的代币账户
+            (token_account_data,) = await timer.measure(
+                "accounts",
+                get_multiple_accounts(self.rpc_client, [token_account], Processed),
+            )
+            quote_vault_data, base_vault_data = (snapshot.data for snapshot in snapshots)
+        else:
+            quote_vault_data, base_vault_data, token_account_data = await timer.measure(
+                "accounts",
+                get_multiple_accounts(self.rpc_client, [*vaults, token_account], Processed),
+            )
+            reserve_store.watch(vaults)
+        if quote_vault_data is None or base_vault_data is None:
+            raise ValueError("Error: One of the account balances is None.")
+
+        quote_vault_amount = parse_token_amount(quote_vault_data)
+        base_vault_amount = parse_token_amount(base_vault_data)
+        base_reserve, quote_reserve, token_decimal = calc_amm_v4_reserves(
+            pool_keys,
+            quote_vault_amount / 10**pool_keys.quote_decimals,
+            base_vault_amount / 10**pool_keys.base_decimals,
+        )
+        return AmmV4SwapAccounts(
+            pool_keys=pool_keys,
+            token_mint=token_mint,
+            token_account=token_account,
+            token_account_exists=token_account_data is not None,
+            token_amount=parse_token_amount(token_account_data) if token_account_data else 0,
+            base_reserve=base_reserve,
+            quote_reserve=quote_reserve,
+            token_decimal=token_decimal,
+            quoter=ConstantProductQuoter.from_amm_v4(
+                pool_keys, base_vault_amount, quote_vault_amount
+            ),
+            balance_needed=balance_needed,
+        )
+
     async def build_buy_instructions(
         self,
         payer_keypair: Keypair,
         token_address: str,
         sol_in: float,
         slippage_bps: int,
+        timer: StepTimer | None = None,
     ) -> list[Instruction]:
         """构建购买代币的指令列表
 
@@ -50,59 +143,32 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
             token_address: 代币地址
             sol_in: 输入的SOL数量
             slippage_bps: 滑点，以基点(bps)为单位，1bps = 0.01%
+            timer: 记录各步骤耗时
 
         Returns:
             list[Instruction]: 指令列表
         """
         logger.info(f"构建购买交易: {token_address}, SOL输入: {sol_in}, 滑点: {slippage_bps}bps")
 
-        # 获取池子信息
-        pool_data = await get_preferred_pool(token_address)
-        if pool_data is None:
-            raise ValueError(f"未找到代币 {token_address} 的交易池")
-
-        # 构建池子密钥
-        pool_keys = AmmV4PoolKeys.from_pool_data(
-            pool_id=pool_data["pool_id"],
-            amm_data=pool_data["amm_data"],
-            market_data=pool_data["market_data"],
-        )
-
-        # 确定代币铸币厂
-        token_mint = pool_keys.base_mint if pool_keys.base_mint != WSOL else pool_keys.quote_mint
+        accounts = await self.resolve_accounts(payer_keypair.pubkey(), token_address, timer)
+        pool_keys = accounts.pool_keys
+        token_mint = accounts.token_mint
 
         # 计算交易金额
         amount_in = int(sol_in * SOL_DECIMAL)
 
-        # 获取池子储备量
-        base_reserve, quote_reserve, token_decimal = await get_amm_v4_reserves(pool_keys)
-
-        # 计算预期输出量
-        # 这里使用简化的计算方法，实际应用中可能需要更复杂的计算
-        constant_product = base_reserve * quote_reserve
-        effective_sol_in = sol_in * (1 - (0.25 / 100))  # 考虑0.25%的交易费用
-        new_quote_reserve = quote_reserve + effective_sol_in
-        new_base_reserve = constant_product / new_quote_reserve
-        amount_out = base_reserve - new_base_reserve
-
-        # 应用滑点
-        slippage_adjustment = 1 - (slippage_bps / 10000)  # 转换bps为百分比
-        minimum_amount_out = int(amount_out * slippage_adjustment * (10**token_decimal))
+        # 计算预期输出量并应用滑点
+        amount_out = accounts.quoter.quote(amount_in, buy=True)
+        minimum_amount_out = min_amount_with_slippage(amount_out, slippage_bps)
 
         logger.info(f"输入金额: {amount_in}, 最小输出金额: {minimum_amount_out}")
 
         # 检查代币账户是否存在
-        token_account = None
-        token_accounts = await self.rpc_client.get_token_accounts_by_owner(
-            payer_keypair.pubkey(), TokenAccountOpts(mint=token_mint), Processed
-        )
-
+        token_account = accounts.token_account
         create_token_account_ix = None
-        if token_accounts.value:
-            token_account = token_accounts.value[0].pubkey
+        if accounts.token_account_exists:
             logger.info(f"找到现有代币账户: {token_account}")
         else:
-            token_account = get_associated_token_address(payer_keypair.pubkey(), token_mint)
             create_token_account_ix = create_associated_token_account(
                 payer_keypair.pubkey(), payer_keypair.pubkey(), token_mint
             )
@@ -112,8 +178,8 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
         seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
         wsol_token_account = Pubkey.create_with_seed(payer_keypair.pubkey(), seed, TOKEN_PROGRAM_ID)
 
-        # 获取租金豁免所需的最小余额
-        balance_needed = await get_min_balance_rent()
+        # 租金豁免所需的最小余额
+        balance_needed = accounts.balance_needed
 
         # 创建WSOL账户指令
         create_wsol_account_ix = create_account_with_seed(
@@ -179,6 +245,7 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
         ui_amount: float,
         in_type: SwapInType,
         slippage_bps: int,
+        timer: StepTimer | None = None,
     ) -> list[Instruction]:
         """构建卖出代币的指令列表
 
@@ -188,6 +255,7 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
             ui_amount: 输入的数量（百分比或具体数量）
             in_type: 输入类型（百分比或具体数量）
             slippage_bps: 滑点，以基点(bps)为单位，1bps = 0.01%
+            timer: 记录各步骤耗时
 
         Returns:
             list[Instruction]: 指令列表
@@ -205,27 +273,16 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
             f"构建卖出交易: {token_address}, 输入: {ui_amount}{in_type.value}, 滑点: {slippage_bps}bps"
         )
 
-        # 获取池子信息
-        pool_data = await get_preferred_pool(token_address)
-        if pool_data is None:
-            raise ValueError(f"未找到代币 {token_address} 的交易池")
-
-        # 构建池子密钥
-        pool_keys = AmmV4PoolKeys.from_pool_data(
-            pool_id=pool_data["pool_id"],
-            amm_data=pool_data["amm_data"],
-            market_data=pool_data["market_data"],
-        )
-
-        # 确定代币铸币厂
-        token_mint = pool_keys.base_mint if pool_keys.base_mint != WSOL else pool_keys.quote_mint
+        accounts = await self.resolve_accounts(payer_keypair.pubkey(), token_address, timer)
+        pool_keys = accounts.pool_keys
+        token_mint = accounts.token_mint
+        token_account = accounts.token_account
 
-        # 获取代币账户
-        token_account = get_associated_token_address(payer_keypair.pubkey(), token_mint)
+        token_decimal = accounts.token_decimal
 
-        # 获取代币余额
-        token_balance = await get_token_balance(token_account, self.rpc_client)
-        if token_balance is None or token_balance == 0:
+        # 代币余额
+        token_balance = accounts.token_amount / 10**token_decimal
+        if not accounts.token_account_exists or token_balance == 0:
             raise ValueError(f"没有可用的代币余额: {token_mint}")
 
         # 计算要卖出的数量
@@ -236,32 +293,21 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
             sell_amount = ui_amount
             logger.info(f"卖出数量: {sell_amount}")
 
-        # 获取池子储备量
-        base_reserve, quote_reserve, token_decimal = await get_amm_v4_reserves(pool_keys)
-
-        # 计算预期输出量
-        # 这里使用简化的计算方法，实际应用中可能需要更复杂的计算
-        constant_product = base_reserve * quote_reserve
-        effective_token_in = sell_amount * (1 - (0.25 / 100))  # 考虑0.25%的交易费用
-        new_base_reserve = base_reserve + effective_token_in
-        new_quote_reserve = constant_product / new_base_reserve
-        amount_out = quote_reserve - new_quote_reserve
-
-        # 应用滑点
-        slippage_adjustment = 1 - (slippage_bps / 10000)  # 转换bps为百分比
-        minimum_amount_out = int(amount_out * slippage_adjustment * SOL_DECIMAL)
-
         # 计算输入金额
         amount_in = int(sell_amount * (10**token_decimal))
 
+        # 计算预期输出量并应用滑点
+        amount_out = accounts.quoter.quote(amount_in, buy=False)
+        minimum_amount_out = min_amount_with_slippage(amount_out, slippage_bps)
+
         logger.info(f"输入金额: {amount_in}, 最小输出金额: {minimum_amount_out}")
 
         # 创建临时WSOL账户
         seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
         wsol_token_account = Pubkey.create_with_seed(payer_keypair.pubkey(), seed, TOKEN_PROGRAM_ID)
 
-        # 获取租金豁免所需的最小余额
-        balance_needed = await get_min_balance_rent()
+        # 租金豁免所需的最小余额
+        balance_needed = accounts.balance_needed
 
         # 创建WSOL账户指令
         create_wsol_account_ix = create_account_with_seed(
@@ -357,12 +403,14 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
         if swap_direction not in [SwapDirection.Buy, SwapDirection.Sell]:
             raise ValueError("swap_direction must be buy or sell")
 
+        timer = StepTimer()
         if swap_direction == SwapDirection.Buy:
             instructions = await self.build_buy_instructions(
                 payer_keypair=keypair,
                 token_address=token_address,
                 sol_in=ui_amount,
                 slippage_bps=slippage_bps,
+                timer=timer,
             )
         elif swap_direction == SwapDirection.Sell:
             if in_type is None:
@@ -374,11 +422,15 @@ class RaydiumV4TransactionBuilder(TransactionBuilder):
                 ui_amount=ui_amount,
                 slippage_bps=slippage_bps,
                 in_type=in_type,
+                timer=timer,
             )
 
-        return await build_transaction(
-            keypair=keypair,
-            instructions=instructions,
-            use_jito=use_jito,
-            priority_fee=priority_fee,
-        )
+        async with timer.step("transaction"):
+            transaction = await build_transaction(
+                keypair=keypair,
+                instructions=instructions,
+                use_jito=use_jito,
+                priority_fee=priority_fee,
+            )
+        await timer.report(str(transaction.signatures[0]))
+        return transaction
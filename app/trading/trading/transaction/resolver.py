@@ -0,0 +1,91 @@
+"""交易构建时的账户解析
+
+构建交易所需的账户大多可以在本地推导（PDA、ATA），推导出地址后通过一次
+getMultipleAccounts 批量获取，与其余互不依赖的查询（global 账户、池子信息、租金等）
+并发执行，使构建耗时接近一次 RPC 往返，而不是多次往返之和。
+"""
+
+import time
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
+from typing import TypeVar
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Commitment
+from solbot_common.log import logger
+from solbot_services.benchmark import benchmark_service
+from solders.pubkey import Pubkey  # type: ignore
+
+# getMultipleAccounts 单次最多查询的账户数量
+MAX_MULTIPLE_ACCOUNTS = 100
+# SPL Token 账户中 amount 字段的偏移量 (mint: 32, owner: 32)
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64
+
+T = TypeVar("T")
+
+
+async def get_multiple_accounts(
+    client: AsyncClient,
+    pubkeys: list[Pubkey],
+    commitment: Commitment | None = None,
+) -> list[bytes | None]:
+    """批量获取账户数据，账户不存在时对应位置为 None"""
+    result: list[bytes | None] = []
+    for i in range(0, len(pubkeys), MAX_MULTIPLE_ACCOUNTS):
+        resp = await client.get_multiple_accounts(
+            pubkeys[i : i + MAX_MULTIPLE_ACCOUNTS], commitment
+        )
+        result.extend(bytes(account.data) if account else None for account in resp.value)
+    return result
+
+
+def parse_token_amount(data: bytes) -> int:
+    """解析 SPL Token 账户中的代币数量"""
+    return int.from_bytes(
+        data[TOKEN_ACCOUNT_AMOUNT_OFFSET : TOKEN_ACCOUNT_AMOUNT_OFFSET + 8], "little"
+    )
+
+
+class StepTimer:
+    """记录交易构建各步骤的耗时
+
+    步骤可以并发执行，每个步骤记录开始与结束时间，
+    交易构建完成后以交易签名为键上报到 benchmark 服务。
+    """
+
+    def __init__(self) -> None:
+        self.steps: dict[str, tuple[float, float]] = {}
+
+    @asynccontextmanager
+    async def step(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.steps[name] = (start, time.time())
+
+    async def measure(self, name: str, aw: Awaitable[T]) -> T:
+        """等待 aw 完成并记录耗时，便于与 asyncio.gather 配合使用"""
+        async with self.step(name):
+            return await aw
+
+    def elapsed(self, name: str) -> float | None:
+        if name not in self.steps:
+            return None
+        start, end = self.steps[name]
+        return end - start
+
+    async def report(self, tx_hash: str) -> None:
+        elapsed = ", ".join(
+            f"{name}: {end - start:.4f}s" for name, (start, end) in self.steps.items()
+        )
+        logger.info(f"Transaction {tx_hash} build steps: {elapsed}")
+        if not benchmark_service.is_running:
+            return
+        for name, (start, end) in self.steps.items():
+            await benchmark_service.add(
+                {"tx_hash": tx_hash, "step": f"build_{name}_start", "timestamp": start}
+            )
+            await benchmark_service.add(
+                {"tx_hash": tx_hash, "step": f"build_{name}_end", "timestamp": end}
+            )
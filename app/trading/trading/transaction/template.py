@@ -0,0 +1,375 @@
+"""交易模板
+
+为持有的代币预先解析好构建交易所需的账户（PDA、ATA 是否存在、手续费接收地址等）
+以及最近的链上状态（bonding curve 储备量、代币余额），触发交易时只需填入数量、
+blockhash 并签名，无需再依次发起多个 RPC 请求。
+"""
+
+import asyncio
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.types import TokenAccountOpts
+from solbot_cache import AccountAmountCache
+from solbot_cache.reserve import ReserveStore
+from solbot_common.constants import (
+    PUMP_FUN_ACCOUNT,
+    PUMP_FUN_PROGRAM,
+    PUMP_GLOBAL_ACCOUNT,
+    SYSTEM_PROGRAM_ID,
+    TOKEN_PROGRAM_ID,
+)
+from solbot_common.exceptions import BondingCurveNotFound
+from solbot_common.layouts.bonding_curve_account import BondingCurveAccount
+from solbot_common.log import logger
+from solbot_common.utils.pda import derivation_cache_stats
+from solbot_common.utils.utils import (
+    get_associated_token_address,
+    get_bonding_curve_pda,
+    get_bonding_curve_pda_creator_vault,
+    get_global_account,
+    warm_pda_cache,
+)
+from solders.pubkey import Pubkey  # type: ignore
+from typing_extensions import Self
+
+from trading.swap import SwapDirection
+from trading.transaction.protocol import TradingRoute
+from trading.transaction.resolver import StepTimer, get_multiple_accounts, parse_token_amount
+
+if TYPE_CHECKING:
+    from trading.route import RouteResolver
+
+TemplateKey = tuple[Pubkey, Pubkey, TradingRoute, SwapDirection]
+
+
+@dataclass
+class PumpSwapTemplate:
+    """pump.fun 交易模板"""
+
+    owner: Pubkey
+    mint: Pubkey
+    bonding_curve: Pubkey
+    associated_bonding_curve: Pubkey
+    creator_vault: Pubkey
+    fee_recipient: Pubkey
+    ata: Pubkey
+    ata_exists: bool
+    bonding_curve_account: BondingCurveAccount
+    # ATA 中的代币数量，ATA 不存在时为 0
+    token_amount: int = 0
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def is_fresh(self, max_age: float) -> bool:
+        return time.monotonic() - self.updated_at <= max_age
+
+    def invalidate(self) -> None:
+        """模板被用于交易后，余额与储备量即将变化，在下次刷新前不再使用"""
+        self.updated_at = 0
+
+    def accounts(self) -> dict[str, Pubkey]:
+        """pump.fun 买卖指令的账户"""
+        return {
+            "fee_recipient": self.fee_recipient,
+            "mint": self.mint,
+            "bonding_curve": self.bonding_curve,
+            "associated_bonding_curve": self.associated_bonding_curve,
+            "associated_user": self.ata,
+            "user": self.owner,
+            "global": PUMP_GLOBAL_ACCOUNT,
+            "system_program": SYSTEM_PROGRAM_ID,
+            "token_program": TOKEN_PROGRAM_ID,
+            "creator_vault": self.creator_vault,
+            "event_authority": PUMP_FUN_ACCOUNT,
+            "program": PUMP_FUN_PROGRAM,
+        }
+
+    @classmethod
+    async def resolve(
+        cls,
+        client: AsyncClient,
+        owner: Pubkey,
+        mint: Pubkey,
+        timer: StepTimer | None = None,
+    ) -> Self:
+        """通过 RPC 解析交易模板
+
+        bonding curve 与 ATA 地址在本地推导后通过一次 getMultipleAccounts 获取，
+        同时并发获取 global 账户（creator vault 由 bonding curve 数据在本地推导）。
+        bonding curve 已被 ReserveStore 订阅时直接从内存中读取
+
+        Raises:
+            BondingCurveNotFound: bonding curve 账户不存在
+        """
+        timer = timer or StepTimer()
+        bonding_curve, _ = get_bonding_curve_pda(mint, PUMP_FUN_PROGRAM)
+        ata = get_associated_token_address(owner=owner, mint=mint)
+        reserve_store = ReserveStore()
+        snapshot = reserve_store.get(bonding_curve)
+        if snapshot is not None:
+            # bonding curve 由订阅维护在内存中，只需获取 ATA
+            (ata_data,), global_account = await asyncio.gather(
+                timer.measure("accounts", get_multiple_accounts(client, [ata])),
+                timer.measure("global_account", get_global_account(client, PUMP_FUN_PROGRAM)),
+            )
+            bonding_curve_data = snapshot.data
+        else:
+            (bonding_curve_data, ata_data), global_account = await asyncio.gather(
+                timer.measure("accounts", get_multiple_accounts(client, [bonding_curve, ata])),
+                timer.measure("global_account", get_global_account(client, PUMP_FUN_PROGRAM)),
+            )
+            reserve_store.watch([bonding_curve])
+        if bonding_curve_data is None:
+            raise BondingCurveNotFound(f"Bonding curve account not found for mint {mint}")
+        if global_account is None:
+            raise ValueError("global account not found")
+
+        bonding_curve_account = BondingCurveAccount(bonding_curve_data)
+        return cls(
+            owner=owner,
+            mint=mint,
+            bonding_curve=bonding_curve,
+            associated_bonding_curve=get_associated_token_address(bonding_curve, mint),
+            creator_vault=_creator_vault(bonding_curve_account),
+            fee_recipient=global_account.fee_recipient,
+            ata=ata,
+            ata_exists=ata_data is not None,
+            bonding_curve_account=bonding_curve_account,
+            token_amount=parse_token_amount(ata_data) if ata_data else 0,
+        )
+
+
+def _creator_vault(bonding_curve_account: BondingCurveAccount) -> Pubkey:
+    creator = Pubkey.from_bytes(bonding_curve_account.creator)
+    creator_vault, _ = get_bonding_curve_pda_creator_vault(creator, PUMP_FUN_PROGRAM)
+    return creator_vault
+
+
+class SwapTemplateCache:
+    """交易模板缓存，以 (用户, 代币, 交易路由, 交易方向) 为键"""
+
+    _instance = None
+    _templates: dict[TemplateKey, PumpSwapTemplate]
+
+    def __new__(cls) -> Self:
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._templates = {}
+        return cls._instance
+
+    def get(
+        self,
+        owner: Pubkey,
+        mint: Pubkey,
+        route: TradingRoute,
+        direction: SwapDirection,
+    ) -> PumpSwapTemplate | None:
+        return self._templates.get((owner, mint, route, direction))
+
+    def put(
+        self,
+        template: PumpSwapTemplate,
+        route: TradingRoute = TradingRoute.PUMP,
+        directions: Iterable[SwapDirection] = (SwapDirection.Buy, SwapDirection.Sell),
+    ) -> None:
+        for direction in directions:
+            self._templates[(template.owner, template.mint, route, direction)] = template
+
+    def remove(self, owner: Pubkey, mint: Pubkey) -> None:
+        for key in [key for key in self._templates if key[0] == owner and key[1] == mint]:
+            del self._templates[key]
+
+    def templates(self) -> list[PumpSwapTemplate]:
+        """所有模板（去重）"""
+        return list({id(t): t for t in self._templates.values()}.values())
+
+    def clear(self) -> None:
+        self._templates.clear()
+
+
+class SwapTemplateRefresher:
+    """在后台维护被跟踪钱包所持有代币的交易模板
+
+    - 每隔 scan_interval 秒扫描钱包持有的代币，为仍在 pump.fun 上交易的代币创建模板
+    - 每隔 refresh_interval 秒通过 getMultipleAccounts 批量刷新模板中的
+      bonding curve 储备量与代币余额
+    """
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        wallets: Callable[[], Iterable[str]],
+        scan_interval: float = 30,
+        refresh_interval: float = 2,
+        route_resolver: "RouteResolver | None" = None,
+    ) -> None:
+        """
+        Args:
+            client: RPC 客户端
+            wallets: 返回需要维护模板的钱包地址
+            scan_interval: 扫描持仓的间隔（秒）
+            refresh_interval: 刷新链上状态的间隔（秒）
+            route_resolver: 发现代币毕业时通知路由解析，使其缓存的路由立即失效
+        """
+        self.client = client
+        self.wallets = wallets
+        self.scan_interval = scan_interval
+        self.refresh_interval = refresh_interval
+        self.route_resolver = route_resolver
+        self.cache = SwapTemplateCache()
+        self.is_running = False
+
+    def _mark_graduated(self, mint: Pubkey) -> None:
+        if self.route_resolver is not None:
+            self.route_resolver.mark_graduated(mint)
+
+    async def _get_held_mints(self, owner: Pubkey) -> dict[Pubkey, int]:
+        """获取钱包持有的代币及数量"""
+        resp = await self.client.get_token_accounts_by_owner(
+            owner, TokenAccountOpts(program_id=TOKEN_PROGRAM_ID)
+        )
+        held = {}
+        for account in resp.value:
+            data = bytes(account.account.data)
+            mint = Pubkey.from_bytes(data[:32])
+            amount = parse_token_amount(data)
+            # 只处理 ATA，交易指令中使用的是 ATA
+            if amount > 0 and account.pubkey == get_associated_token_address(owner, mint):
+                held[mint] = amount
+        return held
+
+    async def scan(self) -> None:
+        """扫描持仓，更新模板集合"""
+        global_account = await get_global_account(self.client, PUMP_FUN_PROGRAM)
+        if global_account is None:
+            raise ValueError("global account not found")
+
+        holdings: list[tuple[Pubkey, Pubkey, int]] = []
+        for wallet in set(self.wallets()):
+            owner = Pubkey.from_string(wallet)
+            held = await self._get_held_mints(owner)
+            holdings.extend((owner, mint, amount) for mint, amount in held.items())
+        # 预先推导持有代币的 PDA/ATA，之后的交易构建直接命中缓存
+        warm_pda_cache(((owner, mint) for owner, mint, _ in holdings), PUMP_FUN_PROGRAM)
+
+        bonding_curves = [
+            get_bonding_curve_pda(mint, PUMP_FUN_PROGRAM)[0] for _, mint, _ in holdings
+        ]
+        accounts = await get_multiple_accounts(self.client, bonding_curves)
+
+        templates = []
+        for (owner, mint, amount), bonding_curve, data in zip(
+            holdings, bonding_curves, accounts, strict=True
+        ):
+            if data is None:
+                # 不是 pump.fun 代币
+                continue
+            try:
+                bonding_curve_account = BondingCurveAccount(data)
+            except ValueError:
+                continue
+            if bonding_curve_account.complete:
+                # 已毕业，不再通过 pump.fun 交易
+                self._mark_graduated(mint)
+                continue
+            templates.append(
+                PumpSwapTemplate(
+                    owner=owner,
+                    mint=mint,
+                    bonding_curve=bonding_curve,
+                    associated_bonding_curve=get_associated_token_address(bonding_curve, mint),
+                    creator_vault=_creator_vault(bonding_curve_account),
+                    fee_recipient=global_account.fee_recipient,
+                    ata=get_associated_token_address(owner, mint),
+                    ata_exists=True,
+                    bonding_curve_account=bonding_curve_account,
+                    token_amount=amount,
+                )
+            )
+
+        self.cache.clear()
+        for template in templates:
+            self.cache.put(template)
+        # 订阅持有代币的 bonding curve，交易时直接从内存中读取储备量
+        ReserveStore().watch(template.bonding_curve for template in templates)
+        logger.info(f"Swap templates prepared for {len(templates)} held pump tokens")
+        logger.debug(f"PDA cache: {derivation_cache_stats()}")
+
+    async def refresh(self) -> None:
+        """批量刷新模板的 bonding curve 储备量与代币余额"""
+        templates = self.cache.templates()
+        if not templates:
+            return
+
+        pubkeys = [t.bonding_curve for t in templates] + [t.ata for t in templates]
+        accounts = await get_multiple_accounts(self.client, pubkeys)
+        bonding_curves, atas = accounts[: len(templates)], accounts[len(templates) :]
+        now = time.monotonic()
+        for template, bonding_curve_data, ata_data in zip(
+            templates, bonding_curves, atas, strict=True
+        ):
+            if bonding_curve_data is None:
+                self.cache.remove(template.owner, template.mint)
+                continue
+            bonding_curve_account = BondingCurveAccount(bonding_curve_data)
+            if bonding_curve_account.complete:
+                self.cache.remove(template.owner, template.mint)
+                self._mark_graduated(template.mint)
+                continue
+            template.bonding_curve_account = bonding_curve_account
+            template.ata_exists = ata_data is not None
+            template.token_amount = parse_token_amount(ata_data) if ata_data else 0
+            template.updated_at = now
+
+    async def start(self) -> None:
+        self.is_running = True
+        last_scan_at = 0.0
+        while self.is_running:
+            try:
+                if time.monotonic() - last_scan_at > self.scan_interval:
+                    await self.scan()
+                    last_scan_at = time.monotonic()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Failed to refresh swap templates: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def stop(self) -> None:
+        self.is_running = False
+
+
+async def get_pump_template(
+    client: AsyncClient,
+    owner: Pubkey,
+    mint: Pubkey,
+    direction: SwapDirection,
+    max_age: float,
+    timer: StepTimer | None = None,
+) -> PumpSwapTemplate:
+    """获取 pump.fun 交易模板，缓存中没有或已过期时通过 RPC 解析
+
+    卖出时代币余额以 AccountAmountCache 订阅维护的余额为准：模板中的余额来自定时轮询，
+    且只在当前进程内失效，多个 worker 交易同一钱包时可能已过期，按过期余额全部卖出
+    会导致关闭 ATA 失败。钱包未被订阅时才使用模板（或 RPC）中的余额
+
+    Raises:
+        BondingCurveNotFound: bonding curve 账户不存在
+    """
+    template = SwapTemplateCache().get(owner, mint, TradingRoute.PUMP, direction)
+    if template is not None and template.is_fresh(max_age):
+        logger.debug(f"Using swap template of {mint} for {owner}")
+        template.invalidate()
+    else:
+        template = await PumpSwapTemplate.resolve(client, owner, mint, timer)
+    if direction == SwapDirection.Sell:
+        balance = AccountAmountCache().get_balance(owner, mint)
+        if balance is not None:
+            template.token_amount = balance
+            template.ata_exists = template.ata_exists or balance > 0
+    return template
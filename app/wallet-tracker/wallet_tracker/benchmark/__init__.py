@@ -1,3 +1,5 @@
+from solbot_services.benchmark import BenchmarkService, benchmark_service
+
 from .decorator import (
     init,
     record_block_time,
@@ -5,7 +7,6 @@ from .decorator import (
     with_fetch_tx,
     with_parse_tx,
 )
-from .service import BenchmarkService, benchmark_service
 
 __all__ = [
     "BenchmarkService",
@@ -2,8 +2,7 @@ import time
 from contextlib import asynccontextmanager
 
 from solbot_common.log import logger
-
-from wallet_tracker.benchmark.service import benchmark_service
+from solbot_services.benchmark import benchmark_service
 
 
 async def _mark_start_fetch(tx_hash: str):
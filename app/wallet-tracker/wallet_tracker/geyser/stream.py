@@ -0,0 +1,305 @@
+"""geyser 订阅流分片
+
+所有钱包放在同一条 gRPC 流的 account_include 中时，会触及服务商对单个过滤器的地址数量限制，
+并且一条流处理不过来时所有钱包的交易都会延迟。
+
+HashRing 通过一致性哈希将钱包分配到 K 条独立的订阅流（独立的 gRPC 连接）上，
+每条流有自己的读取协程与重连逻辑。增加或移除钱包时只有该钱包所在的流需要重新发送订阅请求。
+
+每条流同时订阅 slot 更新，用于计算该流相对最快的流落后了多少个 slot。
+
+一笔交易同时涉及分配在不同流上的钱包时，每条流都会推送一次，
+所有流共享同一个 RecentSignatures，重复的交易在放入响应队列之前丢弃。
+"""
+
+import asyncio
+import bisect
+import hashlib
+import time
+from collections import OrderedDict
+from collections.abc import AsyncGenerator
+
+from grpc.aio import AioRpcError
+from solbot_common.log import logger
+from yellowstone_grpc.client import GeyserClient
+from yellowstone_grpc.grpc import geyser_pb2
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """一致性哈希环，每个分片在环上有 replicas 个虚拟节点"""
+
+    def __init__(self, num_shards: int, replicas: int = 64) -> None:
+        points = sorted(
+            (_hash(f"{shard}:{replica}"), shard)
+            for shard in range(num_shards)
+            for replica in range(replicas)
+        )
+        self._keys = [key for key, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    def get(self, key: str) -> int:
+        """返回 key 所属的分片"""
+        index = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._shards[index]
+
+
+# 重新连接失败后，读取协程重试的最长间隔（秒）
+MAX_RECONNECT_BACKOFF = 60
+
+# 去重集合保留的最大签名数量与保留时间（秒）
+RECENT_SIGNATURES_SIZE = 100_000
+RECENT_SIGNATURES_TTL = 120
+
+
+class RecentSignatures:
+    """最近收到的交易签名，有界的 LRU 集合，超过 ttl 的签名会被淘汰"""
+
+    def __init__(
+        self, maxsize: int = RECENT_SIGNATURES_SIZE, ttl: float = RECENT_SIGNATURES_TTL
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._seen: OrderedDict[bytes, float] = OrderedDict()
+
+    def add(self, signature: bytes) -> bool:
+        """记录签名，签名已存在时返回 False"""
+        now = time.monotonic()
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl and len(self._seen) < self.maxsize:
+                break
+            del self._seen[oldest]
+        if signature in self._seen:
+            return False
+        self._seen[signature] = now
+        return True
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class GeyserStream:
+    """一条 geyser 订阅流，负责哈希环上分配给它的钱包"""
+
+    def __init__(
+        self,
+        index: int,
+        endpoint: str,
+        api_key: str,
+        response_queue: asyncio.Queue,
+        recent_signatures: RecentSignatures | None = None,
+        max_retries: int = 3,
+        retry_delay: float = 5,
+    ) -> None:
+        """
+        Args:
+            recent_signatures: 所有流共享的已收到签名集合，用于丢弃其他流已推送过的交易
+        """
+        self.index = index
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.response_queue = response_queue
+        self.recent_signatures = (
+            RecentSignatures() if recent_signatures is None else recent_signatures
+        )
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retry_count = 0
+        self.is_running = False
+
+        self.wallets: set[str] = set()
+        # 最近一次发送给服务端的钱包集合
+        self._sent_wallets: frozenset[str] | None = None
+
+        self.geyser_client: GeyserClient | None = None
+        self.request_queue: asyncio.Queue[geyser_pb2.SubscribeRequest] | None = None
+        self.responses: AsyncGenerator[geyser_pb2.SubscribeUpdate, None] | None = None
+        self.reader: asyncio.Task | None = None
+
+        # 指标
+        self.received = 0
+        self.duplicates = 0
+        self.last_slot = 0
+        self.last_update_at = 0.0
+        # 等待响应队列的累计时间（秒），反映下游处理的背压
+        self.blocked_seconds = 0.0
+        # 重新连接连续失败的次数与最近一次的错误，重新连接成功后清空
+        self.reconnect_failures = 0
+        self.last_error: str | None = None
+
+    async def _connect(self) -> None:
+        """Connect to Geyser service with retry mechanism."""
+        while self.retry_count < self.max_retries:
+            try:
+                self.geyser_client = await GeyserClient.connect(self.endpoint, x_token=self.api_key)
+                self.retry_count = 0  # Reset retry count on successful connection
+                logger.info(f"Stream {self.index} connected to Geyser service")
+                return
+            except Exception as e:
+                self.retry_count += 1
+                if self.retry_count >= self.max_retries:
+                    logger.error(
+                        f"Stream {self.index} failed to connect to Geyser service "
+                        f"after {self.max_retries} attempts: {e}"
+                    )
+                    raise
+                logger.warning(
+                    f"Stream {self.index} connection attempt {self.retry_count} failed, "
+                    f"retrying in {self.retry_delay} seconds..."
+                )
+                await asyncio.sleep(self.retry_delay)
+
+    async def _subscribe(self) -> None:
+        await self._connect()
+        if self.geyser_client is None:
+            raise RuntimeError("Geyser client is not connected")
+        (
+            self.request_queue,
+            self.responses,
+        ) = await self.geyser_client.subscribe_with_request(self.build_subscribe_request())
+
+    async def _reconnect(self) -> None:
+        logger.info(f"Stream {self.index} attempting to reconnect...")
+        await asyncio.sleep(self.retry_delay)
+        if self.geyser_client is not None:
+            try:
+                await self.geyser_client.close()
+            except Exception as e:
+                logger.warning(f"Stream {self.index} error closing geyser client: {e}")
+            self.geyser_client = None
+        await self._subscribe()
+
+    async def _recover(self) -> None:
+        """重新连接直到成功或流被停止
+
+        _reconnect 在 _connect 重试 max_retries 次后仍然失败时会抛出异常，
+        此时按指数退避继续重试，避免读取协程退出后该流静默地不再推送交易。
+        连续失败的次数与最近一次的错误通过 stats() 暴露
+        """
+        backoff = self.retry_delay
+        while self.is_running:
+            # 每轮重新连接都允许 _connect 重试 max_retries 次
+            self.retry_count = 0
+            try:
+                await self._reconnect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.reconnect_failures += 1
+                self.last_error = repr(e)
+                logger.error(
+                    f"Stream {self.index} failed to reconnect ({self.reconnect_failures} times): "
+                    f"{e}, retrying in {backoff} seconds..."
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RECONNECT_BACKOFF)
+            else:
+                self.reconnect_failures = 0
+                self.last_error = None
+                return
+
+    def build_subscribe_request(self) -> geyser_pb2.SubscribeRequest:
+        """根据当前的钱包集合构建订阅请求，直接构建 protobuf"""
+        wallets = frozenset(self.wallets)
+        logger.info(f"Stream {self.index} subscribing to {len(wallets)} accounts")
+
+        request = geyser_pb2.SubscribeRequest()
+        if wallets:
+            transactions = request.transactions["key"]
+            transactions.account_include.extend(sorted(wallets))
+            transactions.failed = False
+        else:
+            request.ping.id = 1
+        # slot 更新用于计算各条流的延迟
+        request.slots["slots"].SetInParent()
+        self._sent_wallets = wallets
+        return request
+
+    async def flush(self) -> None:
+        """钱包集合有变化时发送新的订阅请求，新请求会完全替换之前的订阅状态"""
+        if self.request_queue is None or self._sent_wallets == self.wallets:
+            return
+        await self.request_queue.put(self.build_subscribe_request())
+
+    def _record(self, response: geyser_pb2.SubscribeUpdate) -> None:
+        self.received += 1
+        self.last_update_at = time.time()
+        if response.HasField("slot"):
+            self.last_slot = max(self.last_slot, response.slot.slot)
+        elif response.HasField("transaction"):
+            self.last_slot = max(self.last_slot, response.transaction.slot)
+
+    async def _read_loop(self) -> None:
+        """读取订阅流，将交易放入共享的响应队列"""
+        logger.info(f"Starting reader of stream {self.index}")
+        while self.is_running:
+            try:
+                if self.responses is None:
+                    raise RuntimeError("Stream is not subscribed")
+                async for response in self.responses:
+                    if not self.is_running:
+                        break
+                    self._record(response)
+                    if response.HasField("slot"):
+                        continue
+                    if response.HasField("transaction") and not self.recent_signatures.add(
+                        response.transaction.transaction.signature
+                    ):
+                        self.duplicates += 1
+                        continue
+                    started = time.monotonic()
+                    await self.response_queue.put(response)
+                    self.blocked_seconds += time.monotonic() - started
+                else:
+                    if self.is_running:
+                        logger.warning(f"Stream {self.index} closed by server")
+                        await self._recover()
+            except asyncio.CancelledError:
+                break
+            except AioRpcError as e:
+                logger.error(f"Stream {self.index} rpc error: {e._details}")
+                await self._recover()
+            except Exception as e:
+                logger.exception(e)
+                await self._recover()
+
+    async def start(self) -> None:
+        self.is_running = True
+        await self._subscribe()
+        self.reader = asyncio.create_task(self._read_loop())
+
+    async def stop(self) -> None:
+        self.is_running = False
+        if self.reader is not None:
+            self.reader.cancel()
+            await asyncio.gather(self.reader, return_exceptions=True)
+            self.reader = None
+        if self.geyser_client is not None:
+            try:
+                await self.geyser_client.close()
+            except Exception as e:
+                logger.error(f"Stream {self.index} error closing geyser client: {e}")
+            self.geyser_client = None
+
+    def stats(self, head_slot: int) -> dict:
+        """返回该流的指标
+
+        Args:
+            head_slot: 所有流中最新的 slot，用于计算该流落后的 slot 数量
+        """
+        return {
+            "stream": self.index,
+            "wallets": len(self.wallets),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "slot": self.last_slot,
+            "slot_lag": head_slot - self.last_slot if self.last_slot else None,
+            "idle_seconds": time.time() - self.last_update_at if self.last_update_at else None,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "reconnect_failures": self.reconnect_failures,
+            "last_error": self.last_error,
+        }
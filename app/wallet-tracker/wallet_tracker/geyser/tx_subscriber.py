@@ -1,70 +1,26 @@
 import asyncio
 import signal
 import time
-from collections.abc import AsyncGenerator, Sequence
+from collections.abc import Iterable, Sequence
 
 import aioredis
-import base58
-import orjson as json
-from google.protobuf.json_format import (
-    Parse,
-    _Printer,  # type: ignore
-)
-from google.protobuf.message import Message
-from grpc.aio import AioRpcError
 from solbot_common.config import settings
 from solbot_common.log import logger
 from solbot_db.redis import RedisClient
 from solders.pubkey import Pubkey  # type: ignore
-from yellowstone_grpc.client import GeyserClient
 from yellowstone_grpc.grpc import geyser_pb2
-from yellowstone_grpc.types import (
-    SubscribeRequest,
-    SubscribeRequestFilterTransactions,
-    SubscribeRequestPing,
-)
 
-from wallet_tracker.constants import NEW_TX_DETAIL_CHANNEL
+from wallet_tracker.geyser.stream import GeyserStream, HashRing, RecentSignatures
+from wallet_tracker.geyser.utils import proto_to_dict, to_rpc_tx_detail
+from wallet_tracker.parser import ProtoTXParser, RawTXParser
+from wallet_tracker.tx_queue import TxDetailQueue
 
-
-def should_convert_to_base58(value) -> bool:
-    """Check if bytes should be converted to base58."""
-    if not isinstance(value, bytes):
-        return False
-    try:
-        # 尝试解码为字符串，如果成功且没有特殊字符，就用字符串
-        decoded = value.decode("utf-8")
-        # 检查是否包含转义字符或不可打印字符
-        return "\\" in decoded or any(ord(c) < 32 or ord(c) > 126 for c in decoded)
-    except UnicodeDecodeError:
-        # 如果无法解码为字符串，就用 base58
-        return True
-
-
-class Base58Printer(_Printer):
-    def __init__(self) -> None:
-        super().__init__()
-        self.preserve_proto_field_names = True
-
-    def _RenderBytes(self, value):
-        """Renders a bytes value as base58 or utf-8 string."""
-        if should_convert_to_base58(value):
-            return base58.b58encode(value).decode("utf-8")
-        return value.decode("utf-8")
-
-    def _FieldToJsonObject(self, field, value):
-        """Converts field value according to its type."""
-        if field.cpp_type == field.CPPTYPE_BYTES and isinstance(value, bytes):
-            if should_convert_to_base58(value):
-                return base58.b58encode(value).decode("utf-8")
-            return value.decode("utf-8")
-        return super()._FieldToJsonObject(field, value)
-
-
-def proto_to_dict(message: Message) -> dict:
-    """Convert protobuf message to dict with bytes fields encoded as base58 or utf-8."""
-    printer = Base58Printer()
-    return printer._MessageToJsonObject(message)
+# 订阅变更的合并窗口（秒），窗口内的多次订阅/取消订阅只发送一次订阅请求
+SUBSCRIBE_DEBOUNCE = 0.05
+# 输出各条订阅流指标的间隔（秒）
+STATS_INTERVAL = 60
+# 订阅流落后超过该 slot 数量时输出警告
+LAG_WARN_SLOTS = 10
 
 
 class TransactionDetailSubscriber:
@@ -74,109 +30,85 @@ class TransactionDetailSubscriber:
         api_key: str,
         redis_client: aioredis.Redis,
         wallets: Sequence[Pubkey],
+        parse_mode: str = "json",
+        tx_queue: TxDetailQueue | None = None,
+        subscribe_debounce: float = SUBSCRIBE_DEBOUNCE,
+        num_streams: int = 1,
     ):
+        """
+        Args:
+            num_streams: 订阅流（gRPC 连接）的数量，钱包通过一致性哈希分配到各条流上
+        """
         self.endpoint = endpoint
         self.api_key = api_key
-        self.geyser_client = None
         self.wallets = wallets
         self.subscribed_wallets = {str(wallet) for wallet in wallets}
         self.redis = redis_client
         self.is_running = False
-        self.retry_count = 0
-        self.max_retries = 3
-        self.retry_delay = 5  # seconds
 
-        self.request_queue: asyncio.Queue[geyser_pb2.SubscribeRequest] | None = None
-        self.responses: AsyncGenerator[geyser_pb2.SubscribeUpdate, None] | None = None
-        # 响应处理相关
+        # 响应处理相关，所有订阅流共享同一个响应队列
         self.response_queue = asyncio.Queue(maxsize=1000)
+        self.ring = HashRing(num_streams)
+        # 一笔交易涉及多条流上的钱包时会被推送多次，所有流共享已收到的签名用于去重
+        self.recent_signatures = RecentSignatures()
+        self.streams = [
+            GeyserStream(index, endpoint, api_key, self.response_queue, self.recent_signatures)
+            for index in range(num_streams)
+        ]
+        for wallet in self.subscribed_wallets:
+            self._stream_of(wallet).wallets.add(wallet)
+        self._stats_task: asyncio.Task | None = None
         self.worker_nums = 2
         self.workers: list[asyncio.Task] = []
+        # native 模式下直接从 protobuf 解析交易，不再转换为 json
+        self.parse_mode = parse_mode
+        self.tx_queue = tx_queue or TxDetailQueue(redis_client)
+        # 订阅变更的合并
+        self.subscribe_debounce = subscribe_debounce
+        self._flush_task: asyncio.Task | None = None
 
-    async def _connect(self) -> None:
-        """Connect to Geyser service with retry mechanism."""
-        while self.retry_count < self.max_retries:
-            try:
-                self.geyser_client = await GeyserClient.connect(self.endpoint, x_token=self.api_key)
-                self.retry_count = 0  # Reset retry count on successful connection
-                logger.info("Successfully connected to Geyser service")
-                return
-            except Exception as e:
-                self.retry_count += 1
-                if self.retry_count >= self.max_retries:
-                    logger.error(
-                        f"Failed to connect to Geyser service after {self.max_retries} attempts: {e}"
-                    )
-                    raise
-                logger.warning(
-                    f"Connection attempt {self.retry_count} failed, retrying in {self.retry_delay} seconds..."
-                )
-                await asyncio.sleep(self.retry_delay)
-
-    async def _reconnect_and_subscribe(self) -> None:
-        logger.info("Attempting to reconnect...")
-        await asyncio.sleep(self.retry_delay)
-        await self._connect()
-
-        if self.geyser_client is None:
-            raise RuntimeError("Geyser client is not connected")
-
-        # Create subscription request
-        subscribe_request = self.__build_subscribe_request()
-        json_str = subscribe_request.model_dump_json()
-        pb_request = Parse(json_str, geyser_pb2.SubscribeRequest())
-
-        # Subscribe to updates
-        logger.info("Subscribing to account updates...")
-        (
-            self.request_queue,
-            self.responses,
-        ) = await self.geyser_client.subscribe_with_request(pb_request)
-
-    def __build_subscribe_request(self) -> SubscribeRequest:
-        logger.info(f"Subscribing to accounts: {self.subscribed_wallets}")
-
-        params = {}
-
-        if len(self.subscribed_wallets) != 0:
-            params["transactions"] = {
-                "key": SubscribeRequestFilterTransactions(
-                    account_include=list(self.subscribed_wallets),
-                    failed=False,
-                )
-            }
-        else:
-            params["ping"] = SubscribeRequestPing(id=1)
-
-        subscribe_request = SubscribeRequest(**params)
-        return subscribe_request
+    def _stream_of(self, wallet: str) -> GeyserStream:
+        return self.streams[self.ring.get(wallet)]
 
     async def _process_transaction(self, transaction: dict) -> None:
-        """Process and store transaction in Redis."""
-        if self.redis is None:
-            raise Exception("Redis is not connected")
-
+        """Process and put transaction into the tx detail queue."""
         try:
             signature = transaction["transaction"]["signature"]
             # 构建成 rpc 返回的结构，方便统一解析交易数据
-            data = {
-                **transaction["transaction"],
-            }
-            data["slot"] = int(transaction["slot"])
-            data["version"] = 0
             # 只有被确认之后才会有 blockTime, 所以这里设置为当前时间
-            data["blockTime"] = int(time.time())
-
-            tx_info_json = json.dumps(data)
-            # Store in Redis using LIST structure
-            # 将交易信息添加到列表左端（最新的交易在最前面）
-            await self.redis.lpush(NEW_TX_DETAIL_CHANNEL, tx_info_json)
-            # 保持列表长度在合理范围内（比如最多保留1000条交易记录）
-            # await self.redis.ltrim(NEW_TX_DETAIL_CHANNEL, 0, 999)
+            data = to_rpc_tx_detail(transaction, int(time.time()))
+
+            await self.tx_queue.put(RawTXParser(data))
             logger.info(f"Added transaction '{signature}' to queue")
         except Exception as e:
             logger.exception(f"Error processing transaction: {e}")
 
+    async def _process_transaction_native(
+        self, transaction: geyser_pb2.SubscribeUpdateTransaction
+    ) -> None:
+        """直接将 protobuf 交易交给解析器，不再转换为 json"""
+        try:
+            tx_parser = ProtoTXParser(transaction)
+            await self.tx_queue.put(tx_parser)
+            logger.info(f"Added transaction '{tx_parser.get_tx_hash()}' to queue")
+        except Exception as e:
+            logger.exception(f"Error processing transaction: {e}")
+
+    async def _process_response(self, response: geyser_pb2.SubscribeUpdate) -> None:
+        if self.parse_mode == "native":
+            if response.HasField("ping"):
+                logger.debug("Got ping response")
+            elif response.HasField("transaction") and len(response.filters) != 0:
+                await self._process_transaction_native(response.transaction)
+            return
+
+        response_dict = proto_to_dict(response)
+        if "ping" in response_dict:
+            logger.debug(f"Got ping response: {response_dict}")
+        if "filters" in response_dict and "transaction" in response_dict:
+            logger.debug(f"Got transaction response: \n {response_dict}")
+            await self._process_transaction(response_dict["transaction"])
+
     async def _process_response_worker(self):
         """Process responses from the queue."""
         logger.info(f"Starting response worker {id(asyncio.current_task())}")
@@ -184,12 +116,7 @@ class TransactionDetailSubscriber:
             try:
                 response = await self.response_queue.get()
                 try:
-                    response_dict = proto_to_dict(response)
-                    if "ping" in response_dict:
-                        logger.debug(f"Got ping response: {response_dict}")
-                    if "filters" in response_dict and "transaction" in response_dict:
-                        logger.debug(f"Got transaction response: \n {response_dict}")
-                        await self._process_transaction(response_dict["transaction"])
+                    await self._process_response(response)
                 except Exception as e:
                     logger.error(f"Error processing response: {e}")
                     logger.exception(e)
@@ -224,7 +151,7 @@ class TransactionDetailSubscriber:
 
     async def start(self) -> None:
         """Start monitoring wallet transactions."""
-        logger.info(f"Starting wallet monitor for accounts: {self.wallets}")
+        logger.info(f"Starting wallet monitor for {len(self.subscribed_wallets)} accounts")
 
         self.is_running = True
 
@@ -232,43 +159,10 @@ class TransactionDetailSubscriber:
             # 启动工作协程
             await self._start_workers()
 
-            # 初始化连接
-            await self._connect()
-
-            if self.geyser_client is None:
-                raise Exception("Geyser client is not connected")
-
-            # Create subscription request
-            subscribe_request = SubscribeRequest(ping=SubscribeRequestPing(id=1))
-            pb_request = Parse(subscribe_request.model_dump_json(), geyser_pb2.SubscribeRequest())
-
-            # Subscribe to updates
-            logger.info("Subscribing to account updates...")
-            (
-                self.request_queue,
-                self.responses,
-            ) = await self.geyser_client.subscribe_with_request(pb_request)
-
-            async def _f():
-                """Process responses from the queue."""
-                logger.info(f"Starting response worker {id(asyncio.current_task())}")
-
-                while self.is_running:
-                    try:
-                        async for response in self.responses:
-                            if not self.is_running:
-                                break
-                            await self.response_queue.put(response)
-                    except AioRpcError as e:
-                        logger.error(f"Rpc Error: {e._details}")
-                        await self._reconnect_and_subscribe()
-                    except Exception as e:
-                        logger.exception(e)
-                        await self._reconnect_and_subscribe()
-
-            monitor_task = asyncio.create_task(_f())
-            # 添加任务完成回调以处理可能的异常
-            monitor_task.add_done_callback(lambda t: t.exception() if t.exception() else None)
+            # 每条流独立连接，初始订阅包含启动前已添加的钱包
+            logger.info(f"Subscribing to account updates on {len(self.streams)} streams...")
+            await asyncio.gather(*(stream.start() for stream in self.streams))
+            self._stats_task = asyncio.create_task(self._stats_loop())
         except asyncio.CancelledError:
             logger.info("Monitor cancelled, shutting down...")
         except Exception as e:
@@ -282,18 +176,18 @@ class TransactionDetailSubscriber:
 
         logger.info("Stopping wallet monitor...")
         self.is_running = False
+        for task in (self._flush_task, self._stats_task):
+            if task is not None:
+                task.cancel()
+        self._flush_task = None
+        self._stats_task = None
+
+        # 关闭订阅流
+        await asyncio.gather(*(stream.stop() for stream in self.streams))
 
         # 等待所有工作协程完成
         await self._stop_workers()
 
-        # 关闭 geyser client
-        if self.geyser_client:
-            try:
-                await self.geyser_client.close()
-                self.geyser_client = None
-            except Exception as e:
-                logger.error(f"Error closing geyser client: {e}")
-
         # 关闭 Redis 连接
         if self.redis:
             try:
@@ -304,57 +198,92 @@ class TransactionDetailSubscriber:
 
         logger.info("Wallet monitor stopped")
 
-    async def subscribe_wallet_transactions(self, wallet: Pubkey) -> None:
-        """订阅钱包的交易信息。
+    def stats(self) -> list[dict]:
+        """返回各条订阅流的指标"""
+        head_slot = max(stream.last_slot for stream in self.streams)
+        return [stream.stats(head_slot) for stream in self.streams]
 
-        每次发送新的订阅请求都会完全替换之前的订阅状态。
+    async def _stats_loop(self) -> None:
+        while self.is_running:
+            await asyncio.sleep(STATS_INTERVAL)
+            for stats in self.stats():
+                if stats["reconnect_failures"]:
+                    logger.warning(f"Geyser stream is reconnecting: {stats}")
+                elif stats["slot_lag"] is not None and stats["slot_lag"] > LAG_WARN_SLOTS:
+                    logger.warning(f"Geyser stream is lagging: {stats}")
+                else:
+                    logger.info(f"Geyser stream stats: {stats}")
+
+    async def flush(self) -> None:
+        """立即向钱包集合有变化的订阅流发送订阅请求
+
+        每次发送新的订阅请求都会完全替换该流之前的订阅状态。
         这是 Geyser API 的设计：它使用 gRPC 的双向流，每个新请求都会更新整个订阅列表。
+        尚未启动时不发送，启动时的初始订阅会包含所有钱包。
+        """
+        await asyncio.gather(*(stream.flush() for stream in self.streams))
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.subscribe_debounce)
+        finally:
+            self._flush_task = None
+        await self.flush()
+
+    def _schedule_flush(self) -> None:
+        """在合并窗口结束后发送订阅请求，窗口内的多次变更只发送一次"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def subscribe_many(self, wallets: Iterable[Pubkey]) -> None:
+        """批量订阅钱包的交易信息
 
         Args:
-            wallet (Pubkey): 要订阅的钱包地址
+            wallets (Iterable[Pubkey]): 要订阅的钱包地址
         """
-        if self.request_queue is None:
-            raise Exception("Request queue is not initialized")
+        added = {str(wallet) for wallet in wallets} - self.subscribed_wallets
+        if not added:
+            return
+        self.subscribed_wallets |= added
+        for wallet in added:
+            self._stream_of(wallet).wallets.add(wallet)
+        self._schedule_flush()
 
-        if str(wallet) in self.subscribed_wallets:
-            logger.warning(f"Wallet {wallet} already subscribed")
+    async def unsubscribe_many(self, wallets: Iterable[Pubkey]) -> None:
+        """批量取消订阅钱包的交易信息
+
+        Args:
+            wallets (Iterable[Pubkey]): 要取消订阅的钱包地址
+        """
+        removed = {str(wallet) for wallet in wallets} & self.subscribed_wallets
+        if not removed:
             return
+        self.subscribed_wallets -= removed
+        for wallet in removed:
+            self._stream_of(wallet).wallets.discard(wallet)
+        self._schedule_flush()
 
-        # 添加到订阅集合
-        self.subscribed_wallets.add(str(wallet))
+    async def subscribe_wallet_transactions(self, wallet: Pubkey) -> None:
+        """订阅钱包的交易信息，合并窗口内的多次变更只发送一次订阅请求
 
-        # 发送订阅请求，包含所有已订阅的钱包
-        # 这个请求会完全替换服务器端之前的订阅状态
-        subscribe_request = self.__build_subscribe_request()
-        json_str = subscribe_request.model_dump_json()
-        pb_request = Parse(json_str, geyser_pb2.SubscribeRequest())
-        await self.request_queue.put(pb_request)
+        Args:
+            wallet (Pubkey): 要订阅的钱包地址
+        """
+        if str(wallet) in self.subscribed_wallets:
+            logger.warning(f"Wallet {wallet} already subscribed")
+            return
+        await self.subscribe_many([wallet])
 
     async def unsubscribe_wallet_transactions(self, wallet: Pubkey) -> None:
-        """取消订阅钱包的交易信息。
-
-        每次发送新的订阅请求都会完全替换之前的订阅状态。
-        这是 Geyser API 的设计：它使用 gRPC 的双向流，每个新请求都会更新整个订阅列表。
+        """取消订阅钱包的交易信息，合并窗口内的多次变更只发送一次订阅请求
 
         Args:
             wallet (Pubkey): 要取消订阅的钱包地址
         """
-        if self.request_queue is None:
-            raise Exception("Request queue is not initialized")
-
         if str(wallet) not in self.subscribed_wallets:
             logger.warning(f"Wallet {wallet} not subscribed")
             return
-
-        # 从订阅集合中移除钱包
-        self.subscribed_wallets.remove(str(wallet))
-
-        # 发送新的订阅请求，只包含剩余的钱包
-        # 这个请求会完全替换服务器端之前的订阅状态
-        subscribe_request = self.__build_subscribe_request()
-        json_str = subscribe_request.model_dump_json()
-        pb_request = Parse(json_str, geyser_pb2.SubscribeRequest())
-        await self.request_queue.put(pb_request)
+        await self.unsubscribe_many([wallet])
 
 
 if __name__ == "__main__":
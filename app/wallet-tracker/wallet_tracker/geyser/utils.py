@@ -0,0 +1,54 @@
+import base58
+from google.protobuf.json_format import _Printer  # type: ignore
+from google.protobuf.message import Message
+
+
+def should_convert_to_base58(value) -> bool:
+    """Check if bytes should be converted to base58."""
+    if not isinstance(value, bytes):
+        return False
+    try:
+        # 尝试解码为字符串，如果成功且没有特殊字符，就用字符串
+        decoded = value.decode("utf-8")
+        # 检查是否包含转义字符或不可打印字符
+        return "\\" in decoded or any(ord(c) < 32 or ord(c) > 126 for c in decoded)
+    except UnicodeDecodeError:
+        # 如果无法解码为字符串，就用 base58
+        return True
+
+
+class Base58Printer(_Printer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.preserve_proto_field_names = True
+
+    def _RenderBytes(self, value):
+        """Renders a bytes value as base58 or utf-8 string."""
+        if should_convert_to_base58(value):
+            return base58.b58encode(value).decode("utf-8")
+        return value.decode("utf-8")
+
+    def _FieldToJsonObject(self, field, value):
+        """Converts field value according to its type."""
+        if field.cpp_type == field.CPPTYPE_BYTES and isinstance(value, bytes):
+            if should_convert_to_base58(value):
+                return base58.b58encode(value).decode("utf-8")
+            return value.decode("utf-8")
+        return super()._FieldToJsonObject(field, value)
+
+
+def proto_to_dict(message: Message) -> dict:
+    """Convert protobuf message to dict with bytes fields encoded as base58 or utf-8."""
+    printer = Base58Printer()
+    return printer._MessageToJsonObject(message)
+
+
+def to_rpc_tx_detail(transaction: dict, block_time: int) -> dict:
+    """将 SubscribeUpdateTransaction 转换后的 dict 构建成 rpc getTransaction 返回的结构"""
+    data = {
+        **transaction["transaction"],
+    }
+    data["slot"] = int(transaction["slot"])
+    data["version"] = 0
+    data["blockTime"] = block_time
+    return data
@@ -11,6 +11,7 @@ from solders.pubkey import Pubkey  # type: ignore
 
 from wallet_tracker.benchmark import BenchmarkService
 from wallet_tracker.tx_monitor import TxMonitor
+from wallet_tracker.tx_queue import TxDetailQueue
 from wallet_tracker.tx_worker import TransactionWorker
 
 
@@ -19,8 +20,17 @@ class WalletTracker:
         self.redis = RedisClient.get_instance()
         self.client = get_async_client()
         self.wallets = init_wallets
-        self.transaction_monitor = TxMonitor(self.wallets, mode=settings.monitor.mode)
-        self.transaction_worker = TransactionWorker(self.redis)
+        # 交易订阅者与解析 worker 之间的队列
+        self.tx_queue = TxDetailQueue(
+            self.redis,
+            mode=settings.monitor.pipeline,
+            maxsize=settings.monitor.queue_size,
+            overflow=settings.monitor.queue_overflow,
+        )
+        self.transaction_monitor = TxMonitor(
+            self.wallets, mode=settings.monitor.mode, tx_queue=self.tx_queue
+        )
+        self.transaction_worker = TransactionWorker(self.redis, self.tx_queue)
         self.benchmark_service = BenchmarkService()
 
     # @provide_session
@@ -1,3 +1,4 @@
+from .proto_tx import ProtoTXParser
 from .raw_tx import RawTXParser
 
-__all__ = ["RawTXParser"]
+__all__ = ["ProtoTXParser", "RawTXParser"]
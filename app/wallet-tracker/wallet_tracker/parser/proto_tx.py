@@ -0,0 +1,73 @@
+import time
+from functools import cache
+
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from yellowstone_grpc.grpc import geyser_pb2
+
+from wallet_tracker.geyser.utils import proto_to_dict, to_rpc_tx_detail
+
+from .raw_tx import RawTXParser, TokenBalance
+
+
+class ProtoTXParser(RawTXParser):
+    """直接从 geyser 的 SubscribeUpdateTransaction 中解析交易
+
+    与 RawTXParser 共用解析逻辑，只是数据来源不同：
+    不再将 protobuf 转换成 rpc 结构的 json，而是直接读取解析所需的字段
+    (签名者、sol 余额、token 余额、日志)。
+    """
+
+    def __init__(
+        self,
+        update: geyser_pb2.SubscribeUpdateTransaction,
+        block_time: int | None = None,
+    ) -> None:
+        self.update = update
+        self.info = update.transaction
+        self.meta = update.transaction.meta
+        # 只有被确认之后才会有 blockTime, 所以这里默认设置为当前时间
+        self.block_time = block_time if block_time is not None else int(time.time())
+
+    @property
+    def tx_detail(self) -> dict:  # type: ignore[override]
+        """rpc 结构的交易详情，仅用于记录解析失败的交易"""
+        return to_rpc_tx_detail(proto_to_dict(self.update), self.block_time)
+
+    @property
+    def slot(self) -> int:
+        return self.update.slot
+
+    @cache
+    def get_block_time(self) -> int:
+        return self.block_time
+
+    @cache
+    def get_tx_hash(self) -> str:
+        signatures = self.info.transaction.signatures
+        if len(signatures) > 1:
+            raise ValueError("multiple txs in one transaction")
+        return str(Signature.from_bytes(signatures[0]))
+
+    @cache
+    def get_who(self) -> str:
+        return str(Pubkey.from_bytes(self.info.transaction.message.account_keys[0]))
+
+    @cache
+    def get_pre_token_balances(self) -> list[TokenBalance]:
+        return [TokenBalance.from_proto(balance) for balance in self.meta.pre_token_balances]
+
+    @cache
+    def get_post_token_balances(self) -> list[TokenBalance]:
+        return [TokenBalance.from_proto(balance) for balance in self.meta.post_token_balances]
+
+    @cache
+    def get_signer_sol_balances(self) -> tuple[int, int]:
+        try:
+            return self.meta.pre_balances[0], self.meta.post_balances[0]
+        except IndexError:
+            raise ValueError("owner index out of range")
+
+    @cache
+    def get_log_messages(self) -> list[str]:
+        return list(self.meta.log_messages)
@@ -1,8 +1,13 @@
 from functools import cache
 
 import orjson as json
-from solbot_common.constants import SWAP_PROGRAMS, TOKEN_PROGRAM_ID, WSOL
+from solbot_common.constants import SWAP_PROGRAMS
 from solbot_common.types import SolAmountChange, TokenAmountChange, TxEvent, TxType
+from solbot_common.utils.tx_balance import (
+    TokenBalance,
+    get_token_amount_change,
+    get_traded_mint,
+)
 
 from wallet_tracker.exceptions import (
     NotSwapTransaction,
@@ -41,64 +46,49 @@ class RawTXParser(TransactionParserInterface):
         return signer["pubkey"]
 
     @cache
-    def get_mint(self) -> str:
-        token_post_balances = self.tx_detail["meta"]["postTokenBalances"]
-        token_pre_balances = self.tx_detail["meta"]["preTokenBalances"]
-        for token_post_balance in token_post_balances:
-            if token_post_balance["owner"] != self.get_who():
-                continue
-            if token_post_balance["programId"] == str(TOKEN_PROGRAM_ID) and token_post_balance[
-                "mint"
-            ] != str(WSOL):
-                return token_post_balance["mint"]
-
-        for token_pre_balance in token_pre_balances:
-            if token_pre_balance["owner"] != self.get_who():
-                continue
-            if token_pre_balance["programId"] == str(TOKEN_PROGRAM_ID) and token_pre_balance[
-                "mint"
-            ] != str(WSOL):
-                return token_pre_balance["mint"]
-        raise ValueError("mint not found")
+    def get_pre_token_balances(self) -> list[TokenBalance]:
+        return [
+            TokenBalance.from_rpc(balance) for balance in self.tx_detail["meta"]["preTokenBalances"]
+        ]
 
     @cache
-    def get_token_amount_change(self) -> TokenAmountChange:
-        pre_token_balances = self.tx_detail["meta"]["preTokenBalances"]
-        post_token_balances = self.tx_detail["meta"]["postTokenBalances"]
-        who = self.get_who()
-        mint = self.get_mint()
-
-        pre_token_amount = 0
-        post_token_amount = 0
-        decimals = 6
-        for pre_token_balance in pre_token_balances:
-            if pre_token_balance["mint"] == mint and pre_token_balance["owner"] == who:
-                pre_token_amount = int(pre_token_balance["uiTokenAmount"]["amount"])
-                decimals = pre_token_balance["uiTokenAmount"]["decimals"]
-                break
-
-        for post_token_balance in post_token_balances:
-            if post_token_balance["mint"] == mint and post_token_balance["owner"] == who:
-                post_token_amount = int(post_token_balance["uiTokenAmount"]["amount"])
-                decimals = post_token_balance["uiTokenAmount"]["decimals"]
-                break
-
-        return {
-            "change_amount": post_token_amount - pre_token_amount,
-            "decimals": decimals,
-            "pre_balance": pre_token_amount,
-            "post_balance": post_token_amount,
-        }
+    def get_post_token_balances(self) -> list[TokenBalance]:
+        return [
+            TokenBalance.from_rpc(balance)
+            for balance in self.tx_detail["meta"]["postTokenBalances"]
+        ]
 
     @cache
-    def get_sol_amount_change(self) -> SolAmountChange:
+    def get_signer_sol_balances(self) -> tuple[int, int]:
         pre_balances = self.tx_detail["meta"]["preBalances"]
         post_balances = self.tx_detail["meta"]["postBalances"]
         try:
-            pre_sol_balance = int(pre_balances[0])
-            post_sol_balance = int(post_balances[0])
+            return int(pre_balances[0]), int(post_balances[0])
         except IndexError:
             raise ValueError("owner index out of range")
+
+    @cache
+    def get_log_messages(self) -> list[str]:
+        return self.tx_detail["meta"]["logMessages"]
+
+    @cache
+    def get_mint(self) -> str:
+        return get_traded_mint(
+            self.get_pre_token_balances(), self.get_post_token_balances(), self.get_who()
+        )
+
+    @cache
+    def get_token_amount_change(self) -> TokenAmountChange:
+        return get_token_amount_change(
+            self.get_pre_token_balances(),
+            self.get_post_token_balances(),
+            self.get_who(),
+            self.get_mint(),
+        )
+
+    @cache
+    def get_sol_amount_change(self) -> SolAmountChange:
+        pre_sol_balance, post_sol_balance = self.get_signer_sol_balances()
         return {
             "change_amount": post_sol_balance - pre_sol_balance,
             "decimals": 9,
@@ -134,8 +124,7 @@ class RawTXParser(TransactionParserInterface):
 
     @cache
     def get_swap_program_id(self) -> str | None:
-        log_messages = self.tx_detail["meta"]["logMessages"]
-        for message in log_messages:
+        for message in self.get_log_messages():
             for program_id in SWAP_PROGRAMS:
                 if program_id in message:
                     return program_id
@@ -149,8 +138,8 @@ class RawTXParser(TransactionParserInterface):
 
         try:
             # 不是 swap 交易
-            pre_token_balances = self.tx_detail["meta"]["preTokenBalances"]
-            post_token_balances = self.tx_detail["meta"]["postTokenBalances"]
+            pre_token_balances = self.get_pre_token_balances()
+            post_token_balances = self.get_post_token_balances()
         except KeyError:
             raise NotSwapTransaction()
 
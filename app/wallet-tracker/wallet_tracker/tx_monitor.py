@@ -10,6 +10,7 @@ from solbot_services.copytrade import CopyTradeService
 from solders.pubkey import Pubkey  # type: ignore
 
 from .geyser.tx_subscriber import TransactionDetailSubscriber as GeyserMonitor
+from .tx_queue import TxDetailQueue
 from .wss.tx_subscriber import TransactionDetailSubscriber as RPCMonitor
 
 
@@ -18,6 +19,7 @@ class TxMonitor:
         self,
         wallets: Sequence[Pubkey],
         mode: Literal["wss", "geyser"] = "wss",
+        tx_queue: TxDetailQueue | None = None,
     ):
         self.mode = mode
         redis = RedisClient.get_instance()
@@ -27,6 +29,7 @@ class TxMonitor:
                 settings.rpc.rpc_url,
                 redis,
                 wallets,
+                tx_queue=tx_queue,
             )
         elif mode == "geyser":
             self.monitor = GeyserMonitor(
@@ -34,6 +37,9 @@ class TxMonitor:
                 settings.rpc.geyser.api_key,
                 redis,
                 wallets,
+                parse_mode=settings.monitor.parse_mode,
+                tx_queue=tx_queue,
+                num_streams=settings.monitor.geyser_streams,
             )
         else:
             raise ValueError("Invalid mode")
@@ -57,9 +63,11 @@ class TxMonitor:
         copytrade_addresses = await CopyTradeService.get_active_wallet_addresses()
         # 合并两个列表
         active_wallet_addresses = list(set(list(monitor_addresses) + list(copytrade_addresses)))
-        for address in active_wallet_addresses:
-            await self.monitor.subscribe_wallet_transactions(Pubkey.from_string(address))
-            logger.debug(f"Subscribed to wallet: {address}")
+        # 一次性批量订阅，避免逐个钱包发送订阅请求
+        await self.monitor.subscribe_many(
+            Pubkey.from_string(address) for address in active_wallet_addresses
+        )
+        logger.info(f"Subscribed to {len(active_wallet_addresses)} wallets")
 
         # 开始处理事件
         logger.info("Start processing monitor events")
@@ -0,0 +1,94 @@
+import asyncio
+
+import aioredis
+import orjson as json
+from solbot_common.log import logger
+
+from wallet_tracker.constants import NEW_TX_DETAIL_CHANNEL
+from wallet_tracker.parser import RawTXParser
+from wallet_tracker.parser.protocol import TransactionParserInterface
+
+
+class TxDetailQueue:
+    """交易详情队列
+
+    连接交易订阅者（wss / geyser）与 TransactionWorker，有两种模式：
+    - redis: 交易详情序列化为 json 后 LPUSH 到 redis 列表，worker 通过 BRPOP 取出
+    - inprocess: 订阅者与 worker 共享一个有界的 asyncio.Queue，直接传递解析器，
+      不再经过 redis 和 json 序列化。队列满时，若开启了 overflow，
+      多出的交易会写入 redis 列表，待队列空闲时再被取出；否则订阅者将等待（背压）
+    """
+
+    def __init__(
+        self,
+        redis: aioredis.Redis,
+        mode: str = "redis",
+        maxsize: int = 1000,
+        overflow: bool = True,
+        channel: str = NEW_TX_DETAIL_CHANNEL,
+    ) -> None:
+        if mode not in ("redis", "inprocess"):
+            raise ValueError(f"Invalid pipeline mode: {mode}")
+        self.redis = redis
+        self.mode = mode
+        self.channel = channel
+        self.overflow = overflow
+        self.queue: asyncio.Queue[TransactionParserInterface] = asyncio.Queue(maxsize=maxsize)
+        self.lock = asyncio.Lock()
+        # 启动时 redis 列表中可能还有上次残留的交易，需要先消费掉
+        self._has_overflow = overflow
+
+    def qsize(self) -> int:
+        return self.queue.qsize()
+
+    async def _push_to_redis(self, tx_parser: TransactionParserInterface) -> None:
+        # 使用 orjson 的 dumps，它返回 bytes，需要解码为 str
+        tx_detail_text = json.dumps(tx_parser.tx_detail).decode("utf-8")
+        await self.redis.lpush(self.channel, tx_detail_text)
+
+    async def put(self, tx_parser: TransactionParserInterface) -> None:
+        """放入一笔待解析的交易"""
+        if self.mode == "redis":
+            await self._push_to_redis(tx_parser)
+            return
+
+        if not self.overflow:
+            await self.queue.put(tx_parser)
+            return
+
+        try:
+            self.queue.put_nowait(tx_parser)
+        except asyncio.QueueFull:
+            logger.warning(f"Tx detail queue is full, overflow to redis: {tx_parser.get_tx_hash()}")
+            await self._push_to_redis(tx_parser)
+            self._has_overflow = True
+
+    async def _pop_from_redis(self, timeout: int) -> TransactionParserInterface | None:
+        async with self.lock:
+            result = await self.redis.brpop(self.channel, timeout=timeout)
+        if result is None:  # timeout occurred
+            return None
+        _, tx_detail = result
+        return RawTXParser.from_json(tx_detail)
+
+    async def get(self, timeout: int = 1) -> TransactionParserInterface | None:
+        """取出一笔待解析的交易，超时返回 None"""
+        if self.mode == "redis":
+            return await self._pop_from_redis(timeout)
+
+        try:
+            return self.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+
+        # 本地队列已空，先消费溢出到 redis 的交易
+        if self._has_overflow:
+            tx_detail = await self.redis.rpop(self.channel)
+            if tx_detail is not None:
+                return RawTXParser.from_json(tx_detail)
+            self._has_overflow = False
+
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
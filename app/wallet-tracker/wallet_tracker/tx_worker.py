@@ -7,7 +7,7 @@ from solbot_common.cp.tx_event import TxEventProducer
 from solbot_common.log import logger
 
 from wallet_tracker import benchmark
-from wallet_tracker.constants import FAILED_TX_DETAIL_CHANNEL, NEW_TX_DETAIL_CHANNEL
+from wallet_tracker.constants import FAILED_TX_DETAIL_CHANNEL
 from wallet_tracker.exceptions import (
     NotSwapTransaction,
     TransactionError,
@@ -15,23 +15,25 @@ from wallet_tracker.exceptions import (
     ZeroChangeAmountError,
 )
 from wallet_tracker.parser import RawTXParser
+from wallet_tracker.parser.protocol import TransactionParserInterface
+from wallet_tracker.tx_queue import TxDetailQueue
 
 
 class TransactionWorker:
     """
     交易处理工作类
 
-    从 Redis 中获取交易签名，并根据签名查询交易详情，需要识别出交易类型
+    从交易详情队列中获取交易，解析后将 TxEvent 发送到 Redis Stream，需要识别出交易类型
     - 建仓
     - 加仓
     - 减仓
     - 清仓
     """
 
-    def __init__(self, redis: aioredis.Redis):
+    def __init__(self, redis: aioredis.Redis, tx_queue: TxDetailQueue | None = None):
         self.redis: aioredis.Redis = redis
         self.is_running = False
-        self.lock = asyncio.Lock()
+        self.tx_queue = tx_queue or TxDetailQueue(redis)
         self.tx_event_producer = TxEventProducer(redis)
 
     async def push_parse_failed_to_redis(self, tx_event: str):
@@ -41,11 +43,17 @@ class TransactionWorker:
 
     async def process_transaction(self, tx_detail: dict):
         """处理单个交易"""
-        tx_parser = RawTXParser(tx_detail)
+        await self.process_parser(RawTXParser(tx_detail))
+
+    async def process_parser(self, tx_parser: TransactionParserInterface):
+        """使用指定的解析器处理单个交易"""
         tx_hash = tx_parser.get_tx_hash()
 
-        # 使用 orjson 的 dumps，它返回 bytes，需要解码为 str
-        tx_detail_text = json.dumps(tx_detail).decode("utf-8")
+        def tx_detail_text() -> str:
+            # 仅在出错时才序列化交易详情
+            # 使用 orjson 的 dumps，它返回 bytes，需要解码为 str
+            return json.dumps(tx_parser.tx_detail).decode("utf-8")
+
         try:
             block_time = tx_parser.get_block_time()
             await benchmark.record_block_time(tx_hash, block_time)
@@ -55,9 +63,10 @@ class TransactionWorker:
 
             # FIXME: 解析失败，该如何处理, 后续需要对失败队列加入监控并发出警报
             if tx_event is None:
-                logger.error(f"Parse tx failed, details: {tx_detail_text}")
+                text = tx_detail_text()
+                logger.error(f"Parse tx failed, details: {text}")
                 # 加入到失败队列
-                await self.push_parse_failed_to_redis(tx_detail_text)
+                await self.push_parse_failed_to_redis(text)
                 return
             await self.tx_event_producer.produce(tx_event)
             logger.success(f"New tx event: {tx_hash}")
@@ -73,10 +82,11 @@ class TransactionWorker:
             logger.info(f"Tx amount is zero, details: {tx_hash}")
             return
         except Exception as e:
-            logger.error(f"Failed to process transaction: {e}, details: {tx_detail_text}")
+            text = tx_detail_text()
+            logger.error(f"Failed to process transaction: {e}, details: {text}")
             logger.exception(e)
             # 加入到失败队列
-            await self.push_parse_failed_to_redis(tx_detail_text)
+            await self.push_parse_failed_to_redis(text)
         # finally:
         #     await benchmark.show_timeline(tx_hash)
 
@@ -84,14 +94,10 @@ class TransactionWorker:
         """单个 worker 协程"""
         while self.is_running:
             try:
-                assert self.redis is not None
-                async with self.lock:
-                    result = await self.redis.brpop(NEW_TX_DETAIL_CHANNEL, timeout=1)
-                    if result is None:  # timeout occurred
-                        continue
-                _, tx_detail = result
-                json_data = json.loads(tx_detail)
-                await self.process_transaction(json_data)
+                tx_parser = await self.tx_queue.get(timeout=1)
+                if tx_parser is None:  # timeout occurred
+                    continue
+                await self.process_parser(tx_parser)
             except RedisError as e:
                 logger.error(f"Failed to push transaction to Redis: {e}")
                 continue
@@ -1,5 +1,5 @@
 import asyncio
-from collections.abc import Sequence
+from collections.abc import Iterable, Sequence
 
 import orjson as json
 from aioredis import Redis
@@ -13,10 +13,11 @@ from solders.signature import Signature  # type: ignore
 from wallet_tracker import benchmark
 from wallet_tracker.constants import (
     FAILED_TX_SIGNATURE_CHANNEL,
-    NEW_TX_DETAIL_CHANNEL,
     NEW_TX_SIGNATURE_CHANNEL,
 )
 from wallet_tracker.exceptions import NotSwapTransaction, TransactionError
+from wallet_tracker.parser import RawTXParser
+from wallet_tracker.tx_queue import TxDetailQueue
 from wallet_tracker.wss.tx_detail_fetcher import TxDetailRawFetcher
 
 from .account_log_monitor import AccountLogMonitor
@@ -32,10 +33,12 @@ class TransactionDetailSubscriber:
         rpc_endpoint: str,
         redis_client: Redis,
         wallets: Sequence[Pubkey],
+        tx_queue: TxDetailQueue | None = None,
     ):
         self.wallets = wallets
         self.rpc_endpoint = rpc_endpoint
         self.redis = redis_client
+        self.tx_queue = tx_queue or TxDetailQueue(redis_client)
         self.rpc_client: Client | None = None
         self.is_running = False
         self.fetchers = [
@@ -98,10 +101,6 @@ class TransactionDetailSubscriber:
             logger.exception(e)
             return None
 
-    async def push_transaction_to_redis(self, tx_detail: str):
-        assert self.redis is not None
-        await self.redis.lpush(NEW_TX_DETAIL_CHANNEL, tx_detail)
-
     async def push_failed_transaction_to_redis(self, tx_detail: str):
         assert self.redis is not None
         await self.redis.lpush(FAILED_TX_SIGNATURE_CHANNEL, tx_detail)
@@ -116,10 +115,8 @@ class TransactionDetailSubscriber:
             await self.push_failed_transaction_to_redis(tx_sig)
             return
 
-        # 使用 orjson 的 dumps，它返回 bytes，需要解码为 str
-        tx_detail_text = json.dumps(tx_detail).decode("utf-8")
         try:
-            await self.push_transaction_to_redis(tx_detail_text)
+            await self.tx_queue.put(RawTXParser(tx_detail))
             logger.success(f"New tx event: {tx_sig}")
         except TransactionError as e:
             logger.info(f"Transaction status is not valid, status: {e}")
@@ -127,6 +124,8 @@ class TransactionDetailSubscriber:
             logger.info(f"Tx is not swap transaction, details: {tx_sig}")
             return
         except Exception as e:
+            # 使用 orjson 的 dumps，它返回 bytes，需要解码为 str
+            tx_detail_text = json.dumps(tx_detail).decode("utf-8")
             logger.error(f"Failed to process transaction: {e}, details: {tx_detail_text}")
             logger.exception(e)
             # 加入到失败队列
@@ -198,3 +197,21 @@ class TransactionDetailSubscriber:
             wallet (Pubkey): 要取消订阅的钱包地址
         """
         await self.account_log_monitor.waitting_unsubscribe_wallet.put(wallet)
+
+    async def subscribe_many(self, wallets: Iterable[Pubkey]) -> None:
+        """批量订阅钱包的交易信息
+
+        Args:
+            wallets (Iterable[Pubkey]): 要订阅的钱包地址
+        """
+        for wallet in wallets:
+            await self.subscribe_wallet_transactions(wallet)
+
+    async def unsubscribe_many(self, wallets: Iterable[Pubkey]) -> None:
+        """批量取消订阅钱包的交易信息
+
+        Args:
+            wallets (Iterable[Pubkey]): 要取消订阅的钱包地址
+        """
+        for wallet in wallets:
+            await self.unsubscribe_wallet_transactions(wallet)
@@ -3,11 +3,13 @@ from .blockhash import get_latest_blockhash
 from .cached import cached
 from .min_balance_rent import get_min_balance_rent
 from .mint_account import MintAccountCache
+from .reserve import ReserveStore
 from .token_info import TokenInfoCache
 
 __all__ = [
     "AccountAmountCache",
     "MintAccountCache",
+    "ReserveStore",
     "TokenInfoCache",
     "cached",
     "get_latest_blockhash",
@@ -3,6 +3,7 @@ import base64
 import orjson as json
 from solana.rpc.async_api import AsyncClient
 from solbot_common.layouts.global_account import GlobalAccount
+from solbot_common.utils.pda import find_program_address
 from solbot_db.redis import RedisClient
 from solders.pubkey import Pubkey  # type: ignore
 
@@ -14,7 +15,7 @@ class GlobalAccountCache:
         self.prefix = "global_account"
 
     async def _get(self, program: Pubkey) -> bytes | None:
-        global_account_pda = Pubkey.find_program_address([b"global"], program)[0]
+        global_account_pda = find_program_address([b"global"], program)[0]
         token_account = await self.client.get_account_info_json_parsed(global_account_pda)
         if token_account is None:
             return None
@@ -1,5 +1,53 @@
+"""钱包代币余额缓存
+
+为自己的钱包在内存中维护所有 SPL Token 账户的余额：
+1. 开始跟踪钱包时，通过 websocket programSubscribe（Token Program，按 owner 过滤）订阅余额变化
+2. 订阅确认后通过 getTokenAccountsByOwner 获取一次全部 token 账户作为快照，
+   先订阅再获取快照，两者之间的变化不会丢失，早于当前记录的数据将被忽略
+3. 每隔 resync_interval 秒重新获取快照，修正关闭账户等订阅收不到的变化
+
+只有订阅在当前连接上生效并已获取到快照的钱包才会被读取到，其余情况返回 None，
+由调用方回退到 RPC。跟踪中的钱包查询余额时不需要任何网络请求。
+"""
+
+import asyncio
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import MemcmpOpts, TokenAccountOpts
+from solana.rpc.websocket_api import connect
+from solbot_common.config import settings
+from solbot_common.constants import TOKEN_PROGRAM_ID
+from solbot_common.log import logger
 from solbot_common.utils.utils import get_async_client
 from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import ProgramNotification, SubscriptionResult  # type: ignore
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+
+# SPL Token 账户的大小
+TOKEN_ACCOUNT_SIZE = 165
+# SPL Token 账户中 owner 与 amount 字段的偏移量
+TOKEN_ACCOUNT_OWNER_OFFSET = 32
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64
+
+
+@dataclass
+class TokenAccountState:
+    owner: Pubkey
+    mint: Pubkey
+    amount: int
+    slot: int
+
+
+def parse_token_account(data: bytes) -> tuple[Pubkey, Pubkey, int]:
+    """解析 SPL Token 账户，返回 (mint, owner, amount)"""
+    mint = Pubkey.from_bytes(data[:TOKEN_ACCOUNT_OWNER_OFFSET])
+    owner = Pubkey.from_bytes(data[TOKEN_ACCOUNT_OWNER_OFFSET:TOKEN_ACCOUNT_AMOUNT_OFFSET])
+    amount = int.from_bytes(
+        data[TOKEN_ACCOUNT_AMOUNT_OFFSET : TOKEN_ACCOUNT_AMOUNT_OFFSET + 8], "little"
+    )
+    return mint, owner, amount
 
 
 class AccountAmountCache:
@@ -11,13 +59,246 @@ class AccountAmountCache:
         return cls._instance
 
     def __init__(self) -> None:
+        # 单例，避免重复初始化时清空已跟踪的余额
+        if hasattr(self, "_accounts"):
+            return
         self._client = get_async_client()
+        self.websocket_url = settings.rpc.rpc_url.replace("https://", "wss://")
+        self.resync_interval = 60
+        # token 账户 -> 余额
+        self._accounts: dict[Pubkey, TokenAccountState] = {}
+        # 钱包 -> mint -> 该 mint 的 token 账户
+        self._holdings: dict[Pubkey, dict[Pubkey, set[Pubkey]]] = {}
+        self._pending_subscriptions: asyncio.Queue[Pubkey] = asyncio.Queue()
+        self._pending_snapshots: asyncio.Queue[Pubkey] = asyncio.Queue()
+        # 当前连接上已发送的订阅请求：请求 ID -> 钱包
+        self._requests: dict[int, Pubkey] = {}
+        # 当前连接上订阅已确认的钱包
+        self._subscribed: set[Pubkey] = set()
+        # 订阅已确认且已获取到快照的钱包，只有这些钱包的余额可以被读取
+        self._live: set[Pubkey] = set()
+        self.is_running = False
+
+    def is_watching(self, owner: Pubkey | str) -> bool:
+        """钱包的余额是否可以从内存中读取"""
+        if isinstance(owner, str):
+            owner = Pubkey.from_string(owner)
+        return owner in self._live
+
+    def apply(self, pubkey: Pubkey, data: bytes, slot: int) -> None:
+        """根据 token 账户数据更新余额，早于当前记录的数据将被忽略"""
+        if len(data) < TOKEN_ACCOUNT_AMOUNT_OFFSET + 8:
+            self._remove(pubkey)
+            return
+        mint, owner, amount = parse_token_account(data)
+        state = self._accounts.get(pubkey)
+        if state is not None and state.slot > slot:
+            return
+        if state is not None and state.owner != owner:
+            # token 账户的 owner 被转移
+            self._remove(pubkey)
+        if owner not in self._holdings:
+            return
+        self._accounts[pubkey] = TokenAccountState(owner=owner, mint=mint, amount=amount, slot=slot)
+        self._holdings[owner].setdefault(mint, set()).add(pubkey)
+
+    def _remove(self, pubkey: Pubkey) -> None:
+        state = self._accounts.pop(pubkey, None)
+        if state is None:
+            return
+        accounts = self._holdings.get(state.owner, {}).get(state.mint)
+        if accounts is None:
+            return
+        accounts.discard(pubkey)
+        if not accounts:
+            del self._holdings[state.owner][state.mint]
+
+    async def snapshot(self, owner: Pubkey) -> None:
+        """获取钱包当前所有 token 账户的余额"""
+        resp = await self._client.get_token_accounts_by_owner(
+            owner, TokenAccountOpts(program_id=TOKEN_PROGRAM_ID), commitment=Confirmed
+        )
+        slot = resp.context.slot
+        self._holdings.setdefault(owner, {})
+        existing = {pubkey for accounts in self._holdings[owner].values() for pubkey in accounts}
+        current = set()
+        for account in resp.value:
+            current.add(account.pubkey)
+            self.apply(account.pubkey, bytes(account.account.data), slot)
+        # 快照中不存在的账户已被关闭
+        for pubkey in existing - current:
+            state = self._accounts.get(pubkey)
+            if state is not None and state.slot <= slot:
+                self._remove(pubkey)
+
+    async def _snapshot_many(self, owners: Iterable[Pubkey]) -> None:
+        """并发获取订阅已确认的钱包的快照，成功后钱包的余额可以被读取"""
+        owners = [owner for owner in owners if owner in self._subscribed]
+        results = await asyncio.gather(
+            *(self.snapshot(owner) for owner in owners), return_exceptions=True
+        )
+        for owner, result in zip(owners, results, strict=True):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to snapshot token balances of {owner}: {result}")
+            elif owner in self._subscribed:
+                self._live.add(owner)
+
+    async def watch(self, owners: Iterable[Pubkey | str]) -> None:
+        """开始跟踪钱包的代币余额，订阅确认并获取到快照后才能读取到余额"""
+        for owner in owners:
+            if isinstance(owner, str):
+                owner = Pubkey.from_string(owner)
+            if owner in self._holdings:
+                continue
+            self._holdings[owner] = {}
+            self._pending_subscriptions.put_nowait(owner)
+            logger.info(f"Watching token balances of {owner}")
+
+    def unwatch(self, owner: Pubkey | str) -> None:
+        """停止跟踪钱包，已建立的订阅在重新连接后失效"""
+        if isinstance(owner, str):
+            owner = Pubkey.from_string(owner)
+        self._subscribed.discard(owner)
+        self._live.discard(owner)
+        for accounts in self._holdings.pop(owner, {}).values():
+            for pubkey in accounts:
+                self._accounts.pop(pubkey, None)
+
+    def get_balance(self, owner: Pubkey | str, mint: Pubkey | str) -> int | None:
+        """获取钱包持有的代币数量，钱包未被跟踪或尚未获取到快照时返回 None"""
+        if isinstance(owner, str):
+            owner = Pubkey.from_string(owner)
+        if isinstance(mint, str):
+            mint = Pubkey.from_string(mint)
+        holdings = self._holdings.get(owner)
+        if holdings is None or owner not in self._live:
+            return None
+        return sum(self._accounts[pubkey].amount for pubkey in holdings.get(mint, ()))
+
+    def get_balances(self, owner: Pubkey | str) -> dict[Pubkey, int] | None:
+        """获取钱包持有的所有代币数量，钱包未被跟踪或尚未获取到快照时返回 None"""
+        if isinstance(owner, str):
+            owner = Pubkey.from_string(owner)
+        holdings = self._holdings.get(owner)
+        if holdings is None or owner not in self._live:
+            return None
+        return {
+            mint: sum(self._accounts[pubkey].amount for pubkey in accounts)
+            for mint, accounts in holdings.items()
+        }
 
     async def get_amount(self, pubkey: Pubkey) -> int:
+        state = self._accounts.get(pubkey)
+        if state is not None:
+            return state.amount
+
         in_account = await self._client.get_account_info_json_parsed(pubkey)
         if in_account.value is None:
             raise Exception("in_account not found")
-        # TODO: 目前没有实现缓存
-        #  缓存思路，需要监听自己钱包的所有 token 的余额变化
         amount = in_account.value.data.parsed["info"]["tokenAmount"]["amount"]  # type: ignore
         return int(amount)  # type: ignore
+
+    async def _subscribe(self, websocket, owner: Pubkey) -> None:
+        await websocket.program_subscribe(
+            TOKEN_PROGRAM_ID,
+            commitment=Confirmed,
+            encoding="base64",
+            filters=[
+                TOKEN_ACCOUNT_SIZE,
+                MemcmpOpts(offset=TOKEN_ACCOUNT_OWNER_OFFSET, bytes=str(owner)),
+            ],
+        )
+        # 刚发送的请求，订阅确认时据此找到对应的钱包
+        self._requests[next(reversed(websocket.sent_subscriptions))] = owner
+
+    async def _subscribe_task(self, websocket) -> None:
+        while True:
+            owner = await self._pending_subscriptions.get()
+            if owner in self._holdings and owner not in self._subscribed:
+                await self._subscribe(websocket, owner)
+
+    async def _snapshot_task(self) -> None:
+        """订阅确认后批量获取钱包的快照"""
+        while True:
+            owners = [await self._pending_snapshots.get()]
+            while not self._pending_snapshots.empty():
+                owners.append(self._pending_snapshots.get_nowait())
+            await self._snapshot_many(owners)
+
+    def _on_message(self, message) -> None:
+        if isinstance(message, SubscriptionResult):
+            owner = self._requests.pop(message.id, None)
+            if owner is None or owner not in self._holdings:
+                return
+            self._subscribed.add(owner)
+            self._pending_snapshots.put_nowait(owner)
+        elif isinstance(message, ProgramNotification):
+            value = message.result.value
+            self.apply(value.pubkey, bytes(value.account.data), message.result.context.slot)
+
+    def _reset_connection(self) -> None:
+        """连接断开后所有订阅失效，钱包的余额在重新订阅并获取快照前不可读取"""
+        self._requests.clear()
+        self._subscribed.clear()
+        self._live.clear()
+        for queue in (self._pending_subscriptions, self._pending_snapshots):
+            while not queue.empty():
+                queue.get_nowait()
+
+    async def _resync_task(self, wallets: Callable[[], Iterable[str]] | None) -> None:
+        while self.is_running:
+            await asyncio.sleep(self.resync_interval)
+            try:
+                if wallets is not None:
+                    await self.watch(wallets())
+                await self._snapshot_many(list(self._subscribed))
+            except Exception as e:
+                logger.error(f"Failed to resync token balances: {e}")
+
+    async def _stream(self) -> None:
+        async with connect(self.websocket_url, ping_interval=20, ping_timeout=30) as websocket:
+            logger.info(f"Token balance stream connected to {self.websocket_url}")
+            # 重新连接后需要重新订阅所有钱包，订阅确认后重新获取快照以补上断开期间的变化
+            self._reset_connection()
+            for owner in list(self._holdings):
+                self._pending_subscriptions.put_nowait(owner)
+            tasks = [
+                asyncio.create_task(self._subscribe_task(websocket)),
+                asyncio.create_task(self._snapshot_task()),
+            ]
+            try:
+                while self.is_running:
+                    for message in await websocket.recv():
+                        self._on_message(message)
+            finally:
+                self._reset_connection()
+                for task in tasks:
+                    task.cancel()
+
+    async def start(self, wallets: Callable[[], Iterable[str]] | None = None) -> None:
+        """持续跟踪钱包的代币余额
+
+        Args:
+            wallets: 返回需要跟踪的钱包地址，定期调用以跟踪新增的钱包。
+                也可以通过 watch 主动添加钱包
+        """
+        self.is_running = True
+        if wallets is not None:
+            await self.watch(wallets())
+        resync_task = asyncio.create_task(self._resync_task(wallets))
+        try:
+            while self.is_running:
+                try:
+                    await self._stream()
+                except (ConnectionClosedError, ConnectionClosedOK) as e:
+                    logger.warning(f"Token balance stream closed: {e}, reconnecting...")
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    logger.error(f"Token balance stream error: {e}, reconnecting...")
+                    await asyncio.sleep(1)
+        finally:
+            resync_task.cancel()
+
+    def stop(self) -> None:
+        self.is_running = False
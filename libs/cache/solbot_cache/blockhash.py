@@ -1,18 +1,119 @@
+import asyncio
+import time
+
 import orjson as json
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed
+from solbot_common.log import logger
 from solbot_common.utils.utils import get_async_client
 from solbot_db.redis import RedisClient
 from solders.hash import Hash  # type: ignore
 
 from solbot_cache.constants import BLOCKHASH_CACHE_KEY
 
+# blockhash 在生成后的 150 个区块内有效
+MAX_PROCESSING_AGE = 150
+# 出块间隔（秒）
+SLOT_DURATION = 0.4
+
 
 async def get_latest_blockhash_from_rpc() -> tuple[Hash, int]:
     resp = await get_async_client().get_latest_blockhash()
     return resp.value.blockhash, resp.value.last_valid_block_height
 
 
+class BlockhashTicker:
+    """进程内的 blockhash 提供者
+
+    后台每隔 poll_interval 秒通过 getLatestBlockhash 获取最新的 blockhash，
+    构建交易时直接从内存中读取，不再经过 Redis。
+
+    最新 blockhash 的 last_valid_block_height 减去 150 即为获取时的区块高度，
+    之后按出块间隔估算当前的区块高度，据此判断内存中的 blockhash 还剩多少个区块过期。
+    """
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(
+        self,
+        client: AsyncClient | None = None,
+        poll_interval: float = 0.4,
+        min_remaining_blocks: int = 120,
+    ) -> None:
+        """
+        Args:
+            client: RPC 客户端
+            poll_interval: 获取 blockhash 的间隔（秒）
+            min_remaining_blocks: 距离过期的区块数量少于该值时（如 RPC 持续失败），
+                认为内存中的 blockhash 不再新鲜，回退到 Redis 缓存
+        """
+        if hasattr(self, "_blockhash"):
+            return
+        self.client = client or get_async_client()
+        self.poll_interval = poll_interval
+        self.min_remaining_blocks = min_remaining_blocks
+        self._blockhash: Hash | None = None
+        self._last_valid_block_height = 0
+        self._updated_at = 0.0
+        self.is_running = False
+
+    @property
+    def block_height(self) -> int:
+        """估算的当前区块高度"""
+        elapsed = time.monotonic() - self._updated_at
+        return self._last_valid_block_height - MAX_PROCESSING_AGE + int(elapsed / SLOT_DURATION)
+
+    def remaining_blocks(self) -> int:
+        """内存中的 blockhash 距离过期还剩的区块数量"""
+        return self._last_valid_block_height - self.block_height
+
+    def is_fresh(self) -> bool:
+        return self._blockhash is not None and self.remaining_blocks() >= self.min_remaining_blocks
+
+    def get(self) -> tuple[Hash, int] | None:
+        """获取内存中的 blockhash 与 last valid block height，没有新鲜的 blockhash 时返回 None"""
+        if not self.is_fresh():
+            return None
+        return self._blockhash, self._last_valid_block_height  # type: ignore
+
+    async def update(self) -> None:
+        resp = await self.client.get_latest_blockhash(Confirmed)
+        last_valid_block_height = resp.value.last_valid_block_height
+        # 乱序的响应不能用更旧的 blockhash 覆盖
+        if last_valid_block_height >= self._last_valid_block_height:
+            self._blockhash = resp.value.blockhash
+            self._last_valid_block_height = last_valid_block_height
+            self._updated_at = time.monotonic()
+
+    async def start(self) -> None:
+        self.is_running = True
+        logger.info("Blockhash ticker started")
+        while self.is_running:
+            try:
+                await self.update()
+            except Exception as e:
+                logger.error(f"Failed to update blockhash: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def stop(self) -> None:
+        self.is_running = False
+
+
 async def get_latest_blockhash() -> tuple[Hash, int]:
-    """Get current blockhash and last valid block height from cache"""
+    """Get current blockhash and last valid block height from cache
+
+    BlockhashTicker 运行中时从内存中读取，否则读取 Redis 缓存
+    """
+    if BlockhashTicker._instance is not None:
+        latest = BlockhashTicker().get()
+        if latest is not None:
+            return latest
+
     redis = RedisClient.get_instance()
     raw_cached_value = await redis.get(BLOCKHASH_CACHE_KEY)
     if raw_cached_value is None:
@@ -1,9 +1,16 @@
+import asyncio
+import functools
 from typing import Literal
 
+import orjson as json
 from aiocache import Cache, caches
 from aiocache import cached as _cached
 from aiocache.base import SENTINEL
+from aiocache.serializers import BaseSerializer
 from solbot_common.config import settings
+from solbot_common.log import logger
+
+from solbot_cache.local import LRUCache
 
 endpoint = settings.db.redis.host
 port = settings.db.redis.port
@@ -33,6 +40,31 @@ caches.set_config(
 )
 
 
+class OrjsonSerializer(BaseSerializer):
+    """使用 orjson 序列化，只适用于可以 JSON 序列化的返回值（如 bool、dict、list）"""
+
+    DEFAULT_ENCODING = None
+
+    def dumps(self, value):
+        return json.dumps(value)
+
+    def loads(self, value):
+        if value is None:
+            return None
+        return json.loads(value)
+
+
+SERIALIZERS = {
+    "pickle": "aiocache.serializers.PickleSerializer",
+    "orjson": "solbot_cache.cached.OrjsonSerializer",
+    # 需要安装 msgpack
+    "msgpack": "aiocache.serializers.MsgPackSerializer",
+}
+
+# 负缓存（结果为 None）在 Redis 中的占位值
+NEGATIVE_CACHE_VALUE = "__solbot_cache_none__"
+
+
 def key_builder(f, *args, **kwargs):
     # 获取 f 所在的模块名
     module_name = f.__module__
@@ -63,6 +95,14 @@ def key_builder(f, *args, **kwargs):
 
 
 class cached(_cached):
+    """在 aiocache.cached 的基础上增加：
+
+    - local: 在 Redis 之前增加一层进程内的 LRU 缓存，命中时不需要网络请求与反序列化
+    - single_flight: 同一进程内同一个 key 同时只有一个加载在执行，并发的调用共享其结果
+    - negative_ttl: 缓存结果为 None 的调用（负缓存），避免不存在的数据反复穿透到上游
+    - serializer: 可以通过名称选择 Redis 中的序列化方式，"pickle"（默认）、"orjson" 或 "msgpack"
+    """
+
     def __init__(
         self,
         ttl=SENTINEL,
@@ -71,12 +111,22 @@ class cached(_cached):
         key_builder=key_builder,
         skip_cache_func=lambda x: False,
         cache=Cache.REDIS,
-        serializer=None,
+        serializer: Literal["pickle", "orjson", "msgpack"] | None = None,
         plugins=None,
         alias: Literal["default", "temp"] = "default",
         noself=False,
+        local: bool = False,
+        local_maxsize: int = 1024,
+        local_ttl: float | None = None,
+        single_flight: bool = True,
+        negative_ttl: int | None = None,
         **kwargs,
     ):
+        """
+        Args:
+            local_ttl: 进程内缓存的过期时间（秒），默认与 ttl 相同
+            negative_ttl: 负缓存的过期时间（秒），None 表示不缓存结果为 None 的调用
+        """
         self.ttl = ttl
         self.key = key
         self.key_builder = key_builder
@@ -90,3 +140,99 @@ class cached(_cached):
         self._namespace = namespace
         self._plugins = plugins
         self._kwargs = kwargs
+
+        if local_ttl is None and isinstance(ttl, int | float):
+            local_ttl = ttl
+        self.local = LRUCache(maxsize=local_maxsize, ttl=local_ttl) if local else None
+        self.single_flight = single_flight
+        self.negative_ttl = negative_ttl
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+
+    def __call__(self, f):
+        if not self.alias or self._serializer is None:
+            return super().__call__(f)
+
+        # 使用 alias 的配置，但替换其中的序列化方式
+        self.cache = caches.create(self.alias, serializer={"class": SERIALIZERS[self._serializer]})
+
+        @functools.wraps(f)
+        async def wrapper(*args, **kwargs):
+            return await self.decorator(f, *args, **kwargs)
+
+        wrapper.cache = self.cache
+        return wrapper
+
+    def get_cache_key(self, f, args, kwargs):
+        if self.noself and not self.key:
+            args = args[1:]
+        return super().get_cache_key(f, args, kwargs)
+
+    async def decorator(
+        self, f, *args, cache_read=True, cache_write=True, aiocache_wait_for_write=True, **kwargs
+    ):
+        key = self.get_cache_key(f, args, kwargs)
+
+        if cache_read and self.local is not None:
+            item = self.local.get(key)
+            if item is not None:
+                return item[0]
+
+        if not self.single_flight:
+            return await self._load(
+                f, key, args, kwargs, cache_read, cache_write, aiocache_wait_for_write
+            )
+
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(
+                self._load(f, key, args, kwargs, cache_read, cache_write, aiocache_wait_for_write)
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda fut: self._inflight.pop(key, None))
+        # 其中一个调用方被取消时不影响其他等待同一结果的调用方
+        return await asyncio.shield(future)
+
+    async def _load(self, f, key, args, kwargs, cache_read, cache_write, aiocache_wait_for_write):
+        if cache_read:
+            value = await self.get_from_cache(key)
+            if value is not None:
+                if value == NEGATIVE_CACHE_VALUE:
+                    value = None
+                self._set_local(key, value)
+                return value
+
+        result = await f(*args, **kwargs)
+
+        if result is None and self.negative_ttl is not None:
+            if cache_write:
+                self._set_local(key, None)
+                await self._set_negative(key)
+            return result
+
+        if self.skip_cache_func(result):
+            return result
+
+        if cache_write:
+            self._set_local(key, result)
+            if aiocache_wait_for_write:
+                await self.set_in_cache(key, result)
+            else:
+                task = asyncio.create_task(self.set_in_cache(key, result))
+                self._background_tasks.add(task)
+                task.add_done_callback(self._background_tasks.discard)
+
+        return result
+
+    def _set_local(self, key: str, value) -> None:
+        if self.local is None or (value is None and self.negative_ttl is None):
+            return
+        # 值可能为 None（负缓存），因此包装为元组存储
+        ttl = self.negative_ttl if value is None else None
+        self.local.set(key, (value,), ttl=ttl)
+
+    async def _set_negative(self, key: str) -> None:
+        try:
+            await self.cache.set(key, NEGATIVE_CACHE_VALUE, ttl=self.negative_ttl)
+        except Exception:
+            logger.exception(f"Couldn't set negative cache {key}")
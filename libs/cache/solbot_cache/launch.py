@@ -21,7 +21,7 @@ class LaunchCache:
     def __repr__(self) -> str:
         return "LaunchCache()"
 
-    @cached(ttl=None, noself=True, skip_cache_func=lambda result: not result)
+    @cached(ttl=None, noself=True, local=True, skip_cache_func=lambda result: not result)
     async def is_pump_token_graduated(self, mint: str | Pubkey) -> bool:
         """Examine if a Pump.fun token has graduated.
 
@@ -0,0 +1,70 @@
+"""进程内缓存
+
+交易路径上频繁读取且几乎不变的数据（如代币精度）放在进程内缓存中，
+命中时只需一次字典访问，未命中时再回退到数据库、Redis 或 RPC。
+"""
+
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """容量有限、带过期时间的 LRU 缓存
+
+    超过容量时淘汰最久未被访问的条目；过期的条目在被访问时才会删除。
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float | None = None) -> None:
+        """
+        Args:
+            maxsize: 最多缓存的条目数量
+            ttl: 条目的过期时间（秒），None 表示永不过期
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        value, expires_at = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """
+        Args:
+            ttl: 该条目的过期时间（秒），默认使用缓存的过期时间
+        """
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        item = self._data.pop(key, None)
+        return item[0] if item is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
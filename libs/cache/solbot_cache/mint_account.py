@@ -1,3 +1,4 @@
+import asyncio
 from asyncio import Queue
 
 from solbot_common.layouts.mint_account import MintAccount
@@ -10,13 +11,25 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from typing_extensions import Self
 
+from solbot_cache.local import LRUCache
+
+# getMultipleAccounts 单次最多查询的账户数量
+MAX_MULTIPLE_ACCOUNTS = 100
+# mint 账户中的精度不会改变，供应量等字段可能变化，因此仍设置过期时间
+MINT_ACCOUNT_CACHE_SIZE = 10000
+MINT_ACCOUNT_CACHE_TTL = 60 * 60
+
 
 class MintAccountBackgoundWriter:
     def __init__(self):
         super().__init__()
         self.queue = Queue()
+        self._task: asyncio.Task | None = None
 
     async def submit(self, mint: Pubkey, bin_: bytes):
+        # 首次提交时启动后台写入任务
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
         await self.queue.put((mint, bin_))
 
     async def run(self):
@@ -41,6 +54,12 @@ class MintAccountBackgoundWriter:
 
 
 class MintAccountCache:
+    """mint 账户缓存
+
+    两级缓存：进程内的 LRU 缓存，以及数据库中的 mint 账户数据。
+    两级缓存均未命中的 mint 通过 getMultipleAccounts 批量从链上获取，并在后台写入数据库。
+    """
+
     _instance = None
 
     def __new__(cls) -> Self:
@@ -49,37 +68,78 @@ class MintAccountCache:
         return cls._instance
 
     def __init__(self) -> None:
+        # 单例，避免重复初始化时清空进程内缓存
+        if hasattr(self, "_local"):
+            return
         self.client = get_async_client()
         self._writer = MintAccountBackgoundWriter()
-
-    @provide_session
-    async def get_mint_account(
-        self, mint: Pubkey | str, *, session: AsyncSession = NEW_ASYNC_SESSION
-    ) -> MintAccount | None:
-        if isinstance(mint, str):
-            mint = Pubkey.from_string(mint)
-        if not isinstance(mint, Pubkey):
+        self._local: LRUCache[str, MintAccount] = LRUCache(
+            maxsize=MINT_ACCOUNT_CACHE_SIZE, ttl=MINT_ACCOUNT_CACHE_TTL
+        )
+
+    async def get_mint_account(self, mint: Pubkey | str) -> MintAccount | None:
+        if isinstance(mint, Pubkey):
+            mint = mint.__str__()
+        if not isinstance(mint, str):
             raise ValueError("Mint must be a string")
 
-        mint_account = None
-        smtm = select(ModelMintAccount).where(ModelMintAccount.mint == mint.__str__())
-        record = (await session.execute(statement=smtm)).scalar_one_or_none()
-        if record is not None:
-            mint_account = record.to_mint_account()
-
+        mint_account = self._local.get(mint)
         if mint_account is not None:
             return mint_account
+        return (await self.get_mint_accounts([mint]))[0]
 
-        logger.warning(f"Did not find mint account in cache: {mint}, fetching...")
-
-        response = await self.client.get_account_info(mint)
-        account = response.value
-        if account is None:
+    async def get_decimals(self, mint: Pubkey | str) -> int | None:
+        """获取代币精度，mint 账户不存在时返回 None"""
+        mint_account = await self.get_mint_account(mint)
+        if mint_account is None:
             return None
-        mint_account = MintAccount.from_buffer(account.data)
+        return mint_account.decimals
+
+    async def get_mint_accounts(self, mints: list[Pubkey | str]) -> list[MintAccount | None]:
+        """批量获取 mint 账户，mint 账户不存在时对应位置为 None"""
+        keys = [mint.__str__() for mint in mints]
+        result: dict[str, MintAccount] = {}
+        for key in keys:
+            mint_account = self._local.get(key)
+            if mint_account is not None:
+                result[key] = mint_account
+
+        missing = [key for key in dict.fromkeys(keys) if key not in result]
+        if missing:
+            result.update(await self._load_mint_accounts(missing))
+        return [result.get(key) for key in keys]
+
+    async def _load_mint_accounts(self, mints: list[str]) -> dict[str, MintAccount]:
+        result = await self._load_from_db(mints)
+        missing = [mint for mint in mints if mint not in result]
+        if missing:
+            logger.warning(f"Did not find mint accounts in cache: {missing}, fetching...")
+            result.update(await self._load_from_chain(missing))
+
+        for mint, mint_account in result.items():
+            self._local.set(mint, mint_account)
+        return result
 
-        await self._writer.submit(mint, account.data)
-        return mint_account
+    @provide_session
+    async def _load_from_db(
+        self, mints: list[str], *, session: AsyncSession = NEW_ASYNC_SESSION
+    ) -> dict[str, MintAccount]:
+        smtm = select(ModelMintAccount).where(ModelMintAccount.mint.in_(mints))  # type: ignore
+        records = (await session.execute(statement=smtm)).scalars().all()
+        return {record.mint: record.to_mint_account() for record in records}
+
+    async def _load_from_chain(self, mints: list[str]) -> dict[str, MintAccount]:
+        result: dict[str, MintAccount] = {}
+        pubkeys = [Pubkey.from_string(mint) for mint in mints]
+        for i in range(0, len(pubkeys), MAX_MULTIPLE_ACCOUNTS):
+            chunk = pubkeys[i : i + MAX_MULTIPLE_ACCOUNTS]
+            response = await self.client.get_multiple_accounts(chunk)
+            for pubkey, account in zip(chunk, response.value, strict=True):
+                if account is None:
+                    continue
+                result[pubkey.__str__()] = MintAccount.from_buffer(account.data)
+                await self._writer.submit(pubkey, account.data)
+        return result
 
     def __del__(self):
         self._writer.stop()
@@ -0,0 +1,388 @@
+"""Mint -> 池子索引
+
+启动时加载 Raydium AMM v4 / CPMM / CLMM 程序下所有与 SOL 配对的池子账户，只保留构建交易所需的字段，
+以定长记录写入一个二进制文件；各个服务通过 mmap 只读映射该文件，共享同一份页缓存，
+并在进程内按 (mint, 池子类型) 建立哈希索引，查询池子只需一次字典访问与一次内存读取。
+
+文件格式：
+
+    header: magic (8 bytes) | record size (u32) | padding (4 bytes)
+    record: pool_id (32) | mint (32) | kind (u8) | decimals_0 (u8) | decimals_1 (u8)
+            | padding (5) | accounts (13 * 32)
+
+- mint 为池子中与 SOL 配对的代币
+- accounts 按池子类型存放构建交易所需的账户，见 AMM_V4_ACCOUNTS / CPMM_ACCOUNTS / CLMM_ACCOUNTS
+- 新池子以追加的方式写入，同一个 (mint, 池子类型) 以最后写入的记录为准
+- 索引不区分池子的流动性与可用性，只作为按使用次数排序的优先级队列未命中时的回退
+- 快照写入临时文件后原子替换，读取方发现文件被替换或变大后重新映射
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from enum import IntEnum
+
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Processed
+from solana.rpc.types import MemcmpOpts
+from solbot_common.config import settings
+from solbot_common.constants import RAYDIUM_AMM_V4, RAYDIUM_CLMM, RAYDIUM_CPMM, WSOL
+from solbot_common.layouts.amm_v4 import AMM_V4_SERUM_MARKET_OFFSET, LIQUIDITY_STATE_LAYOUT_V4
+from solbot_common.layouts.clmm import CLMM_POOL_STATE
+from solbot_common.layouts.cpmm import CPMM_POOL_STATE
+from solbot_common.log import logger
+from solbot_common.types.raydium import AmmV4PoolKeys
+from solders.pubkey import Pubkey  # type: ignore
+
+MAGIC = b"SOLPIDX1"
+MAX_ACCOUNTS = 13
+HEADER = struct.Struct("<8sI4x")
+RECORD = struct.Struct("<32s32sBBB5x" + "32s" * MAX_ACCOUNTS)
+# 记录中 mint 与 kind 相邻，直接作为索引的键
+KEY_OFFSET = 32
+KEY_SIZE = 33
+MAX_MULTIPLE_ACCOUNTS = 100
+
+AMM_V4_ACCOUNTS = (
+    "base_mint",
+    "quote_mint",
+    "open_orders",
+    "target_orders",
+    "base_vault",
+    "quote_vault",
+    "market_id",
+    "market_authority",
+    "market_base_vault",
+    "market_quote_vault",
+    "bids",
+    "asks",
+    "event_queue",
+)
+CPMM_ACCOUNTS = (
+    "amm_config",
+    "token_0_vault",
+    "token_1_vault",
+    "token_0_mint",
+    "token_1_mint",
+    "token_0_program",
+    "token_1_program",
+    "observation_key",
+)
+CLMM_ACCOUNTS = (
+    "amm_config",
+    "token_mint_0",
+    "token_mint_1",
+    "token_vault_0",
+    "token_vault_1",
+    "observation_key",
+)
+
+
+class PoolKind(IntEnum):
+    AMM_V4 = 0
+    CPMM = 1
+    CLMM = 2
+
+
+@dataclass
+class PoolRecord:
+    pool_id: Pubkey
+    mint: Pubkey
+    kind: PoolKind
+    decimals_0: int
+    decimals_1: int
+    accounts: dict[str, Pubkey]
+
+    def to_amm_v4_pool_keys(self) -> AmmV4PoolKeys:
+        if self.kind != PoolKind.AMM_V4:
+            raise ValueError(f"Pool {self.pool_id} is not an AMM v4 pool")
+        return AmmV4PoolKeys.from_accounts(
+            self.pool_id, self.decimals_0, self.decimals_1, self.accounts
+        )
+
+
+def _names_of(kind: PoolKind) -> tuple[str, ...]:
+    if kind == PoolKind.AMM_V4:
+        return AMM_V4_ACCOUNTS
+    if kind == PoolKind.CPMM:
+        return CPMM_ACCOUNTS
+    return CLMM_ACCOUNTS
+
+
+def _paired_mint(mint_0: bytes, mint_1: bytes) -> bytes:
+    return mint_1 if mint_0 == bytes(WSOL) else mint_0
+
+
+def encode_record(
+    pool_id: Pubkey,
+    mint: Pubkey | bytes,
+    kind: PoolKind,
+    decimals_0: int,
+    decimals_1: int,
+    accounts: list[Pubkey | bytes],
+) -> bytes:
+    accounts = [bytes(account) for account in accounts]
+    accounts += [bytes(32)] * (MAX_ACCOUNTS - len(accounts))
+    return RECORD.pack(bytes(pool_id), bytes(mint), kind, decimals_0, decimals_1, *accounts)
+
+
+def decode_record(data: bytes) -> PoolRecord:
+    pool_id, mint, kind, decimals_0, decimals_1, *accounts = RECORD.unpack(data)
+    kind = PoolKind(kind)
+    return PoolRecord(
+        pool_id=Pubkey.from_bytes(pool_id),
+        mint=Pubkey.from_bytes(mint),
+        kind=kind,
+        decimals_0=decimals_0,
+        decimals_1=decimals_1,
+        accounts={
+            name: Pubkey.from_bytes(account)
+            for name, account in zip(_names_of(kind), accounts, strict=False)
+        },
+    )
+
+
+def encode_amm_v4(pool_id: Pubkey, amm_data: bytes, market_data: bytes) -> bytes:
+    pool_keys = AmmV4PoolKeys.from_pool_data(pool_id, amm_data, market_data)
+    mint = _paired_mint(bytes(pool_keys.base_mint), bytes(pool_keys.quote_mint))
+    return encode_record(
+        pool_id,
+        mint,
+        PoolKind.AMM_V4,
+        pool_keys.base_decimals,
+        pool_keys.quote_decimals,
+        [getattr(pool_keys, name) for name in AMM_V4_ACCOUNTS],
+    )
+
+
+def encode_cpmm(pool_id: Pubkey, state) -> bytes:
+    """
+    Args:
+        state: CPMM_POOL_STATE 解析出的池子状态
+    """
+    return encode_record(
+        pool_id,
+        _paired_mint(state.token_0_mint, state.token_1_mint),
+        PoolKind.CPMM,
+        state.mint_0_decimals,
+        state.mint_1_decimals,
+        [getattr(state, name) for name in CPMM_ACCOUNTS],
+    )
+
+
+def encode_clmm(pool_id: Pubkey, state) -> bytes:
+    """
+    Args:
+        state: CLMM_POOL_STATE 解析出的池子状态
+    """
+    return encode_record(
+        pool_id,
+        _paired_mint(state.token_mint_0, state.token_mint_1),
+        PoolKind.CLMM,
+        state.mint_decimals_0,
+        state.mint_decimals_1,
+        [getattr(state, name) for name in CLMM_ACCOUNTS],
+    )
+
+
+class PoolIndex:
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, path: str | None = None, refresh_interval: float = 1) -> None:
+        """
+        Args:
+            path: 索引文件路径，默认为 settings.db.pool_index_path
+            refresh_interval: 查询时检查文件是否更新的最小间隔（秒），命中时也会检查，
+                避免一直返回已被新记录覆盖的池子
+        """
+        if hasattr(self, "_index"):
+            return
+        self.path = path or settings.db.pool_index_path
+        self.refresh_interval = refresh_interval
+        self._index: dict[bytes, int] = {}
+        self._mmap: mmap.mmap | None = None
+        self._inode: int | None = None
+        # 已建立索引的文件大小
+        self._size = 0
+        self._last_refresh = 0.0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._inode = None
+        self._index.clear()
+        self._size = 0
+
+    def refresh(self) -> None:
+        """文件被替换时重新加载，文件变大时为新追加的记录建立索引"""
+        self._last_refresh = time.monotonic()
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._close()
+            return
+        if stat.st_ino != self._inode:
+            self._close()
+        elif stat.st_size == self._size:
+            return
+
+        with open(self.path, "rb") as f:
+            if stat.st_size < HEADER.size:
+                return
+            magic, record_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or record_size != RECORD.size:
+                logger.warning(f"Invalid pool index file: {self.path}")
+                return
+            new_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = new_mmap
+        self._inode = stat.st_ino
+        # 只读取完整的记录，未写完的记录留到下次刷新
+        start = self._size or HEADER.size
+        end = start + (len(new_mmap) - start) // RECORD.size * RECORD.size
+        for offset in range(start, end, RECORD.size):
+            self._index[new_mmap[offset + KEY_OFFSET : offset + KEY_OFFSET + KEY_SIZE]] = offset
+        self._size = end
+
+    def get(self, mint: Pubkey | str, kind: PoolKind = PoolKind.AMM_V4) -> PoolRecord | None:
+        if isinstance(mint, str):
+            mint = Pubkey.from_string(mint)
+        if time.monotonic() - self._last_refresh >= self.refresh_interval:
+            self.refresh()
+        offset = self._index.get(bytes(mint) + bytes([kind]))
+        if offset is None or self._mmap is None:
+            return None
+        return decode_record(self._mmap[offset : offset + RECORD.size])
+
+    def get_amm_v4_pool_keys(self, mint: Pubkey | str) -> AmmV4PoolKeys | None:
+        record = self.get(mint, PoolKind.AMM_V4)
+        if record is None:
+            return None
+        return record.to_amm_v4_pool_keys()
+
+
+class PoolIndexWriter:
+    """索引文件的写入方，同一时间只应有一个进程写入"""
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path or settings.db.pool_index_path
+
+    def write_snapshot(self, records: Iterable[bytes]) -> int:
+        """写入完整的快照，写入临时文件后原子替换"""
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        count = 0
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, RECORD.size))
+            for record in records:
+                f.write(record)
+                count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        return count
+
+    def append(self, records: list[bytes]) -> None:
+        """追加新的记录，文件不存在时先写入文件头"""
+        if not records:
+            return
+        if not os.path.exists(self.path):
+            self.write_snapshot(records)
+            return
+        with open(self.path, "ab") as f:
+            f.write(b"".join(records))
+
+
+async def _get_paired_accounts(
+    client: AsyncClient, program_id: Pubkey, size: int, mint_offsets: tuple[int, int]
+) -> list[tuple[Pubkey, bytes]]:
+    accounts = []
+    for offset in mint_offsets:
+        resp = await client.get_program_accounts(
+            program_id,
+            commitment=Processed,
+            encoding="base64",
+            filters=[size, MemcmpOpts(offset=offset, bytes=str(WSOL))],
+        )
+        accounts.extend((account.pubkey, bytes(account.account.data)) for account in resp.value)
+    return accounts
+
+
+async def _encode_amm_v4_pools(
+    client: AsyncClient, pools: list[tuple[Pubkey, bytes]], concurrency: int
+) -> list[bytes]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _encode_chunk(chunk: list[tuple[Pubkey, bytes]]) -> list[bytes]:
+        market_ids = [
+            Pubkey.from_bytes(
+                amm_data[AMM_V4_SERUM_MARKET_OFFSET : AMM_V4_SERUM_MARKET_OFFSET + 32]
+            )
+            for _, amm_data in chunk
+        ]
+        async with semaphore:
+            resp = await client.get_multiple_accounts(market_ids, commitment=Processed)
+        records = []
+        for (pool_id, amm_data), market in zip(chunk, resp.value, strict=True):
+            if market is None:
+                continue
+            try:
+                records.append(encode_amm_v4(pool_id, amm_data, bytes(market.data)))
+            except ValueError:
+                continue
+        return records
+
+    chunks = await asyncio.gather(
+        *[
+            _encode_chunk(pools[i : i + MAX_MULTIPLE_ACCOUNTS])
+            for i in range(0, len(pools), MAX_MULTIPLE_ACCOUNTS)
+        ]
+    )
+    return [record for chunk in chunks for record in chunk]
+
+
+async def build_snapshot(client: AsyncClient, writer: PoolIndexWriter, concurrency: int = 8) -> int:
+    """从 RPC 加载所有与 SOL 配对的池子，写入索引文件
+
+    AMM v4 池子的 market 账户通过 getMultipleAccounts 批量获取
+
+    Returns:
+        int: 写入的池子数量
+    """
+    amm_v4_pools = await _get_paired_accounts(
+        client, RAYDIUM_AMM_V4, LIQUIDITY_STATE_LAYOUT_V4.sizeof(), (400, 432)
+    )
+    cpmm_pools = await _get_paired_accounts(client, RAYDIUM_CPMM, 637, (168, 200))
+    clmm_pools = await _get_paired_accounts(client, RAYDIUM_CLMM, 1544, (73, 105))
+
+    records = await _encode_amm_v4_pools(client, amm_v4_pools, concurrency)
+    # 同一程序的池子账户大小相同，整批解析
+    for encode, layout, pools in (
+        (encode_cpmm, CPMM_POOL_STATE, cpmm_pools),
+        (encode_clmm, CLMM_POOL_STATE, clmm_pools),
+    ):
+        states = layout.parse_many(data for _, data in pools)
+        for (pool_id, _), state in zip(pools, states, strict=True):
+            records.append(encode(pool_id, state))
+
+    count = writer.write_snapshot(records)
+    logger.info(
+        f"Pool index snapshot written: {count} pools "
+        f"({len(amm_v4_pools)} AMM v4, {len(cpmm_pools)} CPMM, {len(clmm_pools)} CLMM)"
+    )
+    return count
@@ -1,18 +1,25 @@
+import asyncio
 import base64
+from datetime import datetime, timezone
 from typing import TypedDict, cast
 
 import aioredis
 import orjson as json
+from solbot_cache.local import LRUCache
+from solbot_cache.pool_index import PoolIndex
 from solbot_common.constants import WSOL
+from solbot_common.layouts.amm_v4 import AMM_V4_COIN_MINT_OFFSET, AMM_V4_PC_MINT_OFFSET
 from solbot_common.log import logger
 from solbot_common.models import RaydiumPoolModel
-from solbot_common.utils.pool import AmmV4PoolKeys, fetch_pool_data_from_rpc
+from solbot_common.types.raydium import AmmV4PoolKeys
+from solbot_common.utils.pool import fetch_pool_data_from_rpc
 from solbot_common.utils.raydium import RaydiumAPI
 from solbot_common.utils.utils import get_async_client
 from solbot_db.redis import RedisClient
 from solbot_db.session import (NEW_ASYNC_SESSION, provide_session,
                                start_async_session)
 from solders.pubkey import Pubkey  # type: ignore
+from sqlalchemy.dialects.mysql import insert
 from sqlmodel import select
 
 
@@ -22,6 +29,14 @@ class AMMData(TypedDict):
     market_data: bytes
 
 
+def get_amm_v4_mint(amm_data: bytes) -> Pubkey:
+    """从 AMM v4 池子状态中读取与 SOL 配对的代币 Mint"""
+    coin_mint = amm_data[AMM_V4_COIN_MINT_OFFSET : AMM_V4_COIN_MINT_OFFSET + 32]
+    if coin_mint != bytes(WSOL):
+        return Pubkey.from_bytes(coin_mint)
+    return Pubkey.from_bytes(amm_data[AMM_V4_PC_MINT_OFFSET : AMM_V4_PC_MINT_OFFSET + 32])
+
+
 class MintPoolDataCache:
     def __init__(self, redis: aioredis.Redis, max_expiration: int = 60 * 60 * 24 * 7):
         self.redis = redis
@@ -29,18 +44,34 @@ class MintPoolDataCache:
         # 最多缓存 5000 个池子的信息
         self.max_expiration = max_expiration
 
+    @staticmethod
+    def _encode(pool_data: AMMData) -> bytes:
+        return json.dumps(
+            {
+                "pool_id": str(pool_data["pool_id"]),
+                "amm_data": base64.b64encode(pool_data["amm_data"]).decode("utf-8"),
+                "market_data": base64.b64encode(pool_data["market_data"]).decode("utf-8"),
+            }
+        )
+
     async def set(self, pool_id: str, pool_data: AMMData):
-        encoded = {
-            "pool_id": str(pool_data["pool_id"]),
-            "amm_data": base64.b64encode(pool_data["amm_data"]).decode("utf-8"),
-            "market_data": base64.b64encode(pool_data["market_data"]).decode("utf-8"),
-        }
         await self.redis.set(
             f"{self._prefix}:{pool_id}",
-            json.dumps(encoded),
+            self._encode(pool_data),
             ex=self.max_expiration,
         )
 
+    def set_in_pipeline(self, pipe, pool_id: str, pool_data: AMMData):
+        """在 pipeline 中写入池子数据，由调用方统一执行"""
+        pipe.set(f"{self._prefix}:{pool_id}", self._encode(pool_data), ex=self.max_expiration)
+
+    async def exists_many(self, pool_ids: list[str]) -> list[bool]:
+        """通过一个 pipeline 批量检查池子数据是否存在"""
+        pipe = self.redis.pipeline(transaction=False)
+        for pool_id in pool_ids:
+            pipe.exists(f"{self._prefix}:{pool_id}")
+        return [bool(exists) for exists in await pipe.execute()]
+
     async def get(self, pool_id: str) -> AMMData | None:
         text = await self.redis.get(f"{self._prefix}:{pool_id}")
         if text is None:
@@ -55,44 +86,59 @@ class MintPoolDataCache:
         await self.redis.delete(f"{self._prefix}:{pool_id}")
 
 
+# 池子存在时将其优先级+1，并返回更新后的优先级
+_INCR_IF_EXISTS_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return redis.call('ZINCRBY', KEYS[1], 1, ARGV[1])
+end
+return false
+"""
+
+
 class MintPoolPriorityQueue:
     def __init__(
         self,
         redis_client,
         max_length=10,
+        top_pool_ttl: float = 5,
+        flush_interval: float = 1,
     ):
         """为每个 Mint 维护一个优先级队列，用于存储和排序其流动性池
 
         每个 Mint 可能在多个 AMM 中都有流动性池，此类用于管理这些池子的优先级排序。
         优先级越高的池子，流动性和使用频率越高。
 
+        每个操作最多一次 Redis 往返；优先级最高的池子在进程内缓存 top_pool_ttl 秒，
+        读取时的使用次数先在内存中累加，每隔 flush_interval 秒通过一个 pipeline 写入。
+
         Args:
             redis_client: Redis客户端实例
             max_length: 每个 Mint 最多保留的池子数量，默认10个
+            top_pool_ttl: 优先级最高的池子在进程内的缓存时间（秒）
+            flush_interval: 使用次数写入 Redis 的间隔（秒）
         """
         self.redis = redis_client
         self.max_length = max_length
         self._prefix = "raydium_pool:pool_sorter"
+        self.flush_interval = flush_interval
+        self._top_pools: LRUCache[str, str] = LRUCache(maxsize=10000, ttl=top_pool_ttl)
+        # 尚未写入的使用次数：(mint, pool_id) -> 次数
+        self._pending_usage: dict[tuple[str, str], int] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._incr_if_exists = redis_client.register_script(_INCR_IF_EXISTS_SCRIPT)
 
     async def push(self, mint: str, pool_id: str):
-        """添加或更新池子的优先级
+        """添加或更新池子的优先级，并维持队列长度
 
         Args:
             mint: Mint 地址
             pool_id: 流动性池的ID
         """
-        # 检查元素是否已存在
-        current_score = await self.redis.zscore(f"{self._prefix}:{mint}", pool_id)
-        if current_score is not None:
-            # 如果存在，优先级+1
-            priority = current_score + 1
-        else:
-            priority = 1
-
-        # 添加或更新元素到队列
-        await self.redis.zadd(f"{self._prefix}:{mint}", {pool_id: priority})
-        # 维持队列长度
-        await self.trim_queue(f"{self._prefix}:{mint}")
+        pipe = self.redis.pipeline(transaction=False)
+        self.push_in_pipeline(pipe, mint, pool_id)
+        self.trim_in_pipeline(pipe, mint)
+        await pipe.execute()
+        self.invalidate(mint)
 
     async def pop(self, mint: str):
         """获取并移除优先级最高的池子
@@ -103,6 +149,7 @@ class MintPoolPriorityQueue:
         Returns:
             tuple: (pool_id, priority) 或 None
         """
+        self.invalidate(mint)
         result = await self.redis.zpopmax(f"{self._prefix}:{mint}", count=1)
         if result:
             return result[0]  # 返回 (pool_id, priority) 元组
@@ -118,34 +165,71 @@ class MintPoolPriorityQueue:
         Returns:
             float: 更新后的优先级，如果池子不存在则返回 None
         """
-        current_score = await self.redis.zscore(f"{self._prefix}:{mint}", pool_id)
-        if current_score is not None:
-            # 增加优先级
-            await self.redis.zincrby(f"{self._prefix}:{mint}", 1, pool_id)
-            return await self.redis.zscore(f"{self._prefix}:{mint}", pool_id)
-        return None
+        score = await self._incr_if_exists(keys=[f"{self._prefix}:{mint}"], args=[pool_id])
+        if score is None:
+            return None
+        return float(score)
 
     async def get_top_pool(self, mint: str) -> str | None:
         """获取指定代币优先级最高的流动性池（不删除）
 
+        优先从进程内缓存中读取，使用次数在后台批量写入
+
         Args:
             mint: 代币的 Mint 地址
 
         Returns:
             str | None: 优先级最高的池子ID，如果没有则返回 None
         """
-        result = await self.redis.zrevrange(
-            f"{self._prefix}:{mint}",
-            0,  # 获取第一个元素（优先级最高的）
-            0,  # 只获取一个元素
-            withscores=True,
-        )
-        if result:
-            pool_id, _ = result[0]  # 返回 (pool_id, score) 元组
-            # 增加使用次数
-            await self.redis.zincrby(f"{self._prefix}:{mint}", 1, pool_id)
-            return pool_id
-        return None
+        pool_id = self._top_pools.get(mint)
+        if pool_id is None:
+            result = await self.redis.zrevrange(
+                f"{self._prefix}:{mint}",
+                0,  # 获取第一个元素（优先级最高的）
+                0,  # 只获取一个元素
+            )
+            if not result:
+                return None
+            pool_id = result[0]
+            self._top_pools.set(mint, pool_id)
+        # 增加使用次数
+        self._record_usage(mint, pool_id)
+        return pool_id
+
+    def invalidate(self, mint: str):
+        """删除进程内缓存的优先级最高的池子"""
+        self._top_pools.pop(mint)
+
+    def _record_usage(self, mint: str, pool_id: str):
+        key = (mint, pool_id)
+        self._pending_usage[key] = self._pending_usage.get(key, 0) + 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        """将累积的使用次数通过一个 pipeline 写入 Redis"""
+        if not self._pending_usage:
+            return
+        usage, self._pending_usage = self._pending_usage, {}
+        pipe = self.redis.pipeline(transaction=False)
+        for (mint, pool_id), count in usage.items():
+            pipe.zincrby(f"{self._prefix}:{mint}", count, pool_id)
+        try:
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to flush pool usage: {e}")
+
+    def push_in_pipeline(self, pipe, mint: str, pool_id: str):
+        """在 pipeline 中添加池子或将其优先级+1，由调用方统一执行"""
+        pipe.zincrby(f"{self._prefix}:{mint}", 1, pool_id)
+
+    def trim_in_pipeline(self, pipe, mint: str):
+        """在 pipeline 中删除优先级最低的池子，只保留 max_length 个"""
+        pipe.zremrangebyrank(f"{self._prefix}:{mint}", 0, -self.max_length - 1)
 
     async def trim_queue(self, mint: str):
         """确保每个 Mint 的池子数量不超过最大限制
@@ -153,14 +237,8 @@ class MintPoolPriorityQueue:
         Args:
             queue_key: Mint 地址作为队列键
         """
-        current_length = await self.redis.zcard(f"{self._prefix}:{mint}")
-        if current_length > self.max_length:
-            # 删除多余的元素（保留优先级最高的元素）
-            await self.redis.zremrangebyrank(
-                f"{self._prefix}:{mint}",
-                0,  # 从低优先级开始删除
-                current_length - self.max_length - 1,
-            )
+        # 负数下标表示保留优先级最高的 max_length 个元素，无需先查询队列长度
+        await self.redis.zremrangebyrank(f"{self._prefix}:{mint}", 0, -self.max_length - 1)
 
 
 class RaydiumPoolStoreage:
@@ -201,6 +279,13 @@ class RaydiumPoolStoreage:
             pool_data = await self.pool_data.get(top_pool_id) if pool_data is None else pool_data
         return pool_data
 
+    async def get_top_pool_data(self, mint: str) -> AMMData | None:
+        """获取优先级队列中优先级最高的池子数据，队列中没有该 Mint 时返回 None"""
+        top_pool_id = await self.pool_sorter.get_top_pool(mint)
+        if top_pool_id is None:
+            return None
+        return await self.pool_data.get(top_pool_id)
+
     async def is_exist(self, pool_id: Pubkey) -> bool:
         """
         是否存在 redis 中，如果存在则返回 True
@@ -208,39 +293,68 @@ class RaydiumPoolStoreage:
         return await self.pool_data.get(str(pool_id)) is not None
 
     async def update(self, pool_id: Pubkey, pool_data: AMMData) -> None:
-        pool_keys = AmmV4PoolKeys.from_pool_data(
-            pool_id, pool_data["amm_data"], pool_data["market_data"]
-        )
-        mint = pool_keys.base_mint if pool_keys.base_mint != WSOL else pool_keys.quote_mint
-        await self.pool_sorter.push(str(mint), str(pool_id))
+        await self.update_many([{**pool_data, "pool_id": pool_id}])
+        logger.info(f"Pool data updated: {pool_id}")
 
-        await self.pool_data.set(str(pool_id), pool_data)
-        # PERF: 没有必要每次都 trim，可以定期执行
-        await self.pool_sorter.trim_queue(str(mint))
+    async def update_many(self, pools: list[AMMData]) -> None:
+        """批量写入池子数据
 
+        Redis 的写入合并到一个 pipeline 中，数据库通过一条多行的
+        INSERT ... ON DUPLICATE KEY UPDATE 写入
+        """
+        if not pools:
+            return
+
+        now = datetime.now(timezone.utc)
+        mints: set[str] = set()
+        rows = []
+        pipe = self.redis.pipeline(transaction=False)
+        for pool_data in pools:
+            pool_id = str(pool_data["pool_id"])
+            mint = str(get_amm_v4_mint(pool_data["amm_data"]))
+            mints.add(mint)
+            self.pool_sorter.push_in_pipeline(pipe, mint, pool_id)
+            self.pool_data.set_in_pipeline(pipe, pool_id, pool_data)
+            rows.append(
+                {
+                    "mint": mint,
+                    "pool_id": pool_id,
+                    "amm_data": pool_data["amm_data"],
+                    "market_data": pool_data["market_data"],
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+        for mint in mints:
+            self.pool_sorter.trim_in_pipeline(pipe, mint)
+        await pipe.execute()
+        for mint in mints:
+            self.pool_sorter.invalidate(mint)
+
+        stmt = insert(RaydiumPoolModel).values(rows)
+        stmt = stmt.on_duplicate_key_update(
+            amm_data=stmt.inserted.amm_data,
+            market_data=stmt.inserted.market_data,
+            updated_at=stmt.inserted.updated_at,
+        )
         async with start_async_session() as session:
-            # 检查记录是否存在
-            stmt = select(RaydiumPoolModel.id).where(RaydiumPoolModel.pool_id == str(pool_id))
-            result = await session.execute(stmt)
-            pool = result.scalar_one_or_none()
-
-            if pool is None:
-                # 不存在则创建新记录
-                pool = RaydiumPoolModel(
-                    mint=str(mint),
-                    pool_id=str(pool_id),
-                    amm_data=pool_data["amm_data"],
-                    market_data=pool_data["market_data"],
-                )
-                session.add(pool)
+            await session.execute(stmt)
 
-        logger.info(f"Pool data updated: {pool_id}")
+
+_storeage: RaydiumPoolStoreage | None = None
+
+
+def _get_storeage() -> RaydiumPoolStoreage:
+    """进程内共用一个实例，使优先级最高的池子的缓存与累积的使用次数在多次调用间共享"""
+    global _storeage
+    if _storeage is None:
+        _storeage = RaydiumPoolStoreage(RedisClient.get_instance())
+    return _storeage
 
 
 async def get_preferred_pool(mint: Pubkey | str) -> AMMData | None:
     """Get mint The highest priority pool"""
-    redis = RedisClient.get_instance()
-    storeage = RaydiumPoolStoreage(redis)
+    storeage = _get_storeage()
 
     async def _get_pool_data_from_cache(mint: str) -> AMMData | None:
         pool_data = await storeage.get_pool_data_by_mint(mint)
@@ -272,6 +386,28 @@ async def get_preferred_pool(mint: Pubkey | str) -> AMMData | None:
     return pool_data
 
 
+async def get_preferred_pool_keys(mint: Pubkey | str) -> AmmV4PoolKeys | None:
+    """获取代币优先级最高的 AMM v4 池子的 pool keys
+
+    优先使用按使用次数排序的优先级队列中的池子；队列中没有时从本地的池子索引中读取，
+    索引中同一个 Mint 只保留最后写入的池子，不一定是可用的池子，因此只作为回退；
+    索引中也没有时回退到 get_preferred_pool（数据库与 RPC）
+    """
+    pool_data = await _get_storeage().get_top_pool_data(str(mint))
+    if pool_data is None:
+        pool_keys = PoolIndex().get_amm_v4_pool_keys(mint)
+        if pool_keys is not None:
+            return pool_keys
+        pool_data = await get_preferred_pool(mint)
+    if pool_data is None:
+        return None
+    return AmmV4PoolKeys.from_pool_data(
+        pool_id=pool_data["pool_id"],
+        amm_data=pool_data["amm_data"],
+        market_data=pool_data["market_data"],
+    )
+
+
 async def get_pool_data_from_rpc(mint: str) -> AMMData | None:
     """Get pool data directly from RPC.
     
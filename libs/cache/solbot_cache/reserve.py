@@ -0,0 +1,227 @@
+"""池子储备量缓存
+
+通过 websocket accountSubscribe 订阅热点池子的账户（pump.fun bonding curve、Raydium 池子的 vault），
+在内存中保存最新的账户数据及其 slot，构建交易与本地报价时直接读取，不再请求 RPC。
+
+1. watch 注册需要订阅的账户，超过 max_accounts 时取消订阅最久未被读取的账户
+2. 订阅确认后通过 getMultipleAccounts 批量获取一次快照，之后由订阅推送的数据更新
+3. 早于当前记录的数据将被忽略；连接断开期间所有账户都视为不新鲜，重新连接后重新订阅并获取快照
+
+只有订阅在当前连接上生效并已获取到数据的账户才会被读取到，其余情况返回 None，由调用方回退到 RPC。
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from solana.rpc.commitment import Processed
+from solana.rpc.websocket_api import connect
+from solbot_common.config import settings
+from solbot_common.log import logger
+from solbot_common.utils.utils import get_async_client
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import AccountNotification, SubscriptionResult  # type: ignore
+from websockets.exceptions import ConnectionClosedError, ConnectionClosedOK
+
+# SPL Token 账户中 amount 字段的偏移量
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64
+MAX_MULTIPLE_ACCOUNTS = 100
+
+
+@dataclass
+class AccountSnapshot:
+    data: bytes
+    slot: int
+    # 收到数据时的时间（time.monotonic）
+    received_at: float
+
+
+class ReserveStore:
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, max_accounts: int = 1000) -> None:
+        """
+        Args:
+            max_accounts: 最多同时订阅的账户数量
+        """
+        if hasattr(self, "_watched"):
+            return
+        self._client = get_async_client()
+        self.websocket_url = settings.rpc.rpc_url.replace("https://", "wss://")
+        self.max_accounts = max_accounts
+        # 订阅中的账户，按最近读取的顺序排列
+        self._watched: OrderedDict[Pubkey, AccountSnapshot | None] = OrderedDict()
+        # 当前连接上已生效的订阅：账户 -> subscription id
+        self._subscriptions: dict[Pubkey, int] = {}
+        # 订阅生效后已获取到快照的账户，只有这些账户的数据是新鲜的
+        self._live: set[Pubkey] = set()
+        self._pending_subscribe: asyncio.Queue[Pubkey] = asyncio.Queue()
+        self._pending_unsubscribe: asyncio.Queue[Pubkey] = asyncio.Queue()
+        self._pending_snapshot: asyncio.Queue[Pubkey] = asyncio.Queue()
+        self.is_running = False
+
+    def __len__(self) -> int:
+        return len(self._watched)
+
+    def is_watching(self, pubkey: Pubkey) -> bool:
+        return pubkey in self._watched
+
+    def watch(self, pubkeys: Iterable[Pubkey]) -> None:
+        """订阅账户，已订阅的账户会被标记为最近使用"""
+        for pubkey in pubkeys:
+            if pubkey in self._watched:
+                self._watched.move_to_end(pubkey)
+                continue
+            self._watched[pubkey] = None
+            self._pending_subscribe.put_nowait(pubkey)
+        while len(self._watched) > self.max_accounts:
+            evicted, _ = self._watched.popitem(last=False)
+            self._live.discard(evicted)
+            self._pending_unsubscribe.put_nowait(evicted)
+
+    def unwatch(self, pubkey: Pubkey) -> None:
+        if pubkey in self._watched:
+            del self._watched[pubkey]
+            self._live.discard(pubkey)
+            self._pending_unsubscribe.put_nowait(pubkey)
+
+    def apply(self, pubkey: Pubkey, data: bytes, slot: int) -> None:
+        """更新账户数据，早于当前记录的数据将被忽略"""
+        if pubkey not in self._watched:
+            return
+        snapshot = self._watched[pubkey]
+        if snapshot is not None and snapshot.slot > slot:
+            return
+        self._watched[pubkey] = AccountSnapshot(data=data, slot=slot, received_at=time.monotonic())
+
+    def get(self, pubkey: Pubkey) -> AccountSnapshot | None:
+        """获取订阅中的账户数据，订阅未生效或尚未获取到数据时返回 None"""
+        if pubkey not in self._live:
+            return None
+        snapshot = self._watched.get(pubkey)
+        if snapshot is not None:
+            self._watched.move_to_end(pubkey)
+        return snapshot
+
+    def get_many(self, pubkeys: list[Pubkey]) -> list[AccountSnapshot] | None:
+        """批量获取账户数据，任意一个账户不可用时返回 None"""
+        snapshots = []
+        for pubkey in pubkeys:
+            snapshot = self.get(pubkey)
+            if snapshot is None:
+                return None
+            snapshots.append(snapshot)
+        return snapshots
+
+    def get_token_amount(self, pubkey: Pubkey) -> int | None:
+        """获取订阅中的 token 账户（如池子的 vault）的代币数量"""
+        snapshot = self.get(pubkey)
+        if snapshot is None:
+            return None
+        data = snapshot.data
+        return int.from_bytes(
+            data[TOKEN_ACCOUNT_AMOUNT_OFFSET : TOKEN_ACCOUNT_AMOUNT_OFFSET + 8], "little"
+        )
+
+    async def _snapshot(self, pubkeys: list[Pubkey]) -> None:
+        for i in range(0, len(pubkeys), MAX_MULTIPLE_ACCOUNTS):
+            chunk = pubkeys[i : i + MAX_MULTIPLE_ACCOUNTS]
+            resp = await self._client.get_multiple_accounts(chunk, Processed)
+            slot = resp.context.slot
+            for pubkey, account in zip(chunk, resp.value, strict=True):
+                if account is None or pubkey not in self._subscriptions:
+                    continue
+                self.apply(pubkey, bytes(account.data), slot)
+                self._live.add(pubkey)
+
+    async def _snapshot_task(self) -> None:
+        """订阅生效后批量获取账户的快照"""
+        while True:
+            pubkeys = [await self._pending_snapshot.get()]
+            while not self._pending_snapshot.empty():
+                pubkeys.append(self._pending_snapshot.get_nowait())
+            try:
+                await self._snapshot([p for p in pubkeys if p in self._watched])
+            except Exception as e:
+                logger.error(f"Failed to snapshot watched accounts: {e}")
+
+    async def _subscribe_task(self, websocket) -> None:
+        while True:
+            pubkey = await self._pending_subscribe.get()
+            if pubkey in self._watched and pubkey not in self._subscriptions:
+                await websocket.account_subscribe(pubkey, Processed, "base64")
+
+    async def _unsubscribe_task(self, websocket) -> None:
+        while True:
+            pubkey = await self._pending_unsubscribe.get()
+            if pubkey in self._watched:
+                # 取消订阅前又被重新订阅
+                continue
+            subscription = self._subscriptions.pop(pubkey, None)
+            if subscription is not None:
+                await websocket.account_unsubscribe(subscription)
+
+    def _on_message(self, websocket, message) -> None:
+        if isinstance(message, SubscriptionResult):
+            request = websocket.subscriptions.get(message.result)
+            pubkey = getattr(request, "account", None)
+            if pubkey is None:
+                return
+            self._subscriptions[pubkey] = message.result
+            self._pending_snapshot.put_nowait(pubkey)
+        elif isinstance(message, AccountNotification):
+            request = websocket.subscriptions.get(message.subscription)
+            pubkey = getattr(request, "account", None)
+            if pubkey is None:
+                return
+            result = message.result
+            self.apply(pubkey, bytes(result.value.data), result.context.slot)
+
+    async def _stream(self) -> None:
+        async with connect(self.websocket_url, ping_interval=20, ping_timeout=30) as websocket:
+            logger.info(f"Reserve stream connected to {self.websocket_url}")
+            # 重新连接后需要重新订阅所有账户
+            self._subscriptions.clear()
+            self._live.clear()
+            for queue in (self._pending_subscribe, self._pending_unsubscribe):
+                while not queue.empty():
+                    queue.get_nowait()
+            for pubkey in list(self._watched):
+                self._pending_subscribe.put_nowait(pubkey)
+            tasks = [
+                asyncio.create_task(self._subscribe_task(websocket)),
+                asyncio.create_task(self._unsubscribe_task(websocket)),
+                asyncio.create_task(self._snapshot_task()),
+            ]
+            try:
+                while self.is_running:
+                    for message in await websocket.recv():
+                        self._on_message(websocket, message)
+            finally:
+                self._subscriptions.clear()
+                self._live.clear()
+                for task in tasks:
+                    task.cancel()
+
+    async def start(self) -> None:
+        self.is_running = True
+        while self.is_running:
+            try:
+                await self._stream()
+            except (ConnectionClosedError, ConnectionClosedOK) as e:
+                logger.warning(f"Reserve stream closed: {e}, reconnecting...")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Reserve stream error: {e}, reconnecting...")
+                await asyncio.sleep(1)
+
+    def stop(self) -> None:
+        self.is_running = False
@@ -13,6 +13,10 @@ from sqlmodel import select
 from typing_extensions import Self
 
 from solbot_cache.cached import cached
+from solbot_cache.local import LRUCache
+
+TOKEN_INFO_CACHE_SIZE = 10000
+TOKEN_INFO_CACHE_TTL = 60 * 60
 
 
 # {
@@ -61,15 +65,36 @@ class TokenInfoCache:
         return cls._instance
 
     def __init__(self) -> None:
+        # 单例，避免重复初始化时清空进程内缓存
+        if hasattr(self, "_local"):
+            return
         self.rpc_client = get_async_client()
         self.shyft_api = ShyftAPI(settings.api.shyft_api_key)
+        self._local: LRUCache[str, TokenInfo] = LRUCache(
+            maxsize=TOKEN_INFO_CACHE_SIZE, ttl=TOKEN_INFO_CACHE_TTL
+        )
 
     def __repr__(self) -> str:
         return "TokenInfoCache()"
 
-    @cached(ttl=60 * 60 * 24)
+    async def get(self, mint: Pubkey | str) -> TokenInfo | None:
+        """获取代币信息
+
+        优先从进程内缓存中读取，未命中时再依次查询 Redis、数据库与 Shyft API。
+        """
+        key = mint.__str__()
+        token_info = self._local.get(key)
+        if token_info is not None:
+            return token_info.model_copy()
+
+        token_info = await self._get(mint)
+        if token_info is not None:
+            self._local.set(key, token_info.model_copy())
+        return token_info
+
+    @cached(ttl=60 * 60 * 24, negative_ttl=60)
     @provide_session
-    async def get(
+    async def _get(
         self, mint: Pubkey | str, *, session: AsyncSession = NEW_ASYNC_SESSION
     ) -> TokenInfo | None:
         if isinstance(mint, str):
@@ -1,10 +1,14 @@
+import hashlib
 import pathlib
+import re
+import struct
+from functools import cache
 
 from anchorpy.program.core import Program
 from anchorpy.provider import Provider, Wallet
-from anchorpy_core.idl import Idl  # type: ignore
+from anchorpy_core.idl import Idl, IdlTypeSimple  # type: ignore
 from solana.rpc.async_api import AsyncClient
-from solders.instruction import Instruction
+from solders.instruction import AccountMeta, Instruction
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey
 
@@ -12,22 +16,108 @@ from solbot_common.constants import (
     EVENT_AUTHORITY,
     PUMP_FUN_PROGRAM,
     PUMP_GLOBAL_ACCOUNT,
-    RENT_PROGRAM_ID,
     SYSTEM_PROGRAM_ID,
     TOKEN_PROGRAM_ID,
 )
 
+IDL_PATH = pathlib.Path(__file__).parent / "pumpfun.json"
+
+# IDL 参数类型 -> struct 格式
+_ARG_FORMATS = {
+    IdlTypeSimple.U8: "B",
+    IdlTypeSimple.U16: "H",
+    IdlTypeSimple.U32: "I",
+    IdlTypeSimple.U64: "Q",
+    IdlTypeSimple.I64: "q",
+    IdlTypeSimple.Bool: "?",
+}
+
+
+@cache
+def load_idl() -> Idl:
+    """加载 pumpfun IDL，进程内只解析一次"""
+    with open(IDL_PATH) as f:
+        return Idl.from_json(f.read())
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+class _InstructionTemplate:
+    """由 IDL 预编译的指令模板：discriminator、参数编码与账户顺序"""
+
+    def __init__(self, name: str, idl: Idl) -> None:
+        idl_ix = next((ix for ix in idl.instructions if ix.name == name), None)
+        if idl_ix is None:
+            raise ValueError(f"Instruction {name} not found in IDL")
+
+        try:
+            arg_format = "".join(_ARG_FORMATS[arg.ty] for arg in idl_ix.args)
+        except KeyError as e:
+            raise ValueError(f"Unsupported arg type of instruction {name}: {e}") from e
+        # anchor 的 discriminator 为 sha256("global:<name>") 的前 8 字节
+        discriminator = hashlib.sha256(f"global:{_snake_case(name)}".encode()).digest()[:8]
+        self.discriminator = discriminator
+        self.data_struct = struct.Struct(f"<8s{arg_format}")
+        # (账户名, is_signer, is_writable)，账户名与 anchorpy 的 accounts 参数一致
+        self.accounts = [
+            (_snake_case(account.name), account.is_signer, account.is_mut)
+            for account in idl_ix.accounts
+        ]
+
+    def build(self, args: tuple[int, ...], accounts: dict[str, Pubkey]) -> Instruction:
+        data = self.data_struct.pack(self.discriminator, *args)
+        metas = [
+            AccountMeta(pubkey=accounts[name], is_signer=is_signer, is_writable=is_writable)
+            for name, is_signer, is_writable in self.accounts
+        ]
+        return Instruction(PUMP_FUN_PROGRAM, data, metas)
+
+
+class PumpFunInstructionEncoder:
+    """pump.fun 买卖指令编码器
+
+    与 anchorpy 的 `program.methods[...].args().accounts().instruction()` 生成相同的指令，
+    但 IDL 只在构造时解析一次，构建指令时只做 struct 打包与账户排列。
+    使用 `get_encoder()` 获取进程内共享的实例。
+    """
+
+    def __init__(self, idl: Idl | None = None) -> None:
+        idl = idl or load_idl()
+        self._templates = {name: _InstructionTemplate(name, idl) for name in ("buy", "sell")}
+
+    def encode(self, name: str, args: tuple[int, ...], accounts: dict[str, Pubkey]) -> Instruction:
+        """构建指令
+
+        Args:
+            name: 指令名称，buy 或 sell
+            args: 指令参数，buy 为 (amount, max_sol_cost)，sell 为 (amount, min_sol_output)
+            accounts: 账户，键与 anchorpy 的 accounts 参数一致 (snake_case)
+        """
+        return self._templates[name].build(args, accounts)
+
+    def buy(self, token_amount: int, max_sol_cost: int, accounts: dict[str, Pubkey]) -> Instruction:
+        return self.encode("buy", (token_amount, max_sol_cost), accounts)
+
+    def sell(
+        self, token_amount: int, min_sol_output: int, accounts: dict[str, Pubkey]
+    ) -> Instruction:
+        return self.encode("sell", (token_amount, min_sol_output), accounts)
+
+
+@cache
+def get_encoder() -> PumpFunInstructionEncoder:
+    """获取进程内共享的指令编码器"""
+    return PumpFunInstructionEncoder()
+
 
 class PumpFunInterface:
     def __init__(self, keypair: Keypair, client: AsyncClient):
         self.keypair = keypair
         self.client = client
         provider = Provider(connection=client, wallet=Wallet(keypair))
-        idl_path = pathlib.Path(__file__).parent / "pumpfun.json"
-        with open(idl_path) as f:
-            idl = Idl.from_json(f.read())
-
-        self.program = Program(idl, PUMP_FUN_PROGRAM, provider)
+        self.program = Program(load_idl(), PUMP_FUN_PROGRAM, provider)
         self.connection = provider.connection
 
     def buy(
@@ -15,6 +15,7 @@ from pydantic import (
     MySQLDsn,
     RedisDsn,
     field_validator,
+    model_validator,
 )
 from pydantic.fields import FieldInfo
 from pydantic_settings import (
@@ -107,6 +108,20 @@ class MonitorConfig(BaseModel):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
     mode: str = "wss"  # or "geyser"
+    # geyser 模式下交易的解析方式:
+    # json: 将 protobuf 转换为 rpc 结构的 json 后再解析
+    # native: 直接从 protobuf 中解析出 TxEvent, 需要配合 inprocess pipeline 使用
+    parse_mode: str = "json"  # or "native"
+    # 交易订阅者与解析 worker 之间的传递方式:
+    # redis: 交易详情经由 redis 列表传递
+    # inprocess: 进程内有界队列传递，只有解析得到的 TxEvent 才会写入 redis
+    pipeline: str = "redis"  # or "inprocess"
+    # inprocess 队列的容量
+    queue_size: int = 1000
+    # inprocess 队列满时，是否将多出的交易写入 redis 列表，否则订阅者等待队列空闲
+    queue_overflow: bool = True
+    # geyser 订阅流（gRPC 连接）的数量，钱包通过一致性哈希分配到各条流上
+    geyser_streams: int = Field(default=1, ge=1)
     wallets: list[Pubkey] = Field(default_factory=list)
 
     @field_validator("mode", mode="after")
@@ -115,6 +130,25 @@ class MonitorConfig(BaseModel):
             raise ValueError(f"Invalid mode: {value}")
         return value
 
+    @field_validator("parse_mode", mode="after")
+    def validate_parse_mode(cls, value: str) -> str:
+        if value.lower() not in ["json", "native"]:
+            raise ValueError(f"Invalid parse mode: {value}")
+        return value.lower()
+
+    @field_validator("pipeline", mode="after")
+    def validate_pipeline(cls, value: str) -> str:
+        if value.lower() not in ["redis", "inprocess"]:
+            raise ValueError(f"Invalid pipeline: {value}")
+        return value.lower()
+
+    @model_validator(mode="after")
+    def validate_native_pipeline(self) -> "MonitorConfig":
+        # native 解析得到的是 protobuf，经由 redis 传递需要再转换为 json，失去了意义
+        if self.parse_mode == "native":
+            self.pipeline = "inprocess"
+        return self
+
     @field_validator("wallets", mode="before")
     def validate_wallets(cls, value: list[str]) -> list[Pubkey]:
         return [Pubkey.from_string(wallet) for wallet in value]
@@ -174,6 +208,8 @@ class APIConfig(BaseModel):
 class DBConfig(BaseModel):
     mysql: MySQLDsn = Field(..., alias="mysql_url")
     redis: RedisDsn = Field(..., alias="redis_url")
+    # mint -> 池子索引文件，由 cache-preloader 写入，其他服务只读映射
+    pool_index_path: str = "data/pool_index.bin"
 
     @property
     def mysql_url(self):
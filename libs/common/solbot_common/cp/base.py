@@ -17,6 +17,8 @@ class DataProtocol(Protocol):
 
 T = TypeVar("T", bound=DataProtocol)
 MAX_PROCESS_TIME = 15
+# 处理完成的消息最多等待多久（秒）与其他消息合并提交
+ACK_INTERVAL = 0.01
 
 
 class Producer(Generic[T]):
@@ -37,7 +39,27 @@ class Producer(Generic[T]):
         )
 
 
+class _BatchResult:
+    """已处理完成的消息的结果，累积后通过一个 pipeline 统一提交"""
+
+    def __init__(self) -> None:
+        self.acks: list[str] = []
+        self.retries: list[dict] = []
+        self.dead_letters: list[tuple[str, dict]] = []
+
+    def __len__(self) -> int:
+        return len(self.acks) + len(self.retries) + len(self.dead_letters)
+
+    def update(self, other: "_BatchResult") -> None:
+        self.acks.extend(other.acks)
+        self.retries.extend(other.retries)
+        self.dead_letters.extend(other.dead_letters)
+
+
 class Consumer(Generic[T]):
+    # 启动时，若消费者组没有待处理的消息，则重置消费者组从头开始消费
+    reset_idle_group: bool = True
+
     def __init__(
         self,
         channel: str,
@@ -49,6 +71,13 @@ class Consumer(Generic[T]):
         poll_timeout_ms: int = 5000,
         max_retries: int = 3,
         dead_letter_channel: str | None = None,
+        max_concurrent_tasks: int = 1,
+        max_process_time: float | None = MAX_PROCESS_TIME,
+        dead_letter_expired: bool = True,
+        claim_min_idle_ms: int | None = None,
+        claim_interval: float = 5,
+        lock_ttl: int | None = None,
+        ack_interval: float = ACK_INTERVAL,
     ) -> None:
         """Initialize the transaction event consumer.
 
@@ -60,6 +89,23 @@ class Consumer(Generic[T]):
             poll_timeout_ms: Timeout in milliseconds for blocking read
             max_retries: Maximum number of retries for failed messages
             dead_letter_channel: Channel name for dead letter queue
+            max_concurrent_tasks: Maximum number of messages processed concurrently, new
+                messages are read as soon as a slot is free instead of after the whole batch
+            max_process_time: Messages older than this (in seconds) are not processed,
+                None disables the check. The age is taken from the "timestamp" field, or
+                from the message ID when the field is missing
+            dead_letter_expired: Whether expired messages are moved to the dead letter queue
+                or simply acknowledged and discarded
+            claim_min_idle_ms: Pending messages of other consumers idle for longer than this
+                are periodically claimed (XAUTOCLAIM) and processed, None disables claiming
+            claim_interval: Interval in seconds between two claims
+            lock_ttl: If set, a message is locked (SET NX) for this many seconds before being
+                processed, so a claimed message that is still being processed by its
+                original consumer is not processed twice. The lock holds the consumer name,
+                so the same consumer (e.g. after a restart) can re-enter it, and it is
+                released when processing fails. Must be longer than claim_min_idle_ms
+            ack_interval: Finished messages are acknowledged together, at most this many
+                seconds after they complete, in a single pipeline
         """
         self.channel = channel
         self.data_class = data_class
@@ -70,8 +116,31 @@ class Consumer(Generic[T]):
         self.poll_timeout_ms = poll_timeout_ms
         self.max_retries = max_retries
         self.dead_letter_channel = dead_letter_channel or f"{channel}:dead"
+        self.max_process_time = max_process_time
+        self.dead_letter_expired = dead_letter_expired
+        self.claim_min_idle_ms = claim_min_idle_ms
+        self.claim_interval = claim_interval
+        self.lock_ttl = lock_ttl
+        self.ack_interval = ack_interval
+        if (
+            claim_min_idle_ms is not None
+            and lock_ttl is not None
+            and lock_ttl * 1000 <= claim_min_idle_ms
+        ):
+            logger.warning(
+                f"lock_ttl ({lock_ttl}s) of {channel} should be longer than "
+                f"claim_min_idle_ms ({claim_min_idle_ms}ms)"
+            )
+        self.max_concurrent_tasks = max_concurrent_tasks
+        self.semaphore = asyncio.Semaphore(max_concurrent_tasks)
+        # 正在处理的消息
+        self._tasks: set[asyncio.Task] = set()
+        # 处理完成、尚未提交的消息结果
+        self._result = _BatchResult()
+        self._flush_task: asyncio.Task | None = None
         self.is_running = False
         self.callback: Callable[[T], Coroutine[Any, Any, None]] | None = None
+        self._claim_task: asyncio.Task | None = None
 
     async def setup(self) -> None:
         """Setup the consumer group if it doesn't exist."""
@@ -89,6 +158,9 @@ class Consumer(Generic[T]):
                 raise
             logger.info(f"Consumer group {self.consumer_group} already exists")
 
+            if not self.reset_idle_group:
+                return
+
             # 检查是否需要重置消费者组位置
             stream_info = await self.redis.xinfo_stream(self.channel)
             if stream_info["length"] > 0:  # 如果队列中有消息
@@ -145,26 +217,26 @@ class Consumer(Generic[T]):
                     f"Consumer {consumer['name']} - pending: {consumer['pending']}, idle: {consumer['idle']}"
                 )
 
-            # 读取待处理的消息
-            pending = await self.redis.xreadgroup(
-                groupname=self.consumer_group,
-                consumername=self.consumer_name,
-                streams={self.channel: "0"},  # 0 means all pending messages
-                count=self.batch_size,
-            )
-
-            logger.info(f"Found pending messages: {pending is not None and len(pending) > 0}")
-            if pending:
-                for stream_name, messages in pending:
-                    logger.info(f"Processing {len(messages)} messages from stream {stream_name}")
-                    for message_id, fields in messages:
-                        logger.info(f"Processing pending message {message_id}")
-                        logger.debug(f"Message fields: {fields}")
-                        try:
-                            await self._process_message(message_id, fields)
-                        except Exception as e:
-                            logger.error(f"Error processing pending message {message_id}: {e}")
-            else:
+            # 读取待处理的消息，直到处理完当前消费者的所有待处理消息
+            last_id = "0"  # 0 means all pending messages
+            found = False
+            while True:
+                pending = await self.redis.xreadgroup(
+                    groupname=self.consumer_group,
+                    consumername=self.consumer_name,
+                    streams={self.channel: last_id},
+                    count=self.batch_size,
+                )
+                messages = [message for _, messages in pending or [] for message in messages]
+                if not messages:
+                    break
+                found = True
+                logger.info(f"Processing {len(messages)} pending messages")
+                await self._process_batch(messages)
+                last_id = messages[-1][0]
+
+            logger.info(f"Found pending messages: {found}")
+            if not found:
                 # 如果没有待处理的消息，检查是否有新消息
                 new_messages = await self.redis.xread(
                     streams={self.channel: "0-0"},
@@ -180,39 +252,59 @@ class Consumer(Generic[T]):
         except Exception as e:
             logger.error(f"Error processing pending messages: {e}")
 
-    async def _process_message(self, message_id: str, fields: dict) -> None:
-        """Process a single message and acknowledge it.
+    async def _process_message(self, message_id: str, fields: dict, result: _BatchResult) -> None:
+        """Process a single message and record how it should be acknowledged.
 
         Args:
             message_id: ID of the message in Redis Stream
             fields: Message fields containing the event data
+            result: Batch result the outcome of this message is recorded into
         """
         logger.debug(f"Processing message {message_id}: {fields}")
         retry_count = int(fields.get("retry_count", 0))
+        locked = False
         try:
-            timestamp = float(fields.get("timestamp", 0))
-            if time.time() - timestamp > MAX_PROCESS_TIME:
-                logger.warning(
-                    f"Message {message_id} is too old, moving to dead letter queue. Timestamp: {timestamp}"
-                )
-                await self._move_to_dead_letter(message_id, fields, "message_timeout")
-                return
+            if self.max_process_time is not None:
+                timestamp = self._message_time(message_id, fields)
+                if time.time() - timestamp > self.max_process_time:
+                    if self.dead_letter_expired:
+                        logger.warning(
+                            f"Message {message_id} is too old, moving to dead letter queue. Timestamp: {timestamp}"
+                        )
+                        self._move_to_dead_letter(message_id, fields, "message_timeout", result)
+                    else:
+                        logger.warning(
+                            f"Message {message_id} is too old, discard it. Timestamp: {timestamp}"
+                        )
+                        result.acks.append(message_id)
+                    return
+
+            if self.lock_ttl is not None:
+                if not await self._lock(message_id):
+                    # 消息正在被其他消费者处理，由其负责确认
+                    logger.warning(
+                        f"Message {message_id} is being processed by another consumer, skip"
+                    )
+                    return
+                locked = True
 
             if self.callback is not None:
                 data = self.data_class.from_json(fields["data"])
                 await self.callback(data)
 
             # Acknowledge the message on successful processing
-            await self.redis.xack(self.channel, self.consumer_group, message_id)
+            result.acks.append(message_id)
 
         except Exception as e:
             logger.exception(f"Error processing message {message_id}: {e}")
+            if locked:
+                await self._unlock(message_id)
 
             if retry_count >= self.max_retries:
                 logger.error(
                     f"Message {message_id} exceeded max retries, moving to dead letter queue"
                 )
-                await self._move_to_dead_letter(message_id, fields, str(e))
+                self._move_to_dead_letter(message_id, fields, str(e), result)
                 return
 
             # Update retry count and add back to stream
@@ -220,36 +312,221 @@ class Consumer(Generic[T]):
             fields["last_error"] = str(e)
             fields["last_retry_time"] = str(time.time())
 
-            # Add back to stream for retry
-            await self.redis.xadd(self.channel, fields)
-            # Acknowledge the original message
-            await self.redis.xack(self.channel, self.consumer_group, message_id)
+            # Add back to stream for retry, and acknowledge the original message
+            result.retries.append(fields)
+            result.acks.append(message_id)
+
+    @staticmethod
+    def _message_time(message_id: str, fields: dict) -> float:
+        """消息的产生时间，没有 timestamp 字段时使用消息 ID 中写入 stream 的毫秒时间"""
+        if "timestamp" in fields:
+            return float(fields["timestamp"])
+        if isinstance(message_id, bytes):
+            message_id = message_id.decode()
+        return int(message_id.split("-")[0]) / 1000
+
+    def _lock_key(self, message_id: str) -> str:
+        return f"{self.channel}:lock:{message_id}"
+
+    async def _lock(self, message_id: str) -> bool:
+        """Lock a message so that it is processed by only one consumer.
+
+        The lock holds the consumer name, a consumer re-enters its own lock, so that a
+        restarted consumer can process the pending messages it left behind.
+
+        Args:
+            message_id: ID of the message in Redis Stream
+
+        Returns:
+            bool: Whether the lock is acquired
+        """
+        key = self._lock_key(message_id)
+        if await self.redis.set(key, self.consumer_name, nx=True, ex=self.lock_ttl):
+            return True
+        owner = await self.redis.get(key)
+        if isinstance(owner, bytes):
+            owner = owner.decode()
+        return owner == self.consumer_name
+
+    async def _unlock(self, message_id: str) -> None:
+        """Release the lock of a message, so that it can be retried."""
+        try:
+            await self.redis.delete(self._lock_key(message_id))
+        except Exception as e:
+            logger.error(f"Failed to release lock of message {message_id}: {e}")
 
-    async def _move_to_dead_letter(self, message_id: str, fields: dict, error: str) -> None:
+    def _move_to_dead_letter(
+        self, message_id: str, fields: dict, error: str, result: _BatchResult
+    ) -> None:
         """Move a message to the dead letter queue.
 
         Args:
             message_id: Original message ID
             fields: Message fields
             error: Error message
+            result: Batch result the dead letter is recorded into
         """
         fields["original_id"] = message_id
         fields["error"] = error
         fields["moved_to_dlq_at"] = str(time.time())
+        result.dead_letters.append((message_id, fields))
+
+    async def _flush(self, result: _BatchResult) -> None:
+        """Flush acks, retries and dead letters of finished messages in a single pipeline.
+
+        Args:
+            result: Batch result to flush
+        """
+        if len(result) == 0:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for fields in result.retries:
+            pipe.xadd(self.channel, fields)
+        for _, fields in result.dead_letters:
+            pipe.xadd(self.dead_letter_channel, fields)
+
+        dead_letter_ids = [message_id for message_id, _ in result.dead_letters]
+        ack_ids = result.acks + dead_letter_ids
+        if ack_ids:
+            pipe.xack(self.channel, self.consumer_group, *ack_ids)
+        if dead_letter_ids:
+            # Delete dead letters from original stream
+            pipe.xdel(self.channel, *dead_letter_ids)
 
         try:
-            # Add to dead letter queue
-            await self.redis.xadd(self.dead_letter_channel, fields)
-            # Acknowledge the original message
-            await self.redis.xack(self.channel, self.consumer_group, message_id)
-            # Delete the message from original stream
-            await self.redis.xdel(self.channel, message_id)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error flushing batch of {len(result)} messages: {e}")
+            raise
+
+        if dead_letter_ids:
             logger.info(
-                f"Message {message_id} moved to dead letter queue and deleted from original stream"
+                f"Messages {dead_letter_ids} moved to dead letter queue and deleted from original stream"
             )
+
+    async def _flush_pending(self) -> None:
+        """Flush the results of all messages finished so far."""
+        result, self._result = self._result, _BatchResult()
+        try:
+            await self._flush(result)
         except Exception as e:
-            logger.error(f"Error moving message {message_id} to dead letter queue: {e}")
-            raise
+            # 未确认的消息留在 PEL 中，之后会被重新处理
+            logger.error(f"Error acknowledging {len(result)} messages: {e}")
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.ack_interval)
+        finally:
+            self._flush_task = None
+        await self._flush_pending()
+
+    def _schedule_flush(self) -> None:
+        """在 ack_interval 后提交，期间完成的消息合并到同一个 pipeline 中"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _run_message(self, message_id: str, fields: dict) -> None:
+        """Process a single message, its result is flushed together with other finished messages."""
+        try:
+            # 处理期间 self._result 可能已被提交并替换，完成后再合并进去
+            result = _BatchResult()
+            await self._process_message(message_id, fields, result)
+            self._result.update(result)
+        except Exception as e:
+            logger.error(f"Error finishing message {message_id}: {e}")
+        finally:
+            self.semaphore.release()
+        self._schedule_flush()
+
+    async def _dispatch(self, messages: list[tuple[str, dict]]) -> list[asyncio.Task]:
+        """Start processing messages, at most max_concurrent_tasks at a time.
+
+        Returns once every message has been started, so a slow message only holds its
+        own slot instead of stalling the rest of the batch and the next read.
+
+        Args:
+            messages: Messages returned by XREADGROUP for this consumer's stream
+
+        Returns:
+            list[asyncio.Task]: Tasks processing the messages
+        """
+        tasks = []
+        for message_id, fields in messages:
+            await self.semaphore.acquire()
+            task = asyncio.create_task(self._run_message(message_id, fields))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    async def _process_batch(self, messages: list[tuple[str, dict]]) -> None:
+        """Process messages and wait until all of them are acknowledged.
+
+        Args:
+            messages: Messages returned by XREADGROUP for this consumer's stream
+        """
+        tasks = await self._dispatch(messages)
+        if tasks:
+            await asyncio.gather(*tasks)
+        await self._flush_pending()
+
+    async def drain(self) -> None:
+        """Wait for the messages being processed to complete and acknowledge them."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._flush_pending()
+
+    async def claim_idle_pending(self) -> int:
+        """Claim pending messages that other consumers left idle and process them.
+
+        Messages delivered to a consumer that crashed (or was scaled down) stay in the
+        group's PEL forever, XAUTOCLAIM transfers them to this consumer.
+
+        Returns:
+            int: Number of claimed messages
+        """
+        if self.claim_min_idle_ms is None:
+            return 0
+
+        claimed = 0
+        start_id = "0-0"
+        while True:
+            # aioredis 未提供 xautoclaim, 使用原始命令
+            response = await self.redis.execute_command(
+                "XAUTOCLAIM",
+                self.channel,
+                self.consumer_group,
+                self.consumer_name,
+                self.claim_min_idle_ms,
+                start_id,
+                "COUNT",
+                self.batch_size,
+            )
+            start_id, entries = response[0], response[1]
+            messages = [
+                (message_id, dict(zip(fields[::2], fields[1::2], strict=True)))
+                for message_id, fields in entries
+                # 已被删除的消息 fields 为空
+                if fields is not None
+            ]
+            if messages:
+                logger.info(f"Claimed {len(messages)} idle pending messages from {self.channel}")
+                await self._process_batch(messages)
+                claimed += len(messages)
+            if start_id in ("0-0", b"0-0"):
+                break
+        return claimed
+
+    async def _claim_loop(self) -> None:
+        while self.is_running:
+            await asyncio.sleep(self.claim_interval)
+            try:
+                await self.claim_idle_pending()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error claiming idle pending messages: {e}")
 
     async def start(self) -> None:
         """Start consuming messages from the stream."""
@@ -262,15 +539,24 @@ class Consumer(Generic[T]):
         # First process any pending messages
         await self.process_pending()
 
+        if self.claim_min_idle_ms is not None:
+            self._claim_task = asyncio.create_task(self._claim_loop())
+
         # Then start processing new messages
         while self.is_running:
             try:
+                # 只读取有空闲槽位可以立即处理的消息，避免消息在本地等待时空闲过久被认领
+                free = self.max_concurrent_tasks - len(self._tasks)
+                if free <= 0:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
                 # Read new messages
                 messages = await self.redis.xreadgroup(
                     groupname=self.consumer_group,
                     consumername=self.consumer_name,
                     streams={self.channel: ">"},  # > means new messages only
-                    count=self.batch_size,
+                    count=min(self.batch_size, free),
                     block=self.poll_timeout_ms,
                 )
 
@@ -279,8 +565,7 @@ class Consumer(Generic[T]):
 
                 logger.info(f"Processing {len(messages)} messages from stream {messages[0][0]}")
                 for stream, stream_messages in messages:
-                    for message_id, fields in stream_messages:
-                        await self._process_message(message_id, fields)
+                    await self._dispatch(stream_messages)
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -290,6 +575,9 @@ class Consumer(Generic[T]):
     def stop(self) -> None:
         """Stop consuming messages."""
         self.is_running = False
+        if self._claim_task is not None:
+            self._claim_task.cancel()
+            self._claim_task = None
 
 
 class ConsumerProducerBuilder(Generic[T]):
@@ -311,6 +599,7 @@ class ConsumerProducerBuilder(Generic[T]):
         poll_timeout_ms: int = 5000,
         max_retries: int = 3,
         dead_letter_channel: str | None = None,
+        max_concurrent_tasks: int = 1,
     ) -> Consumer[T]:
         return Consumer(
             channel=self.channel,
@@ -322,6 +611,7 @@ class ConsumerProducerBuilder(Generic[T]):
             poll_timeout_ms=poll_timeout_ms,
             max_retries=max_retries,
             dead_letter_channel=dead_letter_channel,
+            max_concurrent_tasks=max_concurrent_tasks,
         )
 
     # def build_producer(self) -> Producer[T]:
@@ -0,0 +1,157 @@
+"""
+Config event producer and consumer for notifying changes of copytrades and bot settings
+"""
+
+from collections.abc import Callable
+from enum import Enum
+
+import aioredis
+import orjson as json
+from aioredis.client import PubSub
+from pydantic import BaseModel
+
+from solbot_common.log import logger
+
+CONFIG_EVENTS_CHANNEL = "config_events"
+
+
+class ConfigEventType(str, Enum):
+    """配置变更事件类型"""
+
+    COPYTRADE = "copytrade"  # 跟单配置变更
+    SETTING = "setting"  # 用户设置变更
+
+
+class ConfigEvent(BaseModel):
+    """配置变更事件
+
+    跟单配置变更时 target_wallet 不为空，用户设置变更时 chat_id 与 wallet_address 不为空
+    """
+
+    event_type: ConfigEventType
+    target_wallet: str | None = None
+    chat_id: int | None = None
+    wallet_address: str | None = None
+
+
+class ConfigEventProducer:
+    """配置变更事件生产者"""
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self.channel = CONFIG_EVENTS_CHANNEL
+
+    async def publish_event(self, event: ConfigEvent):
+        """发布配置变更事件"""
+        await self.redis.publish(self.channel, json.dumps(event.model_dump()))
+
+    async def copytrade_changed(self, target_wallet: str):
+        """跟单配置变更
+
+        Args:
+            target_wallet: 跟单的目标钱包
+        """
+        event = ConfigEvent(event_type=ConfigEventType.COPYTRADE, target_wallet=target_wallet)
+        await self.publish_event(event)
+        logger.debug(f"Published copytrade change of wallet {target_wallet}")
+
+    async def setting_changed(self, chat_id: int, wallet_address: str):
+        """用户设置变更
+
+        Args:
+            chat_id: 用户 id
+            wallet_address: 用户钱包
+        """
+        event = ConfigEvent(
+            event_type=ConfigEventType.SETTING,
+            chat_id=chat_id,
+            wallet_address=wallet_address,
+        )
+        await self.publish_event(event)
+        logger.debug(f"Published setting change of {chat_id}:{wallet_address}")
+
+
+class ConfigEventConsumer:
+    """配置变更事件消费者
+
+    Attributes:
+        redis (aioredis.Redis): Redis客户端实例
+        channel (str): 订阅的Redis频道名
+        _handlers (dict): 事件处理器映射表
+        _pubsub (Optional[aioredis.client.PubSub]): Redis PubSub对象
+    """
+
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self.channel = CONFIG_EVENTS_CHANNEL
+        self._handlers: dict[ConfigEventType, Callable] = {}
+        self._pubsub: PubSub | None = None
+
+    async def subscribe(self) -> PubSub:
+        """订阅配置变更事件
+
+        Returns:
+            aioredis.client.PubSub: Redis PubSub对象
+
+        Raises:
+            RuntimeError: 如果重复调用subscribe
+        """
+        if self._pubsub is not None:
+            raise RuntimeError("Already subscribed to channel")
+
+        self._pubsub = self.redis.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        return self._pubsub
+
+    async def unsubscribe(self) -> None:
+        """取消订阅并清理资源
+
+        Raises:
+            RuntimeError: 如果未订阅就调用unsubscribe
+        """
+        if self._pubsub is None:
+            raise RuntimeError("Not subscribed to any channel")
+
+        await self._pubsub.unsubscribe(self.channel)
+        await self._pubsub.close()
+        self._pubsub = None
+
+    def register_handler(self, event_type: ConfigEventType, handler: Callable) -> None:
+        """注册事件处理器
+
+        Args:
+            event_type: 事件类型
+            handler: 处理器函数，必须是一个接受ConfigEvent参数的异步函数
+
+        Raises:
+            ValueError: 如果handler不是可调用对象
+        """
+        if not callable(handler):
+            raise ValueError("Handler must be callable")
+        self._handlers[event_type] = handler
+
+    async def process_event(self, message: dict) -> None:
+        """处理配置变更事件
+
+        Args:
+            message: Redis消息对象
+
+        Raises:
+            ValueError: 如果消息格式无效
+        """
+        if message.get("type") != "message":
+            return
+
+        data = message.get("data")
+        if not data:
+            raise ValueError("Empty message data")
+
+        try:
+            event = ConfigEvent(**json.loads(data))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON format: {e}") from e
+
+        if handler := self._handlers.get(event.event_type):
+            await handler(event)
+        else:
+            logger.warning(f"No handler registered for event type: {event.event_type}")
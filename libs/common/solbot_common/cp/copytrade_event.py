@@ -23,6 +23,7 @@ class NotifyCopyTradeConsumer(Consumer[SwapEvent]):
         consumer_name: str,
         batch_size: int = 10,
         poll_timeout_ms: int = 5000,
+        max_concurrent_tasks: int = 10,
     ) -> None:
         super().__init__(
             channel=NOTIFY_COPYTRADE_CHANNEL,
@@ -32,4 +33,5 @@ class NotifyCopyTradeConsumer(Consumer[SwapEvent]):
             consumer_name=consumer_name,
             batch_size=batch_size,
             poll_timeout_ms=poll_timeout_ms,
+            max_concurrent_tasks=max_concurrent_tasks,
         )
@@ -26,6 +26,7 @@ class SwapResultConsumer(Consumer[SwapResult]):
         consumer_name: str,
         batch_size: int = 10,
         poll_timeout_ms: int = 5000,
+        max_concurrent_tasks: int = 10,
     ) -> None:
         super().__init__(
             channel=SWAP_EVENT_CHANNEL,
@@ -35,6 +36,7 @@ class SwapResultConsumer(Consumer[SwapResult]):
             consumer_name=consumer_name,
             batch_size=batch_size,
             poll_timeout_ms=poll_timeout_ms,
+            max_concurrent_tasks=max_concurrent_tasks,
         )
 
 
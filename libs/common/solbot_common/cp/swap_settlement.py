@@ -0,0 +1,66 @@
+"""待结算的交易
+
+交易发送后先写入结算流，再确认交易事件消息，结算完成后才确认结算消息。
+进程崩溃或重启时，未完成的结算会在重启后（或被其他消费者认领后）继续进行，不会丢失。
+"""
+
+import aioredis
+
+from solbot_common.types import PendingSettlement
+
+from .base import Consumer, Producer
+
+SWAP_SETTLEMENT_CHANNEL = "swap_event:settlement"
+DEAD_LETTER_CHANNEL = "swap_event:settlement:dlq"
+# 消息锁的有效期，必须大于认领空闲消息的时间
+SWAP_SETTLEMENT_LOCK_TTL = 600  # s
+
+
+class SwapSettlementProducer(Producer[PendingSettlement]):
+    def __init__(self, redis_client: aioredis.Redis) -> None:
+        super().__init__(redis_client=redis_client, channel=SWAP_SETTLEMENT_CHANNEL)
+
+
+class SwapSettlementConsumer(Consumer[PendingSettlement]):
+    # 结算只处理新消息与自己遗留的消息，不重置消费者组
+    reset_idle_group = False
+
+    def __init__(
+        self,
+        redis_client: aioredis.Redis,
+        consumer_group: str,
+        consumer_name: str,
+        batch_size: int = 10,
+        poll_timeout_ms: int = 1000,
+        max_concurrent_tasks: int = 50,
+        claim_min_idle_ms: int | None = None,
+    ) -> None:
+        """Initialize the swap settlement consumer.
+
+        Args:
+            redis_client: Redis client instance
+            consumer_group: Name of the consumer group
+            consumer_name: Unique name for this consumer instance, must be stable across
+                restarts so that the settlements left behind are resumed
+            batch_size: Number of settlements to read in one batch
+            poll_timeout_ms: Timeout in milliseconds for blocking read
+            max_concurrent_tasks: Maximum number of concurrent settlements
+            claim_min_idle_ms: Claim settlements other consumers left idle for longer
+                than this, None disables claiming
+        """
+        super().__init__(
+            channel=SWAP_SETTLEMENT_CHANNEL,
+            data_class=PendingSettlement,
+            redis_client=redis_client,
+            consumer_group=consumer_group,
+            consumer_name=consumer_name,
+            batch_size=batch_size,
+            poll_timeout_ms=poll_timeout_ms,
+            max_retries=0,
+            dead_letter_channel=DEAD_LETTER_CHANNEL,
+            max_concurrent_tasks=max_concurrent_tasks,
+            # 结算晚一些也要完成，不丢弃过期的消息
+            max_process_time=None,
+            claim_min_idle_ms=claim_min_idle_ms,
+            lock_ttl=SWAP_SETTLEMENT_LOCK_TTL,
+        )
@@ -13,6 +13,8 @@ from construct import (
 )
 from construct import Struct as cStruct
 
+from solbot_common.layouts.decoder import CompiledLayout
+
 LIQUIDITY_STATE_LAYOUT_V4 = cStruct(
     "status" / Int64ul,
     "nonce" / Int64ul,
@@ -139,3 +141,12 @@ ACCOUNT_LAYOUT = cStruct(
     "close_authority_option" / Int32ul,
     "close_authority" / PUBLIC_KEY_LAYOUT,
 )
+
+
+LIQUIDITY_STATE_V4 = CompiledLayout(LIQUIDITY_STATE_LAYOUT_V4, "LiquidityStateV4")
+MARKET_STATE_V3 = CompiledLayout(MARKET_STATE_LAYOUT_V3, "MarketStateV3")
+
+# 按偏移量直接读取 AMM v4 池子状态中的字段，无需解析整个结构体
+AMM_V4_COIN_MINT_OFFSET = LIQUIDITY_STATE_V4.offset_of("coinMintAddress")
+AMM_V4_PC_MINT_OFFSET = LIQUIDITY_STATE_V4.offset_of("pcMintAddress")
+AMM_V4_SERUM_MARKET_OFFSET = LIQUIDITY_STATE_V4.offset_of("serumMarket")
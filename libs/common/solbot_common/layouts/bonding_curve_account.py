@@ -4,6 +4,8 @@ from typing import Final
 from construct import Bytes, Flag, Int64ul, Struct
 from solders.pubkey import Pubkey
 
+from solbot_common.layouts.decoder import CompiledLayout
+
 _EXPECTED_DISCRIMINATOR: Final[bytes] = struct.pack("<Q", 6966180631402821399)
 class BondingCurveError(Exception):
     """Exception raised for errors in bonding curve account data validation."""
@@ -31,6 +33,9 @@ BONDING_CURVE_ACCOUNT_LAYOUT_V2 = Struct(
     "creator" / Bytes(32)
 )
 
+BONDING_CURVE_ACCOUNT_V1 = CompiledLayout(BONDING_CURVE_ACCOUNT_LAYOUT_V1, "BondingCurveAccountV1")
+BONDING_CURVE_ACCOUNT_V2 = CompiledLayout(BONDING_CURVE_ACCOUNT_LAYOUT_V2, "BondingCurveAccountV2")
+
 
 class BondingCurveAccount:
     """ 
@@ -50,10 +55,10 @@ class BondingCurveAccount:
             raise ValueError("Invalid curve state discriminator")
 
         if len(data)==49:
-            parsed = BONDING_CURVE_ACCOUNT_LAYOUT_V1.parse(data[8:])
+            parsed = BONDING_CURVE_ACCOUNT_V1.parse(data, 8)
         else:
-            parsed = BONDING_CURVE_ACCOUNT_LAYOUT_V2.parse(data[8:])
-        self.__dict__.update(parsed)
+            parsed = BONDING_CURVE_ACCOUNT_V2.parse(data, 8)
+        self.__dict__.update(parsed._asdict())
 
     virtual_token_reserves: int
     virtual_sol_reserves: int
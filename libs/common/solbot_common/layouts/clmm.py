@@ -12,6 +12,8 @@ from construct import (
     Struct,
 )
 
+from solbot_common.layouts.decoder import CompiledLayout
+
 
 class UInt128Adapter(Adapter):
     def _decode(self, obj, context, path):
@@ -140,3 +142,5 @@ PROTOCOL_POSITION_STATE_LAYOUT = Struct(
     "reward_growth_inside" / Array(3, UInt128ul),
     "padding" / Array(8, Int64ul),
 )
+
+CLMM_POOL_STATE = CompiledLayout(CLMM_POOL_STATE_LAYOUT, "ClmmPoolState")
@@ -11,6 +11,8 @@ from construct import (
     Struct,
 )
 
+from solbot_common.layouts.decoder import CompiledLayout
+
 CPMM_POOL_STATE_LAYOUT = Struct(
     Padding(8),
     "amm_config" / Bytes(32),
@@ -78,3 +80,5 @@ OBSERVATION_STATE = Struct(
     "observations" / GreedyRange(OBSERVATION),
     "padding" / GreedyRange(Int64ul),
 )
+
+CPMM_POOL_STATE = CompiledLayout(CPMM_POOL_STATE_LAYOUT, "CpmmPoolState")
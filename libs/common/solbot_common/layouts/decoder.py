@@ -0,0 +1,164 @@
+"""预编译的账户解码器
+
+construct 的 Struct 每次解析都要在 Python 中逐个字段解释执行，创建 Container，
+池子快照与交易路径上解析 AMM、market、bonding curve 账户的大部分 CPU 都花在这里。
+
+CompiledLayout 在导入时将定长的 construct Struct 编译为一个 struct.Struct：
+
+- parse: 一次 unpack 解析整个账户，返回 namedtuple，字段名与 construct 版本相同
+- parse_many: 对拼接在一起的多个同结构账户调用 struct.iter_unpack，一次解析一整批
+- view: 惰性解析，只在访问某个字段时按偏移量 unpack 该字段
+- reader: 返回读取单个字段的函数，热路径上只需要一两个字段时使用
+
+整数、定长字节、布尔值、padding 直接映射为 struct 的格式字符；128 位整数与整数数组
+先读取为字节再转换；其他无法映射的字段（如位域）读取为字节后交给 construct 解析。
+"""
+
+import struct
+from collections import namedtuple
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import construct
+
+Converter = Callable[[Any], Any]
+
+
+def _int_converter(signed: bool, byteorder: str) -> Converter:
+    def _convert(data: bytes) -> int:
+        return int.from_bytes(data, byteorder, signed=signed)  # type: ignore
+
+    return _convert
+
+
+def _array_converter(fmt: str) -> Converter:
+    item = struct.Struct(fmt)
+
+    def _convert(data: bytes) -> list:
+        return [value for (value,) in item.iter_unpack(data)]
+
+    return _convert
+
+
+def _compile_field(subcon: construct.Construct) -> tuple[str, Converter | None]:
+    """返回字段的 struct 格式与解析后的转换函数"""
+    size = subcon.sizeof()
+    if isinstance(subcon, construct.FormatField):
+        return subcon.fmtstr.lstrip("<"), None
+    if isinstance(subcon, type(construct.Flag)):
+        return "?", None
+    if isinstance(subcon, construct.Bytes):
+        return f"{size}s", None
+    if isinstance(subcon, construct.Padded) and isinstance(subcon.subcon, type(construct.Pass)):
+        return f"{size}x", None
+    if isinstance(subcon, construct.BytesInteger) and isinstance(subcon.swapped, bool):
+        return f"{size}s", _int_converter(subcon.signed, "little" if subcon.swapped else "big")
+    if isinstance(subcon, construct.Adapter) and subcon.__class__.__name__ == "UInt128Adapter":
+        return f"{size}s", _int_converter(False, "little")
+    if isinstance(subcon, construct.Array) and isinstance(subcon.subcon, construct.FormatField):
+        return f"{size}s", _array_converter(subcon.subcon.fmtstr)
+    return f"{size}s", subcon.parse
+
+
+class CompiledLayout:
+    def __init__(self, layout: construct.Struct, name: str) -> None:
+        """
+        Args:
+            layout: 定长的 construct Struct
+            name: 解析结果（namedtuple）的类型名
+        """
+        fmt = "<"
+        offset = 0
+        fields: list[str] = []
+        converters: dict[int, Converter] = {}
+        # 字段名 -> (偏移量, 单字段的 struct, 转换函数)
+        self._fields: dict[str, tuple[int, struct.Struct, Converter | None]] = {}
+        for subcon in layout.subcons:
+            name_ = subcon.name
+            inner = subcon.subcon if isinstance(subcon, construct.Renamed) else subcon
+            field_fmt, converter = _compile_field(inner)
+            fmt += field_fmt
+            if name_ is not None and not field_fmt.endswith("x"):
+                if converter is not None:
+                    converters[len(fields)] = converter
+                fields.append(name_)
+                self._fields[name_] = (offset, struct.Struct("<" + field_fmt), converter)
+            offset += inner.sizeof()
+
+        self.layout = layout
+        self.struct = struct.Struct(fmt)
+        if self.struct.size != offset:
+            raise ValueError(f"Failed to compile layout {name}: {self.struct.size} != {offset}")
+        self.size = offset
+        self.fields = tuple(fields)
+        self.record = namedtuple(name, fields)  # type: ignore
+        self._converters = tuple(converters.items())
+
+    def _make(self, values: tuple) -> Any:
+        if self._converters:
+            values_ = list(values)
+            for index, converter in self._converters:
+                values_[index] = converter(values_[index])
+            values = tuple(values_)
+        return self.record._make(values)
+
+    def parse(self, data: bytes, offset: int = 0) -> Any:
+        """解析整个账户，data 可以比结构体长（如账户末尾的 padding）"""
+        return self._make(self.struct.unpack_from(data, offset))
+
+    def parse_many(self, accounts: Iterable[bytes]) -> list:
+        """一次解析多个同结构的账户，每个账户只取前 size 个字节"""
+        size = self.size
+        buffer = b"".join(data[:size] for data in accounts)
+        return [self._make(values) for values in self.struct.iter_unpack(buffer)]
+
+    def reader(self, name: str) -> Callable[[bytes], Any]:
+        """返回读取单个字段的函数"""
+        offset, field, converter = self._fields[name]
+
+        if converter is None:
+
+            def _read(data: bytes) -> Any:
+                return field.unpack_from(data, offset)[0]
+        else:
+
+            def _read(data: bytes) -> Any:
+                return converter(field.unpack_from(data, offset)[0])
+
+        return _read
+
+    def offset_of(self, name: str) -> int:
+        return self._fields[name][0]
+
+    def view(self, data: bytes) -> "LayoutView":
+        return LayoutView(self, data)
+
+
+class LayoutView:
+    """惰性解析的账户，访问字段时才按偏移量解析，解析结果会被缓存"""
+
+    __slots__ = ("_data", "_layout", "_values")
+
+    def __init__(self, layout: CompiledLayout, data: bytes) -> None:
+        if len(data) < layout.size:
+            raise struct.error(f"{layout.record.__name__} requires {layout.size} bytes")
+        self._layout = layout
+        self._data = data
+        self._values: dict[str, Any] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        values = self._values
+        if name in values:
+            return values[name]
+        try:
+            offset, field, converter = self._layout._fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        value = field.unpack_from(self._data, offset)[0]
+        if converter is not None:
+            value = converter(value)
+        values[name] = value
+        return value
+
+    def __getitem__(self, name: str) -> Any:
+        return getattr(self, name)
@@ -1,7 +1,8 @@
-from .swap import SwapEvent, SwapResult
+from .swap import PendingSettlement, SwapEvent, SwapResult
 from .tx import SolAmountChange, TokenAmountChange, TxEvent, TxType
 
 __all__ = [
+    "PendingSettlement",
     "SolAmountChange",
     "SwapEvent",
     "SwapResult",
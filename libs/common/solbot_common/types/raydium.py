@@ -6,7 +6,7 @@ from solders.pubkey import Pubkey  # type: ignore
 from typing_extensions import Self
 
 from solbot_common.constants import OPEN_BOOK_PROGRAM, RAY_AUTHORITY_V4, TOKEN_PROGRAM_ID
-from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_LAYOUT_V4, MARKET_STATE_LAYOUT_V3
+from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_V4, MARKET_STATE_V3
 
 
 def bytes_of(value):
@@ -44,8 +44,9 @@ class AmmV4PoolKeys:
         else:
             amm_id = pool_id
         try:
-            amm_data_decoded = LIQUIDITY_STATE_LAYOUT_V4.parse(amm_data)
-            market_decoded = MARKET_STATE_LAYOUT_V3.parse(market_data)
+            # 只解析用到的字段
+            amm_data_decoded = LIQUIDITY_STATE_V4.view(amm_data)
+            market_decoded = MARKET_STATE_V3.view(market_data)
             marketId = Pubkey.from_bytes(amm_data_decoded.serumMarket)
             vault_signer_nonce = market_decoded.vault_signer_nonce
         except Exception as e:
@@ -81,6 +82,25 @@ class AmmV4PoolKeys:
 
         return pool_keys
 
+    @classmethod
+    def from_accounts(
+        cls,
+        pool_id: Pubkey,
+        base_decimals: int,
+        quote_decimals: int,
+        accounts: dict[str, Pubkey],
+    ) -> Self:
+        """由已解析的账户构造，不需要 AMM 与 market 账户的原始数据"""
+        return cls(
+            amm_id=pool_id,
+            base_decimals=base_decimals,
+            quote_decimals=quote_decimals,
+            ray_authority_v4=RAY_AUTHORITY_V4,
+            open_book_program=OPEN_BOOK_PROGRAM,
+            token_program_id=TOKEN_PROGRAM_ID,
+            **accounts,
+        )
+
 
 @dataclass
 class CpmmPoolKeys:
@@ -65,3 +65,18 @@ class SwapResult(BaseModel):
     @classmethod
     def from_json(cls, json_str: str) -> "Self":
         return cls.model_validate_json(json_str)
+
+
+class PendingSettlement(BaseModel):
+    """已发送、等待结算的交易"""
+
+    swap_event: SwapEvent
+    transaction_hash: str | None = None  # 为空表示交易未发送成功
+    submmit_time: int  # unix timestamp
+
+    def to_json(self) -> str:
+        return self.model_dump_json()
+
+    @classmethod
+    def from_json(cls, json_str: str) -> "Self":
+        return cls.model_validate_json(json_str)
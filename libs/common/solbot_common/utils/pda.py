@@ -0,0 +1,61 @@
+"""PDA / ATA 地址推导缓存
+
+Pubkey.find_program_address 需要从 bump=255 开始逐个尝试 SHA-256，直到得到不在曲线上的地址，
+交易构建时 bonding curve、creator vault、ATA 等地址每笔交易都要推导好几次。
+地址推导是纯函数，(seeds, program) 相同时结果不变，因此在进程内用有界的 LRU 缓存结果。
+"""
+
+from collections.abc import Sequence
+from functools import lru_cache
+
+from solders.pubkey import Pubkey  # type: ignore
+from spl.token.constants import (
+    ASSOCIATED_TOKEN_PROGRAM_ID,
+    TOKEN_2022_PROGRAM_ID,
+    TOKEN_PROGRAM_ID,
+)
+
+# 缓存的最大地址数量，每条约 200 字节
+DERIVATION_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=DERIVATION_CACHE_SIZE)
+def _find_program_address(seeds: tuple[bytes, ...], program: Pubkey) -> tuple[Pubkey, int]:
+    return Pubkey.find_program_address(list(seeds), program)
+
+
+def find_program_address(seeds: Sequence[bytes], program: Pubkey) -> tuple[Pubkey, int]:
+    """带缓存的 Pubkey.find_program_address
+
+    Returns:
+        Tuple of (program address, bump seed)
+    """
+    return _find_program_address(tuple(seeds), program)
+
+
+def get_associated_token_address(
+    owner: Pubkey, mint: Pubkey, token_program_id: Pubkey = TOKEN_PROGRAM_ID
+) -> Pubkey:
+    """带缓存的 spl.token.instructions.get_associated_token_address"""
+    if token_program_id not in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID):
+        raise ValueError(
+            "token_program_id must be one of TOKEN_PROGRAM_ID or TOKEN_2022_PROGRAM_ID."
+        )
+    return _find_program_address(
+        (bytes(owner), bytes(token_program_id), bytes(mint)), ASSOCIATED_TOKEN_PROGRAM_ID
+    )[0]
+
+
+def derivation_cache_stats() -> dict[str, int]:
+    """返回缓存的命中次数、未命中次数与当前大小"""
+    info = _find_program_address.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize or 0,
+    }
+
+
+def clear_derivation_cache() -> None:
+    _find_program_address.cache_clear()
@@ -20,12 +20,13 @@ from solbot_common.constants import (
     TOKEN_PROGRAM_ID,
     WSOL,
 )
-from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_LAYOUT_V4, MARKET_STATE_LAYOUT_V3
-from solbot_common.layouts.clmm import CLMM_POOL_STATE_LAYOUT
-from solbot_common.layouts.cpmm import CPMM_POOL_STATE_LAYOUT
+from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_V4, MARKET_STATE_V3
+from solbot_common.layouts.clmm import CLMM_POOL_STATE
+from solbot_common.layouts.cpmm import CPMM_POOL_STATE
 from solbot_common.log import logger
 from solbot_common.types.raydium import DIRECTION, AmmV4PoolKeys, ClmmPoolKeys, CpmmPoolKeys
 from solbot_common.utils import get_async_client
+from solbot_common.utils.pda import find_program_address
 
 
 class AMMData(TypedDict):
@@ -40,8 +41,7 @@ async def fetch_pool_data_from_rpc(pool_id: Pubkey, rpc_client: AsyncClient) ->
     if resp.value is None:
         return None
     amm_data = bytes(resp.value.data)
-    amm_data_decoded = LIQUIDITY_STATE_LAYOUT_V4.parse(amm_data)
-    market_id = Pubkey.from_bytes(amm_data_decoded.serumMarket)
+    market_id = Pubkey.from_bytes(LIQUIDITY_STATE_V4.view(amm_data).serumMarket)
 
     resp = await rpc_client.get_account_info_json_parsed(market_id, commitment=commitment.Processed)
     if resp.value is None:
@@ -57,7 +57,7 @@ async def fetch_pool_data_from_rpc(pool_id: Pubkey, rpc_client: AsyncClient) ->
     }
 
 
-@cached(ttl=60)
+@cached(ttl=60, local=True, negative_ttl=10)
 async def fetch_amm_v4_pool_keys(pool_id: str) -> AmmV4PoolKeys | None:
     def bytes_of(value):
         if not (0 <= value < 2**64):
@@ -70,13 +70,13 @@ async def fetch_amm_v4_pool_keys(pool_id: str) -> AmmV4PoolKeys | None:
     resp = await client.get_account_info_json_parsed(amm_id, commitment=Processed)
     if resp.value is None:
         return None
-    amm_data_decoded = LIQUIDITY_STATE_LAYOUT_V4.parse(bytes(resp.value.data))
+    amm_data_decoded = LIQUIDITY_STATE_V4.view(bytes(resp.value.data))
 
     marketId = Pubkey.from_bytes(amm_data_decoded.serumMarket)
     resp = await client.get_account_info_json_parsed(marketId, commitment=Processed)
     if resp.value is None:
         return None
-    market_decoded = MARKET_STATE_LAYOUT_V3.parse(bytes(resp.value.data))
+    market_decoded = MARKET_STATE_V3.view(bytes(resp.value.data))
     vault_signer_nonce = market_decoded.vault_signer_nonce
 
     ray_authority_v4 = RAY_AUTHORITY_V4
@@ -118,7 +118,7 @@ async def fetch_cpmm_pool_keys(pool_id: str) -> CpmmPoolKeys | None:
         resp = await client.get_account_info_json_parsed(pool_state, commitment=Processed)
         if resp.value is None:
             return None
-        parsed_data = CPMM_POOL_STATE_LAYOUT.parse(bytes(resp.value.data))
+        parsed_data = CPMM_POOL_STATE.parse(bytes(resp.value.data))
 
         pool_keys = CpmmPoolKeys(
             pool_state=pool_state,
@@ -160,14 +160,14 @@ async def fetch_clmm_pool_keys(pool_id: str, zero_for_one: bool = True) -> ClmmP
         return (tick_current // (tick_spacing * tick_array_size)) * (tick_spacing * tick_array_size)
 
     def get_pda_tick_array_address(pool_id: Pubkey, start_index: int):
-        tick_array, _ = Pubkey.find_program_address(
+        tick_array, _ = find_program_address(
             [b"tick_array", bytes(pool_id), struct.pack(">i", start_index)],
             RAYDIUM_CLMM,
         )
         return tick_array
 
     def get_pda_tick_array_bitmap_extension(pool_id: Pubkey):
-        bitmap_extension, _ = Pubkey.find_program_address(
+        bitmap_extension, _ = find_program_address(
             [b"pool_tick_array_bitmap_extension", bytes(pool_id)], RAYDIUM_CLMM
         )
         return bitmap_extension
@@ -178,7 +178,7 @@ async def fetch_clmm_pool_keys(pool_id: str, zero_for_one: bool = True) -> ClmmP
         resp = await client.get_account_info_json_parsed(pool_state, commitment=Processed)
         if resp.value is None:
             return None
-        parsed_data = CLMM_POOL_STATE_LAYOUT.parse(bytes(resp.value.data))
+        parsed_data = CLMM_POOL_STATE.parse(bytes(resp.value.data))
 
         tick_spacing = int(parsed_data.tick_spacing)
         tick_current = int(parsed_data.tick_current)
@@ -374,12 +374,7 @@ def make_clmm_swap_instruction(
 
 async def get_amm_v4_reserves(pool_keys: AmmV4PoolKeys) -> tuple:
     quote_vault = pool_keys.quote_vault
-    quote_decimal = pool_keys.quote_decimals
-    quote_mint = pool_keys.quote_mint
-
     base_vault = pool_keys.base_vault
-    base_decimal = pool_keys.base_decimals
-    base_mint = pool_keys.base_mint
 
     client = get_async_client()
     balances_response = await client.get_multiple_accounts_json_parsed(
@@ -387,11 +382,6 @@ async def get_amm_v4_reserves(pool_keys: AmmV4PoolKeys) -> tuple:
     )
     balances = balances_response.value
 
-    balances_response = await client.get_multiple_accounts_json_parsed(
-        [quote_vault, base_vault], Processed
-    )
-    balances = balances_response.value
-
     try:
         quote_account = balances[0]
         base_account = balances[1]
@@ -404,17 +394,35 @@ async def get_amm_v4_reserves(pool_keys: AmmV4PoolKeys) -> tuple:
     except Exception as e:
         raise ValueError(f"Error occurred: {e}")
 
+    return calc_amm_v4_reserves(pool_keys, quote_account_balance, base_account_balance)
+
+
+def calc_amm_v4_reserves(
+    pool_keys: AmmV4PoolKeys,
+    quote_account_balance: float | None,
+    base_account_balance: float | None,
+) -> tuple:
+    """根据池子两个 vault 的余额计算储备量
+
+    Args:
+        pool_keys: 池子密钥
+        quote_account_balance: quote vault 的余额（ui amount）
+        base_account_balance: base vault 的余额（ui amount）
+
+    Returns:
+        tuple: (代币储备量, SOL 储备量, 代币精度)
+    """
     if quote_account_balance is None or base_account_balance is None:
         raise ValueError("Error: One of the account balances is None.")
 
-    if base_mint == WSOL:
+    if pool_keys.base_mint == WSOL:
         base_reserve = quote_account_balance
         quote_reserve = base_account_balance
-        token_decimal = quote_decimal
+        token_decimal = pool_keys.quote_decimals
     else:
         base_reserve = base_account_balance
         quote_reserve = quote_account_balance
-        token_decimal = base_decimal
+        token_decimal = pool_keys.base_decimals
 
     return base_reserve, quote_reserve, token_decimal
 
@@ -0,0 +1,347 @@
+"""本地报价
+
+根据链上的池子状态在本地计算兑换数量，不需要调用 Jupiter 的报价 API。
+所有计算都使用整数（最小单位），取整方式与链上程序一致：输入方向向上取整，输出方向向下取整。
+
+支持：
+- pump.fun bonding curve
+- Raydium AMM v4 / CPMM（恒定乘积）
+- Raydium CLMM（集中流动性，按 tick 计算）
+
+每种池子都提供 quote_many，对同一个池子状态一次计算多个数量（如同一笔跟单的所有跟单钱包）。
+方向统一使用 buy 表示：buy=True 为 SOL 换代币，buy=False 为代币换 SOL。
+"""
+
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from decimal import ROUND_FLOOR, Decimal, localcontext
+from fractions import Fraction
+
+from solbot_common.constants import WSOL
+from solbot_common.layouts.bonding_curve_account import BondingCurveAccount
+from solbot_common.types.raydium import AmmV4PoolKeys
+
+BPS_DENOMINATOR = 10_000
+# pump.fun 交易手续费（协议费与创建者费用之和）
+PUMP_FEE_BPS = 100
+# Raydium AMM v4 交易手续费 0.25%
+AMM_V4_FEE_NUMERATOR = 25
+AMM_V4_FEE_DENOMINATOR = 10_000
+# Raydium CPMM 与 CLMM 的费率以百万分之一为单位
+FEE_RATE_DENOMINATOR = 1_000_000
+CPMM_DEFAULT_TRADE_FEE_RATE = 2_500
+
+Q64 = 1 << 64
+# Raydium CLMM 的 tick 与 sqrt price 范围
+MIN_TICK = -443636
+MAX_TICK = 443636
+MIN_SQRT_PRICE_X64 = 4295048016
+MAX_SQRT_PRICE_X64 = 79226673521066979257578248091
+
+
+def _ceil_div(a: int, b: int) -> int:
+    return -(-a // b)
+
+
+class Quoter(ABC):
+    """池子报价的基类"""
+
+    @abstractmethod
+    def quote(self, amount_in: int, buy: bool) -> int:
+        """输入 amount_in 时的输出数量（扣除手续费）"""
+
+    @abstractmethod
+    def spot_out(self, amount_in: int, buy: bool) -> Fraction:
+        """按当前价格（不考虑价格冲击）兑换时的输出数量，已扣除手续费"""
+
+    def quote_many(self, amounts_in: Sequence[int], buy: bool) -> list[int]:
+        return [self.quote(amount_in, buy) for amount_in in amounts_in]
+
+    def price_impact(self, amount_in: int, buy: bool) -> float:
+        """价格冲击，0~1 的小数，与 Jupiter 报价中的 priceImpactPct 含义相同"""
+        spot_out = self.spot_out(amount_in, buy)
+        if spot_out <= 0:
+            return 1.0
+        return max(float(1 - self.quote(amount_in, buy) / spot_out), 0.0)
+
+    def price_impact_many(self, amounts_in: Sequence[int], buy: bool) -> list[float]:
+        return [self.price_impact(amount_in, buy) for amount_in in amounts_in]
+
+
+@dataclass
+class PumpCurveQuoter(Quoter):
+    """pump.fun bonding curve，买入时手续费从输入的 SOL 中扣除，卖出时从输出的 SOL 中扣除"""
+
+    virtual_sol_reserves: int
+    virtual_token_reserves: int
+    real_token_reserves: int
+    fee_bps: int = PUMP_FEE_BPS
+
+    @classmethod
+    def from_account(
+        cls, account: BondingCurveAccount, fee_bps: int = PUMP_FEE_BPS
+    ) -> "PumpCurveQuoter":
+        return cls(
+            virtual_sol_reserves=account.virtual_sol_reserves,
+            virtual_token_reserves=account.virtual_token_reserves,
+            real_token_reserves=account.real_token_reserves,
+            fee_bps=fee_bps,
+        )
+
+    def _net_sol_in(self, sol_in: int) -> int:
+        return sol_in * BPS_DENOMINATOR // (BPS_DENOMINATOR + self.fee_bps)
+
+    def quote(self, amount_in: int, buy: bool) -> int:
+        if amount_in <= 0:
+            return 0
+        if buy:
+            sol_in = self._net_sol_in(amount_in)
+            k = self.virtual_sol_reserves * self.virtual_token_reserves
+            token_out = self.virtual_token_reserves - (
+                k // (self.virtual_sol_reserves + sol_in) + 1
+            )
+            return max(min(token_out, self.real_token_reserves), 0)
+        sol_out = amount_in * self.virtual_sol_reserves // (self.virtual_token_reserves + amount_in)
+        return sol_out - sol_out * self.fee_bps // BPS_DENOMINATOR
+
+    def spot_out(self, amount_in: int, buy: bool) -> Fraction:
+        if buy:
+            return Fraction(
+                self._net_sol_in(amount_in) * self.virtual_token_reserves,
+                self.virtual_sol_reserves,
+            )
+        sol_out = Fraction(amount_in * self.virtual_sol_reserves, self.virtual_token_reserves)
+        return sol_out * (BPS_DENOMINATOR - self.fee_bps) / BPS_DENOMINATOR
+
+
+@dataclass
+class ConstantProductQuoter(Quoter):
+    """恒定乘积池（Raydium AMM v4、CPMM），手续费从输入中扣除并向上取整
+
+    Attributes:
+        token_reserve: 代币的储备量（最小单位）
+        sol_reserve: SOL 的储备量（lamports）
+    """
+
+    token_reserve: int
+    sol_reserve: int
+    fee_numerator: int = AMM_V4_FEE_NUMERATOR
+    fee_denominator: int = AMM_V4_FEE_DENOMINATOR
+
+    @classmethod
+    def from_amm_v4(
+        cls, pool_keys: AmmV4PoolKeys, base_vault_amount: int, quote_vault_amount: int
+    ) -> "ConstantProductQuoter":
+        """根据 AMM v4 池子两个 vault 的余额（最小单位）创建"""
+        if pool_keys.base_mint == WSOL:
+            return cls(token_reserve=quote_vault_amount, sol_reserve=base_vault_amount)
+        return cls(token_reserve=base_vault_amount, sol_reserve=quote_vault_amount)
+
+    @classmethod
+    def cpmm(
+        cls, token_reserve: int, sol_reserve: int, trade_fee_rate: int = CPMM_DEFAULT_TRADE_FEE_RATE
+    ) -> "ConstantProductQuoter":
+        return cls(token_reserve, sol_reserve, trade_fee_rate, FEE_RATE_DENOMINATOR)
+
+    def _reserves(self, buy: bool) -> tuple[int, int]:
+        return (
+            (self.sol_reserve, self.token_reserve)
+            if buy
+            else (self.token_reserve, self.sol_reserve)
+        )
+
+    def _net_in(self, amount_in: int) -> int:
+        fee = _ceil_div(amount_in * self.fee_numerator, self.fee_denominator)
+        return amount_in - fee
+
+    def quote(self, amount_in: int, buy: bool) -> int:
+        if amount_in <= 0:
+            return 0
+        reserve_in, reserve_out = self._reserves(buy)
+        net_in = self._net_in(amount_in)
+        return reserve_out * net_in // (reserve_in + net_in)
+
+    def quote_many(self, amounts_in: Sequence[int], buy: bool) -> list[int]:
+        reserve_in, reserve_out = self._reserves(buy)
+        result = []
+        for amount_in in amounts_in:
+            net_in = self._net_in(amount_in) if amount_in > 0 else 0
+            result.append(reserve_out * net_in // (reserve_in + net_in))
+        return result
+
+    def spot_out(self, amount_in: int, buy: bool) -> Fraction:
+        reserve_in, reserve_out = self._reserves(buy)
+        return Fraction(self._net_in(amount_in) * reserve_out, reserve_in)
+
+
+def tick_to_sqrt_price_x64(tick: int) -> int:
+    """tick 对应的 sqrt price（Q64.64）"""
+    if not MIN_TICK <= tick <= MAX_TICK:
+        raise ValueError(f"tick out of range: {tick}")
+    with localcontext() as ctx:
+        ctx.prec = 60
+        return int(Decimal("1.0001") ** (Decimal(tick) / 2) * Q64)
+
+
+def _amount_0_delta(sqrt_a: int, sqrt_b: int, liquidity: int, round_up: bool) -> int:
+    """价格在 [sqrt_a, sqrt_b] 之间变化时 token 0 的数量"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator = liquidity * Q64 * (sqrt_b - sqrt_a)
+    if round_up:
+        return _ceil_div(_ceil_div(numerator, sqrt_b), sqrt_a)
+    return numerator // sqrt_b // sqrt_a
+
+
+def _amount_1_delta(sqrt_a: int, sqrt_b: int, liquidity: int, round_up: bool) -> int:
+    """价格在 [sqrt_a, sqrt_b] 之间变化时 token 1 的数量"""
+    if sqrt_a > sqrt_b:
+        sqrt_a, sqrt_b = sqrt_b, sqrt_a
+    numerator = liquidity * (sqrt_b - sqrt_a)
+    return _ceil_div(numerator, Q64) if round_up else numerator // Q64
+
+
+def _next_sqrt_price(sqrt_price: int, liquidity: int, amount_in: int, zero_for_one: bool) -> int:
+    """输入 amount_in 后的 sqrt price"""
+    if zero_for_one:
+        # 输入 token 0，价格下降，向上取整
+        numerator = liquidity * Q64
+        return _ceil_div(numerator * sqrt_price, numerator + amount_in * sqrt_price)
+    # 输入 token 1，价格上升，向下取整
+    return sqrt_price + amount_in * Q64 // liquidity
+
+
+def clmm_swap_step(
+    sqrt_price_x64: int,
+    sqrt_price_target_x64: int,
+    liquidity: int,
+    amount_remaining: int,
+    fee_rate: int,
+) -> tuple[int, int, int, int]:
+    """在同一个 tick 区间内兑换
+
+    Returns:
+        (兑换后的 sqrt price, 消耗的输入数量, 输出数量, 手续费)
+    """
+    zero_for_one = sqrt_price_x64 >= sqrt_price_target_x64
+    amount_remaining_less_fee = (
+        amount_remaining * (FEE_RATE_DENOMINATOR - fee_rate) // FEE_RATE_DENOMINATOR
+    )
+    if zero_for_one:
+        amount_in = _amount_0_delta(sqrt_price_target_x64, sqrt_price_x64, liquidity, True)
+    else:
+        amount_in = _amount_1_delta(sqrt_price_x64, sqrt_price_target_x64, liquidity, True)
+
+    if amount_remaining_less_fee >= amount_in:
+        sqrt_price_next = sqrt_price_target_x64
+    else:
+        sqrt_price_next = _next_sqrt_price(
+            sqrt_price_x64, liquidity, amount_remaining_less_fee, zero_for_one
+        )
+
+    reached_target = sqrt_price_next == sqrt_price_target_x64
+    if zero_for_one:
+        if not reached_target:
+            amount_in = _amount_0_delta(sqrt_price_next, sqrt_price_x64, liquidity, True)
+        amount_out = _amount_1_delta(sqrt_price_next, sqrt_price_x64, liquidity, False)
+    else:
+        if not reached_target:
+            amount_in = _amount_1_delta(sqrt_price_x64, sqrt_price_next, liquidity, True)
+        amount_out = _amount_0_delta(sqrt_price_x64, sqrt_price_next, liquidity, False)
+
+    if reached_target:
+        fee = _ceil_div(amount_in * fee_rate, FEE_RATE_DENOMINATOR - fee_rate)
+    else:
+        # 没有到达区间边界时，剩余的输入都作为手续费
+        fee = amount_remaining - amount_in
+    return sqrt_price_next, amount_in, amount_out, fee
+
+
+@dataclass
+class ClmmQuoter(Quoter):
+    """集中流动性池（Raydium CLMM）
+
+    Attributes:
+        sqrt_price_x64: 当前的 sqrt price（Q64.64）
+        liquidity: 当前区间的流动性
+        fee_rate: 交易费率（百万分之一）
+        token_is_mint_0: 代币是否为池子的 token 0（SOL 为另一侧）
+        ticks: 已初始化的 tick 及其 liquidity_net，用于跨区间计算。
+            未提供时只在当前区间内计算，超出部分按流动性耗尽处理
+    """
+
+    sqrt_price_x64: int
+    liquidity: int
+    fee_rate: int
+    token_is_mint_0: bool
+    ticks: dict[int, int] = field(default_factory=dict)
+
+    def _zero_for_one(self, buy: bool) -> bool:
+        # 买入时输入 SOL：SOL 为 token 1 时输入 token 1，价格上升
+        return not buy if self.token_is_mint_0 else buy
+
+    def _ticks_in_direction(self, zero_for_one: bool) -> list[tuple[int, int]]:
+        if not self.ticks:
+            return []
+        current = self._current_tick()
+        if zero_for_one:
+            return sorted(((t, n) for t, n in self.ticks.items() if t <= current), reverse=True)
+        return sorted((t, n) for t, n in self.ticks.items() if t > current)
+
+    def _current_tick(self) -> int:
+        with localcontext() as ctx:
+            ctx.prec = 60
+            price = (Decimal(self.sqrt_price_x64) / Q64) ** 2
+            tick = int(
+                (price.ln() / Decimal("1.0001").ln()).to_integral_value(rounding=ROUND_FLOOR)
+            )
+        # 修正计算误差
+        while tick_to_sqrt_price_x64(tick) > self.sqrt_price_x64:
+            tick -= 1
+        while tick_to_sqrt_price_x64(tick + 1) <= self.sqrt_price_x64:
+            tick += 1
+        return tick
+
+    def quote(self, amount_in: int, buy: bool) -> int:
+        if amount_in <= 0:
+            return 0
+        zero_for_one = self._zero_for_one(buy)
+        limit = MIN_SQRT_PRICE_X64 if zero_for_one else MAX_SQRT_PRICE_X64
+        sqrt_price = self.sqrt_price_x64
+        liquidity = self.liquidity
+        remaining = amount_in
+        amount_out = 0
+        for tick, liquidity_net in [*self._ticks_in_direction(zero_for_one), (None, 0)]:
+            if remaining <= 0 or liquidity <= 0:
+                break
+            target = tick_to_sqrt_price_x64(tick) if tick is not None else limit
+            sqrt_price, step_in, step_out, fee = clmm_swap_step(
+                sqrt_price, target, liquidity, remaining, self.fee_rate
+            )
+            remaining -= step_in + fee
+            amount_out += step_out
+            if sqrt_price != target:
+                break
+            # 跨过 tick，更新流动性
+            liquidity += -liquidity_net if zero_for_one else liquidity_net
+        return amount_out
+
+    def spot_out(self, amount_in: int, buy: bool) -> Fraction:
+        net_in = Fraction(amount_in * (FEE_RATE_DENOMINATOR - self.fee_rate), FEE_RATE_DENOMINATOR)
+        # token 1 / token 0
+        price = Fraction(self.sqrt_price_x64 * self.sqrt_price_x64, Q64 * Q64)
+        if self._zero_for_one(buy):
+            return net_in * price
+        return net_in / price
+
+
+def slippage_from_price_impact(
+    price_impact: float,
+    min_slippage_bps: int = 250,
+    max_slippage_bps: int = 3000,
+    price_impact_multiplier: float = 1.5,
+) -> int:
+    """根据价格冲击（0~1 的小数）计算滑点，返回 bps"""
+    slippage_bps = price_impact * BPS_DENOMINATOR * price_impact_multiplier
+    return int(min(max(slippage_bps, min_slippage_bps), max_slippage_bps))
@@ -0,0 +1,162 @@
+"""交易前后的余额变化
+
+根据交易 meta 中的 sol 余额与 token 余额计算账户的余额变化，
+与数据来源（rpc getTransaction 的 json / geyser 推送的 protobuf）无关。
+"""
+
+from typing import NamedTuple, TypedDict
+
+from solbot_common.constants import TOKEN_PROGRAM_ID, WSOL
+from solbot_common.types import TokenAmountChange
+
+_TOKEN_PROGRAM_ID = str(TOKEN_PROGRAM_ID)
+_WSOL = str(WSOL)
+
+
+class TokenBalance(NamedTuple):
+    """交易前后某个 token 账户的余额"""
+
+    mint: str
+    owner: str
+    program_id: str
+    amount: int
+    decimals: int
+    # token 账户在交易账户列表中的位置，与 meta 中 pre/post balances 的下标对应
+    account_index: int = -1
+
+    @classmethod
+    def from_rpc(cls, balance: dict) -> "TokenBalance":
+        return cls(
+            mint=balance["mint"],
+            owner=balance["owner"],
+            program_id=balance["programId"],
+            amount=int(balance["uiTokenAmount"]["amount"]),
+            decimals=balance["uiTokenAmount"]["decimals"],
+            account_index=balance.get("accountIndex", -1),
+        )
+
+    @classmethod
+    def from_proto(cls, balance) -> "TokenBalance":
+        """从 geyser 推送的 protobuf TokenBalance 构建"""
+        ui_token_amount = balance.ui_token_amount
+        return cls(
+            mint=balance.mint,
+            owner=balance.owner,
+            program_id=balance.program_id,
+            amount=int(ui_token_amount.amount),
+            decimals=ui_token_amount.decimals,
+            account_index=balance.account_index,
+        )
+
+
+class SwapBalanceChange(TypedDict):
+    """swap 交易中签名者的余额变化，sol 以 lamports 为单位，token 以最小单位表示"""
+
+    fee: int
+    # 不含交易手续费的 sol 变化
+    sol_change: int
+    # 用于 swap 的 sol 变化
+    swap_sol_change: int
+    # 其他 sol 变化，如创建/关闭 token 账户的租金
+    other_sol_change: int
+    token_change: int
+    token_decimals: int
+
+
+def get_traded_mint(
+    pre_token_balances: list[TokenBalance],
+    post_token_balances: list[TokenBalance],
+    owner: str,
+) -> str:
+    """获取 owner 交易的代币（WSOL 以外的 SPL Token）
+
+    Raises:
+        ValueError: 没有找到交易的代币
+    """
+    for token_balance in post_token_balances + pre_token_balances:
+        if token_balance.owner != owner:
+            continue
+        if token_balance.program_id == _TOKEN_PROGRAM_ID and token_balance.mint != _WSOL:
+            return token_balance.mint
+    raise ValueError("mint not found")
+
+
+def get_token_amount_change(
+    pre_token_balances: list[TokenBalance],
+    post_token_balances: list[TokenBalance],
+    owner: str,
+    mint: str,
+) -> TokenAmountChange:
+    """获取 owner 持有的 mint 代币在交易前后的变化"""
+    pre_token_amount = 0
+    post_token_amount = 0
+    decimals = 6
+    for pre_token_balance in pre_token_balances:
+        if pre_token_balance.mint == mint and pre_token_balance.owner == owner:
+            pre_token_amount = pre_token_balance.amount
+            decimals = pre_token_balance.decimals
+            break
+
+    for post_token_balance in post_token_balances:
+        if post_token_balance.mint == mint and post_token_balance.owner == owner:
+            post_token_amount = post_token_balance.amount
+            decimals = post_token_balance.decimals
+            break
+
+    return {
+        "change_amount": post_token_amount - pre_token_amount,
+        "decimals": decimals,
+        "pre_balance": pre_token_amount,
+        "post_balance": post_token_amount,
+    }
+
+
+def get_swap_balance_change(
+    fee: int,
+    pre_balances: list[int],
+    post_balances: list[int],
+    pre_token_balances: list[TokenBalance],
+    post_token_balances: list[TokenBalance],
+    owner: str,
+    mint: str,
+) -> SwapBalanceChange:
+    """计算签名者（pre/post balances 中的第一个账户）在 swap 交易中的余额变化
+
+    - sol_change: 签名者 sol 余额的变化（加回手续费），加上其 WSOL 账户中 WSOL 数量的变化
+    - other_sol_change: 签名者的 token 账户中租金的变化（创建账户时支付，关闭账户时退回）
+    - swap_sol_change: 其余的 sol 变化，即 swap 本身花费或得到的 sol
+      （交易中转给第三方的小费等也计入其中）
+
+    在同一笔交易中创建并关闭的临时 WSOL 账户不会出现在 token 余额中，
+    其 sol 已体现在签名者的 sol 余额变化中。
+    """
+    sol_change = post_balances[0] - pre_balances[0] + fee
+    other_sol_change = 0
+
+    pre_by_index = {b.account_index: b for b in pre_token_balances if b.owner == owner}
+    post_by_index = {b.account_index: b for b in post_token_balances if b.owner == owner}
+    for index in pre_by_index.keys() | post_by_index.keys():
+        if index < 0:
+            continue
+        lamports_change = post_balances[index] - pre_balances[index]
+        balance = post_by_index.get(index) or pre_by_index[index]
+        if balance.mint == _WSOL:
+            pre_amount = pre_by_index[index].amount if index in pre_by_index else 0
+            post_amount = post_by_index[index].amount if index in post_by_index else 0
+            wsol_change = post_amount - pre_amount
+            sol_change += wsol_change
+            other_sol_change -= lamports_change - wsol_change
+        else:
+            other_sol_change -= lamports_change
+
+    token_amount_change = get_token_amount_change(
+        pre_token_balances, post_token_balances, owner, mint
+    )
+    return {
+        "fee": fee,
+        "sol_change": sol_change,
+        "swap_sol_change": sol_change - other_sol_change,
+        "other_sol_change": other_sol_change,
+        "token_change": token_amount_change["change_amount"],
+        "token_decimals": token_amount_change["decimals"],
+    }
@@ -1,4 +1,5 @@
 import asyncio
+from collections.abc import Iterable
 from decimal import Decimal
 from functools import cache
 
@@ -10,12 +11,13 @@ from solders.keypair import Keypair  # type: ignore
 from solders.pubkey import Pubkey  # type: ignore
 from solders.signature import Signature  # type: ignore
 from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
-from spl.token.instructions import get_associated_token_address
 
 from solbot_common.exceptions import BondingCurveNotFound
 from solbot_common.layouts.bonding_curve_account import BondingCurveAccount
 from solbot_common.layouts.global_account import GlobalAccount
 from solbot_common.layouts.mint_account import MintAccount
+from solbot_common.utils.pda import find_program_address, get_associated_token_address
+from solbot_common.utils.quote import slippage_from_price_impact
 
 
 def get_bonding_curve_pda(mint: Pubkey, program: Pubkey) -> tuple[Pubkey, int]:
@@ -30,7 +32,7 @@ def get_bonding_curve_pda(mint: Pubkey, program: Pubkey) -> tuple[Pubkey, int]:
         Tuple of (bonding curve address, bump seed)
     """
 
-    return Pubkey.find_program_address([b"bonding-curve", bytes(mint)], program)
+    return find_program_address([b"bonding-curve", bytes(mint)], program)
 
 
 def get_bonding_curve_pda_creator_vault(mint: Pubkey, program: Pubkey):
@@ -46,7 +48,7 @@ def get_bonding_curve_pda_creator_vault(mint: Pubkey, program: Pubkey):
     """
     # creator - vault
     # return Pubkey.find_program_address([b"bonding-curve", bytes(mint)], program)
-    return Pubkey.find_program_address([b"creator-vault", bytes(mint)], program)
+    return find_program_address([b"creator-vault", bytes(mint)], program)
 
 
 async def get_bonding_curve_account(
@@ -113,6 +115,19 @@ def get_associated_bonding_curve(bonding_curve: Pubkey, mint: Pubkey) -> Pubkey:
     return get_associated_token_address(bonding_curve, mint)
 
 
+def warm_pda_cache(holdings: Iterable[tuple[Pubkey, Pubkey]], program: Pubkey) -> None:
+    """预先推导钱包持有代币交易时需要的地址，之后交易构建时直接命中缓存
+
+    Args:
+        holdings: (钱包地址, 代币地址) 列表
+        program: pump.fun 程序地址
+    """
+    for owner, mint in holdings:
+        get_associated_token_address(owner, mint)
+        bonding_curve, _ = get_bonding_curve_pda(mint, program)
+        get_associated_token_address(bonding_curve, mint)
+
+
 @cache
 def get_client() -> Client:
     """获取 Solana RPC 客户端
@@ -295,20 +310,15 @@ async def calculate_auto_slippage(
         )  # type: ignore[reportArgumentType]
 
         # price_impact 是 0~1 的小数
-        price_impact = Decimal(quote["priceImpactPct"])
-        # 转换为百分比
-        price_impact_pct = float(price_impact * 100)
-
-        # 基础滑点为 price impact 的倍数
-        slippage = price_impact_pct * price_impact_multiplier
-        slippage = max(slippage, min_slippage_bps / 100)
-        slippage = min(slippage, max_slippage_bps / 100)
-
+        price_impact = float(Decimal(quote["priceImpactPct"]))
+        slippage_bps = slippage_from_price_impact(
+            price_impact, min_slippage_bps, max_slippage_bps, price_impact_multiplier
+        )
         logger.info(
-            f"Slippage calculation: price_impact={price_impact_pct}%, "
-            f"multiplier={price_impact_multiplier}, final_slippage={slippage}%"
+            f"Slippage calculation: price_impact={price_impact * 100}%, "
+            f"multiplier={price_impact_multiplier}, final_slippage={slippage_bps} bps"
         )
-        return int(slippage * 100)  # 转换为 bps
+        return slippage_bps
     except Exception as e:
         logger.warning(f"Unexpected error while calculating slippage: {e}")
         return default_slippage_bps
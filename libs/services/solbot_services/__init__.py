@@ -1,5 +1,6 @@
 from .bot_setting import BotSettingService
 from .copytrade import CopyTradeService
+from .copytrade_index import CopyTradeIndex
 from .holding import HoldingService
 
-__all__ = ["BotSettingService", "CopyTradeService", "HoldingService"]
+__all__ = ["BotSettingService", "CopyTradeIndex", "CopyTradeService", "HoldingService"]
@@ -1,3 +1,4 @@
+import asyncio
 from asyncio.queues import Queue
 
 from solbot_common.log import logger
@@ -15,9 +16,10 @@ class BenchmarkService:
     def __init__(self):
         self.q = Queue()
         self.redis = None
+        self.is_running = False
 
     async def connect_redis(self):
-        self.redis = await RedisClient.get_instance()
+        self.redis = RedisClient.get_instance()
 
     async def add(self, item):
         await self.q.put(item)
@@ -29,6 +31,10 @@ class BenchmarkService:
                 await self.redis.ping()
             except AssertionError:
                 await self.connect_redis()
+            except Exception as e:
+                logger.error(f"Redis is not available: {e}")
+                await asyncio.sleep(1)
+                continue
 
             try:
                 item = await self.q.get()
@@ -43,11 +49,13 @@ class BenchmarkService:
                 logger.error(f"Error processing item: {e}")
 
     async def start(self):
+        self.is_running = True
         await self.connect_redis()
         await self.process()
 
     async def stop(self):
         await self.q.join()
+        self.is_running = False
 
     async def get_timeline(self, tx_hash: str) -> dict:
         """Get the timeline of a transaction's processing steps"""
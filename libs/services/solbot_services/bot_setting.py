@@ -1,3 +1,4 @@
+from solbot_common.cp.config_events import ConfigEventProducer
 from solbot_common.types.bot_setting import BotSetting
 from solbot_db.redis import RedisClient
 from typing_extensions import Self
@@ -14,6 +15,7 @@ class BotSettingService:
     def __init__(self):
         self.redis = RedisClient.get_instance()
         self.channel = "setting"
+        self.config_event_producer = ConfigEventProducer(self.redis)
 
     async def get(self, chat_id: int, wallet_address: str) -> BotSetting | None:
         data = await self.redis.get(f"setting:{chat_id}:{wallet_address}")
@@ -21,9 +23,26 @@ class BotSettingService:
             return None
         return BotSetting.from_json(data)
 
+    async def get_many(self, keys: list[tuple[int, str]]) -> list[BotSetting | None]:
+        """批量获取设置
+
+        Args:
+            keys (list[tuple[int, str]]): (chat_id, wallet_address) 列表
+
+        Returns:
+            list[BotSetting | None]: 与 keys 一一对应的设置，不存在时为 None
+        """
+        if not keys:
+            return []
+        values = await self.redis.mget(
+            [f"setting:{chat_id}:{wallet_address}" for chat_id, wallet_address in keys]
+        )
+        return [BotSetting.from_json(data) if data is not None else None for data in values]
+
     async def set(self, setting: BotSetting):
         key = f"setting:{setting.chat_id}:{setting.wallet_address}"
         await self.redis.set(key, setting.to_json())
+        await self.config_event_producer.setting_changed(setting.chat_id, setting.wallet_address)
 
     async def create_default(self, chat_id: int, wallet_address: str):
         setting = BotSetting(
@@ -14,11 +14,19 @@ class CopyTradeService:
     ) -> list[CopyTrade]:
         """ "获取指定目标钱包的活跃跟单"""
         stmt = select(CopyTrade).where(
-            CopyTrade.target_wallet == target_wallet and CopyTrade.active == True
+            CopyTrade.target_wallet == target_wallet, CopyTrade.active == True
         )
         results = await session.execute(stmt)
         return [row.model_copy() for row in results.scalars().all()]
 
+    @classmethod
+    @provide_session
+    async def get_all_active(cls, *, session: AsyncSession = NEW_ASYNC_SESSION) -> list[CopyTrade]:
+        """获取所有活跃的跟单"""
+        stmt = select(CopyTrade).where(CopyTrade.active == True)
+        results = await session.execute(stmt)
+        return [row.model_copy() for row in results.scalars().all()]
+
     @classmethod
     @provide_session
     async def get_active_wallet_addresses(
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import aioredis
+from solbot_common.cp.config_events import ConfigEvent, ConfigEventConsumer, ConfigEventType
+from solbot_common.log import logger
+from solbot_common.models.tg_bot.copytrade import CopyTrade
+from solbot_common.types.bot_setting import BotSetting
+from solbot_db.redis import RedisClient
+
+from solbot_services.bot_setting import BotSettingService
+from solbot_services.copytrade import CopyTradeService
+
+
+class CopyTradeIndex:
+    """跟单规则的内存索引
+
+    维护 target_wallet -> 活跃跟单规则，以及这些规则所属用户的设置。
+    启动时从数据库与 redis 全量加载，之后通过配置变更事件（由 tg-bot 修改跟单或设置时发布）
+    增量刷新，查询时不再访问数据库与 redis。
+
+    pub/sub 消息可能丢失（如连接断开），因此每隔 refresh_interval 秒会全量重新加载一次。
+    """
+
+    def __init__(self, redis: aioredis.Redis | None = None, refresh_interval: float = 300) -> None:
+        self.redis = redis or RedisClient.get_instance()
+        self.events = ConfigEventConsumer(self.redis)
+        self.setting_service = BotSettingService()
+        self.refresh_interval = refresh_interval
+        self._copytrades: dict[str, list[CopyTrade]] = {}
+        self._settings: dict[tuple[int, str], BotSetting] = {}
+        self._last_loaded_at = 0.0
+        self.ready = asyncio.Event()
+        self.is_running = False
+
+    def get_by_target_wallet(self, target_wallet: str) -> list[CopyTrade]:
+        """获取指定目标钱包的活跃跟单"""
+        return self._copytrades.get(target_wallet, [])
+
+    def get_owners(self) -> set[str]:
+        """获取所有跟单所属的钱包"""
+        return {
+            copytrade.owner for copytrades in self._copytrades.values() for copytrade in copytrades
+        }
+
+    def get_setting(self, chat_id: int, wallet_address: str) -> BotSetting | None:
+        """获取跟单所属用户的设置"""
+        return self._settings.get((chat_id, wallet_address))
+
+    async def _load_settings(
+        self, copytrades: list[CopyTrade]
+    ) -> dict[tuple[int, str], BotSetting]:
+        keys = list({(copytrade.chat_id, copytrade.owner) for copytrade in copytrades})
+        values = await self.setting_service.get_many(keys)
+        return {key: setting for key, setting in zip(keys, values, strict=True) if setting}
+
+    async def load(self) -> None:
+        """全量加载跟单规则与设置"""
+        copytrades = await CopyTradeService.get_all_active()
+        index: dict[str, list[CopyTrade]] = {}
+        for copytrade in copytrades:
+            index.setdefault(copytrade.target_wallet, []).append(copytrade)
+        settings = await self._load_settings(copytrades)
+
+        self._copytrades = index
+        self._settings = settings
+        self._last_loaded_at = time.monotonic()
+        self.ready.set()
+        logger.info(f"Loaded {len(copytrades)} copytrades of {len(index)} target wallets")
+
+    async def reload_target_wallet(self, target_wallet: str) -> None:
+        """重新加载指定目标钱包的跟单规则"""
+        copytrades = await CopyTradeService.get_by_target_wallet(target_wallet)
+        self._settings.update(await self._load_settings(copytrades))
+        if copytrades:
+            self._copytrades[target_wallet] = copytrades
+        else:
+            self._copytrades.pop(target_wallet, None)
+        logger.info(f"Reloaded {len(copytrades)} copytrades of target wallet {target_wallet}")
+
+    async def reload_setting(self, chat_id: int, wallet_address: str) -> None:
+        """重新加载指定用户的设置"""
+        setting = await self.setting_service.get(chat_id, wallet_address)
+        if setting is None:
+            self._settings.pop((chat_id, wallet_address), None)
+        else:
+            self._settings[(chat_id, wallet_address)] = setting
+        logger.info(f"Reloaded setting of {chat_id}:{wallet_address}")
+
+    async def _handle_copytrade_event(self, event: ConfigEvent) -> None:
+        if event.target_wallet is None:
+            raise ValueError("target_wallet is required")
+        await self.reload_target_wallet(event.target_wallet)
+
+    async def _handle_setting_event(self, event: ConfigEvent) -> None:
+        if event.chat_id is None or event.wallet_address is None:
+            raise ValueError("chat_id and wallet_address are required")
+        await self.reload_setting(event.chat_id, event.wallet_address)
+
+    async def start(self) -> None:
+        """加载索引，并持续处理配置变更事件"""
+        self.events.register_handler(ConfigEventType.COPYTRADE, self._handle_copytrade_event)
+        self.events.register_handler(ConfigEventType.SETTING, self._handle_setting_event)
+
+        # 先订阅再加载，避免遗漏加载期间发生的变更
+        pubsub = await self.events.subscribe()
+        await self.load()
+
+        self.is_running = True
+        try:
+            while self.is_running:
+                try:
+                    if time.monotonic() - self._last_loaded_at > self.refresh_interval:
+                        await self.load()
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.5)
+                    if message is None:
+                        continue
+                    await self.events.process_event(message)
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    logger.error(f"Error processing config event: {e}")
+                    await asyncio.sleep(1)
+        finally:
+            await self.events.unsubscribe()
+
+    def stop(self) -> None:
+        self.is_running = False
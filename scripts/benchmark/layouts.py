@@ -0,0 +1,95 @@
+"""账户解码耗时对比
+
+construct: 原实现，construct Struct.parse
+compiled:  CompiledLayout.parse，一次 struct.unpack 解析整个账户
+view:      CompiledLayout.view，只解析用到的字段（AmmV4PoolKeys.from_pool_data 的用法）
+batch:     CompiledLayout.parse_many，一次解析整批账户（池子快照的用法），按单个账户的平均耗时计
+
+Usage:
+    uv run python scripts/benchmark/layouts.py [-n 10000]
+"""
+
+import argparse
+import os
+import timeit
+
+from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_V4, MARKET_STATE_V3
+from solbot_common.layouts.bonding_curve_account import BONDING_CURVE_ACCOUNT_V2
+from solbot_common.layouts.clmm import CLMM_POOL_STATE
+from solbot_common.layouts.cpmm import CPMM_POOL_STATE
+
+# AmmV4PoolKeys.from_pool_data 读取的字段
+VIEW_FIELDS = {
+    "LiquidityStateV4": (
+        "serumMarket",
+        "coinDecimals",
+        "pcDecimals",
+        "ammOpenOrders",
+        "ammTargetOrders",
+        "poolCoinTokenAccount",
+        "poolPcTokenAccount",
+    ),
+    "MarketStateV3": (
+        "vault_signer_nonce",
+        "base_mint",
+        "quote_mint",
+        "base_vault",
+        "quote_vault",
+        "bids",
+        "asks",
+        "event_queue",
+    ),
+}
+BATCH_SIZE = 100
+
+
+def sample(layout) -> bytes:
+    data = bytearray(os.urandom(layout.size))
+    if layout is MARKET_STATE_V3:
+        data[5:13] = bytes([0x3F]) + bytes(7)
+    return bytes(data)
+
+
+def bench(fn, number: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=10000)
+    args = parser.parse_args()
+    n = args.number
+
+    print(f"{'layout':<22}{'construct':>12}{'compiled':>12}{'view':>12}{'batch':>12}  (us)")
+    for layout in (
+        LIQUIDITY_STATE_V4,
+        MARKET_STATE_V3,
+        CLMM_POOL_STATE,
+        CPMM_POOL_STATE,
+        BONDING_CURVE_ACCOUNT_V2,
+    ):
+        name = layout.record.__name__
+        data = sample(layout)
+        batch = [data] * BATCH_SIZE
+        fields = VIEW_FIELDS.get(name, layout.fields)
+
+        def read_view(data=data, fields=fields, layout=layout):
+            view = layout.view(data)
+            for field in fields:
+                getattr(view, field)
+
+        results = (
+            bench(lambda data=data, layout=layout: layout.layout.parse(data), max(n // 10, 1)),
+            bench(lambda data=data, layout=layout: layout.parse(data), n),
+            bench(read_view, n),
+            bench(
+                lambda batch=batch, layout=layout: layout.parse_many(batch), max(n // BATCH_SIZE, 1)
+            )
+            / BATCH_SIZE,
+        )
+        print(f"{name:<22}" + "".join(f"{r:>12.2f}" for r in results))
+
+
+if __name__ == "__main__":
+    main()
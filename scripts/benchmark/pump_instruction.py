@@ -0,0 +1,70 @@
+"""pump.fun 买卖指令构建耗时对比
+
+before: 每笔交易创建 PumpFunInterface（解析 IDL、构建 anchorpy Program）并动态构建指令
+after:  进程内共享的 PumpFunInstructionEncoder 直接编码指令
+
+Usage:
+    uv run python scripts/benchmark/pump_instruction.py [-n 1000]
+"""
+
+import argparse
+import timeit
+
+from anchorpy.program.core import Program
+from anchorpy.provider import Provider, Wallet
+from anchorpy_core.idl import Idl  # type: ignore
+from solana.rpc.async_api import AsyncClient
+from solbot_common.constants import (
+    PUMP_FUN_ACCOUNT,
+    PUMP_FUN_PROGRAM,
+    PUMP_GLOBAL_ACCOUNT,
+    SYSTEM_PROGRAM_ID,
+    TOKEN_PROGRAM_ID,
+)
+from solbot_common.IDL.pumpfun import IDL_PATH, get_encoder
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+ACCOUNTS = {
+    "fee_recipient": Pubkey.new_unique(),
+    "mint": Pubkey.new_unique(),
+    "bonding_curve": Pubkey.new_unique(),
+    "associated_bonding_curve": Pubkey.new_unique(),
+    "associated_user": Pubkey.new_unique(),
+    "user": Pubkey.new_unique(),
+    "global": PUMP_GLOBAL_ACCOUNT,
+    "system_program": SYSTEM_PROGRAM_ID,
+    "token_program": TOKEN_PROGRAM_ID,
+    "creator_vault": Pubkey.new_unique(),
+    "event_authority": PUMP_FUN_ACCOUNT,
+    "program": PUMP_FUN_PROGRAM,
+}
+ARGS = (123_456_789, 987_654_321)
+PROVIDER = Provider(AsyncClient("http://localhost:8899"), Wallet(Keypair()))
+
+
+def build_before():
+    # 原实现每次都重新读取并解析 IDL
+    with open(IDL_PATH) as f:
+        idl = Idl.from_json(f.read())
+    program = Program(idl, PUMP_FUN_PROGRAM, PROVIDER)
+    return program.methods["buy"].args(list(ARGS)).accounts(ACCOUNTS).instruction()
+
+
+def build_after():
+    return get_encoder().encode("buy", ARGS, ACCOUNTS)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--number", type=int, default=1000)
+    args = parser.parse_args()
+
+    assert build_before() == build_after()
+    for name, func in (("before", build_before), ("after", build_after)):
+        best = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f"{name:>6}: {best * 1e6:10.2f} us/instruction")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
 import pytest
 from solbot_cache import AccountAmountCache
 from solders.pubkey import Pubkey
+from solders.rpc.responses import SubscriptionResult
 
 
 # elapsed: 0.11
@@ -11,3 +15,119 @@ async def test_get_amount():
         Pubkey.from_string("BZub1xiSRof8qVpnF266QLRXXYVjewv4cYhkiokYoTSj")
     )
     assert isinstance(amount, int)
+
+
+def token_account_data(mint: Pubkey, owner: Pubkey, amount: int) -> bytes:
+    return bytes(mint) + bytes(owner) + amount.to_bytes(8, "little") + bytes(165 - 72)
+
+
+@pytest.fixture
+def tracked_cache(monkeypatch):
+    cache = AccountAmountCache()
+    owner, mint = Pubkey.new_unique(), Pubkey.new_unique()
+    ata, closed = Pubkey.new_unique(), Pubkey.new_unique()
+    client = MagicMock()
+    client.get_token_accounts_by_owner = AsyncMock(
+        return_value=MagicMock(
+            context=MagicMock(slot=10),
+            value=[
+                MagicMock(pubkey=ata, account=MagicMock(data=token_account_data(mint, owner, 100))),
+                MagicMock(
+                    pubkey=closed, account=MagicMock(data=token_account_data(mint, owner, 5))
+                ),
+            ],
+        )
+    )
+    monkeypatch.setattr(cache, "_client", client)
+    yield cache, client, owner, mint, ata, closed
+    cache.unwatch(owner)
+
+
+def subscription_result(request_id: int, subscription: int) -> SubscriptionResult:
+    return SubscriptionResult.from_json(
+        f'{{"jsonrpc": "2.0", "id": {request_id}, "result": {subscription}}}'
+    )
+
+
+def make_websocket() -> MagicMock:
+    websocket = MagicMock(sent_subscriptions={})
+
+    async def program_subscribe(*args, **kwargs):
+        websocket.sent_subscriptions[len(websocket.sent_subscriptions) + 1] = kwargs
+
+    websocket.program_subscribe = AsyncMock(side_effect=program_subscribe)
+    return websocket
+
+
+@pytest.mark.asyncio
+async def test_watch_and_stream(tracked_cache):
+    cache, client, owner, mint, ata, _ = tracked_cache
+    assert cache.get_balance(owner, mint) is None
+
+    # 先订阅，订阅确认前不获取快照，也不能读取余额
+    await cache.watch([str(owner)])
+    websocket = make_websocket()
+    await cache._subscribe(websocket, cache._pending_subscriptions.get_nowait())
+    assert not cache.is_watching(owner)
+    assert cache.get_balance(owner, mint) is None
+    client.get_token_accounts_by_owner.assert_not_called()
+
+    # 订阅确认与快照之间推送的变化不会被快照覆盖
+    cache._on_message(subscription_result(1, 100))
+    cache.apply(ata, token_account_data(mint, owner, 40), slot=11)
+    await cache._snapshot_many([cache._pending_snapshots.get_nowait()])
+    assert cache.is_watching(owner)
+    assert cache.get_balance(owner, mint) == 45
+    assert await cache.get_amount(ata) == 40
+
+    # 订阅推送的余额变化，早于当前记录的数据将被忽略
+    cache.apply(ata, token_account_data(mint, owner, 70), slot=9)
+    assert cache.get_balance(owner, mint) == 45
+
+    # 重新获取快照时，已关闭的账户被移除
+    client.get_token_accounts_by_owner.return_value.context.slot = 12
+    client.get_token_accounts_by_owner.return_value.value.pop()
+    await cache.snapshot(owner)
+    assert cache.get_balances(owner) == {mint: 100}
+    client.get_account_info_json_parsed.assert_not_called()
+
+    # 连接断开后，重新订阅并获取快照前不能读取余额
+    cache._reset_connection()
+    assert cache.get_balance(owner, mint) is None
+
+
+@pytest.mark.asyncio
+async def test_snapshots_run_concurrently(tracked_cache, monkeypatch):
+    cache, _, owner, _, _, _ = tracked_cache
+    others = [Pubkey.new_unique() for _ in range(2)]
+    await cache.watch([owner, *others])
+    cache._subscribed.update([owner, *others])
+    started, release = [], asyncio.Event()
+
+    async def snapshot(owner):
+        started.append(owner)
+        await release.wait()
+        if owner == others[-1]:
+            raise RuntimeError("rpc error")
+
+    monkeypatch.setattr(cache, "snapshot", snapshot)
+    task = asyncio.create_task(cache._snapshot_many([owner, *others]))
+    for _ in range(3):
+        await asyncio.sleep(0)
+    # 所有钱包同时开始获取快照
+    assert not task.done()
+    assert started == [owner, *others]
+    release.set()
+    await task
+    # 获取快照失败的钱包不能读取余额
+    assert cache._live == {owner, others[0]}
+    for other in others:
+        cache.unwatch(other)
+
+
+@pytest.mark.asyncio
+async def test_untracked_owner_is_ignored(tracked_cache):
+    cache, _, owner, mint, ata, _ = tracked_cache
+    cache.apply(ata, token_account_data(mint, owner, 40), slot=11)
+    assert cache.get_balance(owner, mint) is None
+    assert cache.get_balances(owner) is None
@@ -0,0 +1,54 @@
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from solbot_cache.blockhash import BlockhashTicker, get_latest_blockhash
+from solders.hash import Hash
+
+
+def blockhash_response(blockhash: Hash, last_valid_block_height: int) -> MagicMock:
+    resp = MagicMock()
+    resp.value.blockhash = blockhash
+    resp.value.last_valid_block_height = last_valid_block_height
+    return resp
+
+
+@pytest.fixture
+def ticker():
+    BlockhashTicker._instance = None
+    client = MagicMock()
+    client.get_latest_blockhash = AsyncMock()
+    ticker = BlockhashTicker(client)
+    yield ticker
+    BlockhashTicker._instance = None
+
+
+@pytest.mark.asyncio
+async def test_serves_latest_blockhash_from_memory(ticker):
+    first, second = Hash.new_unique(), Hash.new_unique()
+    assert ticker.get() is None
+
+    ticker.client.get_latest_blockhash.return_value = blockhash_response(first, 1150)
+    await ticker.update()
+    ticker.client.get_latest_blockhash.return_value = blockhash_response(second, 1152)
+    await ticker.update()
+    # 乱序返回的旧 blockhash 被忽略
+    ticker.client.get_latest_blockhash.return_value = blockhash_response(first, 1150)
+    await ticker.update()
+
+    assert ticker.block_height == 1002
+    assert ticker.remaining_blocks() == 150
+    with patch("solbot_cache.blockhash.RedisClient") as redis_client:
+        assert await get_latest_blockhash() == (second, 1152)
+        redis_client.get_instance.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_blockhash_close_to_expiry_is_not_served(ticker):
+    ticker.client.get_latest_blockhash.return_value = blockhash_response(Hash.new_unique(), 1150)
+    await ticker.update()
+
+    # 更新停止约 40 个区块后，剩余的区块数量不足
+    with patch("time.monotonic", return_value=time.monotonic() + 40 * 0.4):
+        assert ticker.remaining_blocks() <= 110
+        assert ticker.get() is None
@@ -0,0 +1,77 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from solbot_cache.cached import OrjsonSerializer, cached
+
+
+@pytest.mark.asyncio
+async def test_single_flight():
+    """同一个 key 的并发调用只加载一次"""
+    calls = 0
+
+    @cached(ttl=60, alias="temp")
+    async def load(key: str) -> str:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return f"value:{key}"
+
+    results = await asyncio.gather(*[load("single-flight") for _ in range(50)])
+
+    assert results == ["value:single-flight"] * 50
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_local_tier(monkeypatch):
+    """进程内缓存命中时不再访问后端缓存"""
+    calls = 0
+
+    @cached(ttl=60, alias="temp", local=True)
+    async def load(key: str) -> str:
+        nonlocal calls
+        calls += 1
+        return f"value:{key}"
+
+    assert await load("local") == "value:local"
+    monkeypatch.setattr(load.cache, "get", AsyncMock())
+    assert await load("local") == "value:local"
+
+    load.cache.get.assert_not_called()
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_cache():
+    calls = 0
+
+    @cached(ttl=60, alias="temp", negative_ttl=60)
+    async def load(key: str) -> str | None:
+        nonlocal calls
+        calls += 1
+        return None
+
+    assert await load("negative") is None
+    assert await load("negative") is None
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_noself():
+    class Loader:
+        @cached(ttl=60, alias="temp", noself=True)
+        async def load(self, key: str) -> str:
+            return f"{id(self)}:{key}"
+
+    first = await Loader().load("noself")
+    # 不同实例共享同一个缓存
+    assert await Loader().load("noself") == first
+
+
+def test_orjson_serializer():
+    serializer = OrjsonSerializer()
+    value = {"mint": "So11111111111111111111111111111111111111112", "decimals": 9, "ok": True}
+
+    assert serializer.loads(serializer.dumps(value)) == value
+    assert serializer.loads(None) is None
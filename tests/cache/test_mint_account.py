@@ -1,7 +1,9 @@
 import asyncio
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 from solbot_cache.mint_account import MintAccountCache
+from solbot_common.layouts.layouts import MINT_LAYOUT
 from solbot_common.models import MintAccount
 from solbot_db.session import init_db, start_session
 from solders.pubkey import Pubkey
@@ -29,3 +31,40 @@ async def test_get_mint_account():
         select_stmt = select(MintAccount).where(MintAccount.mint == mint)
         mint_account = session.exec(statement=select_stmt).one()
         assert mint_account
+
+
+def mint_account_data(decimals: int) -> bytes:
+    return MINT_LAYOUT.build(
+        {
+            "mint_authority_option": 0,
+            "mint_authority": bytes(32),
+            "supply": 10**15,
+            "decimals": decimals,
+            "is_initialized": 1,
+            "freeze_authority_option": 0,
+            "freeze_authority": bytes(32),
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_mint_accounts_bulk_load(monkeypatch):
+    """两级缓存均未命中的 mint 通过一次 getMultipleAccounts 获取，之后从进程内缓存读取"""
+    cache = MintAccountCache()
+    cache._local.clear()
+    mints = [Pubkey.new_unique() for _ in range(3)]
+    accounts = [MagicMock(data=mint_account_data(6)), MagicMock(data=mint_account_data(9)), None]
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(return_value=MagicMock(value=accounts))
+    monkeypatch.setattr(cache, "client", client)
+    monkeypatch.setattr(cache, "_load_from_db", AsyncMock(return_value={}))
+    monkeypatch.setattr(cache, "_writer", MagicMock(submit=AsyncMock()))
+
+    result = await cache.get_mint_accounts(mints)
+
+    assert [a.decimals if a else None for a in result] == [6, 9, None]
+    client.get_multiple_accounts.assert_awaited_once_with(mints)
+    assert cache._writer.submit.await_count == 2
+
+    assert await cache.get_decimals(str(mints[1])) == 9
+    client.get_multiple_accounts.assert_awaited_once()
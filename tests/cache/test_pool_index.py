@@ -0,0 +1,96 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_cache import rayidum
+from solbot_cache.pool_index import (
+    AMM_V4_ACCOUNTS,
+    PoolIndex,
+    PoolIndexWriter,
+    PoolKind,
+    encode_record,
+)
+from solbot_common.constants import WSOL
+from solders.pubkey import Pubkey
+
+
+def amm_v4_record(pool_id: Pubkey, mint: Pubkey) -> bytes:
+    accounts = [Pubkey.new_unique() for _ in AMM_V4_ACCOUNTS]
+    accounts[0], accounts[1] = mint, WSOL
+    return encode_record(pool_id, mint, PoolKind.AMM_V4, 6, 9, accounts)
+
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(PoolIndex, "_instance", None)
+    return str(tmp_path / "pool_index.bin")
+
+
+def test_lookup_by_mint_and_kind(index_path):
+    mint = Pubkey.new_unique()
+    amm_pool, cpmm_pool = Pubkey.new_unique(), Pubkey.new_unique()
+    PoolIndexWriter(index_path).write_snapshot(
+        [
+            amm_v4_record(amm_pool, mint),
+            encode_record(cpmm_pool, mint, PoolKind.CPMM, 9, 6, [Pubkey.new_unique()]),
+        ]
+    )
+    index = PoolIndex(index_path)
+
+    assert index.get(mint).pool_id == amm_pool  # type: ignore
+    assert index.get(str(mint), PoolKind.CPMM).pool_id == cpmm_pool  # type: ignore
+    assert index.get(Pubkey.new_unique()) is None
+
+    pool_keys = index.get_amm_v4_pool_keys(mint)
+    assert pool_keys is not None
+    assert pool_keys.amm_id == amm_pool
+    assert pool_keys.base_mint == mint
+    assert pool_keys.quote_mint == WSOL
+    assert (pool_keys.base_decimals, pool_keys.quote_decimals) == (6, 9)
+
+
+def test_picks_up_appended_and_replaced_files(index_path):
+    writer = PoolIndexWriter(index_path)
+    index = PoolIndex(index_path, refresh_interval=0)
+    mint = Pubkey.new_unique()
+    assert index.get(mint) is None
+
+    # 追加的记录覆盖同一个 mint 之前的记录
+    old_pool, new_pool = Pubkey.new_unique(), Pubkey.new_unique()
+    writer.append([amm_v4_record(old_pool, mint)])
+    assert index.get(mint).pool_id == old_pool  # type: ignore
+    # 命中时同样会检查文件是否更新
+    writer.append([amm_v4_record(new_pool, mint)])
+    assert index.get(mint).pool_id == new_pool  # type: ignore
+    assert len(index) == 1
+
+    # 重新写入快照后，旧的记录不再可见
+    other_mint = Pubkey.new_unique()
+    writer.write_snapshot([amm_v4_record(Pubkey.new_unique(), other_mint)])
+    index.refresh()
+    assert index.get(mint) is None
+    assert index.get(other_mint) is not None
+
+
+@pytest.mark.asyncio
+async def test_preferred_pool_keys_prefers_priority_queue(index_path, monkeypatch):
+    mint = Pubkey.new_unique()
+    queue_pool = Pubkey.new_unique()
+    PoolIndexWriter(index_path).write_snapshot([amm_v4_record(Pubkey.new_unique(), mint)])
+    index = PoolIndex(index_path)
+    storeage = MagicMock()
+    storeage.get_top_pool_data = AsyncMock(
+        return_value={"pool_id": queue_pool, "amm_data": b"amm", "market_data": b"market"}
+    )
+    monkeypatch.setattr(rayidum, "_get_storeage", lambda: storeage)
+    from_pool_data = MagicMock()
+    monkeypatch.setattr(rayidum.AmmV4PoolKeys, "from_pool_data", from_pool_data)
+
+    # 优先级队列中有池子时不使用索引
+    assert await rayidum.get_preferred_pool_keys(mint) is from_pool_data.return_value
+    assert from_pool_data.call_args.kwargs["pool_id"] == queue_pool
+
+    # 优先级队列中没有时回退到索引
+    storeage.get_top_pool_data.return_value = None
+    pool_keys = await rayidum.get_preferred_pool_keys(mint)
+    assert pool_keys is not None
+    assert pool_keys.amm_id == index.get(mint).pool_id  # type: ignore
@@ -0,0 +1,54 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_cache.rayidum import MintPoolPriorityQueue
+
+
+@pytest.fixture
+def redis():
+    redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value = pipe
+    redis.zrevrange = AsyncMock(return_value=["pool"])
+    redis.register_script.return_value = AsyncMock(return_value="3")
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_push_uses_one_round_trip(redis):
+    queue = MintPoolPriorityQueue(redis, max_length=10)
+    await queue.push("mint", "pool")
+
+    pipe = redis.pipeline.return_value
+    pipe.zincrby.assert_called_once_with("raydium_pool:pool_sorter:mint", 1, "pool")
+    pipe.zremrangebyrank.assert_called_once_with("raydium_pool:pool_sorter:mint", 0, -11)
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_increments_with_script(redis):
+    queue = MintPoolPriorityQueue(redis)
+    assert await queue.get("mint", "pool") == 3.0
+
+    redis.register_script.return_value.return_value = None
+    assert await queue.get("mint", "missing") is None
+
+
+@pytest.mark.asyncio
+async def test_top_pool_cached_and_usage_flushed_in_batch(redis):
+    queue = MintPoolPriorityQueue(redis, flush_interval=60)
+    for _ in range(3):
+        assert await queue.get_top_pool("mint") == "pool"
+    redis.zrevrange.assert_awaited_once()
+
+    await queue.flush()
+    pipe = redis.pipeline.return_value
+    pipe.zincrby.assert_called_once_with("raydium_pool:pool_sorter:mint", 3, "pool")
+    pipe.execute.assert_awaited_once()
+
+    # 写入新池子后重新读取
+    await queue.push("mint", "new_pool")
+    await queue.get_top_pool("mint")
+    assert redis.zrevrange.await_count == 2
+    queue._flush_task.cancel()  # type: ignore
@@ -0,0 +1,101 @@
+import base64
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_cache.reserve import ReserveStore
+from solders.pubkey import Pubkey
+from solders.rpc.requests import AccountSubscribe
+from solders.rpc.responses import (
+    AccountNotification,
+    SubscriptionResult,
+    parse_websocket_message,
+)
+
+
+def token_account_data(amount: int) -> bytes:
+    return bytes(64) + amount.to_bytes(8, "little") + bytes(165 - 72)
+
+
+def account_notification(subscription: int, slot: int, data: bytes) -> AccountNotification:
+    value = {
+        "lamports": 1,
+        "data": [base64.b64encode(data).decode(), "base64"],
+        "owner": "11111111111111111111111111111111",
+        "executable": False,
+        "rentEpoch": 0,
+        "space": len(data),
+    }
+    message = {
+        "jsonrpc": "2.0",
+        "method": "accountNotification",
+        "params": {
+            "subscription": subscription,
+            "result": {"context": {"slot": slot}, "value": value},
+        },
+    }
+    (notification,) = parse_websocket_message(json.dumps(message))
+    return notification
+
+
+def subscription_result(request_id: int, subscription: int) -> SubscriptionResult:
+    return SubscriptionResult.from_json(
+        f'{{"jsonrpc": "2.0", "id": {request_id}, "result": {subscription}}}'
+    )
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(ReserveStore, "_instance", None)
+    store = ReserveStore(max_accounts=2)
+    client = MagicMock()
+    monkeypatch.setattr(store, "_client", client)
+    return store, client
+
+
+def make_websocket(*pubkeys: Pubkey) -> MagicMock:
+    websocket = MagicMock()
+    websocket.subscriptions = {
+        i: AccountSubscribe(pubkey, None, i) for i, pubkey in enumerate(pubkeys, start=1)
+    }
+    return websocket
+
+
+def test_watch_evicts_least_recently_used(store):
+    store, _ = store
+    a, b, c = Pubkey.new_unique(), Pubkey.new_unique(), Pubkey.new_unique()
+    store.watch([a, b])
+    store.watch([a])
+    store.watch([c])
+
+    assert store.is_watching(a)
+    assert not store.is_watching(b)
+    assert store.is_watching(c)
+    assert store._pending_unsubscribe.get_nowait() == b
+
+
+@pytest.mark.asyncio
+async def test_live_after_subscription_and_snapshot(store):
+    store, client = store
+    vault = Pubkey.new_unique()
+    websocket = make_websocket(vault)
+    client.get_multiple_accounts = AsyncMock(
+        return_value=MagicMock(
+            context=MagicMock(slot=10), value=[MagicMock(data=token_account_data(100))]
+        )
+    )
+    store.watch([vault])
+    assert store.get(vault) is None
+
+    # 订阅生效后获取快照，之后才能读取
+    store._on_message(websocket, subscription_result(1, 1))
+    assert store.get(vault) is None
+    await store._snapshot([store._pending_snapshot.get_nowait()])
+    assert store.get_token_amount(vault) == 100
+    assert store.get(vault).slot == 10  # type: ignore
+
+    # 订阅推送的数据，早于当前记录的数据将被忽略
+    store._on_message(websocket, account_notification(1, 12, token_account_data(40)))
+    store.apply(vault, token_account_data(70), slot=11)
+    assert store.get_token_amount(vault) == 40
+    assert store.get_many([vault, Pubkey.new_unique()]) is None
@@ -1,8 +1,19 @@
-from unittest.mock import AsyncMock, patch
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import aioredis
 import pytest
-from cache_preloader.caches.raydium_pool import RaydiumPoolCache
+from cache_preloader.caches.raydium_pool import MAX_MULTIPLE_ACCOUNTS, RaydiumPoolCache
+from solbot_cache.rayidum import RaydiumPoolStoreage
+from solbot_common.config import settings
+from solbot_common.constants import WSOL
+from solbot_common.layouts.amm_v4 import (
+    AMM_V4_COIN_MINT_OFFSET,
+    AMM_V4_PC_MINT_OFFSET,
+    AMM_V4_SERUM_MARKET_OFFSET,
+    LIQUIDITY_STATE_LAYOUT_V4,
+)
+from solders.pubkey import Pubkey
 
 from libs.cache.solbot_cache.rayidum import MintPoolDataCache
 
@@ -39,15 +50,115 @@ async def test_mint_pool_data_cache(mock_redis):
 @pytest.mark.asyncio
 async def test_raydium_pool_cache_initialization():
     """测试 Raydium 池缓存初始化"""
-    with patch("cache_preloader.caches.raydium_pool.AsyncClient") as mock_client:
+    with patch("cache_preloader.caches.raydium_pool.get_async_client") as mock_client:
         redis = AsyncMock(spec=aioredis.Redis)
-        cache = RaydiumPoolCache("https://api.mainnet-beta.solana.com", redis, 5)
+        cache = RaydiumPoolCache(
+            "https://api.mainnet-beta.solana.com",
+            redis,
+            batch_size=5,
+            flush_interval=0.1,
+            known_pools_size=10,
+            pool_index_path=None,
+        )
 
         # 验证初始状态
         assert not cache.is_running()
-        assert cache.max_concurrent_tasks == 5
-        assert cache.redis == redis
+        assert cache.rpc_client is mock_client.return_value
+        assert cache.websocket_url == "wss://api.mainnet-beta.solana.com"
+        assert cache.batch_size == 5
+        assert cache.flush_interval == 0.1
+        assert cache._known_pools.maxsize == 10
+        assert cache._pending == {}
+        assert cache.storeage.redis == redis
+        assert cache.pool_index_writer.path == settings.db.pool_index_path
 
+        # batch_size 不超过 getMultipleAccounts 的上限
+        cache = RaydiumPoolCache("https://api.mainnet-beta.solana.com", redis, batch_size=1000)
+        assert cache.batch_size == MAX_MULTIPLE_ACCOUNTS
 
-# 注意：由于 RaydiumPoolCache 的完整实现较为复杂，
-# 这里只提供了基本的测试框架。实际测试应该根据完整实现进行扩展。
+
+def amm_data(coin_mint: Pubkey, pc_mint: Pubkey, market: Pubkey) -> bytes:
+    data = bytearray(LIQUIDITY_STATE_LAYOUT_V4.sizeof())
+    data[AMM_V4_COIN_MINT_OFFSET : AMM_V4_COIN_MINT_OFFSET + 32] = bytes(coin_mint)
+    data[AMM_V4_PC_MINT_OFFSET : AMM_V4_PC_MINT_OFFSET + 32] = bytes(pc_mint)
+    data[AMM_V4_SERUM_MARKET_OFFSET : AMM_V4_SERUM_MARKET_OFFSET + 32] = bytes(market)
+    return bytes(data)
+
+
+def notification(pool_id: Pubkey, data: bytes) -> MagicMock:
+    message = MagicMock()
+    message.result.value.pubkey = pool_id
+    message.result.value.account.data = data
+    return message
+
+
+def test_notification_skips_known_and_pending_pools(mock_redis):
+    """重复推送的池子只记录一次，已写入的池子直接跳过"""
+    cache = RaydiumPoolCache("https://api.mainnet-beta.solana.com", mock_redis, batch_size=2)
+    known, pending = Pubkey.new_unique(), Pubkey.new_unique()
+    cache._known_pools.set(known, True)
+
+    cache._on_notification(notification(known, b"known"))
+    cache._on_notification(notification(pending, b"first"))
+    cache._on_notification(notification(pending, b"second"))
+
+    assert cache._pending == {pending: b"first"}
+    assert not cache._batch_ready.is_set()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_fetches_markets_in_one_call(mock_redis):
+    """直接从推送的数据中读取 market，一次 getMultipleAccounts 获取，批量写入"""
+    cache = RaydiumPoolCache("https://api.mainnet-beta.solana.com", mock_redis)
+    existing, new = Pubkey.new_unique(), Pubkey.new_unique()
+    market = Pubkey.new_unique()
+    new_amm_data = amm_data(Pubkey.new_unique(), WSOL, market)
+
+    cache.storeage.pool_data.exists_many = AsyncMock(return_value=[True, False])
+    cache.storeage.update_many = AsyncMock()
+    cache.rpc_client = MagicMock()
+    cache.rpc_client.get_multiple_accounts = AsyncMock(
+        return_value=MagicMock(value=[MagicMock(data=b"market")])
+    )
+
+    await cache._process_batch({existing: b"existing", new: new_amm_data})
+
+    cache.rpc_client.get_multiple_accounts.assert_awaited_once()
+    assert cache.rpc_client.get_multiple_accounts.call_args.args[0] == [market]
+    cache.storeage.update_many.assert_awaited_once_with(
+        [{"pool_id": new, "amm_data": new_amm_data, "market_data": b"market"}]
+    )
+    assert cache._known_pools.get(existing)
+    assert cache._known_pools.get(new)
+
+
+@pytest.mark.asyncio
+async def test_update_many_uses_one_pipeline_and_one_statement():
+    """Redis 写入合并到一个 pipeline，数据库只执行一条语句"""
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis = MagicMock()
+    redis.pipeline.return_value = pipe
+    session = AsyncMock()
+
+    @asynccontextmanager
+    async def start_async_session():
+        yield session
+
+    mint = Pubkey.new_unique()
+    pools = [
+        {
+            "pool_id": Pubkey.new_unique(),
+            "amm_data": amm_data(WSOL, mint, Pubkey.new_unique()),
+            "market_data": b"market",
+        }
+        for _ in range(3)
+    ]
+    with patch("solbot_cache.rayidum.start_async_session", start_async_session):
+        await RaydiumPoolStoreage(redis).update_many(pools)  # type: ignore
+
+    assert pipe.zincrby.call_count == 3
+    assert pipe.set.call_count == 3
+    pipe.zremrangebyrank.assert_called_once_with(f"raydium_pool:pool_sorter:{mint}", 0, -11)
+    pipe.execute.assert_awaited_once()
+    session.execute.assert_awaited_once()
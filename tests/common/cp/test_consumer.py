@@ -0,0 +1,324 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import aioredis
+import pytest
+from solbot_common.cp.base import Consumer
+
+CHANNEL = "test:channel"
+GROUP = "test:group"
+
+
+class Event:
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+    def to_json(self) -> str:
+        return self.value
+
+    @classmethod
+    def from_json(cls, json_str: str) -> "Event":
+        return cls(json_str)
+
+
+@pytest.fixture
+def mock_redis():
+    """模拟 Redis 客户端，pipeline 中的命令记录在 redis.pipe 上"""
+    redis = AsyncMock(spec=aioredis.Redis)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[])
+    redis.pipeline = MagicMock(return_value=pipe)
+    redis.pipe = pipe
+    redis.xack = AsyncMock()
+    redis.xadd = AsyncMock()
+    return redis
+
+
+def make_consumer(redis, **kwargs) -> Consumer[Event]:
+    return Consumer(
+        channel=CHANNEL,
+        data_class=Event,
+        redis_client=redis,
+        consumer_group=GROUP,
+        consumer_name="test:consumer",
+        **kwargs,
+    )
+
+
+def message(message_id: str, value: str, **fields) -> tuple[str, dict]:
+    return message_id, {"data": value, "timestamp": str(int(time.time())), **fields}
+
+
+def acked_ids(redis) -> list[str]:
+    ids = []
+    for call in redis.pipe.xack.call_args_list:
+        channel, group, *message_ids = call.args
+        assert (channel, group) == (CHANNEL, GROUP)
+        ids.extend(message_ids)
+    return sorted(ids)
+
+
+@pytest.mark.asyncio
+async def test_finished_messages_acked_in_one_pipeline(mock_redis):
+    """同时处理完成的消息通过一个 pipeline 一起 ack"""
+    consumer = make_consumer(mock_redis, max_concurrent_tasks=10, ack_interval=60)
+    consumer.register_callback(AsyncMock())
+
+    await consumer._dispatch([message(f"{i}-0", str(i)) for i in range(5)])
+    await asyncio.sleep(0.01)
+    mock_redis.pipe.execute.assert_not_awaited()
+
+    await consumer.drain()
+    mock_redis.pipe.execute.assert_awaited_once()
+    mock_redis.pipe.xack.assert_called_once_with(CHANNEL, GROUP, *[f"{i}-0" for i in range(5)])
+
+
+@pytest.mark.asyncio
+async def test_messages_acked_as_they_complete(mock_redis):
+    """消息处理完成后在 ack_interval 内 ack，慢消息不会阻塞同一批的其他消息"""
+    consumer = make_consumer(mock_redis, max_concurrent_tasks=10, ack_interval=0.001)
+    slow = asyncio.Event()
+
+    async def callback(event: Event) -> None:
+        if event.value == "slow":
+            await slow.wait()
+
+    consumer.register_callback(callback)
+    tasks = await consumer._dispatch(
+        [message("1-0", "slow"), message("2-0", "b"), message("3-0", "c")]
+    )
+    await asyncio.sleep(0.05)
+    assert acked_ids(mock_redis) == ["2-0", "3-0"]
+    mock_redis.pipeline.assert_called_with(transaction=False)
+
+    slow.set()
+    await asyncio.gather(*tasks)
+    await asyncio.sleep(0.05)
+    assert acked_ids(mock_redis) == ["1-0", "2-0", "3-0"]
+    mock_redis.xack.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_read_limited_to_free_slots(mock_redis):
+    """只读取有空闲槽位的数量的消息，槽位占满时等待而不是继续读取"""
+    consumer = make_consumer(mock_redis, batch_size=10, max_concurrent_tasks=2)
+    release = asyncio.Event()
+
+    async def callback(event: Event) -> None:
+        await release.wait()
+
+    consumer.register_callback(callback)
+    mock_redis.xreadgroup = AsyncMock(
+        side_effect=[[[CHANNEL, [message("1-0", "a"), message("2-0", "b")]]]]
+    )
+    consumer.process_pending = AsyncMock()
+    consumer.setup = AsyncMock()
+    task = asyncio.create_task(consumer.start())
+    await asyncio.sleep(0.01)
+
+    mock_redis.xreadgroup.assert_awaited_once()
+    assert mock_redis.xreadgroup.await_args.kwargs["count"] == 2
+    consumer.stop()
+    release.set()
+    await asyncio.wait_for(task, 1)
+    await consumer.drain()
+
+
+@pytest.mark.asyncio
+async def test_batch_is_processed_concurrently(mock_redis):
+    """同一批消息并发处理，并发数受 max_concurrent_tasks 限制"""
+    consumer = make_consumer(mock_redis, max_concurrent_tasks=2)
+    running = 0
+    max_running = 0
+
+    async def callback(event: Event) -> None:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    consumer.register_callback(callback)
+    await consumer._process_batch([message(f"{i}-0", str(i)) for i in range(5)])
+
+    assert max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_messages_are_retried_or_dead_lettered(mock_redis):
+    """失败的消息重新入队，超过重试次数的消息移入死信队列，均在同一 pipeline 中提交"""
+    consumer = make_consumer(mock_redis, max_retries=1)
+
+    async def callback(event: Event) -> None:
+        if event.value != "ok":
+            raise ValueError(event.value)
+
+    consumer.register_callback(callback)
+    await consumer._process_batch(
+        [
+            message("1-0", "ok"),
+            message("2-0", "retry"),
+            message("3-0", "dead", retry_count="1"),
+        ]
+    )
+
+    xadds = {call.args[0]: call.args[1] for call in mock_redis.pipe.xadd.call_args_list}
+    assert xadds[CHANNEL]["data"] == "retry"
+    assert xadds[CHANNEL]["retry_count"] == "1"
+    assert xadds[f"{CHANNEL}:dead"]["original_id"] == "3-0"
+
+    assert acked_ids(mock_redis) == ["1-0", "2-0", "3-0"]
+    mock_redis.pipe.xdel.assert_called_once_with(CHANNEL, "3-0")
+
+
+@pytest.mark.asyncio
+async def test_expired_message(mock_redis):
+    """过期的消息不会被处理，按配置丢弃或移入死信队列"""
+    callback = AsyncMock()
+    expired = message("1-0", "a", timestamp="0")
+
+    consumer = make_consumer(mock_redis, dead_letter_expired=False)
+    consumer.register_callback(callback)
+    await consumer._process_batch([expired])
+    callback.assert_not_awaited()
+    mock_redis.pipe.xack.assert_called_once_with(CHANNEL, GROUP, "1-0")
+    mock_redis.pipe.xadd.assert_not_called()
+
+    mock_redis.pipe.reset_mock()
+    consumer = make_consumer(mock_redis)
+    consumer.register_callback(callback)
+    await consumer._process_batch([message("1-0", "a", timestamp="0")])
+    callback.assert_not_awaited()
+    mock_redis.pipe.xadd.assert_called_once()
+    assert mock_redis.pipe.xadd.call_args.args[0] == f"{CHANNEL}:dead"
+
+    mock_redis.pipe.reset_mock()
+    consumer = make_consumer(mock_redis, max_process_time=None)
+    consumer.register_callback(callback)
+    await consumer._process_batch([message("1-0", "a", timestamp="0")])
+    callback.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_process_pending_drains_own_pel(mock_redis):
+    """启动时处理完当前消费者的所有待处理消息，而不仅仅是第一批"""
+    consumer = make_consumer(mock_redis, batch_size=2)
+    callback = AsyncMock()
+    consumer.register_callback(callback)
+    mock_redis.xinfo_stream = AsyncMock(
+        return_value={"length": 3, "groups": 1, "last-generated-id": "3-0"}
+    )
+    mock_redis.xinfo_groups = AsyncMock(return_value=[])
+    mock_redis.xinfo_consumers = AsyncMock(return_value=[])
+    mock_redis.xreadgroup = AsyncMock()
+    mock_redis.xreadgroup.side_effect = [
+        [[CHANNEL, [message("1-0", "a"), message("2-0", "b")]]],
+        [[CHANNEL, [message("3-0", "c")]]],
+        [[CHANNEL, []]],
+    ]
+
+    await consumer.process_pending()
+
+    assert callback.await_count == 3
+    last_ids = [call.kwargs["streams"][CHANNEL] for call in mock_redis.xreadgroup.call_args_list]
+    assert last_ids == ["0", "2-0", "3-0"]
+
+
+@pytest.mark.asyncio
+async def test_claim_idle_pending(mock_redis):
+    """认领其他消费者遗留的空闲消息并处理"""
+    consumer = make_consumer(mock_redis, batch_size=1, claim_min_idle_ms=1000)
+    callback = AsyncMock()
+    consumer.register_callback(callback)
+    mock_redis.execute_command = AsyncMock(
+        side_effect=[
+            ["2-0", [["1-0", ["data", "a", "timestamp", str(int(time.time()))]]], []],
+            ["0-0", [["2-0", None]], []],
+        ]
+    )
+
+    assert await consumer.claim_idle_pending() == 1
+
+    callback.assert_awaited_once()
+    assert callback.await_args.args[0].value == "a"
+    first, second = mock_redis.execute_command.await_args_list
+    assert first.args == (
+        "XAUTOCLAIM",
+        CHANNEL,
+        GROUP,
+        "test:consumer",
+        1000,
+        "0-0",
+        "COUNT",
+        1,
+    )
+    assert second.args[5] == "2-0"
+    mock_redis.pipe.xack.assert_called_once_with(CHANNEL, GROUP, "1-0")
+
+
+@pytest.mark.asyncio
+async def test_locked_message_is_skipped(mock_redis):
+    """正在被其他消费者处理的消息不会被重复处理，也不会被确认"""
+    consumer = make_consumer(mock_redis, lock_ttl=60)
+    callback = AsyncMock()
+    consumer.register_callback(callback)
+    mock_redis.set = AsyncMock(side_effect=[True, None])
+    mock_redis.get = AsyncMock(return_value="other:consumer")
+
+    await consumer._process_batch([message("1-0", "a")])
+    await consumer._process_batch([message("1-0", "a")])
+
+    callback.assert_awaited_once()
+    mock_redis.set.assert_awaited_with(f"{CHANNEL}:lock:1-0", "test:consumer", nx=True, ex=60)
+    mock_redis.pipe.xack.assert_called_once_with(CHANNEL, GROUP, "1-0")
+
+
+@pytest.mark.asyncio
+async def test_own_lock_is_reentrant(mock_redis):
+    """重启后的消费者可以重新进入自己持有的锁，处理遗留的待处理消息"""
+    consumer = make_consumer(mock_redis, lock_ttl=60)
+    callback = AsyncMock()
+    consumer.register_callback(callback)
+    mock_redis.set = AsyncMock(return_value=None)
+    mock_redis.get = AsyncMock(return_value="test:consumer")
+
+    await consumer._process_batch([message("1-0", "a")])
+
+    callback.assert_awaited_once()
+    mock_redis.pipe.xack.assert_called_once_with(CHANNEL, GROUP, "1-0")
+
+
+@pytest.mark.asyncio
+async def test_lock_released_on_failure(mock_redis):
+    """处理失败时释放锁，重试的消息不会因为锁而被跳过"""
+    consumer = make_consumer(mock_redis, lock_ttl=60)
+    consumer.register_callback(AsyncMock(side_effect=ValueError("boom")))
+    mock_redis.set = AsyncMock(return_value=True)
+    mock_redis.delete = AsyncMock()
+
+    await consumer._process_batch([message("1-0", "a")])
+
+    mock_redis.delete.assert_awaited_once_with(f"{CHANNEL}:lock:1-0")
+
+
+@pytest.mark.asyncio
+async def test_age_from_message_id(mock_redis):
+    """没有 timestamp 字段的消息按消息 ID 中的时间判断是否过期"""
+    callback = AsyncMock()
+    consumer = make_consumer(mock_redis, max_process_time=15)
+    consumer.register_callback(callback)
+    now_ms = int(time.time() * 1000)
+
+    await consumer._process_batch(
+        [
+            (f"{now_ms - 60_000}-0", {"data": "old"}),
+            (f"{now_ms}-0", {"data": "new"}),
+        ]
+    )
+
+    callback.assert_awaited_once()
+    assert callback.await_args.args[0].value == "new"
+    dead_letter = mock_redis.pipe.xadd.call_args
+    assert dead_letter.args[0] == f"{CHANNEL}:dead"
+    assert dead_letter.args[1]["original_id"] == f"{now_ms - 60_000}-0"
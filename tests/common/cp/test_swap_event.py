@@ -0,0 +1,50 @@
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+from solbot_common.cp.swap_event import SWAP_EVENT_CHANNEL, SwapEventProducer
+from solbot_common.types.swap import SwapEvent
+from solbot_common.types.tx import TxEvent, TxType
+
+
+def swap_event(tx_event: TxEvent | None = None) -> SwapEvent:
+    return SwapEvent(
+        user_pubkey="user",
+        swap_mode="ExactIn",
+        input_mint="input",
+        output_mint="output",
+        amount=1,
+        ui_amount=1,
+        timestamp=int(time.time()),
+        tx_event=tx_event,
+    )
+
+
+@pytest.mark.asyncio
+async def test_copytrade_event_keeps_tx_event_time():
+    """跟单的交易事件沿用聪明钱交易事件的时间，有效期从收到聪明钱交易时开始计算"""
+    redis = AsyncMock()
+    producer = SwapEventProducer(redis)
+    received_at = int(time.time()) - 60
+    tx_event = TxEvent(
+        signature="sig",
+        from_amount=1,
+        from_decimals=9,
+        to_amount=1,
+        to_decimals=6,
+        mint="mint",
+        who="smart wallet",
+        tx_type=TxType.OPEN_POSITION,
+        tx_direction="buy",
+        timestamp=received_at,
+        pre_token_amount=0,
+        post_token_amount=1,
+    )
+
+    await producer.produce(swap_event(tx_event))
+    await producer.produce(swap_event())
+
+    copytrade, manual = redis.xadd.await_args_list
+    assert copytrade.kwargs["name"] == SWAP_EVENT_CHANNEL
+    assert copytrade.kwargs["fields"]["timestamp"] == received_at
+    assert manual.kwargs["fields"]["timestamp"] >= received_at + 60
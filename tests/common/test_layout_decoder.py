@@ -0,0 +1,63 @@
+import os
+
+import pytest
+from solbot_common.layouts.amm_v4 import LIQUIDITY_STATE_V4, MARKET_STATE_V3
+from solbot_common.layouts.bonding_curve_account import (
+    _EXPECTED_DISCRIMINATOR,
+    BONDING_CURVE_ACCOUNT_V2,
+    BondingCurveAccount,
+)
+from solbot_common.layouts.clmm import CLMM_POOL_STATE
+from solbot_common.layouts.cpmm import CPMM_POOL_STATE
+
+
+def random_account(layout) -> bytes:
+    data = bytearray(os.urandom(layout.size))
+    if layout is MARKET_STATE_V3:
+        # account flags 中未使用的位必须为 0
+        data[5:13] = bytes([0x3F]) + bytes(7)
+    return bytes(data)
+
+
+@pytest.mark.parametrize(
+    "layout",
+    [
+        LIQUIDITY_STATE_V4,
+        MARKET_STATE_V3,
+        CLMM_POOL_STATE,
+        CPMM_POOL_STATE,
+        BONDING_CURVE_ACCOUNT_V2,
+    ],
+    ids=lambda layout: layout.record.__name__,
+)
+def test_matches_construct(layout):
+    """与 construct 的解析结果一致"""
+    data = random_account(layout)
+    expected = layout.layout.parse(data)
+    parsed = layout.parse(data)
+    view = layout.view(data)
+    for name in layout.fields:
+        assert getattr(parsed, name) == expected[name]
+        assert getattr(view, name) == expected[name]
+        assert layout.reader(name)(data) == expected[name]
+
+
+def test_parse_many():
+    accounts = [random_account(CPMM_POOL_STATE) for _ in range(3)]
+    # 账户末尾多余的数据会被忽略
+    accounts[1] += b"\x00" * 16
+    assert CPMM_POOL_STATE.parse_many(accounts) == [CPMM_POOL_STATE.parse(a) for a in accounts]
+
+
+def test_view_rejects_short_data():
+    with pytest.raises(Exception):
+        LIQUIDITY_STATE_V4.view(bytes(10))
+
+
+def test_bonding_curve_account():
+    data = _EXPECTED_DISCRIMINATOR + random_account(BONDING_CURVE_ACCOUNT_V2)
+    account = BondingCurveAccount(data)
+    expected = BONDING_CURVE_ACCOUNT_V2.layout.parse(data[8:])
+    assert account.virtual_sol_reserves == expected.virtual_sol_reserves
+    assert account.complete == expected.complete
+    assert account.creator == expected.creator
@@ -0,0 +1,52 @@
+import pytest
+from anchorpy.program.core import Program
+from anchorpy.provider import Provider, Wallet
+from solana.rpc.async_api import AsyncClient
+from solbot_common.constants import (
+    PUMP_BUY_METHOD,
+    PUMP_FUN_ACCOUNT,
+    PUMP_FUN_PROGRAM,
+    PUMP_GLOBAL_ACCOUNT,
+    PUMP_SELL_METHOD,
+    SYSTEM_PROGRAM_ID,
+    TOKEN_PROGRAM_ID,
+)
+from solbot_common.IDL.pumpfun import get_encoder, load_idl
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+
+
+@pytest.fixture
+def accounts() -> dict[str, Pubkey]:
+    return {
+        "fee_recipient": Pubkey.new_unique(),
+        "mint": Pubkey.new_unique(),
+        "bonding_curve": Pubkey.new_unique(),
+        "associated_bonding_curve": Pubkey.new_unique(),
+        "associated_user": Pubkey.new_unique(),
+        "user": Pubkey.new_unique(),
+        "global": PUMP_GLOBAL_ACCOUNT,
+        "system_program": SYSTEM_PROGRAM_ID,
+        "token_program": TOKEN_PROGRAM_ID,
+        "creator_vault": Pubkey.new_unique(),
+        "event_authority": PUMP_FUN_ACCOUNT,
+        "program": PUMP_FUN_PROGRAM,
+    }
+
+
+@pytest.mark.parametrize("name", ["buy", "sell"])
+def test_encoder_matches_anchorpy(name, accounts):
+    """预编译的编码器与 anchorpy 动态构建的指令一致"""
+    provider = Provider(AsyncClient("http://localhost:8899"), Wallet(Keypair()))
+    program = Program(load_idl(), PUMP_FUN_PROGRAM, provider)
+    args = (123_456_789, 987_654_321)
+
+    expected = program.methods[name].args(list(args)).accounts(accounts).instruction()
+    assert get_encoder().encode(name, args, accounts) == expected
+
+
+def test_encoder_discriminator():
+    encoder = get_encoder()
+    assert get_encoder() is encoder
+    assert encoder._templates["buy"].discriminator == PUMP_BUY_METHOD.to_bytes(8, "little")
+    assert encoder._templates["sell"].discriminator == PUMP_SELL_METHOD.to_bytes(8, "little")
@@ -0,0 +1,58 @@
+import pytest
+from solbot_common.constants import PUMP_FUN_PROGRAM
+from solbot_common.utils.pda import (
+    clear_derivation_cache,
+    derivation_cache_stats,
+    find_program_address,
+    get_associated_token_address,
+)
+from solbot_common.utils.utils import get_bonding_curve_pda, warm_pda_cache
+from solders.pubkey import Pubkey
+from spl.token.constants import TOKEN_2022_PROGRAM_ID
+from spl.token.instructions import get_associated_token_address as spl_get_associated_token_address
+
+MINT = Pubkey.from_string("7YYfWqoKvZmGfX4MgE9TuTpPZz9waHAUUxshFmwqpump")
+OWNER = Pubkey.from_string("FFWtrEQ4B4PKQoVuHYzZq8FabGkVatYzDpEVHsK5rrhF")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    clear_derivation_cache()
+    yield
+    clear_derivation_cache()
+
+
+def test_matches_uncached_derivation():
+    seeds = [b"bonding-curve", bytes(MINT)]
+    assert find_program_address(seeds, PUMP_FUN_PROGRAM) == Pubkey.find_program_address(
+        seeds, PUMP_FUN_PROGRAM
+    )
+    for program in (None, TOKEN_2022_PROGRAM_ID):
+        kwargs = {} if program is None else {"token_program_id": program}
+        assert get_associated_token_address(OWNER, MINT, **kwargs) == (
+            spl_get_associated_token_address(OWNER, MINT, **kwargs)
+        )
+
+
+def test_hit_miss_counters():
+    get_bonding_curve_pda(MINT, PUMP_FUN_PROGRAM)
+    get_bonding_curve_pda(MINT, PUMP_FUN_PROGRAM)
+    stats = derivation_cache_stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+def test_warm_pda_cache():
+    warm_pda_cache([(OWNER, MINT)], PUMP_FUN_PROGRAM)
+    misses = derivation_cache_stats()["misses"]
+
+    bonding_curve, _ = get_bonding_curve_pda(MINT, PUMP_FUN_PROGRAM)
+    get_associated_token_address(OWNER, MINT)
+    get_associated_token_address(bonding_curve, MINT)
+    assert derivation_cache_stats()["misses"] == misses
+
+
+def test_rejects_unknown_token_program():
+    with pytest.raises(ValueError):
+        get_associated_token_address(OWNER, MINT, PUMP_FUN_PROGRAM)
@@ -0,0 +1,125 @@
+import pytest
+from solbot_common.constants import WSOL
+from solbot_common.layouts.bonding_curve_account import (
+    _EXPECTED_DISCRIMINATOR,
+    BONDING_CURVE_ACCOUNT_LAYOUT_V2,
+    BondingCurveAccount,
+)
+from solbot_common.utils.quote import (
+    MIN_SQRT_PRICE_X64,
+    MIN_TICK,
+    Q64,
+    ClmmQuoter,
+    ConstantProductQuoter,
+    PumpCurveQuoter,
+    slippage_from_price_impact,
+    tick_to_sqrt_price_x64,
+)
+from solders.pubkey import Pubkey
+
+
+def bonding_curve_account() -> BondingCurveAccount:
+    return BondingCurveAccount(
+        _EXPECTED_DISCRIMINATOR
+        + BONDING_CURVE_ACCOUNT_LAYOUT_V2.build(
+            {
+                "virtual_token_reserves": 1_073_000_000_000_000,
+                "virtual_sol_reserves": 30_000_000_000,
+                "real_token_reserves": 793_100_000_000_000,
+                "real_sol_reserves": 0,
+                "token_total_supply": 1_000_000_000_000_000,
+                "complete": False,
+                "creator": bytes(Pubkey.new_unique()),
+            }
+        )
+    )
+
+
+def test_pump_curve_matches_bonding_curve_account():
+    """与 BondingCurveAccount 的计算结果一致"""
+    account = bonding_curve_account()
+    quoter = PumpCurveQuoter.from_account(account, fee_bps=100)
+
+    sol_in = 1_000_000_000
+    net_sol_in = sol_in * 10_000 // 10_100
+    assert quoter.quote(sol_in, buy=True) == account.get_buy_price(net_sol_in)
+
+    token_in = 10_000_000_000_000
+    assert quoter.quote(token_in, buy=False) == account.get_sell_price(token_in, 100)
+
+
+def test_pump_curve_buy_capped_by_real_reserves():
+    quoter = PumpCurveQuoter(
+        virtual_sol_reserves=30, virtual_token_reserves=1_000, real_token_reserves=100
+    )
+    assert quoter.quote(10**9, buy=True) == 100
+
+
+def test_constant_product_amm_v4():
+    quoter = ConstantProductQuoter(token_reserve=1_000_000, sol_reserve=1_000_000)
+    # 手续费 0.25%，向上取整
+    assert quoter.quote(1_000, buy=True) == 1_000_000 * 997 // 1_000_997
+    assert quoter.quote_many([0, 1_000, 2_000], buy=False) == [
+        0,
+        quoter.quote(1_000, buy=False),
+        quoter.quote(2_000, buy=False),
+    ]
+
+
+def test_from_amm_v4_orients_reserves():
+    pool_keys = type("PoolKeys", (), {"base_mint": WSOL})()
+    quoter = ConstantProductQuoter.from_amm_v4(pool_keys, 30, 1_000)  # type: ignore
+    assert quoter.sol_reserve == 30
+    assert quoter.token_reserve == 1_000
+
+
+def test_price_impact_grows_with_amount():
+    quoter = ConstantProductQuoter.cpmm(token_reserve=10**12, sol_reserve=10**11)
+    small, large = quoter.price_impact_many([10**6, 10**10], buy=True)
+    assert small == pytest.approx(0, abs=1e-4)
+    assert large == pytest.approx(10**10 / (10**11 + 10**10), rel=1e-2)
+
+
+def test_tick_to_sqrt_price():
+    assert tick_to_sqrt_price_x64(0) == Q64
+    assert tick_to_sqrt_price_x64(MIN_TICK) == MIN_SQRT_PRICE_X64
+    with pytest.raises(ValueError):
+        tick_to_sqrt_price_x64(MIN_TICK - 1)
+
+
+def test_clmm_single_range_matches_constant_product():
+    """在同一个 tick 区间内，集中流动性等价于虚拟储备量为 L/√P 与 L·√P 的恒定乘积池"""
+    liquidity = 10**12
+    sqrt_price_x64 = 2 * Q64
+    clmm = ClmmQuoter(sqrt_price_x64, liquidity, fee_rate=2_500, token_is_mint_0=True)
+    cpmm = ConstantProductQuoter.cpmm(
+        token_reserve=liquidity * Q64 // sqrt_price_x64,
+        sol_reserve=liquidity * sqrt_price_x64 // Q64,
+        trade_fee_rate=2_500,
+    )
+    for amount in (10**6, 10**9, 10**11):
+        assert clmm.quote(amount, buy=True) == cpmm.quote(amount, buy=True)
+        assert clmm.quote(amount, buy=False) == cpmm.quote(amount, buy=False)
+
+
+def test_clmm_crosses_ticks():
+    """跨过 tick 时按 liquidity_net 更新流动性，流动性耗尽后停止"""
+    liquidity = 10**12
+    upper = 100
+    quoter = ClmmQuoter(Q64, liquidity, fee_rate=2_500, token_is_mint_0=True)
+    # 价格上升越过 upper 后流动性为 0
+    bounded = ClmmQuoter(
+        Q64, liquidity, fee_rate=2_500, token_is_mint_0=True, ticks={upper: -liquidity}
+    )
+    # 价格从 1 上升到 upper 时流出的 token 0
+    upper_sqrt_price = tick_to_sqrt_price_x64(upper)
+    max_out = liquidity * (upper_sqrt_price - Q64) // upper_sqrt_price
+
+    assert quoter.quote(10**12, buy=True) > max_out
+    assert max_out - 1 <= bounded.quote(10**12, buy=True) <= max_out
+
+
+def test_slippage_from_price_impact():
+    assert slippage_from_price_impact(0.001) == 250
+    assert slippage_from_price_impact(0.1) == 1500
+    assert slippage_from_price_impact(0.5) == 3000
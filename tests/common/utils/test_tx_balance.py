@@ -0,0 +1,33 @@
+from solbot_common.constants import TOKEN_PROGRAM_ID, WSOL
+from solbot_common.utils.tx_balance import TokenBalance, get_swap_balance_change
+
+OWNER = "owner"
+MINT = "mint"
+RENT = 2039280
+
+
+def balance(mint: str, amount: int, index: int, owner: str = OWNER) -> TokenBalance:
+    return TokenBalance(mint, owner, str(TOKEN_PROGRAM_ID), amount, 9, index)
+
+
+def test_sell_to_closed_wsol_account():
+    """卖出到 WSOL 账户并在同一笔交易中关闭，租金退回计入其他 sol 变化"""
+    fee = 5000
+    # 0: 签名者, 1: WSOL 账户, 2: 代币账户
+    pre_balances = [1_000_000_000, RENT, RENT]
+    post_balances = [1_000_000_000 - fee + RENT + 500_000_000, 0, RENT]
+
+    change = get_swap_balance_change(
+        fee=fee,
+        pre_balances=pre_balances,
+        post_balances=post_balances,
+        pre_token_balances=[balance(str(WSOL), 0, 1), balance(MINT, 1_000, 2)],
+        post_token_balances=[balance(MINT, 0, 2)],
+        owner=OWNER,
+        mint=MINT,
+    )
+
+    assert change["sol_change"] == RENT + 500_000_000
+    assert change["other_sol_change"] == RENT
+    assert change["swap_sol_change"] == 500_000_000
+    assert change["token_change"] == -1_000
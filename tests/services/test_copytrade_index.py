@@ -0,0 +1,101 @@
+from unittest.mock import AsyncMock
+
+import aioredis
+import orjson as json
+import pytest
+from solbot_common.cp.config_events import ConfigEvent, ConfigEventType
+from solbot_common.models.tg_bot.copytrade import CopyTrade
+from solbot_common.types.bot_setting import BotSetting
+from solbot_services.copytrade import CopyTradeService
+from solbot_services.copytrade_index import CopyTradeIndex
+
+
+def make_copytrade(pk: int, target_wallet: str, owner: str = "owner", chat_id: int = 1):
+    return CopyTrade(
+        id=pk,
+        owner=owner,
+        chat_id=chat_id,
+        target_wallet=target_wallet,
+        is_fixed_buy=True,
+        fixed_buy_amount=0.05,
+        auto_follow=True,
+        stop_loss=False,
+        no_sell=False,
+        priority=0.001,
+        anti_sandwich=False,
+        auto_slippage=True,
+        active=True,
+    )
+
+
+def event_message(event: ConfigEvent) -> dict:
+    return {"type": "message", "data": json.dumps(event.model_dump())}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = CopyTradeIndex(AsyncMock(spec=aioredis.Redis))
+    settings = {(1, "owner"): BotSetting(wallet_address="owner", chat_id=1)}
+    index.setting_service = AsyncMock()
+    index.setting_service.get_many = AsyncMock(
+        side_effect=lambda keys: [settings.get(key) for key in keys]
+    )
+    index.setting_service.get = AsyncMock(side_effect=lambda *key: settings.get(key))
+    monkeypatch.setattr(
+        CopyTradeService,
+        "get_all_active",
+        AsyncMock(return_value=[make_copytrade(1, "wallet_a"), make_copytrade(2, "wallet_b")]),
+    )
+    monkeypatch.setattr(CopyTradeService, "get_by_target_wallet", AsyncMock(return_value=[]))
+    index.settings = settings
+    return index
+
+
+@pytest.mark.asyncio
+async def test_load(index):
+    """启动时全量加载跟单规则与设置"""
+    await index.load()
+
+    assert index.ready.is_set()
+    assert [copytrade.id for copytrade in index.get_by_target_wallet("wallet_a")] == [1]
+    assert [copytrade.id for copytrade in index.get_by_target_wallet("wallet_b")] == [2]
+    assert index.get_by_target_wallet("wallet_c") == []
+    assert index.get_setting(1, "owner") == index.settings[(1, "owner")]
+    index.setting_service.get_many.assert_awaited_once_with([(1, "owner")])
+
+
+@pytest.mark.asyncio
+async def test_copytrade_event_reloads_target_wallet(index):
+    """跟单配置变更后，只重新加载对应目标钱包的跟单规则"""
+    await index.load()
+    index.events.register_handler(ConfigEventType.COPYTRADE, index._handle_copytrade_event)
+
+    CopyTradeService.get_by_target_wallet.return_value = [make_copytrade(3, "wallet_c")]
+    await index.events.process_event(
+        event_message(ConfigEvent(event_type=ConfigEventType.COPYTRADE, target_wallet="wallet_c"))
+    )
+    assert [copytrade.id for copytrade in index.get_by_target_wallet("wallet_c")] == [3]
+
+    # 跟单被删除或停用
+    CopyTradeService.get_by_target_wallet.return_value = []
+    await index.events.process_event(
+        event_message(ConfigEvent(event_type=ConfigEventType.COPYTRADE, target_wallet="wallet_a"))
+    )
+    assert index.get_by_target_wallet("wallet_a") == []
+    assert [copytrade.id for copytrade in index.get_by_target_wallet("wallet_b")] == [2]
+
+
+@pytest.mark.asyncio
+async def test_setting_event_reloads_setting(index):
+    """用户设置变更后重新加载该设置"""
+    await index.load()
+    index.events.register_handler(ConfigEventType.SETTING, index._handle_setting_event)
+
+    updated = BotSetting(wallet_address="owner", chat_id=1, sandwich_slippage_bps=100)
+    index.settings[(1, "owner")] = updated
+    await index.events.process_event(
+        event_message(
+            ConfigEvent(event_type=ConfigEventType.SETTING, chat_id=1, wallet_address="owner")
+        )
+    )
+    assert index.get_setting(1, "owner") == updated
@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from trading.settlement.analyzer import TransactionAnalyzer, analyze_tx_detail
+
+TX_EXAMPLES = Path(__file__).parent.parent / "wallet_tracker" / "tx_examples" / "raw"
+
+
+def read_raw_tx(name: str) -> dict:
+    with open(TX_EXAMPLES / f"{name}.json") as f:
+        return json.load(f)["result"]
+
+
+def signer(tx: dict) -> str:
+    return tx["transaction"]["message"]["accountKeys"][0]
+
+
+def test_analyze_open():
+    """买入时创建 ATA 的租金不计入 swap 花费的 sol"""
+    tx = read_raw_tx("open")
+    data = analyze_tx_detail(tx, signer(tx), "7LCnGcBjiiaqWMkhTfEEemx5mWdLBHbrgDjCPbTbpump")
+
+    assert data["fee"] == 10005000
+    assert data["slot"] == tx["slot"]
+    assert data["timestamp"] == tx["blockTime"]
+    assert data["swap_sol_change"] == pytest.approx(-2.075)
+    assert data["other_sol_change"] == pytest.approx(-0.00203928)
+    assert data["sol_change"] == pytest.approx(-2.07703928)
+    assert data["token_change"] == pytest.approx(59023574.727001)
+    assert data["mint_decimals"]["7LCnGcBjiiaqWMkhTfEEemx5mWdLBHbrgDjCPbTbpump"] == 6
+
+
+def test_analyze_close():
+    tx = read_raw_tx("close")
+    mint = next(b["mint"] for b in tx["meta"]["preTokenBalances"] if b["owner"] == signer(tx))
+    data = analyze_tx_detail(tx, signer(tx), mint)
+
+    assert data["swap_sol_change"] == pytest.approx(0.137337001)
+    assert data["other_sol_change"] == 0
+    assert data["token_change"] == pytest.approx(-7348.085442)
+
+
+@pytest.mark.asyncio
+async def test_analyze_transaction_retry():
+    """交易刚确认时可能还查询不到，重试后从 getTransaction 的结果中分析"""
+    tx = read_raw_tx("open")
+    client = MagicMock()
+    client.get_transaction = AsyncMock(
+        side_effect=[
+            MagicMock(to_json=MagicMock(return_value=json.dumps({"result": None}))),
+            MagicMock(to_json=MagicMock(return_value=json.dumps({"result": tx}))),
+        ]
+    )
+    analyzer = TransactionAnalyzer(client)
+
+    data = await analyzer.analyze_transaction(
+        tx["transaction"]["signatures"][0],
+        signer(tx),
+        "7LCnGcBjiiaqWMkhTfEEemx5mWdLBHbrgDjCPbTbpump",
+    )
+
+    assert client.get_transaction.await_count == 2
+    assert data["swap_sol_change"] == pytest.approx(-2.075)
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import signal
+from unittest.mock import AsyncMock
+
+import pytest
+from solbot_common.types.swap import PendingSettlement
+from solders.signature import Signature
+from trading import main
+from trading.main import Trading
+
+
+@pytest.fixture
+def trading():
+    return Trading(worker_id="test:0", num_consumers=1, num_settlement_workers=2)
+
+
+@pytest.mark.asyncio
+async def test_execution_released_before_settlement(trading, swap_event_from_logs):
+    """交易发送后即释放执行槽位，结算写入结算流后消息才会被确认"""
+    sig = Signature.new_unique()
+    trading._execute_swap = AsyncMock(return_value=sig)
+    trading._record_swap_result = AsyncMock()
+    trading._record_failed_swap = AsyncMock()
+    trading.settlement_producer.produce = AsyncMock()
+
+    await asyncio.wait_for(trading._process_swap_event(swap_event_from_logs), timeout=1)
+    assert trading.semaphore._value == trading.max_concurrent_tasks
+    trading._record_swap_result.assert_not_awaited()
+
+    pending = trading.settlement_producer.produce.await_args.args[0]
+    assert pending.transaction_hash == str(sig)
+    assert pending.swap_event == swap_event_from_logs
+
+    # 结算消费者读取结算流后完成结算
+    await trading._settle_pending(PendingSettlement.from_json(pending.to_json()))
+    trading._record_swap_result.assert_awaited_once_with(sig, swap_event_from_logs)
+    trading._record_failed_swap.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_settles_in_process_when_persist_fails(trading, swap_event_from_logs):
+    """结算写入失败时在进程内结算，不丢失交易结果"""
+    sig = Signature.new_unique()
+    trading._execute_swap = AsyncMock(return_value=sig)
+    trading._record_swap_result = AsyncMock()
+    trading.settlement_producer.produce = AsyncMock(side_effect=ConnectionError("redis"))
+
+    await trading._process_swap_event(swap_event_from_logs)
+    await asyncio.gather(*trading.task_pool)
+
+    trading._record_swap_result.assert_awaited_once_with(sig, swap_event_from_logs)
+
+
+@pytest.mark.asyncio
+async def test_settlement_failure_recorded(trading, swap_event_from_logs):
+    """结算失败时记录失败的交易结果"""
+    trading._record_swap_result = AsyncMock(side_effect=RuntimeError("helius error"))
+    trading._record_failed_swap = AsyncMock()
+
+    await trading._settle(Signature.new_unique(), swap_event_from_logs)
+
+    trading._record_failed_swap.assert_awaited_once_with(swap_event_from_logs)
+
+
+@pytest.mark.asyncio
+async def test_run_stops_in_same_loop_on_signal(trading):
+    """收到信号后在同一个事件循环中关闭，正在运行的任务仍然存活"""
+    started = asyncio.Event()
+
+    async def start():
+        started.set()
+        await asyncio.Event().wait()
+
+    trading.start = start
+    trading.stop = AsyncMock()
+    run = asyncio.create_task(trading.run())
+    await started.wait()
+    os.kill(os.getpid(), signal.SIGTERM)
+
+    await asyncio.wait_for(run, timeout=1)
+    trading.stop.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("warm_caches", [True, False])
+async def test_warm_caches_per_worker(monkeypatch, warm_caches):
+    """只有 warm_caches 的进程维护进程级的热路径缓存"""
+    trading = Trading(worker_id="test:0", num_consumers=1, warm_caches=warm_caches)
+    monkeypatch.setattr(main.benchmark_service, "start", AsyncMock())
+    services = [
+        trading.blockhash_ticker,
+        trading.reserve_store,
+        trading.settlement_consumer,
+        trading.copytrade_processor,
+        *trading.swap_event_consumers,
+    ]
+    for service in services:
+        monkeypatch.setattr(service, "start", AsyncMock())
+    trading._start_template_refresher = AsyncMock()
+    trading._start_account_amount_cache = AsyncMock()
+
+    await trading.start()
+
+    trading.settlement_consumer.start.assert_awaited_once()
+    trading.swap_event_consumers[0].start.assert_awaited_once()
+    for warm in (
+        trading.blockhash_ticker.start,
+        trading.reserve_store.start,
+        trading._start_template_refresher,
+        trading._start_account_amount_cache,
+    ):
+        assert warm.await_count == int(warm_caches)
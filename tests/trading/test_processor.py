@@ -0,0 +1,78 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.constants import WSOL
+from solbot_common.models.swap_record import TransactionStatus
+from solbot_common.types.swap import SwapEvent
+from solders.signature import Signature  # type: ignore
+from trading.settlement import SwapSettlementProcessor
+
+MINT = "7LCnGcBjiiaqWMkhTfEEemx5mWdLBHbrgDjCPbTbpump"
+
+
+@pytest.fixture
+def processor(monkeypatch):
+    processor = SwapSettlementProcessor(MagicMock())
+    decimals = {str(WSOL): 9, MINT: 6}
+    monkeypatch.setattr(
+        processor.mint_account_cache,
+        "get_mint_accounts",
+        AsyncMock(side_effect=lambda mints: [MagicMock(decimals=decimals[m]) for m in mints]),
+    )
+    monkeypatch.setattr(processor, "validate", AsyncMock(return_value=TransactionStatus.SUCCESS))
+    monkeypatch.setattr(processor, "record", AsyncMock())
+    return processor
+
+
+def sell_analysis(mint_decimals: dict[str, int] | None = None) -> dict:
+    return {
+        "fee": 5000,
+        "slot": 1,
+        "timestamp": 1,
+        "sol_change": 0.5,
+        "swap_sol_change": 0.5,
+        "other_sol_change": 0,
+        "token_change": -1000.123456,
+        "mint_decimals": mint_decimals or {},
+    }
+
+
+@pytest.fixture
+def sell_event():
+    return SwapEvent(
+        user_pubkey=str(WSOL),
+        swap_mode="ExactIn",
+        input_mint=MINT,
+        output_mint=str(WSOL),
+        amount=1000123456,
+        ui_amount=1000.123456,
+        timestamp=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_sell_uses_mint_decimals(processor, sell_event):
+    processor.analyzer.analyze_transaction = AsyncMock(return_value=sell_analysis())
+    swap_event = sell_event
+
+    swap_record = await processor.process(Signature.default(), swap_event)
+
+    assert swap_record.input_token_decimals == 6
+    assert swap_record.output_token_decimals == 9
+    assert swap_record.output_amount == 500000000
+    processor.analyzer.analyze_transaction.assert_awaited_once_with(
+        str(Signature.default()), user_account=str(WSOL), mint=MINT
+    )
+
+
+@pytest.mark.asyncio
+async def test_missing_mint_account_falls_back_to_token_balances(processor, sell_event):
+    """获取不到 Mint 账户时，已上链的交易使用 token 余额中的精度"""
+    processor.mint_account_cache.get_mint_accounts = AsyncMock(return_value=[None])
+    processor.analyzer.analyze_transaction = AsyncMock(return_value=sell_analysis({MINT: 6}))
+
+    swap_record = await processor.process(Signature.default(), sell_event)
+
+    assert swap_record.status == TransactionStatus.SUCCESS
+    assert (swap_record.input_token_decimals, swap_record.output_token_decimals) == (6, 9)
+    processor.mint_account_cache.get_mint_accounts.assert_awaited_once_with([MINT])
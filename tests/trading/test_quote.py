@@ -0,0 +1,70 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.constants import WSOL
+from solbot_common.utils.quote import ConstantProductQuoter
+from solders.pubkey import Pubkey
+from trading import quote as quote_module
+from trading.quote import QuoteEngine
+from trading.route import MintStage
+
+
+def make_engine(stage: MintStage) -> QuoteEngine:
+    route_resolver = MagicMock()
+    route_resolver.resolve = AsyncMock(return_value=stage)
+    return QuoteEngine(MagicMock(), route_resolver)
+
+
+@pytest.mark.asyncio
+async def test_auto_slippage_many_quotes_locally(monkeypatch):
+    """所有数量共用一次池子查询，不调用 Jupiter"""
+    engine = make_engine(MintStage.OTHER)
+    quoter = ConstantProductQuoter(token_reserve=10**12, sol_reserve=10**11)
+
+    async def _load_amm_v4_quoter(mint):
+        await asyncio.sleep(0.01)
+        return quoter
+
+    load = AsyncMock(side_effect=_load_amm_v4_quoter)
+    monkeypatch.setattr(engine, "_load_amm_v4_quoter", load)
+    jupiter = AsyncMock()
+    monkeypatch.setattr(quote_module, "calculate_auto_slippage", jupiter)
+    mint = str(Pubkey.new_unique())
+
+    results = await asyncio.gather(
+        engine.auto_slippage_many(str(WSOL), mint, [10**6, 3 * 10**10]),
+        engine.auto_slippage(str(WSOL), mint, 10**6),
+    )
+
+    assert results == [[250, 3000], 250]
+    load.assert_awaited_once_with(mint)
+    jupiter.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_auto_slippage_falls_back_to_jupiter(monkeypatch):
+    engine = make_engine(MintStage.OTHER)
+    monkeypatch.setattr(engine, "_load_amm_v4_quoter", AsyncMock(return_value=None))
+    jupiter = AsyncMock(return_value=600)
+    monkeypatch.setattr(quote_module, "calculate_auto_slippage", jupiter)
+
+    slippage_bps = await engine.auto_slippage(
+        str(Pubkey.new_unique()), str(WSOL), 1_000, "ExactOut"
+    )
+
+    assert slippage_bps == 600
+    assert jupiter.await_args.kwargs["swap_mode"] == "ExactOut"
+
+
+@pytest.mark.asyncio
+async def test_pump_token_quotes_bonding_curve(monkeypatch):
+    engine = make_engine(MintStage.PUMP)
+    load_pump = AsyncMock(return_value=None)
+    load_amm_v4 = AsyncMock()
+    monkeypatch.setattr(engine, "_load_pump_quoter", load_pump)
+    monkeypatch.setattr(engine, "_load_amm_v4_quoter", load_amm_v4)
+
+    assert await engine.get_quoter(str(Pubkey.new_unique())) is None
+    load_pump.assert_awaited_once()
+    load_amm_v4.assert_not_awaited()
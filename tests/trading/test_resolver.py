@@ -0,0 +1,112 @@
+import struct
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.constants import WSOL
+from solders.pubkey import Pubkey
+from trading.transaction import resolver
+from trading.transaction.builders.ray_v4 import RaydiumV4TransactionBuilder
+from trading.transaction.resolver import StepTimer, get_multiple_accounts, parse_token_amount
+
+
+def token_account_data(amount: int) -> bytes:
+    return bytes(Pubkey.new_unique()) + bytes(Pubkey.new_unique()) + struct.pack("<Q", amount)
+
+
+@pytest.mark.asyncio
+async def test_get_multiple_accounts_in_chunks():
+    """超过单次查询上限时分批获取，结果保持顺序"""
+    pubkeys = [Pubkey.new_unique() for _ in range(150)]
+
+    async def _get_multiple_accounts(keys, commitment=None):
+        return MagicMock(
+            value=[MagicMock(data=bytes(key)) if i % 2 == 0 else None for i, key in enumerate(keys)]
+        )
+
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(side_effect=_get_multiple_accounts)
+
+    accounts = await get_multiple_accounts(client, pubkeys)
+
+    assert client.get_multiple_accounts.await_count == 2
+    assert len(accounts) == 150
+    assert accounts[0] == bytes(pubkeys[0])
+    assert accounts[1] is None
+    assert accounts[100] == bytes(pubkeys[100])
+
+
+@pytest.mark.asyncio
+async def test_step_timer_report(monkeypatch):
+    """构建完成后以交易签名为键上报各步骤的开始与结束时间"""
+    benchmark_service = MagicMock(is_running=True, add=AsyncMock())
+    monkeypatch.setattr(resolver, "benchmark_service", benchmark_service)
+    timer = StepTimer()
+
+    assert await timer.measure("pool", AsyncMock(return_value=1)()) == 1
+    async with timer.step("transaction"):
+        pass
+    await timer.report("sig")
+
+    steps = [call.args[0]["step"] for call in benchmark_service.add.await_args_list]
+    assert steps == [
+        "build_pool_start",
+        "build_pool_end",
+        "build_transaction_start",
+        "build_transaction_end",
+    ]
+    assert timer.elapsed("pool") is not None
+    assert timer.elapsed("missing") is None
+
+    benchmark_service.add.reset_mock()
+    benchmark_service.is_running = False
+    await timer.report("sig")
+    benchmark_service.add.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_ray_v4_resolve_accounts(monkeypatch):
+    """vault 与用户代币账户通过一次 getMultipleAccounts 获取"""
+    token_mint = Pubkey.new_unique()
+    pool_keys = MagicMock(
+        base_mint=token_mint,
+        quote_mint=WSOL,
+        base_vault=Pubkey.new_unique(),
+        quote_vault=Pubkey.new_unique(),
+        base_decimals=6,
+        quote_decimals=9,
+    )
+    monkeypatch.setattr(
+        RaydiumV4TransactionBuilder, "_get_pool_keys", AsyncMock(return_value=pool_keys)
+    )
+    monkeypatch.setattr(
+        "trading.transaction.builders.ray_v4.get_min_balance_rent",
+        AsyncMock(return_value=2039280),
+    )
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(
+        return_value=MagicMock(
+            value=[
+                MagicMock(data=token_account_data(30 * 10**9)),
+                MagicMock(data=token_account_data(1_000 * 10**6)),
+                None,
+            ]
+        )
+    )
+    builder = RaydiumV4TransactionBuilder(client)
+
+    accounts = await builder.resolve_accounts(Pubkey.new_unique(), str(token_mint))
+
+    client.get_multiple_accounts.assert_awaited_once()
+    keys = client.get_multiple_accounts.await_args.args[0]
+    assert keys == [pool_keys.quote_vault, pool_keys.base_vault, accounts.token_account]
+    assert accounts.token_mint == token_mint
+    assert not accounts.token_account_exists
+    assert accounts.token_amount == 0
+    assert accounts.base_reserve == 1_000
+    assert accounts.quote_reserve == 30
+    assert accounts.token_decimal == 6
+    assert accounts.balance_needed == 2039280
+
+
+def test_parse_token_amount():
+    assert parse_token_amount(token_account_data(42)) == 42
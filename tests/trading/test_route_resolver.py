@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.constants import PUMP_FUN_PROGRAM
+from solbot_common.layouts.bonding_curve_account import (
+    _EXPECTED_DISCRIMINATOR,
+    BONDING_CURVE_ACCOUNT_LAYOUT_V2,
+)
+from solbot_common.utils.utils import get_bonding_curve_pda
+from solders.pubkey import Pubkey
+from trading import route
+from trading.route import MintStage, RouteResolver
+
+
+def bonding_curve_data(complete: bool = False) -> bytes:
+    return _EXPECTED_DISCRIMINATOR + BONDING_CURVE_ACCOUNT_LAYOUT_V2.build(
+        {
+            "virtual_token_reserves": 1_000,
+            "virtual_sol_reserves": 30,
+            "real_token_reserves": 800,
+            "real_sol_reserves": 0,
+            "token_total_supply": 1_000,
+            "complete": complete,
+            "creator": bytes(Pubkey.new_unique()),
+        }
+    )
+
+
+def make_client(accounts: dict[Pubkey, bytes], delay: float = 0) -> MagicMock:
+    """accounts: mint -> bonding curve 账户数据，不在其中的 mint 没有 bonding curve"""
+    curves = {
+        get_bonding_curve_pda(mint, PUMP_FUN_PROGRAM)[0]: data for mint, data in accounts.items()
+    }
+
+    async def _get_multiple_accounts(keys, commitment=None):
+        await asyncio.sleep(delay)
+        return MagicMock(
+            value=[MagicMock(data=curves[key]) if key in curves else None for key in keys]
+        )
+
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(side_effect=_get_multiple_accounts)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_resolve_many_in_one_request():
+    """未缓存的 mint 通过一次 getMultipleAccounts 获取，之后命中缓存"""
+    pump, graduated, other = Pubkey.new_unique(), Pubkey.new_unique(), Pubkey.new_unique()
+    client = make_client({pump: bonding_curve_data(), graduated: bonding_curve_data(True)})
+    resolver = RouteResolver(client)
+
+    stages = await resolver.resolve_many([pump, str(graduated), other])
+
+    assert stages == [MintStage.PUMP, MintStage.PUMP_GRADUATED, MintStage.OTHER]
+    assert client.get_multiple_accounts.await_count == 1
+
+    assert await resolver.resolve(str(pump)) == MintStage.PUMP
+    assert client.get_multiple_accounts.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_resolve_single_flight():
+    """并发查询同一个 mint 时只发起一次请求"""
+    mint = Pubkey.new_unique()
+    client = make_client({mint: bonding_curve_data()}, delay=0.01)
+    resolver = RouteResolver(client)
+
+    stages = await asyncio.gather(*[resolver.resolve(mint) for _ in range(10)])
+
+    assert stages == [MintStage.PUMP] * 10
+    assert client.get_multiple_accounts.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_mark_graduated_and_invalidate():
+    mint = Pubkey.new_unique()
+    client = make_client({mint: bonding_curve_data()})
+    resolver = RouteResolver(client)
+    assert await resolver.resolve(mint) == MintStage.PUMP
+
+    resolver.mark_graduated(mint)
+    assert await resolver.resolve(mint) == MintStage.PUMP_GRADUATED
+    assert client.get_multiple_accounts.await_count == 1
+
+    resolver.invalidate(str(mint))
+    assert await resolver.resolve(mint) == MintStage.PUMP
+    assert client.get_multiple_accounts.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_pump_miss_cached_briefly(monkeypatch):
+    """交易来自 pump.fun 却查询不到 bonding curve 时只缓存几秒"""
+    monkeypatch.setattr(route, "PUMP_MISS_TTL", 0.01)
+    mint = Pubkey.new_unique()
+    client = make_client({})
+    resolver = RouteResolver(client)
+
+    assert await resolver.resolve(mint, expect_pump=True) == MintStage.OTHER
+    assert await resolver.resolve(mint) == MintStage.OTHER
+    assert client.get_multiple_accounts.await_count == 1
+
+    # RPC 节点追上后可以查询到 bonding curve
+    client.get_multiple_accounts.side_effect = make_client(
+        {mint: bonding_curve_data()}
+    ).get_multiple_accounts.side_effect
+    await asyncio.sleep(0.02)
+    assert await resolver.resolve(mint, expect_pump=True) == MintStage.PUMP
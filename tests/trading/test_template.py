@@ -0,0 +1,195 @@
+import struct
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.exceptions import BondingCurveNotFound
+from solbot_common.layouts.bonding_curve_account import (
+    _EXPECTED_DISCRIMINATOR,
+    BONDING_CURVE_ACCOUNT_LAYOUT_V2,
+    BondingCurveAccount,
+)
+from solders.pubkey import Pubkey
+from trading.swap import SwapDirection
+from trading.transaction import template as template_module
+from trading.transaction.protocol import TradingRoute
+from trading.transaction.resolver import StepTimer
+from trading.transaction.template import (
+    PumpSwapTemplate,
+    SwapTemplateCache,
+    SwapTemplateRefresher,
+    get_pump_template,
+)
+
+
+def bonding_curve_data(virtual_sol_reserves: int = 30, complete: bool = False) -> bytes:
+    return _EXPECTED_DISCRIMINATOR + BONDING_CURVE_ACCOUNT_LAYOUT_V2.build(
+        {
+            "virtual_token_reserves": 1_000,
+            "virtual_sol_reserves": virtual_sol_reserves,
+            "real_token_reserves": 800,
+            "real_sol_reserves": 0,
+            "token_total_supply": 1_000,
+            "complete": complete,
+            "creator": bytes(Pubkey.new_unique()),
+        }
+    )
+
+
+def token_account_data(mint: Pubkey, owner: Pubkey, amount: int) -> bytes:
+    return bytes(mint) + bytes(owner) + struct.pack("<Q", amount) + bytes(93)
+
+
+def make_template(owner: Pubkey | None = None, mint: Pubkey | None = None) -> PumpSwapTemplate:
+    return PumpSwapTemplate(
+        owner=owner or Pubkey.new_unique(),
+        mint=mint or Pubkey.new_unique(),
+        bonding_curve=Pubkey.new_unique(),
+        associated_bonding_curve=Pubkey.new_unique(),
+        creator_vault=Pubkey.new_unique(),
+        fee_recipient=Pubkey.new_unique(),
+        ata=Pubkey.new_unique(),
+        ata_exists=True,
+        bonding_curve_account=BondingCurveAccount(bonding_curve_data()),
+        token_amount=100,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    SwapTemplateCache().clear()
+    yield
+    SwapTemplateCache().clear()
+
+
+def test_cache_key():
+    """模板以 (用户, 代币, 交易路由, 交易方向) 为键"""
+    template = make_template()
+    cache = SwapTemplateCache()
+    cache.put(template, directions=[SwapDirection.Sell])
+
+    assert (
+        cache.get(template.owner, template.mint, TradingRoute.PUMP, SwapDirection.Sell) is template
+    )
+    assert cache.get(template.owner, template.mint, TradingRoute.PUMP, SwapDirection.Buy) is None
+    assert SwapTemplateCache() is cache
+
+    cache.remove(template.owner, template.mint)
+    assert cache.get(template.owner, template.mint, TradingRoute.PUMP, SwapDirection.Sell) is None
+
+
+@pytest.mark.asyncio
+async def test_get_pump_template(monkeypatch):
+    """模板有效时直接使用，使用后失效，下次通过 RPC 解析"""
+    template = make_template()
+    SwapTemplateCache().put(template)
+    resolved = make_template(template.owner, template.mint)
+    resolve = AsyncMock(return_value=resolved)
+    monkeypatch.setattr(PumpSwapTemplate, "resolve", resolve)
+    client = MagicMock()
+
+    args = (client, template.owner, template.mint, SwapDirection.Sell, 5)
+    assert await get_pump_template(*args) is template
+    resolve.assert_not_awaited()
+
+    assert await get_pump_template(*args) is resolved
+    resolve.assert_awaited_once_with(client, template.owner, template.mint, None)
+
+
+@pytest.mark.asyncio
+async def test_sell_uses_streamed_balance(monkeypatch):
+    """卖出时余额以订阅维护的余额为准，钱包未被订阅时使用模板中的余额"""
+    template = make_template()
+    SwapTemplateCache().put(template)
+    account_amount_cache = MagicMock()
+    monkeypatch.setattr(template_module, "AccountAmountCache", lambda: account_amount_cache)
+    args = (MagicMock(), template.owner, template.mint, SwapDirection.Sell, 5)
+
+    account_amount_cache.get_balance.return_value = None
+    assert (await get_pump_template(*args)).token_amount == 100
+
+    template.updated_at = time.monotonic()
+    account_amount_cache.get_balance.return_value = 40
+    assert (await get_pump_template(*args)).token_amount == 40
+    account_amount_cache.get_balance.assert_called_with(template.owner, template.mint)
+
+
+@pytest.mark.asyncio
+async def test_refresh():
+    """批量刷新储备量与余额，已毕业的代币移除模板"""
+    active, graduated = make_template(), make_template()
+    active.updated_at = graduated.updated_at = 0
+    cache = SwapTemplateCache()
+    cache.put(active)
+    cache.put(graduated)
+
+    def account(data: bytes | None):
+        return None if data is None else MagicMock(data=data)
+
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(
+        return_value=MagicMock(
+            value=[
+                account(bonding_curve_data(virtual_sol_reserves=60)),
+                account(bonding_curve_data(complete=True)),
+                account(token_account_data(active.mint, active.owner, 42)),
+                None,
+            ]
+        )
+    )
+
+    await SwapTemplateRefresher(client, wallets=lambda: []).refresh()
+
+    client.get_multiple_accounts.assert_awaited_once_with(
+        [active.bonding_curve, graduated.bonding_curve, active.ata, graduated.ata], None
+    )
+    assert active.bonding_curve_account.virtual_sol_reserves == 60
+    assert active.token_amount == 42
+    assert active.is_fresh(5)
+    assert cache.get(graduated.owner, graduated.mint, TradingRoute.PUMP, SwapDirection.Buy) is None
+
+
+@pytest.mark.asyncio
+async def test_resolve(monkeypatch):
+    """bonding curve 与 ATA 通过一次 getMultipleAccounts 获取，global 账户并发获取"""
+    owner, mint = Pubkey.new_unique(), Pubkey.new_unique()
+    fee_recipient = Pubkey.new_unique()
+    monkeypatch.setattr(
+        "trading.transaction.template.get_global_account",
+        AsyncMock(return_value=MagicMock(fee_recipient=fee_recipient)),
+    )
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(
+        return_value=MagicMock(
+            value=[
+                MagicMock(data=bonding_curve_data(virtual_sol_reserves=60)),
+                MagicMock(data=token_account_data(mint, owner, 42)),
+            ]
+        )
+    )
+    timer = StepTimer()
+
+    template = await PumpSwapTemplate.resolve(client, owner, mint, timer)
+
+    client.get_multiple_accounts.assert_awaited_once_with(
+        [template.bonding_curve, template.ata], None
+    )
+    assert template.fee_recipient == fee_recipient
+    assert template.ata_exists
+    assert template.token_amount == 42
+    assert template.bonding_curve_account.virtual_sol_reserves == 60
+    assert timer.elapsed("accounts") is not None
+    assert timer.elapsed("global_account") is not None
+
+
+@pytest.mark.asyncio
+async def test_resolve_bonding_curve_not_found(monkeypatch):
+    monkeypatch.setattr(
+        "trading.transaction.template.get_global_account",
+        AsyncMock(return_value=MagicMock(fee_recipient=Pubkey.new_unique())),
+    )
+    client = MagicMock()
+    client.get_multiple_accounts = AsyncMock(return_value=MagicMock(value=[None, None]))
+
+    with pytest.raises(BondingCurveNotFound):
+        await PumpSwapTemplate.resolve(client, Pubkey.new_unique(), Pubkey.new_unique())
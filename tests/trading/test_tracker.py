@@ -0,0 +1,98 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from solbot_common.models.swap_record import TransactionStatus
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+from trading.settlement.tracker import ConfirmationTracker
+
+
+def status(confirmation_status=TransactionConfirmationStatus.Confirmed, err=None):
+    return MagicMock(confirmation_status=confirmation_status, err=err)
+
+
+def make_client(statuses: dict[Signature, MagicMock | None]) -> MagicMock:
+    async def _get_signature_statuses(signatures, search_transaction_history=False):
+        return MagicMock(value=[statuses.get(signature) for signature in signatures])
+
+    client = MagicMock()
+    client.get_signature_statuses = AsyncMock(side_effect=_get_signature_statuses)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_batch_confirmation():
+    """所有待确认交易通过一次 getSignatureStatuses 查询"""
+    success, failed, processed, unknown = (Signature.new_unique() for _ in range(4))
+    client = make_client(
+        {
+            success: status(),
+            failed: status(TransactionConfirmationStatus.Finalized, err="InstructionError"),
+            processed: status(TransactionConfirmationStatus.Processed),
+        }
+    )
+    tracker = ConfirmationTracker(client, poll_interval=0.01, timeout=0.05)
+    try:
+        results = await asyncio.gather(
+            tracker.wait(success),
+            tracker.wait(failed),
+            tracker.wait(processed),
+            tracker.wait(unknown),
+        )
+    finally:
+        tracker.stop()
+
+    assert results == [
+        TransactionStatus.SUCCESS,
+        TransactionStatus.FAILED,
+        TransactionStatus.EXPIRED,
+        TransactionStatus.EXPIRED,
+    ]
+    first_call = client.get_signature_statuses.await_args_list[0]
+    assert first_call.args[0] == [success, failed, processed, unknown]
+    assert tracker.pending() == 0
+
+
+@pytest.mark.asyncio
+async def test_poll_in_chunks():
+    """每次最多查询 256 个签名"""
+    signatures = [Signature.new_unique() for _ in range(300)]
+    client = make_client({signature: status() for signature in signatures})
+    tracker = ConfirmationTracker(client, poll_interval=60)
+    try:
+        waiters = [asyncio.create_task(tracker.wait(signature)) for signature in signatures]
+        await asyncio.sleep(0)
+        assert tracker.pending() == 300
+
+        await tracker.poll()
+        results = await asyncio.gather(*waiters)
+    finally:
+        tracker.stop()
+
+    assert client.get_signature_statuses.await_count == 2
+    assert [len(call.args[0]) for call in client.get_signature_statuses.await_args_list] == [
+        256,
+        44,
+    ]
+    assert set(results) == {TransactionStatus.SUCCESS}
+
+
+@pytest.mark.asyncio
+async def test_resolve_shared_waiters():
+    """同一笔交易的多个等待者共享结果，结果可以由外部推送"""
+    signature = Signature.new_unique()
+    client = make_client({})
+    tracker = ConfirmationTracker(client, poll_interval=60)
+    try:
+        first = asyncio.create_task(tracker.wait(signature))
+        second = asyncio.create_task(tracker.wait(signature))
+        await asyncio.sleep(0)
+        assert tracker.pending() == 1
+
+        tracker.resolve(signature, TransactionStatus.SUCCESS)
+        assert await first == TransactionStatus.SUCCESS
+        assert await second == TransactionStatus.SUCCESS
+    finally:
+        tracker.stop()
+    client.get_signature_statuses.assert_not_awaited()
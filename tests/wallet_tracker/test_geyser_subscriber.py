@@ -0,0 +1,232 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from solders.pubkey import Pubkey
+from wallet_tracker.geyser.stream import HashRing, RecentSignatures
+from wallet_tracker.geyser.tx_subscriber import TransactionDetailSubscriber
+from yellowstone_grpc.grpc import geyser_pb2
+
+WALLETS = [Pubkey.new_unique() for _ in range(5)]
+
+
+def make_subscriber(num_streams: int = 1) -> TransactionDetailSubscriber:
+    subscriber = TransactionDetailSubscriber(
+        "endpoint",
+        "api_key",
+        AsyncMock(),
+        [],
+        tx_queue=AsyncMock(),
+        subscribe_debounce=0.01,
+        num_streams=num_streams,
+    )
+    for stream in subscriber.streams:
+        stream.request_queue = asyncio.Queue()
+    return subscriber
+
+
+@pytest.fixture
+def subscriber():
+    return make_subscriber()
+
+
+def drain(queue: asyncio.Queue) -> list:
+    requests = []
+    while not queue.empty():
+        requests.append(queue.get_nowait())
+    return requests
+
+
+@pytest.mark.asyncio
+async def test_changes_coalesced_into_one_request(subscriber):
+    await subscriber.subscribe_many(WALLETS[:3])
+    for wallet in WALLETS[3:]:
+        await subscriber.subscribe_wallet_transactions(wallet)
+    await subscriber.unsubscribe_wallet_transactions(WALLETS[0])
+    (stream,) = subscriber.streams
+    assert stream.request_queue.empty()
+
+    await asyncio.sleep(0.05)
+    (request,) = drain(stream.request_queue)
+    assert list(request.transactions["key"].account_include) == sorted(
+        str(wallet) for wallet in WALLETS[1:]
+    )
+    assert not request.transactions["key"].failed
+    assert "slots" in request.slots
+
+
+@pytest.mark.asyncio
+async def test_no_request_when_unchanged(subscriber):
+    (stream,) = subscriber.streams
+    await subscriber.subscribe_many(WALLETS[:1])
+    await subscriber.unsubscribe_many(WALLETS[:1])
+    await asyncio.sleep(0.05)
+    # 订阅集合为空时退化为 ping 请求
+    (request,) = drain(stream.request_queue)
+    assert request.HasField("ping")
+
+    # 窗口内增加后又移除，集合与已发送的一致，不再发送
+    await subscriber.subscribe_many(WALLETS[:1])
+    await subscriber.unsubscribe_many(WALLETS[:1])
+    await asyncio.sleep(0.05)
+    assert stream.request_queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_subscribe_before_start_included_in_initial_request(subscriber):
+    (stream,) = subscriber.streams
+    stream.request_queue = None
+    await subscriber.subscribe_many(WALLETS)
+    await asyncio.sleep(0.05)
+
+    request = stream.build_subscribe_request()
+    assert len(request.transactions["key"].account_include) == len(WALLETS)
+
+
+def test_hash_ring_moves_few_keys():
+    keys = [str(Pubkey.new_unique()) for _ in range(2000)]
+    ring, bigger = HashRing(4), HashRing(5)
+    shards = [ring.get(key) for key in keys]
+    assert set(shards) == {0, 1, 2, 3}
+    assert max(shards.count(shard) for shard in range(4)) < 2 * len(keys) / 4
+    # 增加一个分片时，只有约 1/5 的 key 需要迁移
+    moved = sum(ring.get(key) != bigger.get(key) for key in keys)
+    assert moved < len(keys) / 3
+
+
+@pytest.mark.asyncio
+async def test_only_owning_stream_resubscribes():
+    subscriber = make_subscriber(num_streams=4)
+    wallets = [Pubkey.new_unique() for _ in range(40)]
+    await subscriber.subscribe_many(wallets)
+    await asyncio.sleep(0.05)
+    sent = [
+        set(request.transactions["key"].account_include)
+        for stream in subscriber.streams
+        for request in drain(stream.request_queue)
+    ]
+    assert set().union(*sent) == {str(wallet) for wallet in wallets}
+    assert sum(len(wallets) for wallets in sent) == len(wallets)
+
+    await subscriber.unsubscribe_wallet_transactions(wallets[0])
+    await asyncio.sleep(0.05)
+    changed = [stream for stream in subscriber.streams if not stream.request_queue.empty()]
+    assert changed == [subscriber._stream_of(str(wallets[0]))]
+
+
+@pytest.mark.asyncio
+async def test_stream_lag_stats():
+    subscriber = make_subscriber(num_streams=2)
+    fast, slow = subscriber.streams
+    fast._record(geyser_pb2.SubscribeUpdate(slot=geyser_pb2.SubscribeUpdateSlot(slot=120)))
+    slow._record(geyser_pb2.SubscribeUpdate(slot=geyser_pb2.SubscribeUpdateSlot(slot=100)))
+
+    fast_stats, slow_stats = subscriber.stats()
+    assert fast_stats["slot_lag"] == 0
+    assert slow_stats["slot_lag"] == 20
+    assert slow_stats["received"] == 1
+
+
+@pytest.mark.asyncio
+async def test_reader_survives_failed_reconnect(monkeypatch):
+    """重新连接失败后读取协程按退避重试，失败通过 stats() 暴露"""
+    subscriber = make_subscriber()
+    (stream,) = subscriber.streams
+    stream.retry_delay = 0.001
+    update = transaction_update(b"\x01" * 64)
+
+    async def closed():
+        return
+        yield
+
+    async def reconnected():
+        yield update
+        await asyncio.Event().wait()
+
+    attempts = 0
+
+    async def reconnect():
+        nonlocal attempts
+        attempts += 1
+        # _connect 在上一轮用完重试次数后，下一轮可以重新重试
+        assert stream.retry_count == 0
+        if attempts < 3:
+            stream.retry_count = stream.max_retries
+            raise RuntimeError("geyser unavailable")
+        stream.responses = reconnected()
+
+    monkeypatch.setattr(stream, "_reconnect", reconnect)
+    failures = []
+    sleep = asyncio.sleep
+
+    async def record_sleep(delay):
+        if delay:
+            failures.append(stream.stats(0)["reconnect_failures"])
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", record_sleep)
+    stream.responses = closed()
+    stream.is_running = True
+    stream.reader = asyncio.create_task(stream._read_loop())
+    for _ in range(20):
+        await sleep(0)
+    monkeypatch.undo()
+
+    assert attempts == 3
+    assert failures == [1, 2]
+    assert not stream.reader.done()
+    assert drain(subscriber.response_queue) == [update]
+    stats = stream.stats(0)
+    assert stats["reconnect_failures"] == 0
+    assert stats["last_error"] is None
+    await stream.stop()
+
+
+def transaction_update(signature: bytes) -> geyser_pb2.SubscribeUpdate:
+    return geyser_pb2.SubscribeUpdate(
+        filters=["key"],
+        transaction=geyser_pb2.SubscribeUpdateTransaction(
+            slot=100,
+            transaction=geyser_pb2.SubscribeUpdateTransactionInfo(signature=signature),
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_duplicate_transaction_across_streams_dropped():
+    subscriber = make_subscriber(num_streams=2)
+    shared, other = b"\x01" * 64, b"\x02" * 64
+
+    async def responses(*signatures):
+        for signature in signatures:
+            yield transaction_update(signature)
+        await asyncio.Event().wait()
+
+    first, second = subscriber.streams
+    first.responses = responses(shared)
+    second.responses = responses(shared, other)
+    for stream in subscriber.streams:
+        stream.is_running = True
+        stream.reader = asyncio.create_task(stream._read_loop())
+    await asyncio.sleep(0.05)
+    for stream in subscriber.streams:
+        await stream.stop()
+
+    received = drain(subscriber.response_queue)
+    assert [r.transaction.transaction.signature for r in received] == [shared, other]
+    assert first.duplicates + second.duplicates == 1
+
+
+def test_recent_signatures_bounded():
+    recent = RecentSignatures(maxsize=2, ttl=60)
+    assert recent.add(b"a")
+    assert not recent.add(b"a")
+    recent.add(b"b")
+    recent.add(b"c")
+    assert len(recent) == 2
+    # 最早的签名已被淘汰
+    assert recent.add(b"a")
+
+    expired = RecentSignatures(ttl=0)
+    expired.add(b"a")
+    assert expired.add(b"a")
@@ -3,7 +3,11 @@ from pathlib import Path
 
 import pytest
 from solbot_common.types import TxType
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from wallet_tracker.parser.proto_tx import ProtoTXParser
 from wallet_tracker.parser.raw_tx import RawTXParser
+from yellowstone_grpc.grpc import geyser_pb2
 
 
 def read_raw_tx(name: str) -> dict:
@@ -12,6 +16,38 @@ def read_raw_tx(name: str) -> dict:
         return json.load(f)["result"]
 
 
+def raw_tx_to_proto(tx: dict) -> geyser_pb2.SubscribeUpdateTransaction:
+    """将 rpc 返回的交易详情转换为 geyser 推送的 protobuf 结构"""
+    update = geyser_pb2.SubscribeUpdateTransaction(slot=tx["slot"])
+    info = update.transaction
+    info.signature = bytes(Signature.from_string(tx["transaction"]["signatures"][0]))
+    for signature in tx["transaction"]["signatures"]:
+        info.transaction.signatures.append(bytes(Signature.from_string(signature)))
+    for account_key in tx["transaction"]["message"]["accountKeys"]:
+        if isinstance(account_key, dict):
+            account_key = account_key["pubkey"]
+        info.transaction.message.account_keys.append(bytes(Pubkey.from_string(account_key)))
+
+    meta = tx["meta"]
+    info.meta.fee = meta["fee"]
+    info.meta.pre_balances.extend(meta["preBalances"])
+    info.meta.post_balances.extend(meta["postBalances"])
+    info.meta.log_messages.extend(meta["logMessages"])
+    for field, balances in (
+        (info.meta.pre_token_balances, meta["preTokenBalances"]),
+        (info.meta.post_token_balances, meta["postTokenBalances"]),
+    ):
+        for balance in balances:
+            token_balance = field.add()
+            token_balance.account_index = balance["accountIndex"]
+            token_balance.mint = balance["mint"]
+            token_balance.owner = balance.get("owner", "")
+            token_balance.program_id = balance.get("programId", "")
+            token_balance.ui_token_amount.amount = balance["uiTokenAmount"]["amount"]
+            token_balance.ui_token_amount.decimals = balance["uiTokenAmount"]["decimals"]
+    return update
+
+
 @pytest.mark.parametrize(
     "name,expected_signature,expected_from_amount,expected_from_decimals,expected_to_amount,expected_to_decimals,expected_mint,expected_who,expected_tx_type,expected_program_id",
     [
@@ -185,3 +221,27 @@ def test_parse_raw_tx(
     assert parsed.who == expected_who
     assert parsed.tx_type == expected_tx_type
     assert parsed.program_id == expected_program_id
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "raw/open",
+        "raw/open1",
+        "raw/open2",
+        "raw/open3",
+        "raw/open4",
+        "raw/reduce",
+        "raw/reduce1",
+        "raw/add",
+        "raw/close",
+        "raw/fail",
+        "raw/fail1",
+        "raw/fail2",
+    ],
+)
+def test_parse_proto_tx(name: str):
+    tx = read_raw_tx(name)
+    expected = RawTXParser(tx).parse()
+    parsed = ProtoTXParser(raw_tx_to_proto(tx), block_time=tx["blockTime"]).parse()
+    assert parsed == expected
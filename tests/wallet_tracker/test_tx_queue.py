@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+from unittest.mock import AsyncMock
+
+import aioredis
+import pytest
+from wallet_tracker.constants import NEW_TX_DETAIL_CHANNEL
+from wallet_tracker.parser.raw_tx import RawTXParser
+from wallet_tracker.tx_queue import TxDetailQueue
+
+
+def read_raw_tx(name: str) -> dict:
+    path = Path(__file__).parent / "tx_examples" / f"{name}.json"
+    with open(path) as f:
+        return json.load(f)["result"]
+
+
+@pytest.fixture
+def mock_redis():
+    """模拟 Redis 客户端"""
+    redis = AsyncMock(spec=aioredis.Redis)
+    redis.lpush = AsyncMock()
+    redis.rpop = AsyncMock(return_value=None)
+    redis.brpop = AsyncMock(return_value=None)
+    return redis
+
+
+@pytest.mark.asyncio
+async def test_redis_mode(mock_redis):
+    """redis 模式下交易详情经由 redis 列表传递"""
+    tx = read_raw_tx("raw/open")
+    queue = TxDetailQueue(mock_redis, mode="redis")
+
+    await queue.put(RawTXParser(tx))
+    mock_redis.lpush.assert_awaited_once()
+    channel, text = mock_redis.lpush.await_args.args
+    assert channel == NEW_TX_DETAIL_CHANNEL
+
+    mock_redis.brpop.return_value = (channel, text)
+    tx_parser = await queue.get()
+    assert tx_parser is not None
+    assert tx_parser.get_tx_hash() == RawTXParser(tx).get_tx_hash()
+
+
+@pytest.mark.asyncio
+async def test_inprocess_mode_skips_redis(mock_redis):
+    """inprocess 模式下直接传递解析器，不经过 redis"""
+    tx_parser = RawTXParser(read_raw_tx("raw/open"))
+    queue = TxDetailQueue(mock_redis, mode="inprocess", overflow=False)
+
+    await queue.put(tx_parser)
+    assert await queue.get() is tx_parser
+    assert await queue.get(timeout=0) is None
+    mock_redis.lpush.assert_not_awaited()
+    mock_redis.rpop.assert_not_awaited()
+    mock_redis.brpop.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_inprocess_mode_overflow(mock_redis):
+    """inprocess 模式下队列满时溢出到 redis 列表，并在队列空闲后被取出"""
+    first = RawTXParser(read_raw_tx("raw/open"))
+    second = RawTXParser(read_raw_tx("raw/close"))
+    queue = TxDetailQueue(mock_redis, mode="inprocess", maxsize=1, overflow=True)
+
+    await queue.put(first)
+    await queue.put(second)
+    mock_redis.lpush.assert_awaited_once()
+    _, text = mock_redis.lpush.await_args.args
+
+    assert await queue.get() is first
+
+    mock_redis.rpop.return_value = text
+    overflowed = await queue.get()
+    assert overflowed is not None
+    assert overflowed.get_tx_hash() == second.get_tx_hash()
+
+    mock_redis.rpop.return_value = None
+    assert await queue.get(timeout=0) is None
+    # 溢出的交易已全部取出，不再访问 redis
+    mock_redis.rpop.reset_mock()
+    assert await queue.get(timeout=0) is None
+    mock_redis.rpop.assert_not_awaited()